@@ -9,6 +9,7 @@ from utils.tickets import (
     create_ticket, get_ticket, get_user_tickets, get_all_tickets,
     update_ticket_status, assign_ticket, add_ticket_response, get_ticket_stats
 )
+from utils.notifications import notifier
 from config import TELEGRAM_ADMIN_IDS
 
 # Состояния FSM для создания тикета
@@ -593,16 +594,8 @@ async def notify_admins_new_ticket(context: ContextTypes.DEFAULT_TYPE, ticket_id
     keyboard = [[InlineKeyboardButton("👀 Посмотреть", callback_data=f"ticket_admin_view_{ticket_id}")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    for admin_id in TELEGRAM_ADMIN_IDS:
-        try:
-            await context.bot.send_message(
-                chat_id=int(admin_id),
-                text=text,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        except:
-            pass
+    # Рассылка в фоне: пользователь не ждёт отправки каждому админу
+    notifier.notify(context.bot, TELEGRAM_ADMIN_IDS, text, reply_markup)
 
 async def notify_user_admin_replied(context: ContextTypes.DEFAULT_TYPE, ticket: dict, message: str):
     """Уведомить пользователя об ответе админа"""
@@ -640,16 +633,8 @@ async def notify_admins_user_replied(context: ContextTypes.DEFAULT_TYPE, ticket:
     keyboard = [[InlineKeyboardButton("👀 Посмотреть", callback_data=f"ticket_admin_view_{ticket['id']}")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    for admin_id in TELEGRAM_ADMIN_IDS:
-        try:
-            await context.bot.send_message(
-                chat_id=int(admin_id),
-                text=text,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        except:
-            pass
+    # Рассылка в фоне: пользователь не ждёт отправки каждому админу
+    notifier.notify(context.bot, TELEGRAM_ADMIN_IDS, text, reply_markup)
 
 async def notify_user_ticket_closed(context: ContextTypes.DEFAULT_TYPE, ticket: dict):
     """Уведомить пользователя о закрытии тикета"""
@@ -676,12 +661,4 @@ async def notify_admins_ticket_closed(context: ContextTypes.DEFAULT_TYPE, ticket
 👤 {ticket['user_name']} (@{ticket['username']})
 """
     
-    for admin_id in TELEGRAM_ADMIN_IDS:
-        try:
-            await context.bot.send_message(
-                chat_id=int(admin_id),
-                text=text,
-                parse_mode='Markdown'
-            )
-        except:
-            pass
+    notifier.notify(context.bot, TELEGRAM_ADMIN_IDS, text)
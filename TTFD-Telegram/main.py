@@ -23,6 +23,7 @@ from handlers.commands import (
 from handlers.buttons import button_handler
 from handlers.messages import message_handler
 from handlers.admin import admin_command, broadcast_command
+from utils.notifications import shutdown_notifier
 
 # Импорты для тикет-системы
 from handlers.tickets import (
@@ -54,7 +55,9 @@ def main():
         sys.exit(1)
     
     # Создаём приложение
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # post_stop досылает очередь уведомлений админам, пока HTTP-клиент бота
+    # ещё открыт (post_shutdown вызывается уже после Application.shutdown())
+    app = Application.builder().token(TELEGRAM_BOT_TOKEN).post_stop(shutdown_notifier).build()
     
     # ========================================================================
     # CONVERSATION HANDLER: Создание тикета
@@ -0,0 +1,308 @@
+"""
+Рассылка уведомлений админам
+Фоновая очередь с лимитами Telegram и дайджестом
+
+Handlers только ставят уведомление в очередь (notifier.notify) и сразу
+отвечают пользователю: медленный или заблокированный чат админа больше
+не задерживает подтверждение. Отправкой занимаются несколько фоновых
+задач:
+- не больше NOTIFY_CONCURRENCY одновременных send_message;
+- в один чат не чаще раза в NOTIFY_CHAT_INTERVAL секунд, на весь бот не
+  больше NOTIFY_GLOBAL_RATE сообщений в секунду;
+- RetryAfter (flood control) ставит отправку на паузу на указанное
+  Telegram время, сетевые ошибки повторяются до NOTIFY_MAX_RETRIES раз;
+- в режиме дайджеста (NOTIFY_DIGEST_SECONDS > 0) события одного админа
+  за окно собираются в одно сообщение.
+"""
+
+import asyncio
+import time
+from collections import deque
+from telegram import InlineKeyboardMarkup
+from telegram.error import RetryAfter, Forbidden, BadRequest, NetworkError
+from config import NOTIFY_DIGEST_SECONDS
+
+# Одновременных отправок
+NOTIFY_CONCURRENCY = 4
+
+# Минимальный интервал между сообщениями в один чат (секунды)
+NOTIFY_CHAT_INTERVAL = 1.0
+
+# Сообщений в секунду на весь бот (лимит Telegram - около 30)
+NOTIFY_GLOBAL_RATE = 25
+
+# Повторов при сетевых ошибках
+NOTIFY_MAX_RETRIES = 3
+
+# Лимит длины сообщения Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+# Кнопок в дайджесте
+DIGEST_MAX_BUTTONS = 8
+
+DIGEST_SEPARATOR = "\n➖➖➖➖➖\n"
+
+
+class _Message:
+    """Уведомление в очереди чата"""
+    
+    __slots__ = ('text', 'reply_markup', 'parse_mode', 'attempts')
+    
+    def __init__(self, text, reply_markup=None, parse_mode='Markdown'):
+        self.text = text.strip()
+        self.reply_markup = reply_markup
+        self.parse_mode = parse_mode
+        self.attempts = 0
+
+
+class _Chat:
+    """Очередь и лимит одного чата"""
+    
+    __slots__ = ('pending', 'next_allowed', 'busy', 'timer')
+    
+    def __init__(self):
+        self.pending = deque()
+        self.next_allowed = 0.0  # time.monotonic(), раньше которого не отправлять
+        self.busy = False        # Чат уже запланирован или отправляется
+        self.timer = None        # asyncio.TimerHandle отложенного запуска
+
+
+class NotificationDispatcher:
+    """Фоновая рассылка уведомлений с лимитами и дайджестом"""
+    
+    def __init__(self, concurrency=NOTIFY_CONCURRENCY, digest_seconds=NOTIFY_DIGEST_SECONDS):
+        self.concurrency = concurrency
+        self.digest_seconds = digest_seconds
+        self.bot = None
+        self._chats = {}
+        self._ready = None
+        self._workers = []
+        self._next_global = 0.0
+        self._sending = 0
+        self.sent = 0
+        self.failed = 0
+    
+    # === Очередь ===
+    
+    def notify(self, bot, chat_ids, text, reply_markup=None, parse_mode='Markdown'):
+        """
+        Поставить уведомление в очередь каждого чата (без ожидания отправки)
+        
+        Args:
+            bot: context.bot
+            chat_ids: ID чатов (например, TELEGRAM_ADMIN_IDS)
+            text: Текст сообщения
+            reply_markup: Кнопки (InlineKeyboardMarkup)
+            parse_mode: Режим разметки
+        """
+        self.bot = bot
+        self._ensure_started()
+        
+        for chat_id in chat_ids:
+            chat = self._chats.setdefault(int(chat_id), _Chat())
+            chat.pending.append(_Message(text, reply_markup, parse_mode))
+            if not chat.busy:
+                chat.busy = True
+                # Первое событие открывает окно дайджеста
+                self._schedule(int(chat_id), max(self.digest_seconds, chat.next_allowed - time.monotonic()))
+    
+    @property
+    def pending_count(self):
+        """Уведомлений, ожидающих отправки (включая отправляемые сейчас)"""
+        return self._sending + sum(len(chat.pending) for chat in self._chats.values())
+    
+    def _ensure_started(self):
+        """Запустить отправителей в текущем event loop (при первом уведомлении)"""
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.concurrency)
+        ]
+    
+    def _schedule(self, chat_id, delay):
+        """Отдать чат отправителям через delay секунд"""
+        chat = self._chats[chat_id]
+        if delay > 0:
+            chat.timer = asyncio.get_running_loop().call_later(delay, self._make_ready, chat_id)
+        else:
+            self._make_ready(chat_id)
+    
+    def _make_ready(self, chat_id):
+        self._chats[chat_id].timer = None
+        self._ready.put_nowait(chat_id)
+    
+    def _reserve_global_slot(self):
+        """Сколько ждать до слота в общем лимите бота"""
+        now = time.monotonic()
+        slot = max(now, self._next_global)
+        self._next_global = slot + 1 / NOTIFY_GLOBAL_RATE
+        return slot - now
+    
+    # === Отправка ===
+    
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            try:
+                await self._send_next(chat_id)
+            except Exception as e:
+                print(f"❌ Ошибка рассылки уведомлений в чат {chat_id}: {e}")
+            finally:
+                self._ready.task_done()
+    
+    async def _send_next(self, chat_id):
+        """Отправить следующее сообщение (или дайджест) чата"""
+        chat = self._chats[chat_id]
+        batch = self._take_batch(chat)
+        if not batch:
+            chat.busy = False
+            return
+        
+        self._sending += len(batch)
+        try:
+            retry_in = await self._send_batch(chat, chat_id, batch)
+        finally:
+            self._sending -= len(batch)
+        
+        now = time.monotonic()
+        chat.next_allowed = now + max(NOTIFY_CHAT_INTERVAL, retry_in)
+        
+        if chat.pending:
+            self._schedule(chat_id, max(chat.next_allowed - now, self.digest_seconds))
+        else:
+            chat.busy = False
+    
+    async def _send_batch(self, chat, chat_id, batch):
+        """
+        Отправить пачку; неотправленное, которое стоит повторить,
+        возвращается в начало очереди чата
+        
+        Returns:
+            Через сколько секунд можно пробовать снова
+        """
+        delay = self._reserve_global_slot()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        text, reply_markup = self._compose(batch)
+        retry_in = 0.0
+        
+        try:
+            await self.bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                reply_markup=reply_markup,
+                parse_mode=batch[0].parse_mode
+            )
+            self.sent += len(batch)
+        except RetryAfter as e:
+            # Flood control: ждём, сколько сказал Telegram, и не шлём никому
+            retry_in = _seconds(e.retry_after)
+            self._next_global = max(self._next_global, time.monotonic() + retry_in)
+            chat.pending.extendleft(reversed(batch))
+            print(f"⚠️  Flood control Telegram: пауза {retry_in:.0f} сек")
+        except (Forbidden, BadRequest) as e:
+            # Админ заблокировал бота или сообщение не принято - не повторяем
+            self.failed += len(batch)
+            print(f"⚠️  Уведомление в чат {chat_id} не доставлено: {e}")
+        except NetworkError as e:
+            retry = [message for message in batch if message.attempts < NOTIFY_MAX_RETRIES]
+            for message in retry:
+                message.attempts += 1
+            chat.pending.extendleft(reversed(retry))
+            self.failed += len(batch) - len(retry)
+            retry_in = 2 ** max((message.attempts for message in retry), default=0)
+            print(f"⚠️  Сетевая ошибка при уведомлении в чат {chat_id}: {e}")
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"❌ Ошибка отправки уведомления в чат {chat_id}: {e}")
+        
+        return retry_in
+    
+    def _take_batch(self, chat):
+        """Сообщения для одной отправки: одно или дайджест, влезающий в лимит"""
+        if not chat.pending:
+            return []
+        
+        batch = [chat.pending.popleft()]
+        if not self.digest_seconds:
+            return batch
+        
+        length = len(batch[0].text)
+        while chat.pending:
+            message = chat.pending[0]
+            length += len(DIGEST_SEPARATOR) + len(message.text)
+            # Заголовок дайджеста - с запасом
+            if message.parse_mode != batch[0].parse_mode or length > MAX_MESSAGE_LENGTH - 100:
+                break
+            batch.append(chat.pending.popleft())
+        
+        return batch
+    
+    @staticmethod
+    def _compose(batch):
+        """Текст и кнопки для отправки"""
+        if len(batch) == 1:
+            return batch[0].text[:MAX_MESSAGE_LENGTH], batch[0].reply_markup
+        
+        text = f"📬 Уведомлений: {len(batch)}\n\n" + DIGEST_SEPARATOR.join(message.text for message in batch)
+        
+        rows = []
+        seen = set()
+        for message in batch:
+            if not message.reply_markup:
+                continue
+            for row in message.reply_markup.inline_keyboard:
+                key = tuple(button.callback_data or button.url for button in row)
+                if key not in seen and len(rows) < DIGEST_MAX_BUTTONS:
+                    seen.add(key)
+                    rows.append(row)
+        
+        return text, InlineKeyboardMarkup(rows) if rows else None
+    
+    # === Остановка ===
+    
+    async def stop(self, timeout=10):
+        """Отправить накопленное (не дожидаясь окна дайджеста) и остановиться"""
+        if not self._workers:
+            return
+        
+        deadline = time.monotonic() + timeout
+        
+        while self.pending_count and time.monotonic() < deadline:
+            for chat_id, chat in self._chats.items():
+                if chat.timer:
+                    chat.timer.cancel()
+                    self._make_ready(chat_id)
+            try:
+                await asyncio.wait_for(self._ready.join(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+            # Чаты, отложенные по лимиту, ещё ждут своего таймера
+            if self.pending_count:
+                await asyncio.sleep(NOTIFY_CHAT_INTERVAL)
+        
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        
+        if self.pending_count:
+            print(f"⚠️  Не отправлено уведомлений при остановке: {self.pending_count}")
+        print(f"📨 Уведомления: отправлено {self.sent}, не доставлено {self.failed}")
+
+
+def _seconds(value):
+    """retry_after: число секунд или timedelta (в новых python-telegram-bot)"""
+    return value.total_seconds() if hasattr(value, 'total_seconds') else float(value)
+
+
+# Глобальный диспетчер
+notifier = NotificationDispatcher()
+
+
+async def shutdown_notifier(app):
+    """post_stop приложения: дослать очередь уведомлений (бот ещё может отправлять)"""
+    await notifier.stop()
@@ -0,0 +1,512 @@
+# Инкрементальные сжатые бэкапы: полный снимок + дельты изменений
+#
+# Каждый бэкап - поток JSON-строк (по строке на запись), сжатый на лету
+# (zstd если установлен zstandard, иначе gzip) и разрезанный на части
+# не больше BACKUP_CHUNK_SIZE (лимит загрузки файлов в Telegram - 50 МБ).
+#
+# Изменения ищутся по журналу хэшей: в backup_state.json для каждой
+# записи хранится короткий хэш её содержимого. Дельта содержит только
+# записи с изменившимся хэшем и удалённые ключи. Раз в BACKUP_FULL_EVERY
+# дельт (или при потере состояния) делается новый полный снимок.
+#
+# Части называются .partNNNofMMM: архив с недостающими частями (загрузка
+# оборвалась) при восстановлении пропускается. Номер бэкапа, хотя бы одна
+# часть которого ушла в Telegram, больше не используется, а дельта хранит
+# номер бэкапа, поверх которого она сделана (prev_seq) - восстановление
+# идёт по этим ссылкам, а не по подряд идущим номерам.
+#
+# Сессии (токены входа) в бэкап не попадают.
+#
+# Восстановление: python restore_backup.py <папка с файлами бэкапа>
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+BACKUP_STATE_FILE = os.getenv('BACKUP_STATE_FILE', 'backup_state.json')
+BACKUP_COMPRESSION = os.getenv('BACKUP_COMPRESSION', 'zstd')
+BACKUP_CHUNK_SIZE = int(os.getenv('BACKUP_CHUNK_SIZE', str(45 * 1024 * 1024)))
+BACKUP_FULL_EVERY = int(os.getenv('BACKUP_FULL_EVERY', '28'))  # 28 × 6 часов = неделя
+
+# Размер порции строк при чтении таблиц PostgreSQL (серверный курсор)
+PG_FETCH_SIZE = 2000
+
+# Таблицы PostgreSQL и их первичные ключи (sessions не выгружается -
+# живые токены входа не должны уходить из базы)
+PG_TABLES = {
+    'users': 'id',
+    'accounts': 'id',
+    'global_stats': 'id',
+}
+
+# Разделы JSON-базы, записи которых не сохраняются (сам раздел - пустым)
+SKIPPED_COLLECTIONS = {'accounts/sessions'}
+
+FORMAT_VERSION = 2
+
+
+class ChunkedWriter:
+    """
+    Файловый объект, который пишет в part001, part002, ... и начинает
+    новую часть, как только текущая достигла max_size байт
+    
+    Части - это просто разрезанный сжатый поток: склеенные по порядку,
+    они дают исходный архив.
+    """
+    
+    def __init__(self, base_path, max_size):
+        self.base_path = base_path
+        self.max_size = max_size
+        self.paths = []
+        self._file = None
+        self._size = 0
+    
+    def _next_part(self):
+        if self._file:
+            self._file.close()
+        path = f"{self.base_path}.part{len(self.paths) + 1:03d}"
+        self.paths.append(path)
+        self._file = open(path, 'wb')
+        self._size = 0
+    
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            if self._file is None or self._size >= self.max_size:
+                self._next_part()
+            room = self.max_size - self._size
+            self._file.write(view[:room])
+            self._size += min(room, len(view))
+            view = view[room:]
+        return len(data)
+    
+    def flush(self):
+        if self._file:
+            self._file.flush()
+    
+    def close(self):
+        if self._file is None:
+            self._next_part()  # Пустой архив - всё равно одна часть
+        self._file.close()
+        
+        # Число частей в имени: по нему видно, что архив пришёл целиком
+        total = len(self.paths)
+        renamed = []
+        for path in self.paths:
+            final = f"{path}of{total:03d}"
+            os.replace(path, final)
+            renamed.append(final)
+        self.paths = renamed
+
+
+def open_compressed_writer(raw, compression):
+    """Потоковый компрессор поверх raw"""
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+    return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+
+
+def record_hash(value_json):
+    """Короткий хэш содержимого записи"""
+    return hashlib.blake2b(value_json.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def dump_value(value):
+    """Стабильная сериализация значения (одинаковые данные - одинаковый хэш)"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def iter_json_records(db):
+    """
+    Записи JSON-базы: (коллекция, ключ, значение)
+    
+    user_data.json и accounts.json разбираются до записей второго уровня
+    (users, sessions, ...), остальные значения верхнего уровня идут как есть.
+    """
+    for source, data in (('user_data', db.data), ('accounts', db.accounts)):
+        for section, value in list(data.items()):
+            if isinstance(value, dict):
+                # Пустой раздел тоже должен восстановиться
+                yield source, section, {}
+                collection = f"{source}/{section}"
+                if collection in SKIPPED_COLLECTIONS:
+                    continue
+                for key, record in list(value.items()):
+                    yield collection, str(key), record
+            else:
+                yield source, section, value
+
+
+def iter_postgres_records(db):
+    """Записи PostgreSQL: все строки таблиц серверным курсором, без LIMIT"""
+    for table, key_column in PG_TABLES.items():
+        conn = db.get_connection()
+        try:
+            cur = conn.cursor(name=f"backup_{table}")
+            cur.itersize = PG_FETCH_SIZE
+            cur.execute(f"SELECT * FROM {table} ORDER BY {key_column}")
+            for row in cur:
+                yield f"postgres/{table}", str(row[key_column]), dict(row)
+            cur.close()
+        finally:
+            conn.close()
+
+
+def iter_records(db):
+    """Все записи базы, независимо от бэкенда"""
+    if hasattr(db, 'data'):
+        return iter_json_records(db)
+    return iter_postgres_records(db)
+
+
+class BackupEngine:
+    """Создание полных и инкрементальных бэкапов"""
+    
+    def __init__(self, db, backup_dir=BACKUP_DIR, state_file=BACKUP_STATE_FILE,
+                 compression=BACKUP_COMPRESSION, chunk_size=BACKUP_CHUNK_SIZE,
+                 full_every=BACKUP_FULL_EVERY):
+        self.db = db
+        self.backup_dir = backup_dir
+        self.state_file = state_file
+        self.compression = compression if compression != 'zstd' or ZSTD_AVAILABLE else 'gzip'
+        self.chunk_size = chunk_size
+        self.full_every = full_every
+        # Последний номер, части которого уже ушли в Telegram
+        self.seq_file = f"{state_file}.seq"
+    
+    @property
+    def extension(self):
+        return 'zst' if self.compression == 'zstd' else 'gz'
+    
+    def load_state(self):
+        """Состояние после последнего успешного бэкапа (None - бэкапов ещё не было)"""
+        if not os.path.exists(self.state_file):
+            return None
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Состояние бэкапов повреждено, будет полный снимок: {e}")
+            return None
+    
+    def last_sent_seq(self):
+        """Последний номер бэкапа, хотя бы одна часть которого отправлена"""
+        try:
+            with open(self.seq_file, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+    
+    def mark_sent(self, backup):
+        """
+        Отметить номер бэкапа занятым (после отправки первой части)
+        
+        Если загрузка оборвётся, следующий бэкап получит новый номер:
+        части с одинаковым номером и разным содержимым не перемешаются.
+        """
+        if backup['seq'] <= self.last_sent_seq():
+            return
+        tmp_path = f"{self.seq_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(backup['seq']))
+        os.replace(tmp_path, self.seq_file)
+    
+    def commit(self, backup):
+        """
+        Зафиксировать бэкап после успешной загрузки
+        
+        До вызова commit следующая дельта считается от предыдущего бэкапа,
+        поэтому неудачная загрузка ничего не теряет.
+        """
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(backup['state'], f, separators=(',', ':'))
+        os.replace(tmp_path, self.state_file)
+    
+    def cleanup(self, backup):
+        """Удалить локальные части бэкапа"""
+        for path in backup['paths']:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def create_backup(self, force_full=False):
+        """
+        Создать бэкап (полный или дельту)
+        
+        Returns:
+            dict: kind, seq, base_seq, paths (части архива), records,
+            deleted, size и state (состояние для commit) или None,
+            если с прошлого бэкапа ничего не изменилось
+        """
+        state = self.load_state()
+        full = (
+            force_full or state is None
+            or state.get('deltas_since_base', 0) + 1 >= self.full_every
+        )
+        old_hashes = {} if full else state['hashes']
+        
+        seq = max(state['seq'] if state else 0, self.last_sent_seq()) + 1
+        base_seq = seq if full else state['base_seq']
+        prev_seq = None if full else state['seq']
+        kind = 'base' if full else 'delta'
+        created_at = datetime.now()
+        
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = f"ttfd_{seq:06d}_{kind}_{created_at.strftime('%Y%m%d_%H%M%S')}.jsonl.{self.extension}"
+        writer = ChunkedWriter(os.path.join(self.backup_dir, name), self.chunk_size)
+        stream = open_compressed_writer(writer, self.compression)
+        
+        header = {
+            'backup': {
+                'format': FORMAT_VERSION,
+                'kind': kind,
+                'seq': seq,
+                'base_seq': base_seq,
+                'prev_seq': prev_seq,
+                'created_at': created_at.isoformat(),
+            }
+        }
+        stream.write((json.dumps(header) + '\n').encode('utf-8'))
+        
+        new_hashes = {}
+        records = 0
+        deleted = 0
+        
+        try:
+            for collection, key, value in iter_records(self.db):
+                value_json = dump_value(value)
+                digest = record_hash(value_json)
+                hashes = new_hashes.setdefault(collection, {})
+                hashes[key] = digest
+                
+                if old_hashes.get(collection, {}).get(key) == digest:
+                    continue
+                
+                line = f'{{"c":{json.dumps(collection)},"k":{json.dumps(key, ensure_ascii=False)},"v":{value_json}}}\n'
+                stream.write(line.encode('utf-8'))
+                records += 1
+            
+            # Удалённые записи
+            for collection, hashes in old_hashes.items():
+                current = new_hashes.get(collection, {})
+                for key in hashes:
+                    if key not in current:
+                        line = json.dumps({'c': collection, 'k': key, 'd': 1}, ensure_ascii=False) + '\n'
+                        stream.write(line.encode('utf-8'))
+                        deleted += 1
+        finally:
+            stream.close()
+            writer.close()
+        
+        backup = {
+            'kind': kind,
+            'seq': seq,
+            'base_seq': base_seq,
+            'prev_seq': prev_seq,
+            'name': name,
+            'paths': writer.paths,
+            'records': records,
+            'deleted': deleted,
+            'size': sum(os.path.getsize(path) for path in writer.paths),
+            'state': {
+                'seq': seq,
+                'base_seq': base_seq,
+                'deltas_since_base': 0 if full else state.get('deltas_since_base', 0) + 1,
+                'created_at': created_at.isoformat(),
+                'hashes': new_hashes,
+            },
+        }
+        
+        if not full and records == 0 and deleted == 0:
+            self.cleanup(backup)
+            return None
+        
+        return backup
+
+
+# ============================================================================
+# ВОССТАНОВЛЕНИЕ
+# ============================================================================
+
+def find_backups(directory):
+    """
+    Архивы в папке в порядке создания: [{'seq', 'kind', 'created', 'paths', 'compression'}]
+    
+    Имена: ttfd_<seq>_<base|delta>_<ГГГГММДД>_<ЧЧММСС>.jsonl.<gz|zst>[.partNNN[ofMMM]]
+    Архивы, у которых не хватает частей, пропускаются.
+    """
+    backups = {}
+    for path in sorted(glob.glob(os.path.join(directory, 'ttfd_*.jsonl.*'))):
+        archive, _, part = os.path.basename(path).partition('.part')
+        parts = archive.split('.')[0].split('_')
+        if len(parts) != 5 or not parts[1].isdigit() or parts[2] not in ('base', 'delta'):
+            continue
+        entry = backups.setdefault(archive, {
+            'seq': int(parts[1]),
+            'kind': parts[2],
+            'created': f"{parts[3]}_{parts[4]}",
+            'compression': 'zstd' if archive.endswith('.zst') else 'gzip',
+            'paths': [],
+            'total': None,  # Архивы формата 1 - без числа частей в имени
+        })
+        entry['paths'].append(path)
+        if 'of' in part:
+            entry['total'] = int(part.split('of')[1])
+    
+    complete = []
+    for archive, entry in backups.items():
+        if entry['total'] is not None and len(entry['paths']) != entry['total']:
+            print(f"⚠️ {archive}: частей {len(entry['paths'])} из {entry['total']}, пропускаем")
+            continue
+        complete.append(entry)
+    return sorted(complete, key=lambda b: (b['created'], b['seq']))
+
+
+def read_header(entry):
+    """Заголовок архива (читается только начало первой части)"""
+    records = read_archive(entry['paths'], entry['compression'])
+    try:
+        return next(records)['backup']
+    finally:
+        records.close()
+
+
+class ConcatReader(io.RawIOBase):
+    """Части архива, читаемые подряд как один файл (без склейки на диске)"""
+    
+    def __init__(self, paths):
+        self._paths = list(paths)
+        self._file = None
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        while True:
+            if self._file is None:
+                if not self._paths:
+                    return 0
+                self._file = open(self._paths.pop(0), 'rb')
+            read = self._file.readinto(buffer)
+            if read:
+                return read
+            self._file.close()
+            self._file = None
+    
+    def close(self):
+        if self._file:
+            self._file.close()
+        super().close()
+
+
+def read_archive(paths, compression):
+    """
+    Записи архива по одной (части читаются подряд и распаковываются потоком)
+    
+    Первая запись - заголовок {'backup': {...}}.
+    """
+    raw = io.BufferedReader(ConcatReader(sorted(paths)))
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Для распаковки .zst установите zstandard")
+        stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+    else:
+        stream = gzip.GzipFile(fileobj=raw, mode='rb')
+    
+    try:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        stream.close()
+        raw.close()
+
+
+def restore(directory, until_seq=None):
+    """
+    Собрать данные на момент самого свежего бэкапа
+    
+    От последнего по времени архива цепочка идёт назад по ссылкам
+    prev_seq до полного снимка. Незафиксированные бэкапы (загрузка
+    оборвалась, следующий сделан от того же предыдущего) в цепочку не
+    попадают. Если состояние бэкапов терялось и нумерация началась
+    заново, номер ищется среди более ранних архивов.
+    
+    Returns:
+        (collections, applied): {коллекция: {ключ: значение}} и список
+        применённых номеров бэкапов
+    """
+    backups = find_backups(directory)
+    if until_seq is not None:
+        backups = [b for b in backups if b['seq'] <= until_seq]
+    
+    if not any(b['kind'] == 'base' for b in backups):
+        raise ValueError(f"В {directory} нет полного снимка")
+    
+    headers = [read_header(entry) for entry in backups]
+    
+    current = len(backups) - 1
+    chain = [current]
+    while backups[current]['kind'] != 'base':
+        # Формат 1 - дельта от предыдущего номера
+        prev_seq = headers[current].get('prev_seq', backups[current]['seq'] - 1)
+        earlier = [i for i in range(current) if backups[i]['seq'] == prev_seq]
+        if not earlier:
+            raise ValueError(f"Пропущен бэкап #{prev_seq}: дельты после него не применить")
+        current = earlier[-1]
+        chain.append(current)
+    chain.reverse()
+    
+    base_seq = backups[chain[0]]['seq']
+    
+    collections = {}
+    applied = []
+    
+    for index in chain:
+        entry = backups[index]
+        if headers[index]['base_seq'] != base_seq:
+            raise ValueError(f"Бэкап #{entry['seq']} относится к другому снимку (#{headers[index]['base_seq']})")
+        
+        records = read_archive(entry['paths'], entry['compression'])
+        next(records)  # Заголовок
+        
+        for record in records:
+            target = collections.setdefault(record['c'], {})
+            if record.get('d'):
+                target.pop(record['k'], None)
+            else:
+                target[record['k']] = record['v']
+        
+        applied.append(entry['seq'])
+    
+    return collections, applied
+
+
+def to_json_files(collections):
+    """
+    Собрать коллекции обратно в структуру JSON-базы
+    
+    Returns:
+        {'user_data': {...}, 'accounts': {...}} - содержимое user_data.json
+        и accounts.json
+    """
+    files = {}
+    # Сначала значения верхнего уровня, затем разделы поверх них
+    for collection in sorted(collections, key=lambda c: '/' in c):
+        records = collections[collection]
+        if '/' in collection:
+            source, section = collection.split('/', 1)
+            files.setdefault(source, {})[section] = records
+        else:
+            files.setdefault(collection, {}).update(records)
+    return files
@@ -5,6 +5,7 @@ import asyncio
 import aiohttp
 from datetime import datetime
 import config
+from presence_index import PresenceIndex
 
 # Пытаемся использовать PostgreSQL, если нет - JSON
 try:
@@ -31,6 +32,12 @@ bot.stats = {
     'messages_seen': 0,
 }
 
+# Онлайн-участники сервера (обновляются событиями, см. presence_index.py)
+presence = PresenceIndex()
+
+# Как часто публиковать изменения онлайна для сайта (секунды)
+ONLINE_PUBLISH_INTERVAL = 5
+
 # Хранилище активных тикетов
 active_tickets = {}
 
@@ -80,8 +87,17 @@ async def on_ready():
     # Обновляем список команд в канале
     await update_commands_list()
     
-    # Запускаем обновление онлайна
-    update_online_members.start()
+    # Индекс онлайна: полный обход участников только при подключении
+    guild = get_presence_guild()
+    if guild:
+        presence.rebuild(guild)
+        print(f"👥 Онлайн на сервере {guild.name}: {presence.count}")
+    else:
+        print("⚠️ Не найдено ни одного сервера")
+    
+    # Запускаем публикацию онлайна (on_ready повторяется после переподключения)
+    if not update_online_members.is_running():
+        update_online_members.start()
 
 @bot.event
 async def on_message(message):
@@ -108,6 +124,7 @@ async def on_member_join(member):
     """Событие: новый участник присоединился"""
     # Создаём пользователя в базе с его username
     db.get_user(str(member.id), username=member.name)
+    presence.update(member)
     
     # Приветственное сообщение
     channel = member.guild.system_channel
@@ -121,47 +138,88 @@ async def on_member_join(member):
         embed.set_thumbnail(url=member.display_avatar.url)
         await channel.send(embed=embed)
 
+@bot.event
+async def on_presence_update(before, after):
+    """Событие: изменился статус или активность участника"""
+    presence.update(after)
+
+@bot.event
+async def on_member_update(before, after):
+    """Событие: изменился ник или аватар на сервере"""
+    presence.update(after)
+
+@bot.event
+async def on_user_update(before, after):
+    """Событие: изменились имя или аватар аккаунта"""
+    guild = bot.get_guild(presence.guild_id) if presence.guild_id else None
+    member = guild.get_member(after.id) if guild else None
+    if member:
+        presence.update(member)
+
+@bot.event
+async def on_member_remove(member):
+    """Событие: участник покинул сервер"""
+    if presence.tracks(member.guild):
+        presence.remove(member.id)
+
 # ==================== ЗАДАЧИ ====================
 
-@tasks.loop(seconds=30)
+def get_presence_guild():
+    """Сервер, онлайн которого показывается на сайте"""
+    # Пытаемся получить гильдию по ID, если он установлен
+    guild = None
+    if config.GUILD_ID and config.GUILD_ID > 0:
+        guild = bot.get_guild(config.GUILD_ID)
+    
+    # Если не нашли по ID, берём первую доступную гильдию
+    if not guild and len(bot.guilds) > 0:
+        guild = bot.guilds[0]
+        print(f"ℹ️ Используется сервер: {guild.name} (ID: {guild.id})")
+    
+    return guild
+
+_published_presence_version = None
+
+@tasks.loop(seconds=ONLINE_PUBLISH_INTERVAL)
 async def update_online_members():
-    """Обновление списка онлайн пользователей"""
+    """Публикация списка онлайн для сайта (только если он изменился)"""
+    global _published_presence_version
+    
     try:
-        # Пытаемся получить гильдию по ID, если он установлен
-        guild = None
-        if config.GUILD_ID and config.GUILD_ID > 0:
-            guild = bot.get_guild(config.GUILD_ID)
-        
-        # Если не нашли по ID, берём первую доступную гильдию
-        if not guild and len(bot.guilds) > 0:
-            guild = bot.guilds[0]
-            print(f"ℹ️ Используется сервер: {guild.name} (ID: {guild.id})")
+        if presence.guild_id is None or presence.version == _published_presence_version:
+            return
         
-        if guild:
-            online_members = []
-            for member in guild.members:
-                if not member.bot and member.status != discord.Status.offline:
-                    online_members.append({
-                        'id': str(member.id),
-                        'name': member.name,
-                        'display_name': member.display_name,
-                        'avatar': str(member.display_avatar.url),
-                        'status': str(member.status),
-                        'activity': str(member.activity.name) if member.activity else None
-                    })
-            
-            # Обновляем данные для веб-сайта
-            import web
-            web.bot_data['online_members'] = online_members
-            web.bot_data['guild_name'] = guild.name
-            web.bot_data['guild_id'] = guild.id
-        else:
-            print("⚠️ Не найдено ни одного сервера")
+        # Обновляем данные для веб-сайта
+        import web
+        web.update_bot_data({
+            'online_members': presence.members(),
+            'online_count': presence.count,
+            'online_version': presence.version,
+            'guild_name': presence.guild_name,
+            'guild_id': presence.guild_id,
+        })
+        _published_presence_version = presence.version
     except Exception as e:
         print(f"❌ Ошибка обновления онлайна: {e}")
         import traceback
         traceback.print_exc()
 
+def get_web_stats():
+    """Статистика бота для веб-сайта"""
+    uptime = 0
+    if bot.stats['start_time']:
+        uptime = int((datetime.now() - bot.stats['start_time']).total_seconds())
+    
+    return {
+        'status': 'online' if bot.is_ready() else 'offline',
+        'uptime': uptime,
+        'guilds': len(bot.guilds),
+        'users': len(bot.users),
+        'commands_used': bot.stats['commands_used'],
+        'messages_seen': bot.stats['messages_seen'],
+        'latency': round(bot.latency * 1000),
+    }
+
 # ==================== КОМАНДЫ ====================
 
 async def update_commands_list():
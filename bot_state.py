@@ -0,0 +1,119 @@
+# Общее состояние бота для веб-сайта (статус, статистика, онлайн)
+#
+# Снимок - неизменяемый словарь. Писатель собирает новый снимок и подменяет
+# ссылку одним присваиванием, поэтому читатели никогда не блокируются и не
+# видят наполовину обновлённых данных.
+#
+# Для других процессов (gunicorn-воркеры при WEB_MODE=external) снимок
+# дублируется в файл BOT_STATE_FILE: запись в фоновом потоке через временный
+# файл и os.replace, чтение - только когда у файла изменилось время
+# модификации. При WEB_MODE=thread читатели в том же процессе, файл не пишется.
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+
+BOT_STATE_FILE = os.getenv('BOT_STATE_FILE', 'bot_state.json')
+
+# Писать файл только если веб работает в отдельных процессах
+BOT_STATE_SHARED = os.getenv('WEB_MODE', 'thread') == 'external'
+
+# Если писатель не обновлял файл столько секунд - бот считается офлайн
+BOT_STATE_STALE_AFTER = 60
+
+DEFAULT_STATE = {
+    'status': 'offline',
+    'uptime': 0,
+    'guilds': 0,
+    'users': 0,
+    'commands_used': 0,
+    'messages_seen': 0,
+    'latency': 0,
+    'online_members': [],
+}
+
+
+class BotState:
+    """Снимок состояния бота, общий для потоков и процессов"""
+    
+    def __init__(self, path=BOT_STATE_FILE, defaults=None, shared=BOT_STATE_SHARED):
+        self.path = path
+        self.shared = shared  # Дублировать снимки в файл для других процессов
+        self._snapshot = MappingProxyType({**(defaults or DEFAULT_STATE), 'version': 0})
+        self._publisher_pid = None  # Процесс, который публикует снимки
+        self._write_lock = threading.Lock()  # Только между писателями
+        self._file_mtime = None
+        
+        # Фоновая запись файла: publish не блокирует event loop на диске
+        self._pending = None  # Последний ещё не записанный снимок
+        self._pending_event = threading.Event()
+        self._writer = None
+    
+    def get(self):
+        """
+        Текущий снимок (только для чтения)
+        
+        В процессе-писателе - из памяти, в остальных - из файла, если он новее.
+        """
+        if self._publisher_pid != os.getpid() and self.path:
+            self._reload()
+            if self._file_mtime and time.time() - self._file_mtime / 1e9 > BOT_STATE_STALE_AFTER:
+                return MappingProxyType({**self._snapshot, 'status': 'offline'})
+        return self._snapshot
+    
+    def publish(self, changes):
+        """Опубликовать новый снимок: текущий + changes"""
+        with self._write_lock:
+            self._publisher_pid = os.getpid()
+            snapshot = dict(self._snapshot)
+            snapshot.update(changes)
+            snapshot['version'] = snapshot.get('version', 0) + 1
+            snapshot['updated_at'] = datetime.now().isoformat()
+            self._snapshot = MappingProxyType(snapshot)
+            
+            if self.path and self.shared:
+                self._pending = snapshot
+                self._pending_event.set()
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+                    self._writer.start()
+        
+        return self._snapshot
+    
+    def _writer_loop(self):
+        """Записывать в файл последний опубликованный снимок (промежуточные пропускаются)"""
+        while True:
+            self._pending_event.wait()
+            self._pending_event.clear()
+            with self._write_lock:
+                snapshot, self._pending = self._pending, None
+            if snapshot is not None:
+                self._write(snapshot)
+    
+    def _write(self, snapshot):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Не удалось записать состояние бота: {e}")
+    
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._file_mtime:
+            return
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return  # Файл подменяется атомарно, но мог быть битым с прошлого запуска
+        
+        self._snapshot = MappingProxyType(snapshot)
+        self._file_mtime = mtime
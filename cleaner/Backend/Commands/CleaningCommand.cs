@@ -22,6 +22,8 @@ public static class CleaningCommand
                 result.Categories[category] = categoryResult;
                 result.TotalFiles += categoryResult.Files;
                 result.TotalSize += categoryResult.Size;
+
+                JsonHelper.WriteProgress(new { category, result = categoryResult });
             }
 
             JsonHelper.WriteSuccess(result);
@@ -0,0 +1,155 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Linq;
+using System.Text.Json;
+using System.Text.Json.Nodes;
+using System.Threading.Tasks;
+using TTFD.Cleaner.Cli.Utils;
+
+namespace TTFD.Cleaner.Cli.Commands;
+
+// Long-lived backend for the GUI: line-delimited JSON-RPC over stdin/stdout.
+//
+// Request:  {"jsonrpc":"2.0","id":1,"method":"scan-cleaning","params":["--categories","temp"]}
+// Partial:  {"jsonrpc":"2.0","method":"progress","params":{"id":1,"data":{...}}}
+// Response: {"jsonrpc":"2.0","id":1,"result":{...command JSON...},"exitCode":0}
+//
+// method/params are the same as the one-shot CLI arguments. Requests run
+// concurrently; "shutdown" waits for running requests and exits.
+public static class DaemonCommand
+{
+    public static int Run(string[] args)
+    {
+        var output = new RequestOutput(Console.Out);
+        Console.SetOut(output);
+
+        output.Send(new JsonObject
+        {
+            ["jsonrpc"] = "2.0",
+            ["method"] = "ready",
+            ["params"] = new JsonObject { ["pid"] = Environment.ProcessId }
+        }.ToJsonString());
+
+        var running = new List<Task>();
+        string? line;
+
+        while ((line = Console.In.ReadLine()) != null)
+        {
+            if (string.IsNullOrWhiteSpace(line))
+                continue;
+
+            JsonNode? id = null;
+            string method;
+            string[] parameters;
+
+            try
+            {
+                var request = JsonNode.Parse(line)!.AsObject();
+                id = request["id"]?.DeepClone();
+                method = request["method"]?.GetValue<string>() ?? "";
+                parameters = request["params"]?.AsArray()
+                    .Select(p => p?.ToString() ?? "")
+                    .ToArray() ?? Array.Empty<string>();
+            }
+            catch (Exception ex)
+            {
+                output.Send(Error(id, -32700, $"Parse error: {ex.Message}"));
+                continue;
+            }
+
+            if (method == "shutdown")
+            {
+                Task.WaitAll(running.ToArray());
+                output.Send(Result(id, new JsonObject { ["success"] = true }, 0));
+                return 0;
+            }
+
+            if (method.Length == 0 || method == "daemon")
+            {
+                output.Send(Error(id, -32601, $"Method not found: {method}"));
+                continue;
+            }
+
+            running.RemoveAll(t => t.IsCompleted);
+            running.Add(Task.Run(() => Handle(output, id, method, parameters)));
+        }
+
+        // stdin closed (GUI exited): finish what is running
+        Task.WaitAll(running.ToArray());
+        return 0;
+    }
+
+    private static void Handle(RequestOutput output, JsonNode? id, string method, string[] parameters)
+    {
+        var buffer = new StringWriter();
+        RequestOutput.Current.Value = buffer;
+        JsonHelper.ProgressSink.Value = data => output.Send(new JsonObject
+        {
+            ["jsonrpc"] = "2.0",
+            ["method"] = "progress",
+            ["params"] = new JsonObject { ["id"] = id?.DeepClone(), ["data"] = JsonNode.Parse(data) }
+        }.ToJsonString());
+
+        try
+        {
+            var exitCode = Program.Dispatch(new[] { method }.Concat(parameters).ToArray());
+            output.Send(Result(id, ParseOutput(buffer.ToString()), exitCode));
+        }
+        catch (Exception ex)
+        {
+            output.Send(Error(id, -32603, ex.Message));
+        }
+        finally
+        {
+            RequestOutput.Current.Value = null;
+            JsonHelper.ProgressSink.Value = null;
+        }
+    }
+
+    // Commands print one JSON object; anything else is returned as text
+    private static JsonNode? ParseOutput(string text)
+    {
+        text = text.Trim();
+        if (text.Length == 0)
+            return null;
+
+        try
+        {
+            return JsonNode.Parse(text);
+        }
+        catch (JsonException)
+        {
+            var lastLine = text.Split('\n').Last().Trim();
+            try
+            {
+                return JsonNode.Parse(lastLine);
+            }
+            catch (JsonException)
+            {
+                return new JsonObject { ["output"] = text };
+            }
+        }
+    }
+
+    private static string Result(JsonNode? id, JsonNode? result, int exitCode)
+    {
+        return new JsonObject
+        {
+            ["jsonrpc"] = "2.0",
+            ["id"] = id?.DeepClone(),
+            ["result"] = result,
+            ["exitCode"] = exitCode
+        }.ToJsonString();
+    }
+
+    private static string Error(JsonNode? id, int code, string message)
+    {
+        return new JsonObject
+        {
+            ["jsonrpc"] = "2.0",
+            ["id"] = id?.DeepClone(),
+            ["error"] = new JsonObject { ["code"] = code, ["message"] = message }
+        }.ToJsonString();
+    }
+}
@@ -18,23 +18,12 @@ class Program
                 return 0;
             }
 
-            var command = args[0].ToLower();
-
-            return command switch
+            if (args[0].ToLower() == "daemon")
             {
-                "status" => StatusCommand.Execute(args),
-                "scan-cleaning" => CleaningCommand.Scan(args),
-                "apply-cleaning" => CleaningCommand.Apply(args),
-                "list-startup" => StartupCommand.List(args),
-                "set-startup" => StartupCommand.Set(args),
-                "services" => ServicesCommand.Execute(args),
-                "list-apps" => AppsCommand.List(args),
-                "remove-uwp" => AppsCommand.RemoveUwp(args),
-                "export-baseline" => BaselineCommand.Export(args),
-                "restore-baseline" => BaselineCommand.Restore(args),
-                "help" or "--help" or "-h" => PrintHelp(),
-                _ => PrintError($"Unknown command: {command}")
-            };
+                return DaemonCommand.Run(args);
+            }
+
+            return Dispatch(args);
         }
         catch (Exception ex)
         {
@@ -42,6 +31,27 @@ class Program
         }
     }
 
+    public static int Dispatch(string[] args)
+    {
+        var command = args[0].ToLower();
+
+        return command switch
+        {
+            "status" => StatusCommand.Execute(args),
+            "scan-cleaning" => CleaningCommand.Scan(args),
+            "apply-cleaning" => CleaningCommand.Apply(args),
+            "list-startup" => StartupCommand.List(args),
+            "set-startup" => StartupCommand.Set(args),
+            "services" => ServicesCommand.Execute(args),
+            "list-apps" => AppsCommand.List(args),
+            "remove-uwp" => AppsCommand.RemoveUwp(args),
+            "export-baseline" => BaselineCommand.Export(args),
+            "restore-baseline" => BaselineCommand.Restore(args),
+            "help" or "--help" or "-h" => PrintHelp(),
+            _ => PrintError($"Unknown command: {command}")
+        };
+    }
+
     static int PrintHelp()
     {
         Console.WriteLine("TTFD-Cleaner CLI v1.3.0");
@@ -59,6 +69,7 @@ class Program
         Console.WriteLine("  remove-uwp                - Remove UWP app");
         Console.WriteLine("  export-baseline           - Export system baseline");
         Console.WriteLine("  restore-baseline          - Restore from baseline");
+        Console.WriteLine("  daemon                    - JSON-RPC over stdin/stdout (one request per line)");
         return 0;
     }
 
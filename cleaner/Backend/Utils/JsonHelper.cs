@@ -1,6 +1,7 @@
 using System;
 using System.Text.Json;
 using System.Text.Json.Serialization;
+using System.Threading;
 
 namespace TTFD.Cleaner.Cli.Utils;
 
@@ -24,4 +25,14 @@ public static class JsonHelper
         var response = new { success = false, error = message };
         Console.WriteLine(JsonSerializer.Serialize(response, Options));
     }
+
+    // Daemon mode: receiver of partial results for the current request
+    public static readonly AsyncLocal<Action<string>?> ProgressSink = new();
+
+    // Partial result of a long command (e.g. one scanned category).
+    // Sent to the client immediately in daemon mode, ignored in one-shot mode.
+    public static void WriteProgress<T>(T data)
+    {
+        ProgressSink.Value?.Invoke(JsonSerializer.Serialize(data, Options));
+    }
 }
@@ -0,0 +1,42 @@
+using System;
+using System.IO;
+using System.Text;
+using System.Threading;
+
+namespace TTFD.Cleaner.Cli.Utils;
+
+// Console.Out replacement for daemon mode: commands keep writing with
+// Console.WriteLine, but each request's output lands in its own buffer
+// (selected through AsyncLocal, so concurrent requests do not mix).
+public class RequestOutput : TextWriter
+{
+    public static readonly AsyncLocal<StringWriter?> Current = new();
+
+    private readonly TextWriter _stdout;
+    private readonly object _stdoutLock = new();
+
+    public RequestOutput(TextWriter stdout)
+    {
+        _stdout = stdout;
+    }
+
+    public override Encoding Encoding => _stdout.Encoding;
+
+    public override void Write(char value) => Target.Write(value);
+
+    public override void Write(string? value) => Target.Write(value);
+
+    public override void WriteLine(string? value) => Target.WriteLine(value);
+
+    // Protocol line straight to stdout (never interleaved with other lines)
+    public void Send(string line)
+    {
+        lock (_stdoutLock)
+        {
+            _stdout.WriteLine(line);
+            _stdout.Flush();
+        }
+    }
+
+    private TextWriter Target => Current.Value ?? _stdout;
+}
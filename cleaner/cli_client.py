@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Клиент backend CLI в режиме daemon
+
+Один долгоживущий процесс `TTFD.Cleaner.Cli.exe daemon` вместо нового
+процесса на каждое действие. Обмен - JSON-RPC, по одному JSON на строку
+(stdin/stdout). Запросы из разных потоков идут параллельно и различаются
+по id; промежуточные результаты (progress) приходят до ответа.
+
+Если backend не поддерживает daemon (старая сборка), используется
+прежний запуск процесса на каждую команду.
+"""
+
+import json
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Сколько ждать сообщения о готовности daemon
+STARTUP_TIMEOUT = 10
+
+# Не показывать консольное окно backend на Windows
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+class CliError(Exception):
+    """Ошибка вызова backend"""
+
+
+def cli_command(cli_path: Path) -> List[str]:
+    """Команда запуска backend (.py - через текущий интерпретатор, для тестов)"""
+    if str(cli_path).endswith('.py'):
+        return [sys.executable, str(cli_path)]
+    return [str(cli_path)]
+
+
+class CliClient:
+    """Мультиплексирующий клиент backend CLI"""
+    
+    def __init__(self, cli_path: Path, log: Optional[Callable[[str], None]] = None):
+        self.cli_path = Path(cli_path)
+        self.log = log or (lambda message: None)
+        self.daemon_supported = True
+        
+        self._process: Optional[subprocess.Popen] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._partials: Dict[int, Callable[[Any], None]] = {}
+        self._next_id = 1
+        self._ready = threading.Event()
+    
+    # === Публичный API ===
+    
+    def call(self, args: List[str], on_partial: Optional[Callable[[Any], None]] = None,
+             timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Выполнить команду и дождаться результата (вызывать из рабочего потока)
+        
+        Returns:
+            JSON, напечатанный командой, или None если она завершилась с ошибкой
+        """
+        if self.daemon_supported and self._ensure_daemon():
+            try:
+                response = self.submit(args, on_partial).result(timeout)
+            except CliError as e:
+                self.log(f"[ERROR] CLI: {e}")
+                return None
+            
+            if response.get('exitCode', 0) != 0:
+                self.log(f"[ERROR] CLI вернул код {response.get('exitCode')}")
+                self.log(json.dumps(response.get('result'), ensure_ascii=False))
+                return None
+            return response.get('result')
+        
+        return self._run_once(args)
+    
+    def submit(self, args: List[str], on_partial: Optional[Callable[[Any], None]] = None) -> Future:
+        """Отправить запрос, не дожидаясь ответа (Future с ответом daemon)"""
+        future: Future = Future()
+        if not self._ensure_daemon():
+            future.set_exception(CliError("daemon недоступен"))
+            return future
+        
+        with self._pending_lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = future
+            if on_partial:
+                self._partials[request_id] = on_partial
+        
+        request = {'jsonrpc': '2.0', 'id': request_id, 'method': args[0], 'params': args[1:]}
+        try:
+            self._send(request)
+        except (OSError, ValueError) as e:
+            self._resolve(request_id, error=CliError(f"backend недоступен: {e}"))
+        
+        return future
+    
+    def close(self):
+        """Остановить daemon (дожидается выполняющихся запросов)"""
+        process = self._process
+        if not process or process.poll() is not None:
+            return
+        
+        try:
+            self._send({'jsonrpc': '2.0', 'id': 0, 'method': 'shutdown', 'params': []})
+            process.wait(timeout=5)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            process.kill()
+    
+    # === Daemon ===
+    
+    def _ensure_daemon(self) -> bool:
+        """Запустить daemon при первом вызове или после его падения"""
+        if self._process and self._process.poll() is None:
+            return True
+        
+        with self._start_lock:
+            if self._process and self._process.poll() is None:
+                return True
+            if not self.daemon_supported:
+                return False
+            
+            try:
+                self._ready.clear()
+                self._process = subprocess.Popen(
+                    cli_command(self.cli_path) + ['daemon'],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    encoding='utf-8',
+                    bufsize=1,
+                    creationflags=CREATE_NO_WINDOW
+                )
+            except OSError as e:
+                self.log(f"[ERROR] Ошибка запуска CLI: {e}")
+                return False
+            
+            threading.Thread(target=self._read_loop, args=(self._process,), daemon=True).start()
+            
+            if not self._ready.wait(STARTUP_TIMEOUT) or self._process.poll() is not None:
+                # Старая сборка печатает ошибку «Unknown command» и выходит
+                self.log("[WARNING] CLI не поддерживает режим daemon, запуск на каждую команду")
+                self.daemon_supported = False
+                if self._process.poll() is None:
+                    self._process.kill()
+                return False
+            
+            self.log(f"[OK] CLI daemon запущен (PID {self._process.pid})")
+            return True
+    
+    def _send(self, message: Dict[str, Any]):
+        line = json.dumps(message, ensure_ascii=False) + '\n'
+        with self._write_lock:
+            self._process.stdin.write(line)
+            self._process.stdin.flush()
+    
+    def _read_loop(self, process: subprocess.Popen):
+        """Разбор ответов daemon (отдельный поток на процесс)"""
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                self.log(f"[WARNING] CLI: {line}")
+                continue
+            
+            method = message.get('method')
+            if method == 'ready':
+                self._ready.set()
+            elif method == 'progress':
+                params = message.get('params') or {}
+                callback = self._partials.get(params.get('id'))
+                if callback:
+                    try:
+                        callback(params.get('data'))
+                    except Exception as e:
+                        self.log(f"[ERROR] Обработка промежуточного результата: {e}")
+            elif 'id' in message:
+                if 'error' in message:
+                    error = message['error'] or {}
+                    self._resolve(message['id'], error=CliError(error.get('message', 'unknown error')))
+                else:
+                    self._resolve(message['id'], response=message)
+        
+        # Процесс завершился: ожидающие запросы больше не получат ответ
+        process.wait()
+        self._ready.set()  # Не держать запуск до таймаута, если daemon сразу вышел
+        with self._pending_lock:
+            pending = list(self._pending)
+        for request_id in pending:
+            self._resolve(request_id, error=CliError("backend завершился"))
+    
+    def _resolve(self, request_id: int, response: Optional[Dict[str, Any]] = None,
+                 error: Optional[Exception] = None):
+        with self._pending_lock:
+            future = self._pending.pop(request_id, None)
+            self._partials.pop(request_id, None)
+        
+        if future is None or future.done():
+            return
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+    
+    # === Запуск на каждую команду ===
+    
+    def _run_once(self, args: List[str]) -> Optional[Dict[str, Any]]:
+        """Прежний режим: отдельный процесс на команду"""
+        try:
+            cmd = cli_command(self.cli_path) + args
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, encoding='utf-8',
+                creationflags=CREATE_NO_WINDOW
+            )
+            
+            if result.returncode != 0:
+                self.log(f"[ERROR] CLI вернул код {result.returncode}")
+                self.log(result.stderr)
+                return None
+            
+            # Парсинг JSON
+            try:
+                return json.loads(result.stdout)
+            except json.JSONDecodeError as e:
+                self.log(f"[ERROR] Ошибка парсинга JSON: {e}")
+                self.log(f"Вывод: {result.stdout}")
+                return None
+        
+        except Exception as e:
+            self.log(f"[ERROR] Ошибка запуска CLI: {e}")
+            return None
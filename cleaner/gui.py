@@ -16,6 +16,9 @@ from typing import Dict, Any, Optional, List
 import threading
 from datetime import datetime
 
+from cli_client import CliClient
+from tree_model import Row, TreeModel
+
 # UI эффекты
 try:
     from ui_effects import UIEffectsManager
@@ -78,12 +81,21 @@ class CleanerGUI:
         if not self.cli_path:
             self.cli_path = Path(CLI_EXE)  # Fallback
         
+        # Явный путь к backend (например, тестовая замена на Linux)
+        if os.environ.get("CLEANER_CLI"):
+            self.cli_path = Path(os.environ["CLEANER_CLI"])
+        
+        # Один процесс backend на все действия (запускается при первом вызове)
+        self.cli_client = CliClient(self.cli_path, log=lambda message: self.root.after(0, self.log, message))
+        
         self.is_admin = False
         self.system_info = {}
         
         # Данные
         self.scan_result = None
+        self.scan_shown = None  # Что уже выведено в scan_text: [(категория, файлы, размер)]
         self.startup_items = []
+        self.startup_model = None
         self.apps_list = []
         
         # UI
@@ -282,7 +294,8 @@ class CleanerGUI:
         self.autoruns_tab = AutorunsStyleStartupTab(
             self.tab_startup,
             self.cli_path,
-            self.log
+            self.log,
+            self.run_cli
         )
 
     
@@ -311,6 +324,8 @@ class CleanerGUI:
         self.apps_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        self.apps_model = TreeModel(self.apps_tree)
+        
         # Кнопки
         btn_frame = ttk.Frame(self.tab_apps, padding="10")
         btn_frame.pack(fill=tk.X)
@@ -379,34 +394,19 @@ class CleanerGUI:
     
     # === CLI взаимодействие ===
     
-    def run_cli(self, args: List[str]) -> Optional[Dict[str, Any]]:
-        """Запуск CLI команды"""
+    def run_cli(self, args: List[str], on_partial=None) -> Optional[Dict[str, Any]]:
+        """
+        Запуск CLI команды через daemon backend
+        
+        Можно вызывать из нескольких потоков одновременно. on_partial
+        получает промежуточные результаты (в потоке чтения, не в UI).
+        """
         if not self.cli_path.exists():
             self.log("[ERROR] CLI не найден!")
             messagebox.showerror("Ошибка", f"Файл {CLI_EXE} не найден!\n\nСоберите Backend проект.")
             return None
         
-        try:
-            cmd = [str(self.cli_path)] + args
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-            
-            if result.returncode != 0:
-                self.log(f"[ERROR] CLI вернул код {result.returncode}")
-                self.log(result.stderr)
-                return None
-            
-            # Парсинг JSON
-            try:
-                data = json.loads(result.stdout)
-                return data
-            except json.JSONDecodeError as e:
-                self.log(f"[ERROR] Ошибка парсинга JSON: {e}")
-                self.log(f"Вывод: {result.stdout}")
-                return None
-                
-        except Exception as e:
-            self.log(f"[ERROR] Ошибка запуска CLI: {e}")
-            return None
+        return self.cli_client.call(args, on_partial)
     
     def check_cli(self):
         """Проверка наличия CLI"""
@@ -461,37 +461,66 @@ class CleanerGUI:
         
         self.log(f"[INFO] Сканирование: {', '.join(categories)}")
         
+        # Категории показываются по мере сканирования
+        partial = {"totalFiles": 0, "totalSize": 0, "categories": {}}
+        
+        def on_partial(data):
+            category_result = data.get("result", {})
+            partial["categories"][data.get("category")] = category_result
+            partial["totalFiles"] += category_result.get("files", 0)
+            partial["totalSize"] += category_result.get("size", 0)
+            snapshot = dict(partial, categories=dict(partial["categories"]), partial=True)
+            self.root.after(0, self.display_scan_result, snapshot)
+        
         def task():
-            result = self.run_cli(["scan-cleaning", "--categories", ",".join(categories)])
+            result = self.run_cli(["scan-cleaning", "--categories", ",".join(categories)], on_partial)
             if result and result.get("success"):
                 self.scan_result = result.get("data", {})
                 self.root.after(0, self.display_scan_result)
         
         threading.Thread(target=task, daemon=True).start()
     
-    def display_scan_result(self):
-        """Отображение результатов сканирования"""
-        if not self.scan_result:
+    def display_scan_result(self, scan_result=None):
+        """
+        Отображение результатов сканирования (scan_result - промежуточный)
+        
+        Пока категории только добавляются (прогресс сканирования), меняются
+        строки итогов и дописываются новые категории; иначе текст выводится
+        заново.
+        """
+        scan_result = scan_result or self.scan_result
+        if not scan_result:
             return
         
-        self.scan_text.config(state=tk.NORMAL)
-        self.scan_text.delete(1.0, tk.END)
+        total_size = scan_result.get("totalSize", 0)
+        total_files = scan_result.get("totalFiles", 0)
+        entries = [
+            (cat_name, cat_data.get("files", 0), cat_data.get("size", 0))
+            for cat_name, cat_data in scan_result.get("categories", {}).items()
+        ]
         
-        total_size = self.scan_result.get("totalSize", 0)
-        total_files = self.scan_result.get("totalFiles", 0)
+        self.scan_text.config(state=tk.NORMAL)
         
-        self.scan_text.insert(tk.END, f"Всего файлов: {total_files}\n")
-        self.scan_text.insert(tk.END, f"Общий размер: {self.format_size(total_size)}\n\n")
+        shown = self.scan_shown
+        if shown is not None and entries[:len(shown)] == shown:
+            # Итоги - первые две строки, категории - в конце
+            self.scan_text.delete("1.0", "3.0")
+            new_entries = entries[len(shown):]
+        else:
+            self.scan_text.delete(1.0, tk.END)
+            self.scan_text.insert(tk.END, "\n")
+            new_entries = entries
         
-        categories = self.scan_result.get("categories", {})
-        for cat_name, cat_data in categories.items():
-            files = cat_data.get("files", 0)
-            size = cat_data.get("size", 0)
+        self.scan_text.insert("1.0", f"Всего файлов: {total_files}\nОбщий размер: {self.format_size(total_size)}\n")
+        for cat_name, files, size in new_entries:
             self.scan_text.insert(tk.END, f"{cat_name}:\n")
             self.scan_text.insert(tk.END, f"  Файлов: {files}\n")
             self.scan_text.insert(tk.END, f"  Размер: {self.format_size(size)}\n\n")
+        self.scan_shown = entries
         
         self.scan_text.config(state=tk.DISABLED)
+        if scan_result.get("partial"):
+            return
         self.log(f"[OK] Сканирование завершено: {total_files} файлов, {self.format_size(total_size)}")
 
     
@@ -594,9 +623,8 @@ class CleanerGUI:
     
     def display_startup_items(self):
         """Отображение элементов автозапуска (группировка по категориям)"""
-        # Очистка
-        for item in self.startup_tree.get_children():
-            self.startup_tree.delete(item)
+        if self.startup_model is None:
+            self.startup_model = TreeModel(self.startup_tree)
         
         # Группировка по типам
         categories = {}
@@ -606,10 +634,12 @@ class CleanerGUI:
                 categories[item_type] = []
             categories[item_type].append(item)
         
-        # Отображение по категориям
+        # Строки по категориям (в Treeview попадут только изменения)
+        rows = []
         for category, items in sorted(categories.items()):
-            # Создать родительский узел категории
-            category_id = self.startup_tree.insert("", tk.END, text=f"{category} ({len(items)})", open=True)
+            # Родительский узел категории
+            category_key = f"type:{category}"
+            rows.append(Row(category_key, {"text": f"{category} ({len(items)})", "open": True}, group=True))
             
             for item in items:
                 name = item.get("name", "Unknown")
@@ -627,17 +657,21 @@ class CleanerGUI:
                 elif not item.get("enabled", True):
                     tag = "disabled"
                 
-                # Добавить элемент
-                self.startup_tree.insert(category_id, tk.END, 
-                                       values=(name, item_type, location, enabled),
-                                       tags=(tag,))
-        
+                rows.append(Row(
+                    item.get("id") or f"{item_type}|{location}|{name}",
+                    {"values": (name, item_type, location, enabled), "tags": (tag,)},
+                    parent=category_key,
+                    search=(name, item_type, location),
+                    data=item
+                ))
+        
+        self.startup_model.set_rows(rows)
         self.log(f"[OK] Загружено {len(self.startup_items)} элементов автозапуска")
     
-    def filter_startup_items(self):
-        """Фильтрация элементов автозапуска"""
-        # Перезагрузить с фильтрами
-        self.load_startup_items()
+    def filter_startup_items(self, query: str = ""):
+        """Фильтрация элементов автозапуска (по уже загруженному списку)"""
+        if self.startup_model is not None:
+            self.startup_model.set_filter(query)
     
     def export_startup(self):
         """Экспорт списка автозапуска в TXT"""
@@ -685,8 +719,10 @@ class CleanerGUI:
             messagebox.showwarning("Предупреждение", "Выберите элемент!")
             return
         
-        item_idx = self.startup_tree.index(selection[0])
-        item = self.startup_items[item_idx]
+        item = self.startup_model.item(selection[0])
+        if not item:
+            messagebox.showwarning("Предупреждение", "Выберите элемент, а не категорию!")
+            return
         item_id = item.get("id", "")
         
         action = "включение" if enable else "отключение"
@@ -870,18 +906,21 @@ class CleanerGUI:
     
     def display_apps(self):
         """Отображение приложений"""
-        # Очистка
-        for item in self.apps_tree.get_children():
-            self.apps_tree.delete(item)
-        
-        # Заполнение
+        rows = []
         for app in self.apps_list:
             name = app.get("name", "Unknown")
             publisher = app.get("publisher", "Unknown")
             size = self.format_size(app.get("size", 0))
             
-            self.apps_tree.insert("", tk.END, values=(name, publisher, size))
-        
+            rows.append(Row(
+                app.get("package") or f"{name}|{publisher}",
+                {"values": (name, publisher, size)},
+                search=(name, publisher),
+                data=app
+            ))
+        
+        # В таблицу попадут только изменения
+        self.apps_model.set_rows(rows)
         self.log(f"[OK] Загружено {len(self.apps_list)} приложений")
     
     def remove_uwp_app(self):
@@ -895,8 +934,7 @@ class CleanerGUI:
             messagebox.showwarning("Предупреждение", "Выберите приложение!")
             return
         
-        item_idx = self.apps_tree.index(selection[0])
-        app = self.apps_list[item_idx]
+        app = self.apps_model.item(selection[0])
         app_name = app.get("name", "Unknown")
         package = app.get("package", "")
         
@@ -1063,6 +1101,7 @@ def main():
     def on_closing():
         if app.effects:
             app.effects.cleanup()
+        app.cli_client.close()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -9,19 +9,21 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Dict, List, Any
 import subprocess
-import json
 import os
 import re
 
+from tree_model import Row, TreeModel
+
 class AutorunsStyleStartupTab:
     """Вкладка автозапуска в стиле Sysinternals Autoruns"""
     
-    def __init__(self, parent_frame, cli_path, log_callback):
+    def __init__(self, parent_frame, cli_path, log_callback, run_cli):
+        """run_cli - CleanerGUI.run_cli (команды через daemon backend)"""
         self.parent = parent_frame
         self.cli_path = cli_path
         self.log = log_callback
+        self.run_cli = run_cli
         self.startup_items = []
-        self.startup_items_dict = {}  # Словарь для быстрого поиска по ID
         
         # Настройки фильтров (как в Autoruns Options)
         self.hide_microsoft = tk.BooleanVar(value=False)
@@ -93,7 +95,7 @@ class AutorunsStyleStartupTab:
         # Поиск
         ttk.Label(toolbar, text="Поиск:").pack(side=tk.LEFT, padx=5)
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', lambda *args: self.apply_filters())
+        self.search_var.trace('w', lambda *args: self.apply_filters(debounce=True))
         search_entry = ttk.Entry(toolbar, textvariable=self.search_var, width=30)
         search_entry.pack(side=tk.LEFT, padx=2)
         
@@ -104,6 +106,7 @@ class AutorunsStyleStartupTab:
         # Создаём вкладки для каждой категории
         self.category_frames = {}
         self.category_trees = {}
+        self.category_models = {}
         
         for cat_id, cat_name in self.categories.items():
             frame = ttk.Frame(category_notebook)
@@ -113,6 +116,7 @@ class AutorunsStyleStartupTab:
             tree = self.create_treeview(frame)
             self.category_frames[cat_id] = frame
             self.category_trees[cat_id] = tree
+            self.category_models[cat_id] = TreeModel(tree, on_render=self.update_count)
         
         # Привязка смены вкладки
         category_notebook.bind('<<NotebookTabChanged>>', self.on_category_changed)
@@ -216,17 +220,11 @@ class AutorunsStyleStartupTab:
         self.status_label.config(text="Сканирование...")
         self.log("[INFO] Сканирование автозапуска...")
         
-        # Запуск CLI
+        # Запуск CLI (ошибки процесса run_cli пишет в лог сам)
         try:
-            result = subprocess.run(
-                [str(self.cli_path), "list-startup"],
-                capture_output=True,
-                text=True,
-                encoding='utf-8'
-            )
+            data = self.run_cli(["list-startup"])
             
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
+            if data is not None:
                 if data.get("success"):
                     self.startup_items = data.get("data", [])
                     self.display_items()
@@ -237,7 +235,6 @@ class AutorunsStyleStartupTab:
                     self.log("[ERROR] Ошибка получения данных")
             else:
                 self.status_label.config(text="Ошибка CLI")
-                self.log(f"[ERROR] CLI вернул код {result.returncode}")
         
         except Exception as e:
             self.status_label.config(text="Ошибка")
@@ -258,12 +255,11 @@ class AutorunsStyleStartupTab:
                 categorized[category] = []
             categorized[category].append(item)
         
-        # Заполнение каждой вкладки
-        for cat_id, tree in self.category_trees.items():
-            # Очистка
-            for item in tree.get_children():
-                tree.delete(item)
-            
+        # Строка элемента одинакова во всех вкладках - строим один раз
+        item_rows = {id(item): (self.item_key(item), self.item_options(item)) for item in self.startup_items}
+        
+        # Заполнение каждой вкладки (в TreeView попадут только изменения)
+        for cat_id, model in self.category_models.items():
             # Получить элементы для этой категории
             if cat_id == 'Everything':
                 items = self.startup_items
@@ -281,23 +277,31 @@ class AutorunsStyleStartupTab:
                 subcategories[subcat].append(item)
             
             # Отображение с группировкой
+            rows = []
             for subcat, subcat_items in sorted(subcategories.items()):
                 # Родительский узел подкатегории
-                parent_id = tree.insert('', tk.END, text=f'☐ {subcat}', open=True)
+                parent_key = f'group:{subcat}'
+                rows.append(Row(parent_key, {'text': f'☐ {subcat}', 'open': True}, group=True))
                 
                 for item in subcat_items:
-                    self.insert_item(tree, parent_id, item)
+                    key, options = item_rows[id(item)]
+                    # Индекс поиска: запись, описание, издатель, путь
+                    rows.append(Row(key, options, parent=parent_key, search=options['values'][:4], data=item))
+            
+            model.set_rows(rows)
         
         self.apply_filters()
     
-    def insert_item(self, tree, parent, item):
-        """Вставка элемента в TreeView"""
+    def item_key(self, item):
+        """Ключ элемента (iid в TreeView) - не меняется между обновлениями"""
+        return item.get('id') or f"{item.get('type', '')}|{item.get('location', '')}|{item.get('name', '')}"
+    
+    def item_options(self, item):
+        """Опции строки TreeView для элемента"""
         
         name = item.get('name', 'Unknown')
         location = item.get('location', '')
         enabled = item.get('enabled', False)
-        is_protected = item.get('isSystemProtected', False)
-        item_id = item.get('id', '')
         
         # Определение описания и издателя (как в Autoruns)
         description = self.extract_description(item)
@@ -316,15 +320,12 @@ class AutorunsStyleStartupTab:
         # Извлечение иконки
         icon = self.get_icon(image_path)
         
-        # Вставка
-        iid = tree.insert(parent, tk.END,
-                   text=checkbox,
-                   values=(name, description, publisher, image_path, status),
-                   tags=(tag,),
-                   image=icon if icon else '')
-        
-        # Сохранить ID элемента для последующего использования
-        self.startup_items_dict[iid] = item
+        return {
+            'text': checkbox,
+            'values': (name, description, publisher, image_path, status),
+            'tags': (tag,),
+            'image': icon if icon else ''
+        }
     
     def map_type_to_category(self, item_type):
         """Маппинг типа элемента на категорию Autoruns"""
@@ -487,94 +488,49 @@ class AutorunsStyleStartupTab:
         else:
             return 'normal'     # Чёрный
     
-    def apply_filters(self):
+    def apply_filters(self, debounce=False):
         """Применение фильтров (как Options в Autoruns)"""
-        search_text = self.search_var.get().lower()
-        
-        for cat_id, tree in self.category_trees.items():
-            for item_id in tree.get_children():
-                self.filter_item(tree, item_id, search_text)
+        search_text = self.search_var.get()
+        hide_microsoft = self.hide_microsoft.get()
+        hide_windows = self.hide_windows.get()
         
-        # Обновление счётчика
-        current_tree = self.get_current_tree()
-        visible_count = self.count_visible_items(current_tree)
-        self.count_label.config(text=f"Элементов: {visible_count}")
-    
-    def filter_item(self, tree, item_id, search_text):
-        """Фильтрация элемента"""
-        values = tree.item(item_id, 'values')
-        
-        if not values:  # Родительский узел
-            # Фильтрация детей
-            children = tree.get_children(item_id)
-            visible_children = 0
-            
-            for child_id in children:
-                if self.filter_item(tree, child_id, search_text):
-                    visible_children += 1
-            
-            # Скрыть родителя если нет видимых детей
-            if visible_children == 0:
-                tree.detach(item_id)
-            else:
-                tree.reattach(item_id, '', tk.END)
-            
-            return visible_children > 0
-        
-        else:  # Дочерний элемент
-            name, description, publisher, image_path, timestamp = values
-            
-            # Фильтр Microsoft
-            if self.hide_microsoft.get() and 'Microsoft' in publisher:
-                tree.detach(item_id)
+        def visible(row):
+            name, description, publisher, image_path, status = row.options['values']
+            if hide_microsoft and 'Microsoft' in publisher:
                 return False
-            
-            # Фильтр Windows
-            if self.hide_windows.get() and 'Windows' in name:
-                tree.detach(item_id)
+            if hide_windows and 'Windows' in name:
                 return False
-            
-            # Поиск
-            if search_text:
-                if (search_text not in name.lower() and 
-                    search_text not in description.lower() and
-                    search_text not in publisher.lower() and
-                    search_text not in image_path.lower()):
-                    tree.detach(item_id)
-                    return False
-            
-            tree.reattach(item_id, tree.parent(item_id), tk.END)
             return True
-    
-    def count_visible_items(self, tree):
-        """Подсчёт видимых элементов"""
-        count = 0
-        for item_id in tree.get_children():
-            count += self.count_visible_items_recursive(tree, item_id)
-        return count
-    
-    def count_visible_items_recursive(self, tree, item_id):
-        """Рекурсивный подсчёт"""
-        count = 0
-        values = tree.item(item_id, 'values')
         
-        if values:  # Дочерний элемент
-            count = 1
+        predicate = visible if hide_microsoft or hide_windows else None
         
-        for child_id in tree.get_children(item_id):
-            count += self.count_visible_items_recursive(tree, child_id)
-        
-        return count
+        # Ввод в поиске применяется с задержкой, переключатели - сразу
+        for model in self.category_models.values():
+            if debounce:
+                model.set_filter(search_text, predicate)
+            else:
+                model.set_filter(search_text, predicate, delay=0)
+    
+    def update_count(self):
+        """Обновление счётчика видимых элементов текущей вкладки"""
+        self.count_label.config(text=f"Элементов: {self.get_current_model().visible_count}")
+    
+    def get_current_category(self):
+        """Получить текущую категорию"""
+        current_tab = self.category_notebook.index(self.category_notebook.select())
+        return list(self.categories.keys())[current_tab]
     
     def get_current_tree(self):
         """Получить текущий TreeView"""
-        current_tab = self.category_notebook.index(self.category_notebook.select())
-        cat_id = list(self.categories.keys())[current_tab]
-        return self.category_trees[cat_id]
+        return self.category_trees[self.get_current_category()]
+    
+    def get_current_model(self):
+        """Получить модель текущего TreeView"""
+        return self.category_models[self.get_current_category()]
     
     def on_category_changed(self, event):
         """Обработка смены категории"""
-        self.apply_filters()
+        self.update_count()
     
     def toggle_selected(self, enable=None):
         """Переключение состояния выбранных элементов"""
@@ -591,7 +547,7 @@ class AutorunsStyleStartupTab:
                 continue
             
             # Получить данные элемента
-            item_data = self.startup_items_dict.get(item_id)
+            item_data = self.get_current_model().item(item_id)
             if not item_data:
                 self.log(f"[ERROR] Не найдены данные для элемента")
                 continue
@@ -612,40 +568,30 @@ class AutorunsStyleStartupTab:
             
             # Вызвать CLI для переключения
             try:
-                result = subprocess.run(
-                    [str(self.cli_path), "set-startup", "--id", startup_id, "--enabled", str(new_enabled).lower()],
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8'
+                data = self.run_cli(
+                    ["set-startup", "--id", startup_id, "--enabled", str(new_enabled).lower()]
                 )
                 
-                if result.returncode == 0:
-                    data = json.loads(result.stdout)
+                if data is not None:
                     if data.get("success"):
-                        # Обновить чекбокс
-                        new_text = '☑' if new_enabled else '☐'
-                        tree.item(item_id, text=new_text)
-                        
-                        # Обновить статус в колонке
-                        values = list(tree.item(item_id, 'values'))
-                        values[4] = "Enabled" if new_enabled else "Disabled"  # Обновить Status
-                        tree.item(item_id, values=values)
-                        
                         # Обновить данные
                         item_data['enabled'] = new_enabled
                         
+                        # Обновить чекбокс, статус и цвет во всех вкладках
+                        options = self.item_options(item_data)
+                        for model in self.category_models.values():
+                            model.update(item_id, **options)
+                        
                         action = "включён" if new_enabled else "отключён"
                         self.log(f"[OK] {item_name} {action}")
                     else:
                         self.log(f"[ERROR] Не удалось изменить {item_name}: {data.get('message', 'Unknown error')}")
-                else:
-                    self.log(f"[ERROR] CLI вернул код {result.returncode}")
             
             except Exception as e:
                 self.log(f"[ERROR] Ошибка при изменении {item_name}: {e}")
         
         # Обновить счётчик
-        self.apply_filters()
+        self.update_count()
     
     def delete_selected(self):
         """Удаление выбранных элементов"""
@@ -665,8 +611,9 @@ class AutorunsStyleStartupTab:
             return
         
         # TODO: Вызвать CLI для удаления
+        model = self.get_current_model()
         for item_id in selection:
-            tree.delete(item_id)
+            model.remove(item_id)
         
         self.log(f"[OK] Удалено {len(selection)} элементов")
     
@@ -679,7 +626,7 @@ class AutorunsStyleStartupTab:
             return
         
         item_id = selection[0]
-        item_data = self.startup_items_dict.get(item_id)
+        item_data = self.get_current_model().item(item_id)
         
         if item_data:
             location = item_data.get('location', '')
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замена TTFD.Cleaner.Cli.exe для проверки GUI и cli_client без Windows
+
+Поддерживает тот же протокол daemon (JSON-RPC по строкам) и обычный
+запуск одной команды. Данные вымышленные, сканирование - с задержками.
+
+Запуск GUI с заменой:
+    CLEANER_CLI=scripts/fake_cli_backend.py python gui.py
+
+Проверка клиента (параллельные запросы и промежуточные результаты):
+    python scripts/fake_cli_backend.py --check
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Задержка сканирования одной категории (секунды)
+SCAN_DELAY = 0.2
+
+_stdout_lock = threading.Lock()
+
+
+def send(message):
+    with _stdout_lock:
+        sys.stdout.write(json.dumps(message, ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+
+
+def option(params, name, default=''):
+    if name in params:
+        index = params.index(name)
+        if index + 1 < len(params):
+            return params[index + 1]
+    return default
+
+
+def scan_cleaning(params, progress):
+    categories = [c for c in option(params, '--categories').split(',') if c]
+    data = {'categories': {}, 'totalFiles': 0, 'totalSize': 0}
+    for number, category in enumerate(categories, 1):
+        time.sleep(SCAN_DELAY)
+        result = {'files': number * 10, 'size': number * 1024 * 1024, 'errors': []}
+        data['categories'][category] = result
+        data['totalFiles'] += result['files']
+        data['totalSize'] += result['size']
+        progress({'category': category, 'result': result})
+    return 0, {'success': True, 'data': data}
+
+
+def execute(method, params, progress):
+    """Команда -> (код выхода, JSON)"""
+    if method == 'status':
+        return 0, {'success': True, 'data': {
+            'windowsVersion': 'Linux (fake backend)',
+            'userName': 'tester',
+            'isAdmin': False,
+            'browsers': []
+        }}
+    if method == 'scan-cleaning':
+        return scan_cleaning(params, progress)
+    if method in ('list-startup', 'list-apps'):
+        return 0, {'success': True, 'data': []}
+    if method == 'sleep':
+        time.sleep(float(params[0]) if params else 1)
+        return 0, {'success': True, 'data': {'slept': params}}
+    return 1, {'success': False, 'error': f'Unknown command: {method}'}
+
+
+def run_daemon():
+    send({'jsonrpc': '2.0', 'method': 'ready', 'params': {'pid': 0}})
+    running = []
+    
+    def handle(request_id, method, params):
+        def progress(data):
+            send({'jsonrpc': '2.0', 'method': 'progress', 'params': {'id': request_id, 'data': data}})
+        
+        try:
+            exit_code, result = execute(method, params, progress)
+            send({'jsonrpc': '2.0', 'id': request_id, 'result': result, 'exitCode': exit_code})
+        except Exception as e:
+            send({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': -32603, 'message': str(e)}})
+    
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            method = request.get('method') or ''
+            params = [str(p) for p in request.get('params') or []]
+        except (ValueError, AttributeError) as e:
+            send({'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': f'Parse error: {e}'}})
+            continue
+        
+        if method == 'shutdown':
+            for thread in running:
+                thread.join()
+            send({'jsonrpc': '2.0', 'id': request_id, 'result': {'success': True}, 'exitCode': 0})
+            return 0
+        
+        thread = threading.Thread(target=handle, args=(request_id, method, params))
+        thread.start()
+        running = [t for t in running if t.is_alive()] + [thread]
+    
+    for thread in running:
+        thread.join()
+    return 0
+
+
+def check():
+    """Проверка CliClient против этой замены"""
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from cli_client import CliClient
+    
+    client = CliClient(Path(__file__).resolve(), log=print)
+    partials = []
+    try:
+        started = time.monotonic()
+        slow = client.submit(['sleep', '1'])
+        scan = client.submit(['scan-cleaning', '--categories', 'temp,browser,logs'], partials.append)
+        status = client.call(['status'])
+        assert status['data']['userName'] == 'tester', status
+        
+        # Быстрый запрос не ждёт медленные
+        assert time.monotonic() - started < 0.5, 'status ждал другие запросы'
+        
+        scan_result = scan.result(5)['result']['data']
+        assert [p['category'] for p in partials] == ['temp', 'browser', 'logs'], partials
+        assert scan_result['totalFiles'] == 60, scan_result
+        assert slow.result(5)['exitCode'] == 0
+        assert client.call(['no-such-command']) is None
+        print(f"[OK] {len(partials)} промежуточных результатов, "
+              f"{time.monotonic() - started:.2f}с на все запросы")
+    finally:
+        client.close()
+    
+    # Старый backend без daemon - запуск на каждую команду
+    legacy = CliClient(Path(__file__).resolve(), log=print)
+    legacy.daemon_supported = False
+    assert legacy.call(['status'])['success']
+    print("[OK] Проверка пройдена")
+    return 0
+
+
+def main():
+    args = sys.argv[1:]
+    if args == ['--check']:
+        return check()
+    if args[:1] == ['daemon']:
+        return run_daemon()
+    if not args:
+        print(json.dumps({'success': False, 'error': 'No command'}))
+        return 1
+    
+    exit_code, result = execute(args[0], args[1:], lambda data: None)
+    print(json.dumps(result, ensure_ascii=False))
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -28,6 +28,11 @@ class StartupWindow:
             base_path = Path(__file__).parent.parent
         self.cli_path = base_path / "TTFD.Cleaner.Cli.exe"
         
+        # Daemon backend CLI (останавливается при закрытии окна)
+        from cli_client import CliClient
+        self.cli_client = CliClient(self.cli_path, log=self.log)
+        self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
         # Создать UI
         self.setup_ui()
     
@@ -44,9 +49,15 @@ class StartupWindow:
         self.autoruns_tab = AutorunsStyleStartupTab(
             container,
             self.cli_path,
-            self.log
+            self.log,
+            self.cli_client.call
         )
     
+    def on_closing(self):
+        """Закрытие окна"""
+        self.cli_client.close()
+        self.window.destroy()
+    
     def log(self, message: str):
         """Логирование (для совместимости с AutorunsStyleStartupTab)"""
         print(message)
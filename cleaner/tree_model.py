@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTFD-Cleaner - Модель данных для ttk.Treeview
+
+Вместо очистки и повторной вставки всех строк при каждом обновлении
+модель сравнивает новый набор строк с тем, что уже показано, и применяет
+только вставки, изменения и удаления. Строки идентифицируются ключом
+(он же iid в Treeview), поэтому выделение и прокрутка сохраняются.
+
+Фильтр работает по заранее подготовленному индексу (строка в нижнем
+регистре), срабатывает с задержкой после последнего изменения, а большие
+пачки операций выполняются частями через after(), не блокируя окно.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Операций Treeview за один тик главного цикла
+CHUNK_SIZE = 300
+
+# Пауза между частями (мс)
+CHUNK_DELAY = 1
+
+# Задержка фильтра после последнего изменения (мс)
+FILTER_DELAY = 150
+
+
+class Row:
+    """Строка модели: ключ, родитель, опции Treeview и индекс поиска"""
+    
+    __slots__ = ('key', 'parent', 'options', 'search', 'data', 'group')
+    
+    def __init__(self, key: str, options: Dict[str, Any], parent: str = '',
+                 search: Iterable[Any] = (), data: Any = None, group: bool = False):
+        self.key = str(key)
+        self.parent = parent
+        self.options = options
+        self.search = '\n'.join(str(field) for field in search if field).lower()
+        self.data = data
+        self.group = group
+
+
+class TreeModel:
+    """Набор строк, показанный в Treeview через минимальный diff"""
+    
+    def __init__(self, tree, on_render: Optional[Callable[[], None]] = None):
+        self.tree = tree
+        self.on_render = on_render
+        
+        self._rows: Dict[str, Row] = {}
+        self._order: Dict[str, List[str]] = {}  # Родитель -> ключи детей по порядку
+        self._shown: Dict[str, Row] = {}        # Что сейчас в Treeview
+        
+        self._query = ''
+        self._predicate: Optional[Callable[[Row], bool]] = None
+        self._filter_job = None
+        self._render_job = None
+    
+    # === Данные ===
+    
+    def set_rows(self, rows: Iterable[Row]):
+        """Заменить набор строк (родитель должен идти раньше детей)"""
+        self._rows = {}
+        self._order = {}
+        seen: Dict[str, int] = {}
+        
+        for row in rows:
+            # Одинаковые ключи (например, две записи без id) - с суффиксом
+            if row.key in seen:
+                seen[row.key] += 1
+                row.key = f"{row.key}#{seen[row.key]}"
+            else:
+                seen[row.key] = 1
+            
+            self._rows[row.key] = row
+            self._order.setdefault(row.parent, []).append(row.key)
+        
+        self.render()
+    
+    def item(self, key: str) -> Any:
+        """Данные строки (data) по ключу/iid"""
+        row = self._rows.get(key)
+        return row.data if row else None
+    
+    def update(self, key: str, **options):
+        """Изменить опции одной строки (без пересборки всего набора)"""
+        row = self._rows.get(key)
+        if not row:
+            return
+        
+        row.options = dict(row.options, **options)
+        if key in self._shown:
+            self.tree.item(key, **options)
+            self._shown[key].options = row.options
+    
+    def remove(self, key: str):
+        """Убрать строку (группу - вместе с детьми)"""
+        row = self._rows.pop(key, None)
+        if not row:
+            return
+        
+        self._order.get(row.parent, []).remove(key)
+        for child in self._order.pop(key, []):
+            self._rows.pop(child, None)
+        self.render()
+    
+    @property
+    def visible_count(self) -> int:
+        """Количество показанных строк (без групп)"""
+        return sum(1 for row in self._shown.values() if not row.group)
+    
+    # === Фильтр ===
+    
+    def set_filter(self, query: str = '', predicate: Optional[Callable[[Row], bool]] = None,
+                   delay: int = FILTER_DELAY):
+        """
+        Фильтр по подстроке и/или условию на строку (Row)
+        
+        Применяется через delay мс после последнего вызова, поэтому ввод
+        в поле поиска не перерисовывает таблицу на каждую букву.
+        """
+        self._query = query.strip().lower()
+        self._predicate = predicate
+        
+        if self._filter_job:
+            self.tree.after_cancel(self._filter_job)
+            self._filter_job = None
+        
+        if delay:
+            self._filter_job = self.tree.after(delay, self.render)
+        else:
+            self.render()
+    
+    def _matches(self, row: Row) -> bool:
+        if self._query and self._query not in row.search:
+            return False
+        return self._predicate is None or self._predicate(row)
+    
+    def _visible(self) -> Dict[str, List[str]]:
+        """Родитель -> видимые дети (группы без видимых детей скрываются)"""
+        visible: Dict[str, List[str]] = {}
+        
+        def collect(parent: str) -> List[str]:
+            keys = visible[parent] = []  # Родитель в словаре раньше детей
+            for key in self._order.get(parent, []):
+                row = self._rows[key]
+                if row.group:
+                    if collect(key):
+                        keys.append(key)
+                elif self._matches(row):
+                    keys.append(key)
+            return keys
+        
+        collect('')
+        return visible
+    
+    # === Отрисовка ===
+    
+    def render(self):
+        """Привести Treeview к текущему набору строк и фильтру"""
+        self._filter_job = None
+        if self._render_job:
+            # Незаконченная отрисовка устарела: diff считается заново
+            # от того, что уже успели применить
+            self.tree.after_cancel(self._render_job)
+            self._render_job = None
+        
+        visible = self._visible()
+        wanted = {key: parent for parent, keys in visible.items() for key in keys}
+        
+        # Удаления - сразу (один вызов Tcl): скрытые строки, сменившие
+        # родителя (их вставим заново) и всё внутри удаляемых групп
+        removed = {
+            key for key, row in self._shown.items()
+            if wanted.get(key) != row.parent or row.group != self._rows[key].group
+        } if self._shown else set()
+        changed = True
+        while changed:
+            extra = {key for key, row in self._shown.items() if key not in removed and row.parent in removed}
+            removed |= extra
+            changed = bool(extra)
+        
+        top_removed = [key for key in removed if self._shown[key].parent not in removed]
+        if top_removed:
+            self.tree.delete(*top_removed)
+        for key in removed:
+            self._shown.pop(key)
+        
+        # Вставки, изменения и перестановки по родителям (группы раньше детей)
+        operations = []
+        for parent, keys in visible.items():
+            if parent and parent not in wanted:
+                continue
+            shown_order = [key for key in keys if key in self._shown]
+            reorder = shown_order != self._current_order(parent, shown_order)
+            
+            for index, key in enumerate(keys):
+                row = self._rows[key]
+                shown = self._shown.get(key)
+                if shown is None:
+                    operations.append(('insert', parent, index, row))
+                else:
+                    if shown.options != row.options:
+                        operations.append(('update', row))
+                    if reorder:
+                        operations.append(('move', key, parent, index))
+        
+        self._apply(operations)
+    
+    def _current_order(self, parent: str, keys: List[str]) -> List[str]:
+        """Порядок уже показанных строк родителя в Treeview"""
+        if not keys:
+            return []
+        present = set(keys)
+        return [key for key in self.tree.get_children(parent) if key in present]
+    
+    def _apply(self, operations: list):
+        """Выполнить операции частями по CHUNK_SIZE за тик"""
+        self._render_job = None
+        chunk, rest = operations[:CHUNK_SIZE], operations[CHUNK_SIZE:]
+        
+        for operation in chunk:
+            kind = operation[0]
+            if kind == 'insert':
+                _, parent, index, row = operation
+                self.tree.insert(parent, index, iid=row.key, **row.options)
+                self._shown[row.key] = Row(row.key, row.options, row.parent, group=row.group)
+            elif kind == 'update':
+                row = operation[1]
+                self.tree.item(row.key, **row.options)
+                self._shown[row.key].options = row.options
+            elif kind == 'move':
+                _, key, parent, index = operation
+                self.tree.move(key, parent, index)
+        
+        if rest:
+            self._render_job = self.tree.after(CHUNK_DELAY, self._apply, rest)
+        elif self.on_render:
+            self.on_render()
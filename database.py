@@ -2,12 +2,26 @@
 import json
 import os
 from datetime import datetime
+import bisect
+import functools
 import hashlib
 import secrets
+import threading
+
+# Сессии старше этого срока удаляются фоновой очисткой
+SESSION_MAX_AGE_DAYS = int(os.getenv('SESSION_MAX_AGE_DAYS', '30'))
+
+# Размер страницы каталога пользователей
+ACCOUNTS_PAGE_SIZE = 24
 
 DATABASE_FILE = 'user_data.json'
 ACCOUNTS_FILE = 'accounts.json'
 
+# Кулдаун ежедневной награды; стрик продолжается, если прошлая награда
+# была не раньше DAILY_STREAK_WINDOW_SECONDS назад
+DAILY_COOLDOWN_SECONDS = 86400
+DAILY_STREAK_WINDOW_SECONDS = 2 * 86400
+
 # 20 рангов с требованиями
 RANKS = [
     {"id": 1, "name": "Пустой взгляд", "color": "#95a5a6", "required_xp": 0, "reward_coins": 0},
@@ -32,10 +46,37 @@ RANKS = [
     {"id": 20, "name": "Абсолютный гуль", "color": "#8b0000", "required_xp": 52250, "reward_coins": 15000},
 ]
 
+def _locked(method):
+    """Выполнить метод под общей блокировкой данных (Database.lock)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class Database:
     def __init__(self):
         self.data = self.load_data()
         self.accounts = self.load_accounts()
+        
+        # Версия данных для кэша ответов (лидерборд, профили, список пользователей)
+        self.data_version = 0
+        self.data_modified_at = datetime.now()
+        
+        # Индексы каталога пользователей (перестраиваются при смене data_version)
+        self._accounts_index_version = None
+        self._accounts_order = []  # [(created_at, id)] по возрастанию
+        self._accounts_names = []  # [(имя в нижнем регистре, id)] по возрастанию
+        
+        # Отложенная запись (включает оркестратор): save_* только помечают файл,
+        # а на диск его пишет flush() - периодически и при остановке
+        self.write_behind = False
+        self._dirty = set()
+        self._flush_lock = threading.Lock()
+        
+        # Общая блокировка данных: её держат все изменения self.data/self.accounts
+        # (потоки werkzeug, обработчики бота) и снимок для записи в flush()
+        self.lock = threading.RLock()
     
     def load_data(self):
         """Загрузить данные из файла"""
@@ -51,15 +92,65 @@ class Database:
                 return json.load(f)
         return {'accounts': {}, 'sessions': {}}
     
+    def bump_data_version(self):
+        """Отметить изменение данных (XP, монеты, аккаунты)"""
+        self.data_version += 1
+        self.data_modified_at = datetime.now()
+    
+    @_locked
     def save_data(self):
         """Сохранить данные в файл"""
-        with open(DATABASE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        self.bump_data_version()
+        if self.write_behind:
+            self._dirty.add(DATABASE_FILE)
+            return
+        self._write_file(DATABASE_FILE, self._dump(self.data))
     
+    @_locked
     def save_accounts(self):
         """Сохранить аккаунты"""
-        with open(ACCOUNTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.accounts, f, indent=2, ensure_ascii=False)
+        self.bump_data_version()
+        if self.write_behind:
+            self._dirty.add(ACCOUNTS_FILE)
+            return
+        self._write_file(ACCOUNTS_FILE, self._dump(self.accounts))
+    
+    def _dump(self, content):
+        """Сериализовать в JSON (вызывать под self.lock)"""
+        return json.dumps(content, indent=2, ensure_ascii=False)
+    
+    def _write_file(self, path, text):
+        """Записать JSON атомарно (через временный файл)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    
+    def flush(self):
+        """Записать на диск отложенные изменения (режим write_behind)"""
+        with self._flush_lock:
+            # Снимок под общей блокировкой, запись на диск - уже без неё
+            with self.lock:
+                dirty, self._dirty = self._dirty, set()
+                snapshots = {
+                    path: self._dump(self.data if path == DATABASE_FILE else self.accounts)
+                    for path in dirty
+                }
+            
+            pending = set(snapshots)
+            try:
+                for path, text in snapshots.items():
+                    self._write_file(path, text)
+                    pending.discard(path)
+            except Exception:
+                # Всё незаписанное - в следующий flush
+                with self.lock:
+                    self._dirty |= pending
+                raise
+    
+    def close(self):
+        """Завершение работы: дописать отложенные изменения"""
+        self.flush()
     
     # ==================== АККАУНТЫ ====================
     
@@ -67,6 +158,7 @@ class Database:
         """Хешировать пароль"""
         return hashlib.sha256(password.encode()).hexdigest()
     
+    @_locked
     def create_account(self, email, username, password, display_name):
         """Создать аккаунт"""
         # Проверка существования
@@ -103,6 +195,7 @@ class Database:
         self.save_accounts()
         return {'success': True, 'account_id': account_id}
     
+    @_locked
     def login(self, username, password):
         """Войти в аккаунт"""
         password_hash = self.hash_password(password)
@@ -120,6 +213,7 @@ class Database:
         
         return {'success': False, 'error': 'Неверный логин или пароль'}
     
+    @_locked
     def get_account_by_token(self, token):
         """Получить аккаунт по токену сессии"""
         if token in self.accounts['sessions']:
@@ -127,6 +221,7 @@ class Database:
             return self.accounts['accounts'].get(account_id)
         return None
     
+    @_locked
     def get_account_by_username(self, username):
         """Получить аккаунт по username"""
         for acc in self.accounts['accounts'].values():
@@ -134,6 +229,7 @@ class Database:
                 return acc
         return None
     
+    @_locked
     def update_profile(self, account_id, **kwargs):
         """Обновить профиль"""
         if account_id in self.accounts['accounts']:
@@ -159,6 +255,7 @@ class Database:
         
         return {'success': False, 'error': 'Аккаунт не найден'}
     
+    @_locked
     def change_password(self, account_id, old_password, new_password):
         """Сменить пароль"""
         if account_id in self.accounts['accounts']:
@@ -173,6 +270,7 @@ class Database:
         
         return {'success': False, 'error': 'Аккаунт не найден'}
     
+    @_locked
     def link_discord(self, account_id, discord_id):
         """Привязать Discord ID к аккаунту"""
         if account_id in self.accounts['accounts']:
@@ -181,6 +279,7 @@ class Database:
             return {'success': True}
         return {'success': False, 'error': 'Аккаунт не найден'}
     
+    @_locked
     def logout(self, token):
         """Выйти из аккаунта"""
         if token in self.accounts['sessions']:
@@ -189,6 +288,40 @@ class Database:
             return {'success': True}
         return {'success': False}
     
+    @_locked
+    def cleanup_expired_sessions(self, max_age_days=SESSION_MAX_AGE_DAYS, batch_size=1000):
+        """Удалить сессии старше max_age_days (порциями по batch_size)"""
+        sessions = self.accounts.get('sessions', {})
+        total = 0
+        
+        while True:
+            expired = []
+            for token, data in sessions.items():
+                try:
+                    age = datetime.now() - datetime.fromisoformat(data['created_at'])
+                except (KeyError, ValueError):
+                    continue
+                if age.days >= max_age_days:
+                    expired.append(token)
+                    if len(expired) >= batch_size:
+                        break
+            
+            for token in expired:
+                del sessions[token]
+            
+            if expired:
+                self.save_accounts()
+            
+            total += len(expired)
+            if len(expired) < batch_size:
+                break
+        
+        if total:
+            print(f"🧹 Удалено старых сессий: {total}")
+        
+        return total
+    
+    @_locked
     def get_user(self, user_id):
         """Получить данные пользователя"""
         user_id = str(user_id)
@@ -210,6 +343,7 @@ class Database:
             self.save_data()
         return self.data['users'][user_id]
     
+    @_locked
     def update_user(self, user_id, **kwargs):
         """Обновить данные пользователя"""
         user = self.get_user(user_id)
@@ -222,6 +356,7 @@ class Database:
         self.save_data()
         return user
     
+    @_locked
     def add_xp(self, user_id, amount):
         """Добавить опыт пользователю"""
         user = self.get_user(user_id)
@@ -241,6 +376,7 @@ class Database:
             'new_rank': new_rank
         }
     
+    @_locked
     def add_coins(self, user_id, amount):
         """Добавить монеты пользователю"""
         user = self.get_user(user_id)
@@ -275,6 +411,7 @@ class Database:
             {'id': 4, 'name': 'Будь активен 5 минут', 'target': 300, 'progress': 0, 'reward_xp': 100, 'reward_coins': 50, 'completed': False},
         ]
     
+    @_locked
     def complete_task(self, user_id, task_id):
         """Завершить задание"""
         user = self.get_user(user_id)
@@ -321,48 +458,136 @@ class Database:
         now = datetime.now()
         time_diff = (now - last_daily).total_seconds()
         
-        # 24 часа = 86400 секунд
-        return time_diff >= 86400
+        return time_diff >= DAILY_COOLDOWN_SECONDS
     
     def claim_daily(self, user_id):
-        """Получить ежедневную награду"""
-        if not self.can_claim_daily(user_id):
-            user = self.get_user(user_id)
-            last_daily = datetime.fromisoformat(user['last_daily'])
-            time_left = 86400 - (datetime.now() - last_daily).total_seconds()
-            hours = int(time_left // 3600)
-            minutes = int((time_left % 3600) // 60)
-            return {
-                'success': False,
-                'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
-            }
-        
-        user = self.get_user(user_id)
+        """Получить ежедневную награду (проверка и начисление за один проход)"""
         reward_xp = 100
         reward_coins = 50
         
-        self.add_xp(user_id, reward_xp)
-        self.add_coins(user_id, reward_coins)
-        
-        user['last_daily'] = datetime.now().isoformat()
-        self.save_data()
-        
-        return {
-            'success': True,
-            'xp': reward_xp,
-            'coins': reward_coins
-        }
+        # Проверка и начисление под одной блокировкой - параллельный запрос
+        # не получит награду второй раз
+        with self.lock:
+            user = self.get_user(user_id)
+            now = datetime.now()
+            
+            # Кулдаун и стрик - по last_daily
+            streak = 1
+            if user.get('last_daily'):
+                elapsed = (now - datetime.fromisoformat(user['last_daily'])).total_seconds()
+                if elapsed < DAILY_COOLDOWN_SECONDS:
+                    time_left = DAILY_COOLDOWN_SECONDS - elapsed
+                    hours = int(time_left // 3600)
+                    minutes = int((time_left % 3600) // 60)
+                    return {
+                        'success': False,
+                        'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
+                    }
+                if elapsed <= DAILY_STREAK_WINDOW_SECONDS:
+                    streak = user.get('daily_streak', 0) + 1
+            
+            # Награда, ранг, стрик и last_daily - одно изменение и одна запись
+            old_rank = user['rank_id']
+            user['xp'] += reward_xp
+            user['coins'] += reward_coins
+            new_rank = self._check_rank_up(user)
+            user['last_daily'] = now.isoformat()
+            user['daily_streak'] = streak
+            self.save_data()
+            
+            return {
+                'success': True,
+                'xp': reward_xp,
+                'coins': reward_coins,
+                'streak': streak,
+                'rank_up': new_rank > old_rank,
+                'new_rank': new_rank
+            }
     
     def get_all_ranks(self):
         """Получить все ранги"""
         return RANKS
     
+    @_locked
     def get_all_accounts(self):
         """Получить все аккаунты"""
         all_accounts = list(self.accounts.get('accounts', {}).values())
         # Сортируем по дате создания (новые первые)
         all_accounts.sort(key=lambda x: x.get('created_at', ''), reverse=True)
         return all_accounts
+    
+    def count_accounts(self):
+        """Количество аккаунтов"""
+        return len(self.accounts.get('accounts', {}))
+    
+    @_locked
+    def _accounts_index(self):
+        """Отсортированные ключи аккаунтов для каталога"""
+        if self._accounts_index_version != self.data_version:
+            accounts = self.accounts.get('accounts', {}).items()
+            self._accounts_order = sorted((acc.get('created_at') or '', key) for key, acc in accounts)
+            self._accounts_names = sorted(
+                (name.lower(), key)
+                for key, acc in accounts
+                for name in {acc.get('username') or '', acc.get('display_name') or ''}
+                if name
+            )
+            self._accounts_index_version = self.data_version
+        return self._accounts_order, self._accounts_names
+    
+    @_locked
+    def get_accounts_page(self, cursor=None, limit=ACCOUNTS_PAGE_SIZE, prefix=None):
+        """
+        Страница каталога пользователей (новые первые) без полного профиля
+        
+        Args:
+            cursor: next_cursor предыдущей страницы
+            prefix: Начало username или display_name
+        
+        Returns:
+            {'accounts': [...], 'next_cursor': str или None}
+        """
+        if limit <= 0:
+            return {'accounts': [], 'next_cursor': cursor}
+        
+        order, names = self._accounts_index()
+        
+        matching = None
+        if prefix:
+            prefix = prefix.lower()
+            start = bisect.bisect_left(names, (prefix,))
+            matching = set()
+            for name, account_id in names[start:]:
+                if not name.startswith(prefix):
+                    break
+                matching.add(account_id)
+        
+        end = len(order)
+        if cursor:
+            created_at, _, account_id = cursor.rpartition('|')
+            end = bisect.bisect_left(order, (created_at, account_id))
+        
+        page = []
+        next_cursor = None
+        for created_at, account_id in reversed(order[:end]):
+            if matching is not None and account_id not in matching:
+                continue
+            if len(page) == limit:
+                next_cursor = f"{page[-1]['created_at']}|{page[-1]['id']}"
+                break
+            acc = self.accounts['accounts'][account_id]
+            profile = acc.get('profile') or {}
+            page.append({
+                'id': acc.get('id', account_id),
+                'username': acc.get('username'),
+                'display_name': acc.get('display_name'),
+                'discord_id': acc.get('discord_id'),
+                'created_at': created_at,
+                'avatar_url': profile.get('avatar_url') or '',
+                'bio': (profile.get('bio') or '')[:101]
+            })
+        
+        return {'accounts': page, 'next_cursor': next_cursor}
 
 # Глобальный экземпляр базы данных
 db = Database()
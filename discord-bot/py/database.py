@@ -9,6 +9,11 @@ from font_converter import convert_to_font
 DATABASE_FILE = 'json/user_data.json'
 ACCOUNTS_FILE = 'json/accounts.json'
 
+# Кулдаун ежедневной награды; стрик продолжается, если прошлая награда
+# была не раньше DAILY_STREAK_WINDOW_SECONDS назад
+DAILY_COOLDOWN_SECONDS = 86400
+DAILY_STREAK_WINDOW_SECONDS = 2 * 86400
+
 # 20 рангов с буквенной системой F-S и кастомными эмодзи
 RANKS = [
     # Ранг F (1-3) - Начальные
@@ -366,36 +371,47 @@ class Database:
         now = datetime.now()
         time_diff = (now - last_daily).total_seconds()
         
-        # 24 часа = 86400 секунд
-        return time_diff >= 86400
+        return time_diff >= DAILY_COOLDOWN_SECONDS
     
     def claim_daily(self, user_id):
-        """Получить ежедневную награду"""
-        if not self.can_claim_daily(user_id):
-            user = self.get_user(user_id)
-            last_daily = datetime.fromisoformat(user['last_daily'])
-            time_left = 86400 - (datetime.now() - last_daily).total_seconds()
-            hours = int(time_left // 3600)
-            minutes = int((time_left % 3600) // 60)
-            return {
-                'success': False,
-                'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
-            }
-        
-        user = self.get_user(user_id)
+        """Получить ежедневную награду (проверка и начисление за один проход)"""
         reward_xp = 100
         reward_coins = 50
         
-        self.add_xp(user_id, reward_xp)
-        self.add_coins(user_id, reward_coins)
+        user = self.get_user(user_id)
+        now = datetime.now()
+        
+        # Кулдаун и стрик - по last_daily
+        streak = 1
+        if user.get('last_daily'):
+            elapsed = (now - datetime.fromisoformat(user['last_daily'])).total_seconds()
+            if elapsed < DAILY_COOLDOWN_SECONDS:
+                time_left = DAILY_COOLDOWN_SECONDS - elapsed
+                hours = int(time_left // 3600)
+                minutes = int((time_left % 3600) // 60)
+                return {
+                    'success': False,
+                    'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
+                }
+            if elapsed <= DAILY_STREAK_WINDOW_SECONDS:
+                streak = user.get('daily_streak', 0) + 1
         
-        user['last_daily'] = datetime.now().isoformat()
+        # Награда, ранг, стрик и last_daily - одно изменение и одна запись
+        old_rank = user['rank_id']
+        user['xp'] += reward_xp
+        user['coins'] += reward_coins
+        new_rank = self._check_rank_up(user)
+        user['last_daily'] = now.isoformat()
+        user['daily_streak'] = streak
         self.save_data()
         
         return {
             'success': True,
             'xp': reward_xp,
-            'coins': reward_coins
+            'coins': reward_coins,
+            'streak': streak,
+            'rank_up': new_rank > old_rank,
+            'new_rank': new_rank
         }
     
     def get_all_ranks(self):
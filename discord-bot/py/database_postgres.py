@@ -333,6 +333,24 @@ class PostgresDatabase:
         
         return result
     
+    def get_users_page(self, after=None, limit=1000):
+        """
+        Пользователи по возрастанию id, не больше limit после after
+        
+        Постраничное чтение по ключу (индекс PRIMARY KEY) - для переноса
+        всей таблицы без загрузки её в память. JSON-поля не разбираются.
+        """
+        conn = self.get_connection()
+        cur = conn.cursor()
+        
+        cur.execute("SELECT * FROM users WHERE id > %s ORDER BY id LIMIT %s", (after or '', limit))
+        users = cur.fetchall()
+        
+        cur.close()
+        conn.close()
+        
+        return [dict(u) for u in users]
+    
     # Методы для голосовой активности
     def get_voice_data(self, user_id):
         """Получить данные голосовой активности"""
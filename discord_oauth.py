@@ -152,11 +152,12 @@ def handle_oauth_callback(db):
                 cur.close()
                 conn.close()
             else:
-                db.accounts['sessions'][token] = {
-                    'account_id': existing_account['id'],
-                    'created_at': datetime.now().isoformat()
-                }
-                db.save_accounts()
+                with db.lock:
+                    db.accounts['sessions'][token] = {
+                        'account_id': existing_account['id'],
+                        'created_at': datetime.now().isoformat()
+                    }
+                    db.save_accounts()
         except Exception as e:
             print(f"❌ Ошибка создания сессии: {e}")
             return {'success': False, 'error': 'Failed to create session'}
@@ -219,11 +220,12 @@ def handle_oauth_callback(db):
                     conn.close()
                 else:
                     from datetime import datetime
-                    db.accounts['sessions'][token] = {
-                        'account_id': str(account_id),
-                        'created_at': datetime.now().isoformat()
-                    }
-                    db.save_accounts()
+                    with db.lock:
+                        db.accounts['sessions'][token] = {
+                            'account_id': str(account_id),
+                            'created_at': datetime.now().isoformat()
+                        }
+                        db.save_accounts()
             except Exception as e:
                 print(f"❌ Ошибка создания сессии: {e}")
                 return {'success': False, 'error': 'Failed to create session'}
@@ -0,0 +1,36 @@
+# Конфигурация gunicorn для web.py (см. wsgi.py)
+import multiprocessing
+import os
+
+# Render/Railway передают порт через PORT
+bind = f"0.0.0.0:{os.getenv('PORT') or os.getenv('WEB_PORT', '5000')}"
+
+# Процессы масштабируют страницы по ядрам, потоки - ожидание БД внутри процесса.
+# Несколько процессов - только с PostgreSQL: JSON-база держит копию данных
+# в памяти каждого процесса и перезаписывает файлы целиком (wsgi.py не
+# запустится с JSON-базой и WEB_WORKERS > 1)
+default_workers = multiprocessing.cpu_count() * 2 + 1 if os.getenv('DATABASE_URL') else 1
+workers = int(os.getenv('WEB_WORKERS', default_workers))
+threads = int(os.getenv('WEB_THREADS', '4'))
+
+# Воркеры наследуют окружение мастера: wsgi.py проверяет число процессов
+os.environ['WEB_WORKERS'] = str(workers)
+
+# Кэш сессий у каждого процесса свой: logout в одном воркере не сбросит
+# токен в остальных, поэтому при нескольких процессах кэш сессий выключен.
+# Кэш ответов тоже свой у процесса - запись в другом воркере видна
+# после RESPONSE_CACHE_TTL (30 с)
+if workers > 1:
+    os.environ.setdefault('SESSION_CACHE_TTL', '0')
+worker_class = 'gthread'
+
+# Воркер перезапускается периодически, чтобы не копить память
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '2000'))
+max_requests_jitter = 200
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
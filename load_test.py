@@ -0,0 +1,109 @@
+# Нагрузочный тест веб-сайта: задержки p50/p90/p99 и пропускная способность
+#
+#   python load_test.py http://localhost:5000 --requests 2000 --concurrency 50
+#   python load_test.py http://localhost:5000 --click-user 123456789
+#
+# Сравнение режимов: python web.py (dev-сервер) против
+# gunicorn -c gunicorn.conf.py wsgi:app
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+# Страницы и API, которые открываются чаще всего
+DEFAULT_PATHS = [
+    '/',
+    '/leaderboard',
+    '/ranks',
+    '/users',
+    '/api/leaderboard',
+    '/api/stats',
+]
+
+
+def percentile(sorted_values, p):
+    """Перцентиль по уже отсортированному списку"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def worker(session, base_url, jobs, results, errors):
+    while True:
+        try:
+            method, path, payload = jobs.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        
+        started = time.perf_counter()
+        try:
+            async with session.request(method, base_url + path, json=payload) as response:
+                await response.read()
+                if response.status >= 500:
+                    errors[path] = errors.get(path, 0) + 1
+        except aiohttp.ClientError:
+            errors[path] = errors.get(path, 0) + 1
+            continue
+        
+        results.setdefault(path, []).append(time.perf_counter() - started)
+
+
+async def run(args):
+    jobs = asyncio.Queue()
+    paths = args.paths or DEFAULT_PATHS
+    
+    for i in range(args.requests):
+        if args.click_user and i % 2:
+            jobs.put_nowait(('POST', '/api/click', {'user_id': args.click_user}))
+        else:
+            jobs.put_nowait(('GET', paths[i % len(paths)], None))
+    
+    results = {}
+    errors = {}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(session, args.url.rstrip('/'), jobs, results, errors)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    
+    total = sum(len(v) for v in results.values())
+    
+    print("=" * 72)
+    print(f"📊 {args.url}: {total} запросов за {elapsed:.1f} с "
+          f"({total / elapsed:.0f} req/s), параллельно {args.concurrency}")
+    print("=" * 72)
+    print(f"{'путь':<24}{'n':>7}{'p50 мс':>10}{'p90 мс':>10}{'p99 мс':>10}{'ошибок':>9}")
+    
+    all_latencies = []
+    for path in sorted(set(results) | set(errors)):
+        latencies = sorted(results.get(path, []))
+        all_latencies.extend(latencies)
+        print(f"{path:<24}{len(latencies):>7}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}"
+              f"{percentile(latencies, 90) * 1000:>10.1f}"
+              f"{percentile(latencies, 99) * 1000:>10.1f}"
+              f"{errors.get(path, 0):>9}")
+    
+    all_latencies.sort()
+    print("-" * 72)
+    print(f"{'всего':<24}{len(all_latencies):>7}"
+          f"{percentile(all_latencies, 50) * 1000:>10.1f}"
+          f"{percentile(all_latencies, 90) * 1000:>10.1f}"
+          f"{percentile(all_latencies, 99) * 1000:>10.1f}"
+          f"{sum(errors.values()):>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Нагрузочный тест веб-сайта')
+    parser.add_argument('url', nargs='?', default='http://localhost:5000')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--paths', nargs='*', help='Свои пути вместо стандартного набора')
+    parser.add_argument('--click-user', help='Смешать GET с POST /api/click для этого user_id')
+    asyncio.run(run(parser.parse_args()))
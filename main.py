@@ -1,14 +1,17 @@
 # Главный файл - запускает бота и веб-сервер одновременно
 import asyncio
+import os
 import threading
-from datetime import datetime
 import bot as bot_module
 import web
 
 # Импортируем Telegram бэкап
 try:
-    from telegram_bot import auto_backup_to_telegram
-    telegram_enabled = True
+    from telegram_bot import auto_backup_to_telegram, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    # Без токена или чата загрузка всегда падает - снимки делались бы впустую
+    telegram_enabled = bool(TELEGRAM_TOKEN and TELEGRAM_CHAT_ID)
+    if not telegram_enabled:
+        print("⚠️ Telegram бэкап отключён: нужны TELEGRAM_BOT_TOKEN и TELEGRAM_BACKUP_CHAT_ID")
 except Exception as e:
     print(f"⚠️ Telegram бэкап недоступен: {e}")
     telegram_enabled = False
@@ -21,24 +24,20 @@ except Exception as e:
     print(f"⚠️ Telegram бот недоступен: {e}")
     telegram_bot_enabled = False
 
+# thread - веб-сервер Flask в потоке бота (по умолчанию)
+# external - веб обслуживает gunicorn отдельно (gunicorn -c gunicorn.conf.py wsgi:app)
+WEB_MODE = os.getenv('WEB_MODE', 'thread')
+
+# threads - компоненты в отдельных потоках (по умолчанию)
+# async - все компоненты на одном event loop под присмотром (см. orchestrator.py)
+RUN_MODE = os.getenv('RUN_MODE', 'threads')
+
 def update_web_stats():
     """Обновление статистики для веб-сайта"""
     while True:
         try:
             if bot_module.bot.is_ready():
-                uptime = 0
-                if bot_module.bot.stats['start_time']:
-                    uptime = int((datetime.now() - bot_module.bot.stats['start_time']).total_seconds())
-                
-                web.update_bot_data({
-                    'status': 'online' if bot_module.bot.is_ready() else 'offline',
-                    'uptime': uptime,
-                    'guilds': len(bot_module.bot.guilds),
-                    'users': len(bot_module.bot.users),
-                    'commands_used': bot_module.bot.stats['commands_used'],
-                    'messages_seen': bot_module.bot.stats['messages_seen'],
-                    'latency': round(bot_module.bot.latency * 1000),
-                })
+                web.update_bot_data(bot_module.get_web_stats())
         except Exception as e:
             print(f"❌ Ошибка обновления статистики: {e}")
         
@@ -49,16 +48,31 @@ def run_web_server():
     """Запуск веб-сервера в отдельном потоке"""
     web.run_web()
 
+def run_telegram_backup():
+    """Периодический бэкап базы в Telegram (свой event loop в отдельном потоке)"""
+    asyncio.run(auto_backup_to_telegram(web.db))
+
 def main():
     """Главная функция"""
     print("=" * 50)
     print("🚀 Запуск Discord бота с веб-панелью")
     print("=" * 50)
     
+    if RUN_MODE == 'async':
+        import orchestrator
+        try:
+            asyncio.run(orchestrator.run_all(WEB_MODE))
+        except KeyboardInterrupt:
+            pass
+        return
+    
     # Запускаем веб-сервер в отдельном потоке
-    web_thread = threading.Thread(target=run_web_server, daemon=True)
-    web_thread.start()
-    print("✅ Веб-сервер запущен")
+    if WEB_MODE == 'external':
+        print("ℹ️ Веб-сервер запускается отдельно (WEB_MODE=external)")
+    else:
+        web_thread = threading.Thread(target=run_web_server, daemon=True)
+        web_thread.start()
+        print("✅ Веб-сервер запущен")
     
     # Запускаем Telegram бота в отдельном потоке
     if telegram_bot_enabled:
@@ -66,6 +80,12 @@ def main():
         telegram_thread.start()
         print("✅ Telegram бот запущен")
     
+    # Запускаем бэкапы в Telegram в отдельном потоке
+    if telegram_enabled:
+        backup_thread = threading.Thread(target=run_telegram_backup, daemon=True)
+        backup_thread.start()
+        print("✅ Бэкапы в Telegram запущены")
+    
     # Запускаем обновление статистики в отдельном потоке
     stats_thread = threading.Thread(target=update_web_stats, daemon=True)
     stats_thread.start()
@@ -0,0 +1,238 @@
+# Оркестратор: Discord бот, Telegram бот, веб-сервер и фоновые задачи
+# в одном процессе на одном event loop (RUN_MODE=async python main.py)
+#
+# Каждый компонент - задача под присмотром supervise(): при падении он
+# перезапускается с нарастающей паузой, не трогая остальные. Веб-сайт -
+# WSGI-приложение Flask, поэтому его сервер крутится в пуле потоков loop'а.
+#
+# Остановка (SIGTERM / Ctrl+C): компоненты получают stop_event, после чего
+# публикуется статус offline и база дописывает отложенные изменения.
+import asyncio
+import os
+import signal
+import time
+
+from werkzeug.serving import make_server
+
+import bot as bot_module
+import config
+import web
+
+try:
+    from telegram_bot import auto_backup_to_telegram, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    # Без токена или чата загрузка всегда падает - снимки делались бы впустую
+    telegram_backup_enabled = bool(TELEGRAM_TOKEN and TELEGRAM_CHAT_ID)
+    if not telegram_backup_enabled:
+        print("⚠️ Telegram бэкап отключён: нужны TELEGRAM_BOT_TOKEN и TELEGRAM_BACKUP_CHAT_ID")
+except Exception as e:
+    print(f"⚠️ Telegram бэкап недоступен: {e}")
+    telegram_backup_enabled = False
+
+try:
+    from telegram_bot_full import TELEGRAM_TOKEN, run_telegram_bot_async
+    telegram_bot_enabled = bool(TELEGRAM_TOKEN)
+except Exception as e:
+    print(f"⚠️ Telegram бот недоступен: {e}")
+    telegram_bot_enabled = False
+
+# Как часто публиковать статистику бота для сайта (секунды)
+STATS_INTERVAL = 5
+
+# Как часто JSON-база пишет накопленные изменения на диск (секунды)
+DB_FLUSH_INTERVAL = float(os.getenv('DB_FLUSH_INTERVAL', '5'))
+
+# Сколько ждать компоненты при остановке, прежде чем отменить их
+SHUTDOWN_TIMEOUT = 20
+
+# Пауза перед перезапуском упавшего компонента (удваивается до максимума)
+RESTART_DELAY = 1
+RESTART_DELAY_MAX = 60
+
+
+async def wait_stop(stop_event, timeout):
+    """Подождать timeout секунд или запроса на остановку. True - остановка"""
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def until_stopped(awaitable, stop_event):
+    """
+    Выполнять awaitable, пока не запрошена остановка
+    
+    Если awaitable завершился сам - его результат или исключение
+    пробрасываются; при остановке он отменяется.
+    """
+    task = asyncio.ensure_future(awaitable)
+    stopper = asyncio.ensure_future(stop_event.wait())
+    try:
+        await asyncio.wait({task, stopper}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stopper.cancel()
+    
+    if task.done():
+        return task.result()
+    
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def supervise(name, component, stop_event):
+    """Запускать component(stop_event) и перезапускать после падения"""
+    loop = asyncio.get_running_loop()
+    delay = RESTART_DELAY
+    
+    while not stop_event.is_set():
+        started = loop.time()
+        try:
+            await component(stop_event)
+            if stop_event.is_set():
+                break
+            print(f"⚠️ {name}: завершился без остановки, перезапуск")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+        
+        # Долго проработавший компонент перезапускаем сразу с короткой паузой
+        if loop.time() - started > RESTART_DELAY_MAX:
+            delay = RESTART_DELAY
+        
+        if await wait_stop(stop_event, delay):
+            break
+        delay = min(delay * 2, RESTART_DELAY_MAX)
+    
+    print(f"🛑 {name}: остановлен")
+
+
+# ==================== КОМПОНЕНТЫ ====================
+
+async def run_discord(stop_event):
+    """Discord бот на текущем loop"""
+    bot = bot_module.bot
+    if bot.is_closed():
+        bot.clear()  # После падения клиент нужно «переоткрыть»
+    
+    try:
+        await until_stopped(bot.start(config.DISCORD_TOKEN), stop_event)
+    finally:
+        if not bot.is_closed():
+            await bot.close()
+
+
+async def run_web(stop_event):
+    """Веб-сервер Flask (WSGI) в пуле потоков"""
+    loop = asyncio.get_running_loop()
+    server = make_server('0.0.0.0', config.WEB_PORT, web.app, threaded=True)
+    print(f"🌐 Веб-сервер запущен на http://localhost:{config.WEB_PORT}")
+    
+    serving = loop.run_in_executor(None, server.serve_forever)
+    try:
+        await until_stopped(asyncio.shield(serving), stop_event)
+    finally:
+        if not serving.done():
+            await loop.run_in_executor(None, server.shutdown)
+        server.server_close()
+
+
+async def run_stats(stop_event):
+    """Публикация статистики бота для сайта"""
+    while True:
+        if bot_module.bot.is_ready():
+            web.update_bot_data(bot_module.get_web_stats())
+        if await wait_stop(stop_event, STATS_INTERVAL):
+            return
+
+
+async def run_session_sweeper(stop_event):
+    """Очистка старых сессий и загрузок"""
+    while True:
+        await asyncio.to_thread(web.sweep_sessions)
+        if await wait_stop(stop_event, web.SESSION_SWEEP_INTERVAL):
+            return
+
+
+async def run_db_flusher(stop_event):
+    """Периодическая запись накопленных изменений JSON-базы"""
+    while True:
+        await asyncio.to_thread(web.db.flush)
+        if await wait_stop(stop_event, DB_FLUSH_INTERVAL):
+            return
+
+
+async def run_backups(stop_event):
+    """Бэкапы в Telegram"""
+    await until_stopped(auto_backup_to_telegram(web.db), stop_event)
+
+
+async def run_telegram(stop_event):
+    """Telegram бот (сам останавливается по stop_event)"""
+    await run_telegram_bot_async(stop_event)
+
+
+def build_components(web_mode):
+    """Компоненты для запуска: {имя: корутина(stop_event)}"""
+    components = {'Discord бот': run_discord, 'Статистика': run_stats}
+    
+    if web_mode != 'external':
+        components['Веб-сервер'] = run_web
+        components['Очистка сессий'] = run_session_sweeper
+    if telegram_bot_enabled:
+        components['Telegram бот'] = run_telegram
+    if telegram_backup_enabled:
+        components['Бэкапы'] = run_backups
+    if getattr(web.db, 'write_behind', None) is not None:
+        components['Запись базы'] = run_db_flusher
+    
+    return components
+
+
+async def run_all(web_mode='thread'):
+    """Запустить все компоненты и дождаться остановки"""
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    
+    # Ctrl+C обрабатывает asyncio.run (отменой этой корутины), SIGTERM - здесь
+    try:
+        loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    except (NotImplementedError, AttributeError):
+        pass  # Windows
+    
+    # Запись JSON-базы на каждое сообщение блокировала бы весь loop
+    if getattr(web.db, 'write_behind', None) is not None:
+        web.db.write_behind = True
+    
+    components = build_components(web_mode)
+    tasks = [
+        asyncio.create_task(supervise(name, component, stop_event), name=name)
+        for name, component in components.items()
+    ]
+    print(f"✅ Запущено компонентов: {len(tasks)} ({', '.join(components)})")
+    
+    try:
+        await stop_event.wait()
+    finally:
+        print("🛑 Остановка...")
+        stop_event.set()
+        
+        done, pending = await asyncio.wait(tasks, timeout=SHUTDOWN_TIMEOUT)
+        for task in pending:
+            print(f"⚠️ {task.get_name()}: не остановился за {SHUTDOWN_TIMEOUT}с, отмена")
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        web.update_bot_data({
+            'status': 'offline',
+            'online_members': [],
+            'online_count': 0,
+            'online_version': int(time.time() * 1000),
+        })
+        
+        # Отложенные изменения базы - на диск
+        await asyncio.to_thread(web.db.close)
+        print("✅ Данные сохранены, работа завершена")
@@ -0,0 +1,89 @@
+# Индекс онлайн-участников Discord сервера
+#
+# Вместо обхода всех guild.members каждые 30 секунд индекс обновляется
+# событиями (on_presence_update, on_member_join, on_member_remove, ...):
+# каждое событие - O(1). Количество онлайн - len(словаря), а упорядоченный
+# список для сайта собирается только при изменении версии.
+import time
+
+
+class PresenceIndex:
+    """Онлайн-участники одного сервера: {id: данные участника}"""
+    
+    def __init__(self):
+        self.guild_id = None
+        self.guild_name = None
+        self._online = {}
+        # Версия уникальна между перезапусками: клиенты сравнивают её как ETag
+        self.version = int(time.time() * 1000)
+        self._members_version = None
+        self._members = []
+    
+    @staticmethod
+    def is_online(member):
+        """Учитывается ли участник (не бот и не offline)"""
+        return not member.bot and str(member.status) != 'offline'
+    
+    @staticmethod
+    def member_entry(member):
+        """Данные участника для сайта"""
+        return {
+            'id': str(member.id),
+            'name': member.name,
+            'display_name': member.display_name,
+            'avatar': str(member.display_avatar.url),
+            'status': str(member.status),
+            'activity': str(member.activity.name) if member.activity else None
+        }
+    
+    def rebuild(self, guild):
+        """Полностью пересобрать индекс (при подключении к серверу)"""
+        self.guild_id = guild.id
+        self.guild_name = guild.name
+        self._online = {
+            member.id: self.member_entry(member)
+            for member in guild.members
+            if self.is_online(member)
+        }
+        self.version += 1
+    
+    def tracks(self, guild):
+        """Относится ли событие к отслеживаемому серверу"""
+        return guild is not None and guild.id == self.guild_id
+    
+    def update(self, member):
+        """Участник изменился (статус, активность, ник, аватар, вход на сервер)"""
+        if not self.tracks(member.guild):
+            return
+        
+        if self.is_online(member):
+            entry = self.member_entry(member)
+            if self._online.get(member.id) != entry:
+                self._online[member.id] = entry
+                self.version += 1
+        else:
+            self.remove(member.id)
+    
+    def remove(self, member_id):
+        """Участник ушёл с сервера или стал offline"""
+        if self._online.pop(member_id, None) is not None:
+            self.version += 1
+    
+    @property
+    def count(self):
+        """Количество онлайн"""
+        return len(self._online)
+    
+    def members(self):
+        """Список онлайн по имени (пересобирается только после изменений)"""
+        if self._members_version != self.version:
+            self._members = sorted(
+                self._online.values(),
+                key=lambda entry: (entry['display_name'] or '').casefold()
+            )
+            self._members_version = self.version
+        return self._members
+    
+    def page(self, offset=0, limit=50):
+        """Страница списка онлайн"""
+        return self.members()[offset:offset + limit]
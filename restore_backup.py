@@ -0,0 +1,102 @@
+# Восстановление из инкрементальных бэкапов (полный снимок + дельты)
+#
+#   python restore_backup.py backups/ --out restored/
+#   python restore_backup.py backups/ --until 42          # состояние на бэкап #42
+#   python restore_backup.py backups/ --database-url postgresql://...  # залить в PostgreSQL
+#
+# В папке должны лежать все части (.partNNN) последнего снимка и дельт
+# после него - в том виде, в каком они пришли в Telegram.
+import argparse
+import json
+import os
+
+from backup_engine import PG_TABLES, restore, to_json_files
+
+
+def write_json_files(files, out_dir):
+    """user_data.json / accounts.json (JSON-база) и postgres_<таблица>.json"""
+    os.makedirs(out_dir, exist_ok=True)
+    
+    for source, content in files.items():
+        if source == 'postgres':
+            for table, rows in content.items():
+                path = os.path.join(out_dir, f"postgres_{table}.json")
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(list(rows.values()), f, indent=2, ensure_ascii=False)
+                print(f"💾 {path}: {len(rows)} строк")
+        else:
+            path = os.path.join(out_dir, f"{source}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(content, f, indent=2, ensure_ascii=False)
+            print(f"💾 {path}")
+
+
+def load_into_postgres(tables, database_url, batch_size=1000):
+    """Залить строки в PostgreSQL (INSERT ... ON CONFLICT DO UPDATE)"""
+    import psycopg2
+    from psycopg2.extras import Json, execute_values
+    
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            # Сессии в бэкап не входят - после восстановления нужно войти заново
+            for table, key_column in PG_TABLES.items():
+                rows = list(tables.get(table, {}).values())
+                if not rows:
+                    continue
+                
+                columns = list(rows[0].keys())
+                updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in columns if c != key_column)
+                query = (
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s "
+                    f"ON CONFLICT ({key_column}) DO UPDATE SET {updates}"
+                )
+                
+                for start in range(0, len(rows), batch_size):
+                    values = [
+                        tuple(
+                            Json(row.get(c)) if isinstance(row.get(c), (dict, list)) else row.get(c)
+                            for c in columns
+                        )
+                        for row in rows[start:start + batch_size]
+                    ]
+                    execute_values(cur, query, values)
+                
+                print(f"✅ {table}: {len(rows)} строк")
+            
+            # SERIAL после явных id
+            cur.execute(
+                "SELECT setval(pg_get_serial_sequence('accounts', 'id'), "
+                "COALESCE((SELECT MAX(id) FROM accounts), 1))"
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Восстановление из бэкапов TTFD')
+    parser.add_argument('directory', help='Папка с файлами бэкапа')
+    parser.add_argument('--out', default='restored', help='Куда записать JSON-файлы')
+    parser.add_argument('--until', type=int, help='Восстановить состояние на бэкап с этим номером')
+    parser.add_argument('--database-url', help='Залить данные в PostgreSQL вместо файлов')
+    args = parser.parse_args()
+    
+    collections, applied = restore(args.directory, args.until)
+    print(f"🔄 Снимок #{applied[0]} + дельт: {len(applied) - 1} (до #{applied[-1]})")
+    
+    files = to_json_files(collections)
+    
+    if args.database_url:
+        load_into_postgres(files.get('postgres', {}), args.database_url)
+    else:
+        write_json_files(files, args.out)
+    
+    print("✅ Восстановление завершено")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Скрипт для применения миграции партиционирования событий
+Переносит sync_events и cross_platform_events в дневные партиции
+"""
+
+import asyncio
+import asyncpg
+import os
+from pathlib import Path
+
+# Миграции по порядку: (название, путь к SQL файлу, таблица для проверки)
+MIGRATIONS = [
+    (
+        'cross_platform_events',
+        Path(__file__).parent / 'migration_partition_events.sql',
+        'cross_platform_events'
+    ),
+    (
+        'sync_events (Telegram бот)',
+        Path(__file__).parent.parent / 'telegram-bot' / 'infrastructure' / 'database'
+        / 'migrations' / '007_partition_sync_events.sql',
+        'sync_events'
+    ),
+]
+
+
+async def apply_migration():
+    """Применить миграции партиционирования"""
+    
+    # Получаем DATABASE_URL
+    database_url = os.getenv('DATABASE_URL')
+    
+    if not database_url:
+        print("❌ DATABASE_URL не найден в переменных окружения")
+        print("💡 Установи переменную окружения:")
+        print("   PowerShell: $env:DATABASE_URL='postgresql://...'")
+        return False
+    
+    print("=" * 70)
+    print("🔄 ПРИМЕНЕНИЕ МИГРАЦИИ: партиционирование событий")
+    print("=" * 70)
+    print(f"📊 База данных: {database_url[:30]}...")
+    print()
+    
+    try:
+        # Подключаемся к БД
+        print("🔌 Подключение к PostgreSQL...")
+        conn = await asyncpg.connect(database_url)
+        print("✅ Подключено успешно")
+        print()
+        
+        for name, sql_file, table in MIGRATIONS:
+            # Таблица может отсутствовать в этой БД (например, только unified)
+            exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", table)
+            if not exists and table == 'sync_events':
+                print(f"⏭️  {name}: таблица {table} не найдена - пропуск")
+                print()
+                continue
+            
+            print(f"📄 {name}: {sql_file.name}")
+            
+            with open(sql_file, 'r', encoding='utf-8') as f:
+                sql = f.read()
+            
+            # Перенос данных выполняется в одной транзакции
+            async with conn.transaction():
+                await conn.execute(sql)
+            
+            partitions = await conn.fetchval("""
+                SELECT COUNT(*) FROM pg_inherits
+                WHERE inhparent = $1::regclass
+            """, table)
+            rows = await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+            
+            print(f"✅ {table}: {partitions} партиций, {rows} записей")
+            print()
+        
+        # Закрываем соединение
+        await conn.close()
+        
+        print("=" * 70)
+        print("✅ МИГРАЦИЯ ЗАВЕРШЕНА УСПЕШНО!")
+        print("=" * 70)
+        print()
+        print("🎯 Следующие шаги:")
+        print("   1. Проверить данные в новых таблицах")
+        print("   2. Удалить *_legacy таблицы вручную")
+        print()
+        
+        return True
+    
+    except Exception as e:
+        print()
+        print("=" * 70)
+        print("❌ ОШИБКА ПРИМЕНЕНИЯ МИГРАЦИИ")
+        print("=" * 70)
+        print(f"Тип ошибки: {type(e).__name__}")
+        print(f"Сообщение: {e}")
+        print()
+        
+        import traceback
+        print("Полный traceback:")
+        traceback.print_exc()
+        
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(apply_migration())
+    
+    if success:
+        print("✅ Готово! События партиционированы.")
+    else:
+        print("❌ Миграция не применена. Проверь ошибки выше.")
@@ -6,6 +6,7 @@ import asyncio
 import logging
 from typing import Optional
 from database_unified import get_unified_db, UnifiedDatabase
+from event_batch import process_events
 
 logger = logging.getLogger(__name__)
 
@@ -44,27 +45,28 @@ class BalanceSync:
     async def _process_pending_events(self):
         """Обработать необработанные события"""
         events = await self.unified_db.get_pending_events(limit=50)
+        if not events:
+            return
         
-        for event in events:
-            try:
-                # Обрабатываем только события изменения баланса
-                if event.event_type == 'coins_change':
-                    await self._sync_coins_change(event)
-                elif event.event_type == 'xp_change':
-                    await self._sync_xp_change(event)
-                elif event.event_type == 'rank_up':
-                    await self._sync_rank_up(event)
-                
-                # Отмечаем как обработанное
-                await self.unified_db.mark_event_processed(event.id)
-                
-            except Exception as e:
-                logger.error(f"❌ Ошибка обработки события {event.id}: {e}")
+        # Пользователи всей пачки - одним запросом вместо запроса на событие
+        users = await self.unified_db.get_users_by_ids(list({event.user_id for event in events}))
+        
+        async def handle(event):
+            # Обрабатываем только события изменения баланса
+            user = users.get(event.user_id)
+            if event.event_type == 'coins_change':
+                await self._sync_coins_change(event, user)
+            elif event.event_type == 'xp_change':
+                await self._sync_xp_change(event, user)
+            elif event.event_type == 'rank_up':
+                await self._sync_rank_up(event, user)
+        
+        # Изменения монет/XP одного пользователя складываются,
+        # обработанные отмечаются одним UPDATE
+        await process_events(self.unified_db, events, handle)
     
-    async def _sync_coins_change(self, event):
+    async def _sync_coins_change(self, event, user):
         """Синхронизировать изменение монет"""
-        user = await self.unified_db.get_user_by_id(event.user_id)
-        
         if not user:
             return
         
@@ -75,10 +77,8 @@ class BalanceSync:
         
         # Монеты уже обновлены в unified_users, событие просто для логирования
     
-    async def _sync_xp_change(self, event):
+    async def _sync_xp_change(self, event, user):
         """Синхронизировать изменение XP"""
-        user = await self.unified_db.get_user_by_id(event.user_id)
-        
         if not user:
             return
         
@@ -87,10 +87,8 @@ class BalanceSync:
                    f"delta={event.data.get('delta_xp')}, "
                    f"new_xp={event.data.get('new_xp')}")
     
-    async def _sync_rank_up(self, event):
+    async def _sync_rank_up(self, event, user):
         """Синхронизировать повышение ранга"""
-        user = await self.unified_db.get_user_by_id(event.user_id)
-        
         if not user:
             return
         
@@ -0,0 +1,233 @@
+"""
+Бенчмарк пакетной миграции в unified_users на синтетических данных
+
+Работает в отдельной схеме migration_bench локальной БД (схема
+пересоздаётся): генерирует по N пользователей Telegram, Discord и
+Website с пересечениями (часть Discord с теми же username, что в
+Telegram, часть аккаунтов сайта с discord_id). Telegram кладётся в
+таблицу users (как в Telegram БД, telegram_id не равен id) и читается
+тем же read_telegram_rows, что и при настоящей миграции. Затем:
+- меряет прежний построчный перенос на небольшой выборке;
+- запускает BulkMigration, прерывает Discord на середине и продолжает
+  с checkpoint;
+- сверяет итоговые счётчики с ожидаемыми.
+
+Запуск: DATABASE_URL=postgresql://localhost/test python benchmark_migration.py [users]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import asyncpg
+
+from bulk_migration import BulkMigration, MigrationSource, CHUNK_SIZE
+from database_unified import UnifiedDatabase
+from migrate_to_unified import (
+    TELEGRAM_COLUMNS, TELEGRAM_MERGE, DISCORD_COLUMNS, DISCORD_MERGE,
+    WEBSITE_COLUMNS, WEBSITE_MERGE, read_telegram_rows
+)
+
+SCHEMA = 'migration_bench'
+
+# Доля Discord-пользователей с username из Telegram и аккаунтов сайта с discord_id
+LINKED_SHARE = 0.3
+
+# Пользователей для построчного переноса (дольше не нужно - видно и так)
+LEGACY_SAMPLE = 2000
+
+
+def make_telegram(count):
+    """Строки таблицы users Telegram БД (id, telegram_id, username, ...)"""
+    now = datetime.now()
+    return [
+        (i, str(500_000_000 + i * 37), f"user{i}", i % 5000, i % 700, 1 + i % 10,
+         now - timedelta(days=i % 365), now, None, i % 7)
+        for i in range(1, count + 1)
+    ]
+
+
+async def load_telegram_users(pool, telegram):
+    """Таблица users по схеме Telegram БД (001_initial_schema + daily_streak)"""
+    await pool.execute(
+        """
+        CREATE TABLE users (
+            id SERIAL PRIMARY KEY,
+            telegram_id VARCHAR(50) UNIQUE NOT NULL,
+            username VARCHAR(100),
+            first_name VARCHAR(100),
+            xp INTEGER DEFAULT 0,
+            coins INTEGER DEFAULT 0,
+            rank_id INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT NOW(),
+            last_active TIMESTAMP DEFAULT NOW(),
+            last_daily TIMESTAMP,
+            daily_streak INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    async with pool.acquire() as conn:
+        await conn.copy_records_to_table(
+            'users', records=telegram,
+            columns=['id', 'telegram_id', 'username', 'xp', 'coins', 'rank_id',
+                     'created_at', 'last_active', 'last_daily', 'daily_streak']
+        )
+
+
+def make_discord(count):
+    linked = int(count * LINKED_SHARE)
+    return [
+        (f"d{i:09d}", f"user{i}" if i <= linked else f"discord{i}", f"Discord {i}",
+         i % 3000, i % 500, 1, i % 30, i % 10, 0, i * 60 % 100000, i % 1000)
+        for i in range(1, count + 1)
+    ]
+
+
+def make_website(count):
+    linked = int(count * LINKED_SHARE)
+    return [
+        (f"site{i:09d}@example.com", f"site{i}", f"Site {i}", f"d{i:09d}" if i <= linked else None)
+        for i in range(1, count + 1)
+    ]
+
+
+def list_reader(rows, fail_after=None):
+    """read_chunks по готовому списку; fail_after - оборвать после стольких частей"""
+    keys = [str(row[0]) for row in rows]
+    
+    async def read_chunks(after, chunk_size):
+        start = keys.index(after) + 1 if after is not None else 0
+        for chunk_number, offset in enumerate(range(start, len(rows), chunk_size)):
+            if fail_after is not None and chunk_number >= fail_after:
+                raise RuntimeError("обрыв источника (проверка checkpoint)")
+            yield rows[offset:offset + chunk_size]
+    return read_chunks
+
+
+def sources(pool, discord, website, discord_fail_after=None):
+    def read_telegram(after, chunk_size):
+        return read_telegram_rows(pool, after, chunk_size)
+    
+    return [
+        MigrationSource('telegram', '📱 Telegram', TELEGRAM_COLUMNS, read_telegram, TELEGRAM_MERGE),
+        MigrationSource('discord', '🎮 Discord', DISCORD_COLUMNS, list_reader(discord, discord_fail_after), DISCORD_MERGE),
+        MigrationSource('website', '🌐 Website', WEBSITE_COLUMNS, list_reader(website), WEBSITE_MERGE),
+    ]
+
+
+async def legacy_migrate(pool, telegram):
+    """Как было: поиск + INSERT + UPDATE на каждого пользователя"""
+    started = time.perf_counter()
+    for row in telegram:
+        async with pool.acquire() as conn:
+            existing = await conn.fetchrow("SELECT * FROM unified_users WHERE telegram_id = $1", row[1])
+            if existing:
+                continue
+            user_id = await conn.fetchval(
+                """
+                INSERT INTO unified_users (telegram_id, username, display_name, platforms, primary_platform)
+                VALUES ($1, $2, $2, '["telegram"]'::jsonb, 'telegram')
+                RETURNING id
+                """,
+                row[1], row[2]
+            )
+            await conn.execute(
+                """
+                UPDATE unified_users
+                SET xp = $1, coins = $2, rank_id = $3, games_played = 0, games_won = 0,
+                    created_at = $4, last_active = $5, last_daily = $6, daily_streak = $7
+                WHERE id = $8
+                """,
+                *row[3:], user_id
+            )
+    return time.perf_counter() - started
+
+
+async def run(count):
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        print("❌ DATABASE_URL не установлен (нужна локальная тестовая БД)")
+        return
+    
+    admin = await asyncpg.connect(database_url)
+    await admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await admin.execute(f"CREATE SCHEMA {SCHEMA}")
+    await admin.close()
+    
+    pool = await asyncpg.create_pool(
+        database_url, min_size=4, max_size=10,
+        server_settings={'search_path': SCHEMA}
+    )
+    unified = UnifiedDatabase(database_url)
+    unified.pool = pool
+    await unified.init_tables()
+    
+    telegram, discord, website = make_telegram(count), make_discord(count), make_website(count)
+    await load_telegram_users(pool, telegram)
+    
+    print("=" * 60)
+    print(f"🚚 Миграция: по {count} пользователей Telegram, Discord и Website")
+    print("=" * 60)
+    
+    try:
+        # Построчно - на выборке
+        sample = telegram[:min(LEGACY_SAMPLE, count)]
+        legacy_seconds = await legacy_migrate(pool, sample)
+        legacy_rate = len(sample) / legacy_seconds
+        print(f"\n🐢 Построчно: {len(sample)} за {legacy_seconds:.1f} с ({legacy_rate:.0f} строк/с)")
+        await pool.execute("TRUNCATE unified_users RESTART IDENTITY CASCADE")
+        
+        # Пакетно, с обрывом Discord на середине
+        started = time.perf_counter()
+        chunk_size = min(CHUNK_SIZE, max(1, count // 10))
+        half = count // chunk_size // 2
+        first = await BulkMigration(
+            pool, sources(pool, discord, website, discord_fail_after=half), chunk_size
+        ).run(restart=True)
+        assert 'error' in first['discord'] and 'error' in first['website']
+        print(f"\n🔌 Discord оборван после {half} частей, Website ждёт слияния Discord")
+        
+        results = await BulkMigration(pool, sources(pool, discord, website), chunk_size).run()
+        bulk_seconds = time.perf_counter() - started
+        bulk_rate = count * 3 / bulk_seconds
+        print(f"\n🚀 Пакетно (с обрывом и продолжением): {count * 3} за {bulk_seconds:.1f} с ({bulk_rate:.0f} строк/с)")
+        print(f"   Ускорение: x{bulk_rate / legacy_rate:.0f}")
+        
+        # Проверка результата
+        linked = int(count * LINKED_SHARE)
+        expected = {
+            'telegram': {'total': count, 'migrated': count, 'linked': 0, 'skipped': 0, 'errors': 0},
+            'discord': {'total': count, 'migrated': count - linked, 'linked': linked, 'skipped': 0, 'errors': 0},
+            'website': {'total': count, 'migrated': count - linked, 'linked': linked, 'skipped': 0, 'errors': 0},
+        }
+        for name, wanted in expected.items():
+            got = {key: results[name][key] for key in wanted}
+            assert got == wanted, f"{name}: {got} != {wanted}"
+        
+        users = await pool.fetchval("SELECT COUNT(*) FROM unified_users")
+        assert users == count * 3 - linked * 2, users
+        
+        # telegram_id - из users.telegram_id, а не из users.id
+        mismatched = await pool.fetchval(
+            """
+            SELECT COUNT(*) FROM users t
+            LEFT JOIN unified_users u ON u.telegram_id = t.telegram_id AND u.xp = t.xp
+            WHERE u.id IS NULL
+            """
+        )
+        assert mismatched == 0, mismatched
+        
+        # Повторный запуск ничего не меняет
+        again = await BulkMigration(pool, sources(pool, discord, website), chunk_size).run()
+        assert all(again[name]['migrated'] == results[name]['migrated'] for name in expected)
+        assert await pool.fetchval("SELECT COUNT(*) FROM unified_users") == users
+        
+        print(f"\n✅ unified_users: {users} пользователей, счётчики совпадают с ожидаемыми")
+    finally:
+        await pool.close()
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    asyncio.run(run(count))
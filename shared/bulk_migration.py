@@ -0,0 +1,268 @@
+"""
+Bulk Migration - пакетный перенос пользователей в unified_users
+
+Вместо двух запросов на пользователя (поиск + create_user) источник
+читается частями, каждая часть уходит одним COPY в staging-таблицу
+платформы, а в unified_users данные попадают одним INSERT ... SELECT
+... ON CONFLICT на платформу.
+
+- Чтение и COPY всех платформ идут параллельно; слияние - по очереди
+  (Telegram → Discord → Website), потому что Discord привязывается к уже
+  перенесённым пользователям по username, а Website - по discord_id.
+- Прогресс хранится в unified_migration_checkpoints: COPY части и сдвиг
+  checkpoint в одной транзакции, поэтому прерванный запуск продолжается
+  с последней записанной части, а уже слитая платформа не трогается.
+- Скорость чтения и слияния пишется в лог (строк в секунду).
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Строк в одной части (один COPY)
+CHUNK_SIZE = 5000
+
+# Как часто писать прогресс чтения (секунды)
+PROGRESS_INTERVAL = 5
+
+CHECKPOINT_TABLE = 'unified_migration_checkpoints'
+
+# read_chunks(после какого ключа, размер части) -> части строк, по возрастанию ключа
+ChunkReader = Callable[[Optional[str], int], AsyncIterator[List[tuple]]]
+
+
+class MigrationSource:
+    """Источник пользователей одной платформы"""
+    
+    def __init__(
+        self,
+        name: str,
+        title: str,
+        columns: Sequence[Tuple[str, str]],
+        read_chunks: ChunkReader,
+        merge_sql: str
+    ):
+        """
+        Args:
+            name: Имя платформы (ключ checkpoint и суффикс staging-таблицы)
+            title: Название для логов
+            columns: Колонки staging-таблицы (имя, тип); первая - ключ
+                порядка чтения, по ней сохраняется checkpoint
+            read_chunks: Генератор частей строк (кортежи в порядке columns)
+            merge_sql: Слияние staging → unified_users; {stage} - имя
+                staging-таблицы, возвращает строку со счётчиками
+                total/migrated/linked/skipped/errors
+        """
+        self.name = name
+        self.title = title
+        self.columns = columns
+        self.read_chunks = read_chunks
+        self.merge_sql = merge_sql
+    
+    @property
+    def stage_table(self) -> str:
+        return f"unified_migration_stage_{self.name}"
+
+
+class BulkMigration:
+    """Пакетная миграция нескольких платформ с checkpoint"""
+    
+    def __init__(self, pool: asyncpg.Pool, sources: Sequence[MigrationSource], chunk_size: int = CHUNK_SIZE):
+        """
+        Args:
+            pool: Пул unified БД
+            sources: Платформы в порядке слияния
+            chunk_size: Строк в одной части
+        """
+        self.pool = pool
+        self.sources = list(sources)
+        self.chunk_size = chunk_size
+    
+    async def prepare(self, restart: bool = False):
+        """Создать таблицу checkpoint и staging-таблицы (restart - начать заново)"""
+        async with self.pool.acquire() as conn:
+            await conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                    source TEXT PRIMARY KEY,
+                    last_key TEXT,
+                    staged BIGINT NOT NULL DEFAULT 0,
+                    result JSONB,
+                    merged_at TIMESTAMP,
+                    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+                )
+            """)
+            
+            for source in self.sources:
+                if restart:
+                    await conn.execute(f"DROP TABLE IF EXISTS {source.stage_table}")
+                    await conn.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE source = $1", source.name)
+                
+                # UNLOGGED: staging не пишется в WAL (после сбоя сервера
+                # таблица пустеет - это ловит проверка в stage)
+                columns = ', '.join(f"{name} {type_}" for name, type_ in source.columns)
+                await conn.execute(f"CREATE UNLOGGED TABLE IF NOT EXISTS {source.stage_table} ({columns})")
+                await conn.execute(
+                    f"INSERT INTO {CHECKPOINT_TABLE} (source) VALUES ($1) ON CONFLICT (source) DO NOTHING",
+                    source.name
+                )
+    
+    async def _checkpoint(self, source: MigrationSource):
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(f"SELECT * FROM {CHECKPOINT_TABLE} WHERE source = $1", source.name)
+    
+    async def _reset(self, source: MigrationSource):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(f"TRUNCATE {source.stage_table}")
+                return await conn.fetchrow(
+                    f"""
+                    UPDATE {CHECKPOINT_TABLE}
+                    SET last_key = NULL, staged = 0, updated_at = NOW()
+                    WHERE source = $1
+                    RETURNING *
+                    """,
+                    source.name
+                )
+    
+    async def stage(self, source: MigrationSource) -> Dict:
+        """
+        Прочитать источник частями и скопировать в staging-таблицу
+        
+        Returns:
+            {'staged': строк за этот запуск, 'seconds': время}
+        """
+        checkpoint = await self._checkpoint(source)
+        if checkpoint['merged_at']:
+            logger.info(f"⏭️  {source.title}: уже перенесено ({checkpoint['merged_at']})")
+            return {'staged': 0, 'seconds': 0.0}
+        
+        if checkpoint['staged']:
+            async with self.pool.acquire() as conn:
+                actual = await conn.fetchval(f"SELECT COUNT(*) FROM {source.stage_table}")
+            if actual != checkpoint['staged']:
+                logger.warning(f"⚠️  {source.title}: staging не совпадает с checkpoint ({actual} != {checkpoint['staged']}), читаем заново")
+                checkpoint = await self._reset(source)
+        
+        if checkpoint['last_key'] is not None:
+            logger.info(f"🔁 {source.title}: продолжаем после {checkpoint['last_key']} ({checkpoint['staged']} строк уже прочитано)")
+        
+        columns = [name for name, _ in source.columns]
+        staged = 0
+        started = last_report = time.perf_counter()
+        
+        async for chunk in source.read_chunks(checkpoint['last_key'], self.chunk_size):
+            if not chunk:
+                continue
+            
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.copy_records_to_table(source.stage_table, records=chunk, columns=columns)
+                    await conn.execute(
+                        f"""
+                        UPDATE {CHECKPOINT_TABLE}
+                        SET last_key = $2, staged = staged + $3, updated_at = NOW()
+                        WHERE source = $1
+                        """,
+                        source.name, str(chunk[-1][0]), len(chunk)
+                    )
+            staged += len(chunk)
+            
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                logger.info(f"📦 {source.title}: прочитано {staged} ({staged / (now - started):.0f} строк/с)")
+        
+        elapsed = time.perf_counter() - started
+        logger.info(f"📦 {source.title}: прочитано {staged} за {elapsed:.1f} с ({_rate(staged, elapsed)} строк/с)")
+        return {'staged': staged, 'seconds': elapsed}
+    
+    async def merge(self, source: MigrationSource) -> Dict:
+        """
+        Слить staging-таблицу в unified_users одним запросом
+        
+        Returns:
+            Счётчики total/migrated/linked/skipped/errors и время
+        """
+        checkpoint = await self._checkpoint(source)
+        if checkpoint['merged_at']:
+            return json.loads(checkpoint['result'])
+        
+        started = time.perf_counter()
+        
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(source.merge_sql.format(stage=source.stage_table))
+                result = {
+                    key: row.get(key) or 0
+                    for key in ('total', 'migrated', 'linked', 'skipped', 'errors')
+                }
+                result['seconds'] = round(time.perf_counter() - started, 3)
+                
+                # Отметка о слиянии - в той же транзакции, staging больше не нужен
+                await conn.execute(
+                    f"""
+                    UPDATE {CHECKPOINT_TABLE}
+                    SET result = $2::jsonb, merged_at = NOW(), updated_at = NOW()
+                    WHERE source = $1
+                    """,
+                    source.name, json.dumps(result)
+                )
+                await conn.execute(f"TRUNCATE {source.stage_table}")
+        
+        logger.info(
+            f"✅ {source.title}: слито {result['total']} за {result['seconds']:.1f} с "
+            f"({_rate(result['total'], result['seconds'])} строк/с)"
+        )
+        return result
+    
+    async def run(self, restart: bool = False) -> Dict[str, Dict]:
+        """
+        Полная миграция: параллельное чтение, затем слияние по порядку
+        
+        Returns:
+            {платформа: счётчики}; у платформы с ошибкой чтения - {'error': ...}
+        """
+        await self.prepare(restart)
+        started = time.perf_counter()
+        
+        staged = await asyncio.gather(
+            *(self.stage(source) for source in self.sources),
+            return_exceptions=True
+        )
+        stage_seconds = time.perf_counter() - started
+        
+        results = {}
+        failed = None
+        for source, stage_result in zip(self.sources, staged):
+            if isinstance(stage_result, BaseException):
+                # Прочитанное сохранено, следующий запуск продолжит с checkpoint
+                logger.error(f"❌ {source.title}: ошибка чтения: {stage_result}")
+                results[source.name] = {'error': str(stage_result)}
+                failed = failed or source
+                continue
+            
+            if failed:
+                # Привязка зависит от уже слитых платформ: сливать в обход
+                # порядка нельзя, прочитанное дождётся следующего запуска
+                results[source.name] = {'error': f"ждёт слияния {failed.title}"}
+                continue
+            
+            results[source.name] = await self.merge(source)
+            results[source.name]['staged'] = stage_result['staged']
+        
+        elapsed = time.perf_counter() - started
+        total = sum(result.get('total', 0) for result in results.values())
+        logger.info(
+            f"⏱️  Чтение: {stage_seconds:.1f} с, всего: {elapsed:.1f} с, "
+            f"{total} строк ({_rate(total, elapsed)} строк/с)"
+        )
+        return results
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:.0f}" if seconds > 0 else "-"
@@ -18,6 +18,13 @@ CREATE INDEX IF NOT EXISTS idx_link_codes_discord ON link_codes(discord_id);
 CREATE INDEX IF NOT EXISTS idx_link_codes_expires ON link_codes(expires_at);
 CREATE INDEX IF NOT EXISTS idx_link_codes_used ON link_codes(used);
 
+-- Пул заранее сгенерированных свободных кодов (LINK_CODE_POOL_SIZE > 0):
+-- выдача кода - один запрос, перенос кода из пула в link_codes
+CREATE TABLE IF NOT EXISTS link_code_pool (
+    code TEXT PRIMARY KEY,                      -- Свободный код
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Комментарии
 COMMENT ON TABLE link_codes IS 'Одноразовые коды для быстрой привязки Discord к Telegram';
 COMMENT ON COLUMN link_codes.code IS 'Уникальный код из 6 символов (заглавные буквы и цифры)';
@@ -28,3 +35,4 @@ COMMENT ON COLUMN link_codes.used IS 'Флаг использования код
 COMMENT ON COLUMN link_codes.created_at IS 'Время создания кода';
 COMMENT ON COLUMN link_codes.expires_at IS 'Время истечения кода (обычно +10 минут от создания)';
 COMMENT ON COLUMN link_codes.used_at IS 'Время использования кода';
+COMMENT ON TABLE link_code_pool IS 'Заранее сгенерированные коды привязки, пополняется в фоне';
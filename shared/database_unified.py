@@ -2,6 +2,7 @@
 Unified Database - Единая база данных для всех платформ
 PostgreSQL с поддержкой Telegram, Discord и Website
 """
+import json
 import os
 import asyncpg
 from typing import Optional, List, Dict, Any
@@ -98,10 +99,12 @@ class UnifiedDatabase:
                 CREATE INDEX IF NOT EXISTS idx_unified_users_xp ON unified_users(xp DESC);
             """)
             
-            # Таблица событий синхронизации
+            # Таблица событий синхронизации (партиции по дням).
+            # Существующую непартиционированную таблицу переносит
+            # migration_partition_events.sql (apply_partition_migration.py)
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS cross_platform_events (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                    id UUID NOT NULL DEFAULT gen_random_uuid(),
                     user_id INTEGER NOT NULL REFERENCES unified_users(id) ON DELETE CASCADE,
                     
                     -- Тип и источник
@@ -118,12 +121,34 @@ class UnifiedDatabase:
                     -- Метаданные
                     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
                     
-                    INDEX idx_cross_platform_events_user (user_id),
-                    INDEX idx_cross_platform_events_processed (processed),
-                    INDEX idx_cross_platform_events_created (created_at)
-                );
+                    PRIMARY KEY (id, created_at)
+                ) PARTITION BY RANGE (created_at);
+            """)
+            
+            partitioned = await conn.fetchval("""
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_partitioned_table
+                    WHERE partrelid = 'cross_platform_events'::regclass
+                )
             """)
             
+            if partitioned:
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS cross_platform_events_default
+                        PARTITION OF cross_platform_events DEFAULT;
+                    
+                    CREATE INDEX IF NOT EXISTS idx_cross_platform_events_user_created
+                        ON cross_platform_events(user_id, created_at DESC);
+                    CREATE INDEX IF NOT EXISTS idx_cross_platform_events_pending
+                        ON cross_platform_events(created_at) WHERE processed = FALSE;
+                """)
+                await self.ensure_event_partitions()
+            else:
+                logger.warning(
+                    "⚠️  cross_platform_events не партиционирована - "
+                    "примени migration_partition_events.sql"
+                )
+            
             logger.info("✅ Таблицы unified БД инициализированы")
     
     # ========================================================================
@@ -166,6 +191,18 @@ class UnifiedDatabase:
             )
             return self._row_to_user(row) if row else None
     
+    async def get_users_by_ids(self, user_ids: List[int]) -> Dict[int, UnifiedUser]:
+        """Получить пользователей по списку ID одним запросом"""
+        if not user_ids:
+            return {}
+        
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT * FROM unified_users WHERE id = ANY($1::int[])",
+                list(user_ids)
+            )
+            return {row['id']: self._row_to_user(row) for row in rows}
+    
     async def create_user(
         self,
         telegram_id: Optional[str] = None,
@@ -350,14 +387,14 @@ class UnifiedDatabase:
                 INSERT INTO cross_platform_events (user_id, event_type, source_platform, data)
                 VALUES ($1, $2, $3, $4)
                 RETURNING id
-            """, user_id, event_type, source_platform, data)
+            """, user_id, event_type, source_platform, json.dumps(data))
             
             event_id = str(row['id'])
             logger.info(f"📝 Событие создано: {event_type} от {source_platform}")
             return event_id
     
     async def get_pending_events(self, limit: int = 100) -> List[CrossPlatformEvent]:
-        """Получить необработанные события"""
+        """Получить необработанные события (частичный индекс по processed = FALSE)"""
         async with self.pool.acquire() as conn:
             rows = await conn.fetch("""
                 SELECT * FROM cross_platform_events
@@ -377,6 +414,70 @@ class UnifiedDatabase:
                 WHERE id = $1
             """, event_id)
     
+    async def mark_events_processed(self, event_ids: List[str], since: Optional[datetime] = None) -> int:
+        """
+        Отметить события как обработанные одним UPDATE
+        
+        Args:
+            event_ids: ID событий
+            since: created_at самого старого из них - более старые
+                партиции не просматриваются
+        
+        Returns:
+            Сколько событий отмечено
+        """
+        if not event_ids:
+            return 0
+        
+        async with self.pool.acquire() as conn:
+            if since:
+                result = await conn.execute("""
+                    UPDATE cross_platform_events
+                    SET processed = TRUE, processed_at = CURRENT_TIMESTAMP
+                    WHERE id = ANY($1::uuid[]) AND created_at >= $2 AND processed = FALSE
+                """, event_ids, since)
+            else:
+                result = await conn.execute("""
+                    UPDATE cross_platform_events
+                    SET processed = TRUE, processed_at = CURRENT_TIMESTAMP
+                    WHERE id = ANY($1::uuid[]) AND processed = FALSE
+                """, event_ids)
+            
+            return int(result.split()[-1])
+    
+    async def ensure_event_partitions(self, days_ahead: int = 7):
+        """Создать дневные партиции cross_platform_events на N дней вперёд"""
+        async with self.pool.acquire() as conn:
+            # Функции управления партициями живут в migration_partition_events.sql
+            has_function = await conn.fetchval(
+                "SELECT to_regproc('ensure_cross_platform_events_partitions') IS NOT NULL"
+            )
+            
+            if not has_function:
+                sql_file = os.path.join(os.path.dirname(__file__), 'migration_partition_events.sql')
+                with open(sql_file, 'r', encoding='utf-8') as f:
+                    await conn.execute(f.read())
+            
+            await conn.execute(
+                "SELECT ensure_cross_platform_events_partitions($1)",
+                days_ahead
+            )
+    
+    async def drop_old_event_partitions(self, retention_days: int = 30, dry_run: bool = False) -> int:
+        """
+        Удалить дневные партиции событий старше retention_days
+        
+        Партиции с необработанными событиями не удаляются.
+        
+        Returns:
+            Количество удалённых (при dry_run - подлежащих удалению) событий
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                "SELECT drop_old_cross_platform_events_partitions($1, $2)",
+                retention_days, dry_run
+            )
+    
     # ========================================================================
     # УТИЛИТЫ
     # ========================================================================
@@ -413,12 +514,17 @@ class UnifiedDatabase:
     
     def _row_to_event(self, row) -> CrossPlatformEvent:
         """Конвертировать строку БД в CrossPlatformEvent"""
+        # Без кодека jsonb asyncpg отдаёт data строкой
+        data = row['data']
+        if isinstance(data, str):
+            data = json.loads(data)
+        
         return CrossPlatformEvent(
             id=str(row['id']),
             user_id=row['user_id'],
             event_type=row['event_type'],
             source_platform=row['source_platform'],
-            data=row['data'],
+            data=data,
             processed=row['processed'],
             processed_at=row.get('processed_at'),
             created_at=row['created_at']
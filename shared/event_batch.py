@@ -0,0 +1,121 @@
+"""
+Event Batch - пакетная обработка событий cross_platform_events
+
+Пачка событий группируется по пользователю. Подряд идущие изменения XP
+или монет одного пользователя складываются в одно событие с суммарной
+дельтой, события одного пользователя обрабатываются по порядку, разные
+пользователи - параллельно (не больше BATCH_CONCURRENCY одновременно).
+Все успешно обработанные события отмечаются одним UPDATE ... WHERE
+id = ANY($1) вместо UPDATE на каждое событие.
+"""
+import asyncio
+import logging
+from dataclasses import replace
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from models import CrossPlatformEvent
+
+logger = logging.getLogger(__name__)
+
+# Пользователей, обрабатываемых одновременно
+BATCH_CONCURRENCY = 8
+
+# Складываемые события: тип -> (поле дельты, поле итогового значения)
+FOLDABLE_EVENTS = {
+    'xp_change': ('delta_xp', 'new_xp'),
+    'coins_change': ('delta_coins', 'new_coins'),
+}
+
+
+def group_by_user(events: List[CrossPlatformEvent]) -> Dict[int, List[CrossPlatformEvent]]:
+    """События по пользователям (порядок внутри пользователя сохраняется)"""
+    grouped: Dict[int, List[CrossPlatformEvent]] = {}
+    for event in events:
+        grouped.setdefault(event.user_id, []).append(event)
+    return grouped
+
+
+def fold_events(events: List[CrossPlatformEvent]) -> List[Tuple[CrossPlatformEvent, List[str]]]:
+    """
+    Сложить подряд идущие изменения XP/монет одного пользователя
+    
+    Другие события (rank_up и т.п.) разрывают серию, поэтому порядок
+    относительно них не меняется.
+    
+    Returns:
+        [(событие для обработки, ID исходных событий)]
+    """
+    folded: List[Tuple[CrossPlatformEvent, List[str]]] = []
+    
+    for event in events:
+        fields = FOLDABLE_EVENTS.get(event.event_type)
+        if fields and folded and folded[-1][0].event_type == event.event_type:
+            last, ids = folded[-1]
+            delta_field, total_field = fields
+            data = dict(last.data or {})
+            current = event.data or {}
+            
+            data[delta_field] = (data.get(delta_field) or 0) + (current.get(delta_field) or 0)
+            if total_field in current:
+                data[total_field] = current[total_field]
+            
+            sources = last.source_platform.split(',')
+            if event.source_platform not in sources:
+                sources.append(event.source_platform)
+            
+            folded[-1] = (
+                replace(last, data=data, source_platform=','.join(sources), created_at=event.created_at),
+                ids + [event.id]
+            )
+        else:
+            folded.append((event, [event.id]))
+    
+    return folded
+
+
+async def process_events(
+    unified_db,
+    events: List[CrossPlatformEvent],
+    handle_event: Callable[[CrossPlatformEvent], Awaitable[None]],
+    concurrency: int = BATCH_CONCURRENCY
+) -> Tuple[int, int]:
+    """
+    Обработать пачку событий и отметить обработанные одним запросом
+    
+    Args:
+        unified_db: UnifiedDatabase
+        events: События (как из get_pending_events, по created_at)
+        handle_event: Обработчик одного (возможно, сложенного) события
+        concurrency: Пользователей одновременно
+    
+    Returns:
+        (обработано, с ошибкой) - ошибочные остаются необработанными
+        и попадут в следующую пачку
+    """
+    if not events:
+        return 0, 0
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def process_user(user_events: List[CrossPlatformEvent]) -> List[str]:
+        done: List[str] = []
+        async with semaphore:
+            for event, event_ids in fold_events(user_events):
+                try:
+                    await handle_event(event)
+                    done.extend(event_ids)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка обработки событий {', '.join(event_ids)}: {e}")
+        return done
+    
+    results = await asyncio.gather(*(
+        process_user(user_events) for user_events in group_by_user(events).values()
+    ))
+    processed_ids = [event_id for done in results for event_id in done]
+    
+    await unified_db.mark_events_processed(
+        processed_ids,
+        since=min(event.created_at for event in events)
+    )
+    
+    return len(processed_ids), len(events) - len(processed_ids)
@@ -1,7 +1,13 @@
 """
 Link Codes - Система одноразовых кодов для привязки аккаунтов
 Генерирует короткие коды для быстрой привязки Discord к Telegram
+
+Код выдаётся одним INSERT ... ON CONFLICT DO NOTHING RETURNING на одном
+соединении (повтор только при совпадении кода). При pool_size > 0 заранее
+сгенерированные коды лежат в link_code_pool и пополняются в фоне - тогда
+выдача кода это один запрос, перенос кода из пула в link_codes.
 """
+import asyncio
 import secrets
 import string
 from datetime import datetime, timedelta
@@ -10,13 +16,31 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Попыток вставить случайный код (пространство 32^6 - совпадения редки)
+CODE_INSERT_ATTEMPTS = 10
+
+# Как часто фоновая задача проверяет пул, даже если коды не выдавались (секунды)
+POOL_REFILL_INTERVAL = 60
+
+# Пул пополняется, когда в нём осталось меньше этой доли от pool_size
+POOL_LOW_WATERMARK = 0.5
+
 
 class LinkCodeManager:
     """Менеджер кодов привязки"""
     
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, pool_size: int = 0):
+        """
+        Args:
+            database_url: URL PostgreSQL
+            pool_size: Сколько кодов держать заранее сгенерированными
+                (0 - без пула, код генерируется при выдаче)
+        """
         self.database_url = database_url
         self.pool = None
+        self.pool_size = pool_size
+        self._refill_needed = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
     
     async def connect(self):
         """Подключиться к БД"""
@@ -29,10 +53,23 @@ class LinkCodeManager:
         
         self.pool = await asyncpg.create_pool(db_url, min_size=2, max_size=10)
         await self.init_table()
+        
+        if self.pool_size > 0:
+            await self.refill_pool()
+            self._refill_task = asyncio.create_task(self._refill_loop())
+        
         logger.info("✅ LinkCodeManager подключен к БД")
     
     async def disconnect(self):
         """Отключиться от БД"""
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        
         if self.pool:
             await self.pool.close()
     
@@ -48,11 +85,17 @@ class LinkCodeManager:
                     used BOOLEAN NOT NULL DEFAULT FALSE,
                     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
                     expires_at TIMESTAMP NOT NULL,
-                    used_at TIMESTAMP,
-                    
-                    INDEX idx_link_codes_telegram (telegram_id),
-                    INDEX idx_link_codes_discord (discord_id),
-                    INDEX idx_link_codes_expires (expires_at)
+                    used_at TIMESTAMP
+                );
+                
+                CREATE INDEX IF NOT EXISTS idx_link_codes_telegram ON link_codes(telegram_id);
+                CREATE INDEX IF NOT EXISTS idx_link_codes_discord ON link_codes(discord_id);
+                CREATE INDEX IF NOT EXISTS idx_link_codes_expires ON link_codes(expires_at);
+                
+                -- Заранее сгенерированные свободные коды
+                CREATE TABLE IF NOT EXISTS link_code_pool (
+                    code TEXT PRIMARY KEY,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
                 );
             """)
     
@@ -87,33 +130,107 @@ class LinkCodeManager:
         Returns:
             Сгенерированный код
         """
-        # Генерируем уникальный код
-        while True:
-            code = self.generate_code()
-            
-            # Проверяем что код не существует
-            async with self.pool.acquire() as conn:
-                exists = await conn.fetchval(
-                    "SELECT EXISTS(SELECT 1 FROM link_codes WHERE code = $1)",
-                    code
-                )
-                
-                if not exists:
-                    break
-        
         # Вычисляем время истечения
         expires_at = datetime.now() + timedelta(minutes=expires_minutes)
         
-        # Сохраняем код
         async with self.pool.acquire() as conn:
-            await conn.execute("""
+            code = None
+            if self.pool_size > 0:
+                code = await self._take_from_pool(conn, telegram_id, platform, expires_at)
+            
+            if code is None:
+                code = await self._insert_random_code(conn, telegram_id, platform, expires_at)
+        
+        logger.info(f"✅ Создан код привязки: {code} для {platform} {telegram_id}")
+        return code
+    
+    async def _insert_random_code(self, conn, telegram_id: str, platform: str, expires_at: datetime) -> str:
+        """
+        Вставить случайный код: проверка уникальности и запись - один запрос
+        
+        Совпавший код не вставляется (ON CONFLICT DO NOTHING), и пробуется
+        следующий - на том же соединении, не больше CODE_INSERT_ATTEMPTS раз.
+        """
+        for _ in range(CODE_INSERT_ATTEMPTS):
+            code = await conn.fetchval("""
                 INSERT INTO link_codes (code, telegram_id, platform, expires_at)
                 VALUES ($1, $2, $3, $4)
-            """, code, telegram_id, platform, expires_at)
+                ON CONFLICT (code) DO NOTHING
+                RETURNING code
+            """, self.generate_code(), telegram_id, platform, expires_at)
+            
+            if code:
+                return code
         
-        logger.info(f"✅ Создан код привязки: {code} для {platform} {telegram_id}")
+        raise RuntimeError(f"Не удалось подобрать свободный код за {CODE_INSERT_ATTEMPTS} попыток")
+    
+    async def _take_from_pool(self, conn, telegram_id: str, platform: str, expires_at: datetime) -> Optional[str]:
+        """
+        Выдать код из пула одним запросом
+        
+        Returns:
+            Код или None, если пул пуст (или код оказался занят)
+        """
+        code = await conn.fetchval("""
+            WITH taken AS (
+                DELETE FROM link_code_pool
+                WHERE code = (
+                    SELECT code FROM link_code_pool
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING code
+            )
+            INSERT INTO link_codes (code, telegram_id, platform, expires_at)
+            SELECT code, $1, $2, $3 FROM taken
+            ON CONFLICT (code) DO NOTHING
+            RETURNING code
+        """, telegram_id, platform, expires_at)
+        
+        # Фоновая задача проверит остаток пула
+        self._refill_needed.set()
         return code
     
+    async def refill_pool(self) -> int:
+        """
+        Пополнить пул свободных кодов до pool_size
+        
+        Returns:
+            Сколько кодов добавлено
+        """
+        async with self.pool.acquire() as conn:
+            available = await conn.fetchval("SELECT COUNT(*) FROM link_code_pool")
+            if available >= self.pool_size * POOL_LOW_WATERMARK:
+                return 0
+            
+            # Коды, уже выданные или лежащие в пуле, отбрасываются в самом запросе
+            codes = list({self.generate_code() for _ in range(self.pool_size - available)})
+            result = await conn.execute("""
+                INSERT INTO link_code_pool (code)
+                SELECT c.code FROM unnest($1::text[]) AS c(code)
+                WHERE NOT EXISTS (SELECT 1 FROM link_codes WHERE link_codes.code = c.code)
+                ON CONFLICT (code) DO NOTHING
+            """, codes)
+        
+        added = int(result.split()[-1]) if result else 0
+        if added:
+            logger.info(f"🔑 Пул кодов привязки пополнен: +{added} (было {available})")
+        return added
+    
+    async def _refill_loop(self):
+        """Фоновое пополнение пула: после выдачи кодов или раз в интервал"""
+        while True:
+            try:
+                await asyncio.wait_for(self._refill_needed.wait(), timeout=POOL_REFILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._refill_needed.clear()
+            
+            try:
+                await self.refill_pool()
+            except Exception as e:
+                logger.error(f"❌ Ошибка пополнения пула кодов: {e}")
+    
     async def verify_code(self, code: str) -> Optional[Dict[str, Any]]:
         """
         Проверить код привязки
@@ -180,16 +297,48 @@ class LinkCodeManager:
             
             return dict(row)
     
-    async def cleanup_expired(self):
-        """Удалить истёкшие коды"""
+    async def cleanup_expired(self, batch_size: Optional[int] = None) -> int:
+        """
+        Удалить истёкшие коды
+        
+        Args:
+            batch_size: Максимум строк за один DELETE (None - все сразу)
+        
+        Returns:
+            Количество удалённых кодов
+        """
         async with self.pool.acquire() as conn:
-            result = await conn.execute("""
-                DELETE FROM link_codes
+            if batch_size is None:
+                result = await conn.execute("""
+                    DELETE FROM link_codes
+                    WHERE expires_at < CURRENT_TIMESTAMP
+                    AND used = FALSE
+                """)
+            else:
+                result = await conn.execute("""
+                    DELETE FROM link_codes
+                    WHERE code IN (
+                        SELECT code FROM link_codes
+                        WHERE expires_at < CURRENT_TIMESTAMP
+                        AND used = FALSE
+                        LIMIT $1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                """, batch_size)
+            
+            count = int(result.split()[-1]) if result else 0
+            if count > 0:
+                logger.info(f"🗑️ Удалено истёкших кодов: {count}")
+            return count
+    
+    async def count_expired(self) -> int:
+        """Посчитать истёкшие коды (для dry-run очистки)"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval("""
+                SELECT COUNT(*) FROM link_codes
                 WHERE expires_at < CURRENT_TIMESTAMP
                 AND used = FALSE
             """)
-            
-            logger.info(f"🗑️ Удалено истёкших кодов: {result}")
     
     async def get_user_codes(self, telegram_id: str) -> list:
         """Получить все коды пользователя"""
@@ -219,7 +368,8 @@ async def get_link_code_manager() -> LinkCodeManager:
         if not database_url:
             raise ValueError("DATABASE_URL не установлен")
         
-        link_code_manager = LinkCodeManager(database_url)
+        pool_size = int(os.getenv('LINK_CODE_POOL_SIZE', '0'))
+        link_code_manager = LinkCodeManager(database_url, pool_size=pool_size)
         await link_code_manager.connect()
     
     return link_code_manager
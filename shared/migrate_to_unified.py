@@ -1,11 +1,22 @@
 """
 Скрипт миграции данных в Unified Database
 Переносит пользователей из всех платформ в единую таблицу unified_users
+
+Источники читаются частями и копируются в staging-таблицы (COPY), затем
+каждая платформа сливается в unified_users одним запросом (см.
+bulk_migration.py). Прерванный запуск продолжается с checkpoint.
+
+Запуск:
+    python migrate_to_unified.py                  # миграция / продолжение
+    python migrate_to_unified.py --restart        # заново, без checkpoint
+    python migrate_to_unified.py --chunk-size 10000
 """
+import argparse
 import asyncio
 import os
 import sys
 import logging
+from bisect import bisect_right
 from datetime import datetime
 
 # Добавляем пути к модулям
@@ -14,332 +25,332 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'TTFD-Discord', 'p
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'TTFD-Website'))
 
 from database_unified import get_unified_db
-from models import UnifiedUser
+from bulk_migration import BulkMigration, MigrationSource, CHUNK_SIZE
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def migrate_telegram_users():
-    """Мигрировать пользователей из Telegram Bot"""
-    logger.info("=" * 60)
-    logger.info("📱 МИГРАЦИЯ TELEGRAM ПОЛЬЗОВАТЕЛЕЙ")
-    logger.info("=" * 60)
+# ============================================================================
+# TELEGRAM
+# ============================================================================
+
+# source_id - users.id Telegram БД: ключ порядка чтения и checkpoint
+TELEGRAM_COLUMNS = (
+    ('source_id', 'INTEGER'),
+    ('telegram_id', 'TEXT'),
+    ('username', 'TEXT'),
+    ('xp', 'INTEGER'),
+    ('coins', 'INTEGER'),
+    ('rank_id', 'INTEGER'),
+    ('games_played', 'INTEGER'),
+    ('games_won', 'INTEGER'),
+    ('created_at', 'TIMESTAMP'),
+    ('last_active', 'TIMESTAMP'),
+    ('last_daily', 'TIMESTAMP'),
+    ('daily_streak', 'INTEGER'),
+)
+
+# Новые пользователи вставляются, уже перенесённые пропускаются
+TELEGRAM_MERGE = """
+    WITH src AS (
+        SELECT DISTINCT ON (telegram_id) * FROM {stage} ORDER BY telegram_id
+    ),
+    ins AS (
+        INSERT INTO unified_users (
+            telegram_id, username, display_name, xp, coins, rank_id,
+            games_played, games_won, created_at, last_active, last_daily,
+            daily_streak, platforms, primary_platform
+        )
+        SELECT
+            telegram_id, username, username, xp, coins, rank_id,
+            games_played, games_won, created_at, last_active, last_daily,
+            daily_streak, '["telegram"]'::jsonb, 'telegram'
+        FROM src
+        ON CONFLICT (telegram_id) DO NOTHING
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src) AS total,
+        (SELECT COUNT(*) FROM ins) AS migrated,
+        (SELECT COUNT(*) FROM src) - (SELECT COUNT(*) FROM ins) AS skipped
+"""
+
+
+async def read_telegram_rows(pool, after, chunk_size):
+    """Пользователи Telegram БД частями по возрастанию users.id"""
+    last_id = int(after) if after else 0
     
-    try:
-        # Импортируем Telegram БД
-        from infrastructure.database.connection import db_connection
-        await db_connection.connect()
-        pool = db_connection.get_pool()
-        
-        unified_db = await get_unified_db()
-        
-        # Получаем всех пользователей из Telegram БД
+    while True:
         async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT * FROM users")
-        
-        logger.info(f"📊 Найдено {len(rows)} пользователей в Telegram БД")
-        
-        migrated = 0
-        skipped = 0
-        errors = 0
-        
-        for row in rows:
-            user_id = None
-            try:
-                # В Telegram БД поле называется 'id', а не 'telegram_id'
-                user_id = str(row['id'])
-                
-                # Проверяем существование
-                existing = await unified_db.get_user_by_telegram(user_id)
-                
-                if existing:
-                    logger.info(f"⏭️  Пропущен {user_id} (уже существует)")
-                    skipped += 1
-                    continue
-                
-                # Создаём пользователя
-                user = await unified_db.create_user(
-                    telegram_id=user_id,
-                    username=row.get('username', 'Unknown'),
-                    display_name=row.get('username', 'Unknown'),  # В Telegram БД нет first_name
-                    primary_platform='telegram'
-                )
-                
-                # Обновляем данные
-                await unified_db.pool.execute("""
-                    UPDATE unified_users
-                    SET xp = $1, coins = $2, rank_id = $3,
-                        games_played = $4, games_won = $5,
-                        created_at = $6, last_active = $7, last_daily = $8,
-                        daily_streak = $9
-                    WHERE id = $10
-                """, 
-                    row.get('xp', 0),
-                    row.get('coins', 0),
-                    row.get('rank_id', 1),
-                    row.get('games_played', 0),
-                    row.get('games_won', 0),
-                    row.get('created_at', datetime.now()),
-                    row.get('last_active', datetime.now()),
-                    row.get('last_daily'),
-                    row.get('daily_streak', 0),
-                    user.id
-                )
-                
-                logger.info(f"✅ Мигрирован {user_id} → unified_id={user.id}")
-                migrated += 1
-                
-            except Exception as e:
-                if user_id:
-                    logger.error(f"❌ Ошибка миграции {user_id}: {e}")
-                else:
-                    logger.error(f"❌ Ошибка миграции строки: {e}")
-                errors += 1
-        
-        await db_connection.disconnect()
-        
-        logger.info("")
-        logger.info("📊 СТАТИСТИКА МИГРАЦИИ TELEGRAM:")
-        logger.info(f"   ✅ Мигрировано: {migrated}")
-        logger.info(f"   ⏭️  Пропущено: {skipped}")
-        logger.info(f"   ❌ Ошибок: {errors}")
-        logger.info("")
-        
-        return {'migrated': migrated, 'skipped': skipped, 'errors': errors}
+            rows = await conn.fetch(
+                "SELECT * FROM users WHERE id > $1 ORDER BY id LIMIT $2",
+                last_id, chunk_size
+            )
+        if not rows:
+            return
+        last_id = rows[-1]['id']
         
-    except Exception as e:
-        logger.error(f"❌ Критическая ошибка миграции Telegram: {e}")
-        import traceback
-        traceback.print_exc()
-        return {'migrated': 0, 'skipped': 0, 'errors': 1}
+        now = datetime.now()
+        # id - только для постраничного чтения, в unified_users идёт telegram_id;
+        # first_name не переносим - display_name = username, как раньше
+        yield [
+            (
+                row['id'],
+                str(row['telegram_id']),
+                row.get('username') or 'Unknown',
+                row.get('xp') or 0,
+                row.get('coins') or 0,
+                row.get('rank_id') or 1,
+                row.get('games_played') or 0,
+                row.get('games_won') or 0,
+                row.get('created_at') or now,
+                row.get('last_active') or now,
+                row.get('last_daily'),
+                row.get('daily_streak') or 0,
+            )
+            for row in rows
+        ]
 
 
-async def migrate_discord_users():
-    """Мигрировать пользователей из Discord Bot"""
-    logger.info("=" * 60)
-    logger.info("🎮 МИГРАЦИЯ DISCORD ПОЛЬЗОВАТЕЛЕЙ")
-    logger.info("=" * 60)
+async def read_telegram_chunks(after, chunk_size):
+    """Пользователи Telegram БД (пул telegram-bot)"""
+    from infrastructure.database.connection import db_connection
+    await db_connection.connect()
     
     try:
-        # Пытаемся импортировать Discord БД
-        try:
-            sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'TTFD-Discord', 'py'))
-            from database_postgres import db as discord_db
-        except (ImportError, ModuleNotFoundError) as e:
-            logger.warning(f"⚠️  Discord БД недоступна: {e}")
-            logger.info("💡 Пропускаем миграцию Discord пользователей")
-            return {'migrated': 0, 'linked': 0, 'skipped': 0, 'errors': 0}
-        
-        unified_db = await get_unified_db()
-        
-        # Получаем всех пользователей из Discord БД
-        users = discord_db.get_all_users()
-        
-        logger.info(f"📊 Найдено {len(users)} пользователей в Discord БД")
-        
-        migrated = 0
-        linked = 0
-        skipped = 0
-        errors = 0
-        
-        for discord_id, user_data in users.items():
-            try:
-                # Проверяем существование по Discord ID
-                existing = await unified_db.get_user_by_discord(discord_id)
-                
-                if existing:
-                    logger.info(f"⏭️  Пропущен {discord_id} (уже существует)")
-                    skipped += 1
-                    continue
-                
-                # Проверяем есть ли пользователь с таким же username (может быть из Telegram)
-                username = user_data.get('username', 'Unknown')
-                
-                # Пытаемся найти по username в unified_users
-                async with unified_db.pool.acquire() as conn:
-                    existing_by_username = await conn.fetchrow(
-                        "SELECT * FROM unified_users WHERE username = $1 AND discord_id IS NULL",
-                        username
-                    )
-                
-                if existing_by_username:
-                    # Привязываем Discord к существующему пользователю
-                    success = await unified_db.link_discord(existing_by_username['id'], discord_id)
-                    if success:
-                        # Обновляем данные Discord
-                        await unified_db.pool.execute("""
-                            UPDATE unified_users
-                            SET total_voice_time = total_voice_time + $1,
-                                messages_sent = messages_sent + $2
-                            WHERE id = $3
-                        """,
-                            user_data.get('voice_time', 0),
-                            user_data.get('messages_sent', 0),
-                            existing_by_username['id']
-                        )
-                        logger.info(f"🔗 Привязан Discord {discord_id} → unified_id={existing_by_username['id']}")
-                        linked += 1
-                    else:
-                        logger.warning(f"⚠️  Не удалось привязать Discord {discord_id}")
-                        errors += 1
-                else:
-                    # Создаём нового пользователя
-                    user = await unified_db.create_user(
-                        discord_id=discord_id,
-                        username=username,
-                        display_name=user_data.get('display_name', username),
-                        primary_platform='discord'
-                    )
-                    
-                    # Обновляем данные (без проблемных полей)
-                    await unified_db.pool.execute("""
-                        UPDATE unified_users
-                        SET xp = $1, coins = $2, rank_id = $3,
-                            games_played = $4, games_won = $5,
-                            daily_streak = $6
-                        WHERE id = $7
-                    """,
-                        user_data.get('xp', 0),
-                        user_data.get('coins', 0),
-                        user_data.get('rank_id', 1),
-                        user_data.get('games_played', 0),
-                        user_data.get('games_won', 0),
-                        user_data.get('daily_streak', 0),
-                        user.id
-                    )
-                    
-                    logger.info(f"✅ Мигрирован {discord_id} → unified_id={user.id}")
-                    migrated += 1
-                
-            except Exception as e:
-                logger.error(f"❌ Ошибка миграции {discord_id}: {e}")
-                errors += 1
-        
-        logger.info("")
-        logger.info("📊 СТАТИСТИКА МИГРАЦИИ DISCORD:")
-        logger.info(f"   ✅ Мигрировано: {migrated}")
-        logger.info(f"   🔗 Привязано: {linked}")
-        logger.info(f"   ⏭️  Пропущено: {skipped}")
-        logger.info(f"   ❌ Ошибок: {errors}")
-        logger.info("")
-        
-        return {'migrated': migrated, 'linked': linked, 'skipped': skipped, 'errors': errors}
+        async for chunk in read_telegram_rows(db_connection.get_pool(), after, chunk_size):
+            yield chunk
+    finally:
+        await db_connection.disconnect()
+
+
+# ============================================================================
+# DISCORD
+# ============================================================================
+
+DISCORD_COLUMNS = (
+    ('discord_id', 'TEXT'),
+    ('username', 'TEXT'),
+    ('display_name', 'TEXT'),
+    ('xp', 'INTEGER'),
+    ('coins', 'INTEGER'),
+    ('rank_id', 'INTEGER'),
+    ('games_played', 'INTEGER'),
+    ('games_won', 'INTEGER'),
+    ('daily_streak', 'INTEGER'),
+    ('voice_time', 'INTEGER'),
+    ('messages_sent', 'INTEGER'),
+)
+
+# Discord привязывается к пользователю с тем же username без Discord
+# (обычно перенесённому из Telegram), иначе создаётся новый пользователь.
+# На одного пользователя - одна привязка, остальные одноимённые - новые.
+DISCORD_MERGE = """
+    WITH src AS (
+        SELECT DISTINCT ON (discord_id) * FROM {stage} ORDER BY discord_id
+    ),
+    new AS (
+        SELECT s.* FROM src s
+        WHERE NOT EXISTS (SELECT 1 FROM unified_users u WHERE u.discord_id = s.discord_id)
+    ),
+    candidates AS (
+        SELECT DISTINCT ON (username) id, username
+        FROM unified_users
+        WHERE discord_id IS NULL
+        ORDER BY username, id
+    ),
+    target AS (
+        SELECT DISTINCT ON (c.id) c.id, n.discord_id, n.voice_time, n.messages_sent
+        FROM new n
+        JOIN candidates c ON c.username = n.username
+        ORDER BY c.id, n.discord_id
+    ),
+    linked AS (
+        UPDATE unified_users u
+        SET discord_id = t.discord_id,
+            platforms = u.platforms || '["discord"]'::jsonb,
+            total_voice_time = u.total_voice_time + t.voice_time,
+            messages_sent = u.messages_sent + t.messages_sent
+        FROM target t
+        WHERE u.id = t.id AND u.discord_id IS NULL
+        RETURNING 1
+    ),
+    ins AS (
+        INSERT INTO unified_users (
+            discord_id, username, display_name, xp, coins, rank_id,
+            games_played, games_won, daily_streak, platforms, primary_platform
+        )
+        SELECT
+            discord_id, username, display_name, xp, coins, rank_id,
+            games_played, games_won, daily_streak, '["discord"]'::jsonb, 'discord'
+        FROM new n
+        WHERE NOT EXISTS (SELECT 1 FROM target t WHERE t.discord_id = n.discord_id)
+        ON CONFLICT (discord_id) DO NOTHING
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src) AS total,
+        (SELECT COUNT(*) FROM ins) AS migrated,
+        (SELECT COUNT(*) FROM linked) AS linked,
+        (SELECT COUNT(*) FROM src) - (SELECT COUNT(*) FROM new) AS skipped,
+        (SELECT COUNT(*) FROM target) - (SELECT COUNT(*) FROM linked) AS errors
+"""
+
+
+async def read_discord_chunks(after, chunk_size):
+    """Пользователи Discord БД по возрастанию discord_id (порядок PostgreSQL)"""
+    try:
+        sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'TTFD-Discord', 'py'))
+        from database_postgres import db as discord_db
+    except (ImportError, ModuleNotFoundError) as e:
+        logger.warning(f"⚠️  Discord БД недоступна: {e}")
+        logger.info("💡 Пропускаем миграцию Discord пользователей")
+        return
+    
+    # Discord БД синхронная (psycopg2) - читаем в потоке, не блокируя остальные
+    # источники, страницами по ключу users.id (без загрузки всей таблицы)
+    last_id = after
+    
+    while True:
+        users = await asyncio.to_thread(discord_db.get_users_page, last_id, chunk_size)
+        if not users:
+            return
+        last_id = users[-1]['id']
         
-    except Exception as e:
-        logger.error(f"❌ Критическая ошибка миграции Discord: {e}")
-        import traceback
-        traceback.print_exc()
-        return {'migrated': 0, 'linked': 0, 'skipped': 0, 'errors': 0}
+        chunk = []
+        for user_data in users:
+            username = user_data.get('username') or 'Unknown'
+            chunk.append((
+                str(user_data['id']),
+                username,
+                user_data.get('display_name') or username,
+                int(user_data.get('xp') or 0),
+                int(user_data.get('coins') or 0),
+                int(user_data.get('rank_id') or 1),
+                int(user_data.get('games_played') or 0),
+                int(user_data.get('games_won') or 0),
+                int(user_data.get('daily_streak') or 0),
+                int(user_data.get('voice_time') or 0),
+                int(user_data.get('messages_sent') or 0),
+            ))
+        yield chunk
 
 
-async def migrate_website_users():
-    """Мигрировать пользователей из Website"""
-    logger.info("=" * 60)
-    logger.info("🌐 МИГРАЦИЯ WEBSITE ПОЛЬЗОВАТЕЛЕЙ")
-    logger.info("=" * 60)
+# ============================================================================
+# WEBSITE
+# ============================================================================
+
+WEBSITE_COLUMNS = (
+    ('email', 'TEXT'),
+    ('username', 'TEXT'),
+    ('display_name', 'TEXT'),
+    ('discord_id', 'TEXT'),
+)
+
+# Аккаунт с discord_id (вход через OAuth) привязывается к пользователю с
+# этим Discord; если у него уже есть другой email - считается ошибкой
+WEBSITE_MERGE = """
+    WITH src AS (
+        SELECT DISTINCT ON (email) * FROM {stage} ORDER BY email
+    ),
+    new AS (
+        SELECT s.* FROM src s
+        WHERE NOT EXISTS (SELECT 1 FROM unified_users u WHERE u.website_email = s.email)
+    ),
+    target AS (
+        SELECT DISTINCT ON (u.id) u.id, n.email
+        FROM new n
+        JOIN unified_users u ON u.discord_id = n.discord_id
+        ORDER BY u.id, n.email
+    ),
+    linked AS (
+        UPDATE unified_users u
+        SET website_email = t.email,
+            platforms = u.platforms || '["website"]'::jsonb
+        FROM target t
+        WHERE u.id = t.id AND u.website_email IS NULL
+        RETURNING 1
+    ),
+    ins AS (
+        INSERT INTO unified_users (website_email, username, display_name, platforms, primary_platform)
+        SELECT email, username, display_name, '["website"]'::jsonb, 'website'
+        FROM new n
+        WHERE NOT EXISTS (
+            SELECT 1 FROM unified_users u
+            WHERE n.discord_id IS NOT NULL AND u.discord_id = n.discord_id
+        )
+        ON CONFLICT (website_email) DO NOTHING
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src) AS total,
+        (SELECT COUNT(*) FROM ins) AS migrated,
+        (SELECT COUNT(*) FROM linked) AS linked,
+        (SELECT COUNT(*) FROM src) - (SELECT COUNT(*) FROM new) AS skipped,
+        (
+            SELECT COUNT(*) FROM new n
+            WHERE n.discord_id IS NOT NULL
+              AND EXISTS (SELECT 1 FROM unified_users u WHERE u.discord_id = n.discord_id)
+        ) - (SELECT COUNT(*) FROM linked) AS errors
+"""
+
+
+async def read_website_chunks(after, chunk_size):
+    """
+    Аккаунты Website БД по возрастанию email
     
+    JSON-база сайта и так целиком в памяти процесса, поэтому аккаунты
+    берутся одним списком (get_all_accounts) и режутся на части здесь -
+    для больших баз это полная загрузка источника.
+    """
     try:
-        # Пытаемся импортировать Website БД
-        try:
-            sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'TTFD-Website'))
-            from database import db as website_db
-        except (ImportError, ModuleNotFoundError) as e:
-            logger.warning(f"⚠️  Website БД недоступна: {e}")
-            logger.info("💡 Пропускаем миграцию Website пользователей")
-            return {'migrated': 0, 'linked': 0, 'skipped': 0, 'errors': 0}
-        
-        unified_db = await get_unified_db()
-        
-        # Получаем всех пользователей из Website БД
-        # Пытаемся разные методы получения данных
-        accounts = []
-        try:
-            if hasattr(website_db, 'get_all_accounts'):
-                accounts = website_db.get_all_accounts()
-            elif hasattr(website_db, 'get_all_users'):
-                accounts = website_db.get_all_users()
-            elif hasattr(website_db, 'accounts'):
-                accounts = list(website_db.accounts.values())
-            else:
-                logger.warning("⚠️  Не найден метод получения аккаунтов")
-                return {'migrated': 0, 'linked': 0, 'skipped': 0, 'errors': 0}
-        except Exception as e:
-            logger.warning(f"⚠️  Ошибка получения аккаунтов: {e}")
-            return {'migrated': 0, 'linked': 0, 'skipped': 0, 'errors': 0}
-        
-        logger.info(f"📊 Найдено {len(accounts)} аккаунтов в Website БД")
-        
-        migrated = 0
-        linked = 0
-        skipped = 0
-        errors = 0
-        
-        for account in accounts:
-            try:
-                email = account.get('email')
-                if not email:
-                    continue
-                
-                # Проверяем существование по email
-                existing = await unified_db.get_user_by_website(email)
-                
-                if existing:
-                    logger.info(f"⏭️  Пропущен {email} (уже существует)")
-                    skipped += 1
-                    continue
-                
-                # Проверяем есть ли Discord ID в аккаунте (привязка через OAuth)
-                discord_id = account.get('discord_id')
-                
-                if discord_id:
-                    # Ищем пользователя по Discord ID
-                    existing_by_discord = await unified_db.get_user_by_discord(discord_id)
-                    
-                    if existing_by_discord:
-                        # Привязываем Website к существующему пользователю
-                        success = await unified_db.link_website(existing_by_discord.id, email)
-                        if success:
-                            logger.info(f"🔗 Привязан Website {email} → unified_id={existing_by_discord.id}")
-                            linked += 1
-                        else:
-                            logger.warning(f"⚠️  Не удалось привязать Website {email}")
-                            errors += 1
-                        continue
-                
-                # Создаём нового пользователя
-                user = await unified_db.create_user(
-                    website_email=email,
-                    username=account.get('username', 'Unknown'),
-                    display_name=account.get('display_name', account.get('username', 'Unknown')),
-                    primary_platform='website'
-                )
-                
-                logger.info(f"✅ Мигрирован {email} → unified_id={user.id}")
-                migrated += 1
-                
-            except Exception as e:
-                logger.error(f"❌ Ошибка миграции {email if 'email' in locals() else 'unknown'}: {e}")
-                errors += 1
-        
-        logger.info("")
-        logger.info("📊 СТАТИСТИКА МИГРАЦИИ WEBSITE:")
-        logger.info(f"   ✅ Мигрировано: {migrated}")
-        logger.info(f"   🔗 Привязано: {linked}")
-        logger.info(f"   ⏭️  Пропущено: {skipped}")
-        logger.info(f"   ❌ Ошибок: {errors}")
-        logger.info("")
-        
-        return {'migrated': migrated, 'linked': linked, 'skipped': skipped, 'errors': errors}
-        
-    except Exception as e:
-        logger.error(f"❌ Критическая ошибка миграции Website: {e}")
-        import traceback
-        traceback.print_exc()
-        return {'migrated': 0, 'linked': 0, 'skipped': 0, 'errors': 0}
+        sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'TTFD-Website'))
+        from database import db as website_db
+    except (ImportError, ModuleNotFoundError) as e:
+        logger.warning(f"⚠️  Website БД недоступна: {e}")
+        logger.info("💡 Пропускаем миграцию Website пользователей")
+        return
+    
+    # Пытаемся разные методы получения данных
+    if hasattr(website_db, 'get_all_accounts'):
+        accounts = await asyncio.to_thread(website_db.get_all_accounts)
+    elif hasattr(website_db, 'get_all_users'):
+        accounts = await asyncio.to_thread(website_db.get_all_users)
+    elif hasattr(website_db, 'accounts'):
+        accounts = list(website_db.accounts.values())
+    else:
+        logger.warning("⚠️  Не найден метод получения аккаунтов")
+        return
+    
+    by_email = {account['email']: account for account in accounts if account.get('email')}
+    keys = sorted(by_email)
+    start = bisect_right(keys, after) if after else 0
+    
+    for offset in range(start, len(keys), chunk_size):
+        chunk = []
+        for email in keys[offset:offset + chunk_size]:
+            account = by_email[email]
+            username = account.get('username') or 'Unknown'
+            discord_id = account.get('discord_id')
+            chunk.append((
+                email,
+                username,
+                account.get('display_name') or username,
+                str(discord_id) if discord_id else None,
+            ))
+        yield chunk
+
 
+# Порядок важен: слияние идёт по нему (см. bulk_migration.py)
+SOURCES = [
+    MigrationSource('telegram', '📱 Telegram', TELEGRAM_COLUMNS, read_telegram_chunks, TELEGRAM_MERGE),
+    MigrationSource('discord', '🎮 Discord', DISCORD_COLUMNS, read_discord_chunks, DISCORD_MERGE),
+    MigrationSource('website', '🌐 Website', WEBSITE_COLUMNS, read_website_chunks, WEBSITE_MERGE),
+]
 
-async def main():
+
+async def main(restart: bool = False, chunk_size: int = CHUNK_SIZE):
     """Главная функция миграции"""
     logger.info("")
     logger.info("=" * 60)
@@ -367,37 +378,31 @@ async def main():
     
     logger.info("")
     
-    # Мигрируем пользователей
-    telegram_stats = await migrate_telegram_users()
-    discord_stats = await migrate_discord_users()
-    website_stats = await migrate_website_users()
+    migration = BulkMigration(unified_db.pool, SOURCES, chunk_size)
+    results = await migration.run(restart=restart)
     
     # Итоговая статистика
     logger.info("=" * 60)
     logger.info("📊 ИТОГОВАЯ СТАТИСТИКА")
     logger.info("=" * 60)
     logger.info("")
-    logger.info(f"📱 Telegram:")
-    logger.info(f"   ✅ Мигрировано: {telegram_stats['migrated']}")
-    logger.info(f"   ⏭️  Пропущено: {telegram_stats['skipped']}")
-    logger.info(f"   ❌ Ошибок: {telegram_stats['errors']}")
-    logger.info("")
-    logger.info(f"🎮 Discord:")
-    logger.info(f"   ✅ Мигрировано: {discord_stats['migrated']}")
-    logger.info(f"   🔗 Привязано: {discord_stats.get('linked', 0)}")
-    logger.info(f"   ⏭️  Пропущено: {discord_stats['skipped']}")
-    logger.info(f"   ❌ Ошибок: {discord_stats['errors']}")
-    logger.info("")
-    logger.info(f"🌐 Website:")
-    logger.info(f"   ✅ Мигрировано: {website_stats['migrated']}")
-    logger.info(f"   🔗 Привязано: {website_stats.get('linked', 0)}")
-    logger.info(f"   ⏭️  Пропущено: {website_stats['skipped']}")
-    logger.info(f"   ❌ Ошибок: {website_stats['errors']}")
-    logger.info("")
     
-    total_migrated = telegram_stats['migrated'] + discord_stats['migrated'] + website_stats['migrated']
-    total_linked = discord_stats.get('linked', 0) + website_stats.get('linked', 0)
-    total_errors = telegram_stats['errors'] + discord_stats['errors'] + website_stats['errors']
+    for source in SOURCES:
+        stats = results[source.name]
+        logger.info(f"{source.title}:")
+        if 'error' in stats:
+            logger.info(f"   ❌ Ошибка: {stats['error']} (следующий запуск продолжит с checkpoint)")
+        else:
+            logger.info(f"   ✅ Мигрировано: {stats['migrated']}")
+            logger.info(f"   🔗 Привязано: {stats['linked']}")
+            logger.info(f"   ⏭️  Пропущено: {stats['skipped']}")
+            logger.info(f"   ❌ Ошибок: {stats['errors']}")
+        logger.info("")
+    
+    merged = [stats for stats in results.values() if 'error' not in stats]
+    total_migrated = sum(stats['migrated'] for stats in merged)
+    total_linked = sum(stats['linked'] for stats in merged)
+    total_errors = sum(stats['errors'] for stats in merged) + len(results) - len(merged)
     
     logger.info(f"🎯 ВСЕГО:")
     logger.info(f"   ✅ Мигрировано: {total_migrated}")
@@ -414,4 +419,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Миграция пользователей в unified_users")
+    parser.add_argument('--restart', action='store_true', help="начать заново, сбросив checkpoint")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="строк в одном COPY")
+    args = parser.parse_args()
+    
+    asyncio.run(main(restart=args.restart, chunk_size=args.chunk_size))
@@ -0,0 +1,154 @@
+-- ============================================================================
+-- Миграция: Партиционирование cross_platform_events по дням
+-- ============================================================================
+--
+-- cross_platform_events становится RANGE-партиционированной по created_at.
+-- Старые дни удаляются DROP'ом партиции, необработанные события ищутся
+-- по частичному индексу (processed = FALSE).
+--
+-- Существующие данные переносятся, старая таблица остаётся как
+-- cross_platform_events_legacy - удалите её вручную после проверки.
+
+-- Создать партицию за день (если её нет)
+CREATE OR REPLACE FUNCTION create_cross_platform_events_partition(day DATE)
+RETURNS void AS $$
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF cross_platform_events
+         FOR VALUES FROM (%L) TO (%L)',
+        'cross_platform_events_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Создать партиции на N дней вперёд
+CREATE OR REPLACE FUNCTION ensure_cross_platform_events_partitions(days_ahead INTEGER DEFAULT 7)
+RETURNS void AS $$
+BEGIN
+    PERFORM create_cross_platform_events_partition(day::date)
+    FROM generate_series(CURRENT_DATE, CURRENT_DATE + days_ahead, INTERVAL '1 day') AS day;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Удалить дневные партиции старше retention_days (кроме партиций
+-- с необработанными событиями). Возвращает количество строк.
+CREATE OR REPLACE FUNCTION drop_old_cross_platform_events_partitions(
+    retention_days INTEGER DEFAULT 30,
+    dry_run BOOLEAN DEFAULT FALSE
+)
+RETURNS BIGINT AS $$
+DECLARE
+    part RECORD;
+    has_pending BOOLEAN;
+    part_rows BIGINT;
+    total_rows BIGINT := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'cross_platform_events'::regclass
+            AND c.relname ~ '^cross_platform_events_p[0-9]{8}$'
+        ORDER BY c.relname
+    LOOP
+        IF to_date(right(part.relname, 8), 'YYYYMMDD') >= CURRENT_DATE - retention_days THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM %I WHERE processed = FALSE)',
+            part.relname
+        ) INTO has_pending;
+
+        IF has_pending THEN
+            RAISE NOTICE 'Партиция % содержит необработанные события - пропуск', part.relname;
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('SELECT COUNT(*) FROM %I', part.relname) INTO part_rows;
+        total_rows := total_rows + part_rows;
+
+        IF NOT dry_run THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+        END IF;
+    END LOOP;
+
+    RETURN total_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Переименовываем старую (непартиционированную) таблицу
+DO $$
+BEGIN
+    IF to_regclass('cross_platform_events') IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = 'cross_platform_events'::regclass
+    ) THEN
+        ALTER TABLE cross_platform_events RENAME TO cross_platform_events_legacy;
+    END IF;
+END;
+$$;
+
+-- Новая таблица
+CREATE TABLE IF NOT EXISTS cross_platform_events (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    user_id INTEGER NOT NULL REFERENCES unified_users(id) ON DELETE CASCADE,
+
+    -- Тип и источник
+    event_type TEXT NOT NULL,
+    source_platform TEXT NOT NULL,
+
+    -- Данные
+    data JSONB NOT NULL,
+
+    -- Статус
+    processed BOOLEAN NOT NULL DEFAULT FALSE,
+    processed_at TIMESTAMP,
+
+    -- Метаданные
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Страховка на случай, если партиция на день не была создана заранее
+CREATE TABLE IF NOT EXISTS cross_platform_events_default
+    PARTITION OF cross_platform_events DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_cross_platform_events_user_created
+    ON cross_platform_events(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_cross_platform_events_pending
+    ON cross_platform_events(created_at) WHERE processed = FALSE;
+
+-- Перенос данных
+DO $$
+DECLARE
+    first_day DATE;
+BEGIN
+    IF to_regclass('cross_platform_events_legacy') IS NULL THEN
+        RETURN;
+    END IF;
+
+    SELECT MIN(created_at)::date INTO first_day FROM cross_platform_events_legacy;
+
+    IF first_day IS NOT NULL THEN
+        PERFORM create_cross_platform_events_partition(day::date)
+        FROM generate_series(first_day, CURRENT_DATE, INTERVAL '1 day') AS day;
+    END IF;
+
+    PERFORM ensure_cross_platform_events_partitions(7);
+
+    INSERT INTO cross_platform_events (
+        id, user_id, event_type, source_platform, data,
+        processed, processed_at, created_at
+    )
+    SELECT
+        l.id, l.user_id, l.event_type, l.source_platform, l.data,
+        l.processed, l.processed_at, l.created_at
+    FROM cross_platform_events_legacy l
+    ON CONFLICT DO NOTHING;
+END;
+$$;
+
+SELECT 'cross_platform_events партиционирована' AS status;
+SELECT COUNT(*) AS pending_events FROM cross_platform_events WHERE processed = FALSE;
@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import Optional
 
 from database_unified import get_unified_db
+from event_batch import process_events, BATCH_CONCURRENCY
 from models import CrossPlatformEvent
 
 logging.basicConfig(level=logging.INFO)
@@ -17,9 +18,13 @@ logger = logging.getLogger(__name__)
 class SyncWorker:
     """Воркер для обработки событий синхронизации"""
     
-    def __init__(self):
+    # Сколько дней хранить обработанные события
+    EVENTS_RETENTION_DAYS = 30
+    
+    def __init__(self, concurrency: int = BATCH_CONCURRENCY):
         self.unified_db = None
         self.running = False
+        self.concurrency = concurrency
     
     async def start(self):
         """Запустить воркер"""
@@ -28,8 +33,9 @@ class SyncWorker:
         self.unified_db = await get_unified_db()
         self.running = True
         
-        # Запускаем фоновую задачу
+        # Запускаем фоновые задачи
         asyncio.create_task(self._process_events_loop())
+        asyncio.create_task(self._partition_maintenance_loop())
         
         logger.info("✅ Sync Worker запущен")
     
@@ -53,6 +59,22 @@ class SyncWorker:
                 logger.error(f"❌ Ошибка в цикле обработки событий: {e}")
                 await asyncio.sleep(10)  # Ждём дольше при ошибке
     
+    async def _partition_maintenance_loop(self):
+        """Создание будущих и удаление старых партиций событий (раз в час)"""
+        while self.running:
+            try:
+                await self.unified_db.ensure_event_partitions()
+                dropped = await self.unified_db.drop_old_event_partitions(
+                    self.EVENTS_RETENTION_DAYS
+                )
+                
+                if dropped:
+                    logger.info(f"🧹 Удалено старых событий: {dropped}")
+            except Exception as e:
+                logger.error(f"❌ Ошибка обслуживания партиций: {e}")
+            
+            await asyncio.sleep(3600)
+    
     async def _process_pending_events(self):
         """Обработать необработанные события"""
         try:
@@ -64,15 +86,14 @@ class SyncWorker:
             
             logger.info(f"📝 Обработка {len(events)} событий...")
             
-            for event in events:
-                try:
-                    await self._process_event(event)
-                    await self.unified_db.mark_event_processed(event.id)
-                except Exception as e:
-                    logger.error(f"❌ Ошибка обработки события {event.id}: {e}")
-            
-            logger.info(f"✅ Обработано {len(events)} событий")
+            # По пользователям параллельно, изменения XP/монет сложены,
+            # обработанные отмечаются одним UPDATE
+            processed, failed = await process_events(
+                self.unified_db, events, self._process_event, self.concurrency
+            )
             
+            logger.info(f"✅ Обработано {processed} событий" + (f", ошибок: {failed}" if failed else ""))
+        
         except Exception as e:
             logger.error(f"❌ Ошибка получения событий: {e}")
     
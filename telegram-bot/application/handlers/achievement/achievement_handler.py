@@ -7,6 +7,7 @@ import logging
 
 from domain.services.achievement_service import AchievementService
 from domain.services.user_service import UserService
+from core.request_context import RequestContext
 
 logger = logging.getLogger(__name__)
 
@@ -31,10 +32,12 @@ class AchievementHandler:
         user_id = update.effective_user.id
         
         # Получаем или создаём пользователя
+        ctx = RequestContext.of(update, context)
         user = await self.user_service.get_or_create_user(
-            user_id=user_id,
-            username=update.effective_user.username,
-            first_name=update.effective_user.first_name
+            ctx.telegram_id,
+            ctx.username,
+            ctx.first_name,
+            ctx=ctx
         )
         
         # Получаем статистику
@@ -236,6 +236,17 @@ class AdminHandler:
             f"• Ошибок: {failed}"
         )
     
+    @PermissionService.require_admin_id()
+    async def handle_reload_permissions_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Пересобрать таблицы прав (список админов из .env) без перезапуска"""
+        matrix = PermissionService.reload()
+        
+        await update.message.reply_text(
+            f"🔐 Таблицы прав пересобраны\n"
+            f"• Админов: {len(matrix.admin_ids)}\n"
+            f"• Ролей: {len(matrix.levels)}"
+        )
+    
     @PermissionService.require_permission(Permission.VIEW_ANALYTICS)
     async def handle_database_panel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Панель просмотра БД (callback)"""
@@ -6,6 +6,7 @@ from telegram.ext import ContextTypes
 
 from domain.services.user_service import UserService
 from core.exceptions import CooldownError
+from core.request_context import RequestContext
 
 
 class DailyHandler:
@@ -16,18 +17,19 @@ class DailyHandler:
     
     async def handle_daily_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработать команду /daily"""
-        user_tg = update.effective_user
+        ctx = RequestContext.of(update, context)
         
         try:
             # Получаем или создаём пользователя
-            user = await self.user_service.get_or_create_user(
-                str(user_tg.id),
-                user_tg.username or 'Unknown',
-                user_tg.first_name or ''
+            await self.user_service.get_or_create_user(
+                ctx.telegram_id,
+                ctx.username,
+                ctx.first_name,
+                ctx=ctx
             )
             
             # Пытаемся получить награду
-            result = await self.user_service.claim_daily(str(user_tg.id))
+            result = await self.user_service.claim_daily(ctx.telegram_id, ctx)
             
             # Формируем сообщение
             message = f"""
@@ -35,6 +37,7 @@ class DailyHandler:
 
 ⭐ +{result['xp']} XP
 💰 +{result['coins']} монет
+🔥 Стрик: {result['streak']} дн.
 """
             
             # Если был ранк-ап
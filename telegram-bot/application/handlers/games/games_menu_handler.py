@@ -8,6 +8,7 @@ from telegram.ext import ContextTypes
 from domain.services.game_service import GameService
 from domain.services.user_service import UserService
 from core.callbacks import GameCallback
+from core.request_context import RequestContext
 
 
 class GamesMenuHandler:
@@ -23,11 +24,12 @@ class GamesMenuHandler:
         if query:
             await query.answer()
         
-        user_tg = update.effective_user
+        ctx = RequestContext.of(update, context)
         user = await self.user_service.get_or_create_user(
-            str(user_tg.id),
-            user_tg.username or 'Unknown',
-            user_tg.first_name or ''
+            ctx.telegram_id,
+            ctx.username,
+            ctx.first_name,
+            ctx=ctx
         )
         
         text = f"""
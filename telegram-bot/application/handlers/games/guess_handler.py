@@ -10,6 +10,7 @@ from domain.services.user_service import UserService
 from core.exceptions import InsufficientFundsError
 from core.callbacks import GameCallback, CallbackBuilder
 from core.state_manager import state_manager, StateKey, StateTimeout
+from core.request_context import RequestContext
 
 
 class GuessGameHandler:
@@ -25,11 +26,12 @@ class GuessGameHandler:
         if query:
             await query.answer()
         
-        user_tg = update.effective_user
+        ctx = RequestContext.of(update, context)
         user = await self.user_service.get_or_create_user(
-            str(user_tg.id),
-            user_tg.username or 'Unknown',
-            user_tg.first_name or ''
+            ctx.telegram_id,
+            ctx.username,
+            ctx.first_name,
+            ctx=ctx
         )
         
         text = f"""
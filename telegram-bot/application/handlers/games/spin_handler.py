@@ -9,6 +9,7 @@ from domain.services.game_service import GameService
 from domain.services.user_service import UserService
 from core.exceptions import CooldownError
 from core.callbacks import GameCallback
+from core.request_context import RequestContext
 
 
 class SpinHandler:
@@ -24,11 +25,12 @@ class SpinHandler:
         if query:
             await query.answer()
         
-        user_tg = update.effective_user
+        ctx = RequestContext.of(update, context)
         user = await self.user_service.get_or_create_user(
-            str(user_tg.id),
-            user_tg.username or 'Unknown',
-            user_tg.first_name or ''
+            ctx.telegram_id,
+            ctx.username,
+            ctx.first_name,
+            ctx=ctx
         )
         
         # Проверка кулдауна
@@ -7,6 +7,7 @@ from telegram.ext import ContextTypes
 from domain.services.season_service import SeasonService
 from domain.services.user_service import UserService
 from core.callbacks import MenuCallback
+from core.request_context import RequestContext
 
 
 class SeasonHandler:
@@ -26,21 +27,22 @@ class SeasonHandler:
         if query:
             await query.answer()
         
-        user_tg = update.effective_user
+        ctx = RequestContext.of(update, context)
         user = await self.user_service.get_or_create_user(
-            str(user_tg.id),
-            user_tg.username or 'Unknown',
-            user_tg.first_name or ''
+            ctx.telegram_id,
+            ctx.username,
+            ctx.first_name,
+            ctx=ctx
         )
         
         # Получаем активный сезон
-        season = await self.season_service.get_or_create_active_season()
+        season = await self.season_service.get_or_create_active_season(ctx)
         
         # Получаем прогресс пользователя
-        progress = await self.season_service.get_user_progress(user.id)
+        progress = await self.season_service.get_user_progress(user.id, ctx=ctx)
         
         # Получаем статистику сезона
-        stats = await self.season_service.get_season_stats()
+        stats = await self.season_service.get_season_stats(ctx=ctx)
         
         text = f"""
 🏆 **{season.name}**
@@ -82,17 +84,17 @@ class SeasonHandler:
         query = update.callback_query
         await query.answer()
         
-        user_tg = update.effective_user
-        user = await self.user_service.get_user(str(user_tg.id))
+        ctx = RequestContext.of(update, context)
+        user = await self.user_service.get_user(ctx.telegram_id, ctx)
         
         # Получаем сезон
-        season = await self.season_service.get_or_create_active_season()
+        season = await self.season_service.get_or_create_active_season(ctx)
         
         # Получаем топ-20
-        leaderboard = await self.season_service.get_season_leaderboard(limit=20)
+        leaderboard = await self.season_service.get_season_leaderboard(limit=20, ctx=ctx)
         
         # Получаем позицию пользователя
-        user_progress = await self.season_service.get_user_progress(user.id)
+        user_progress = await self.season_service.get_user_progress(user.id, ctx=ctx)
         
         text = f"🏆 **Рейтинг {season.name}**\n\n"
         
@@ -132,7 +134,7 @@ class SeasonHandler:
         query = update.callback_query
         await query.answer()
         
-        season = await self.season_service.get_or_create_active_season()
+        season = await self.season_service.get_or_create_active_season(RequestContext.of(update, context))
         
         text = f"""
 🎁 **Награды {season.name}**
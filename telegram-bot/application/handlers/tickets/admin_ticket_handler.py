@@ -12,6 +12,9 @@ from domain.models.permission import Permission
 from domain.models.ticket import CATEGORY_NAMES, PRIORITY_NAMES, STATUS_EMOJI
 from core.callbacks import AdminCallback, CallbackBuilder
 
+# Тикетов на странице списка
+TICKETS_PAGE_SIZE = 15
+
 
 class AdminTicketHandler:
     """Handler для админ-панели тикетов"""
@@ -85,7 +88,16 @@ class AdminTicketHandler:
         }
         
         status_filter = filter_map.get(status_param)
-        tickets = await self.ticket_service.get_all_tickets(status=status_filter)
+        before = AdminCallback.parse_ticket_cursor(params)
+        
+        # Страница по ключу (created_at, id) + один тикет, чтобы понять, есть ли следующая
+        tickets = await self.ticket_service.get_all_tickets(
+            status=status_filter,
+            limit=TICKETS_PAGE_SIZE + 1,
+            before=before
+        )
+        has_next = len(tickets) > TICKETS_PAGE_SIZE
+        tickets = tickets[:TICKETS_PAGE_SIZE]
         
         filter_name = {
             'open': '🆕 Открытые',
@@ -98,10 +110,12 @@ class AdminTicketHandler:
             text = f"{filter_name[status_filter]} тикеты: пусто"
             keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data=AdminCallback.tickets())]]
         else:
-            text = f"🎫 **{filter_name[status_filter]} тикеты ({len(tickets)}):**\n\n"
+            stats = await self.ticket_service.get_stats()
+            total = getattr(stats, status_filter) if status_filter else stats.total
+            text = f"🎫 **{filter_name[status_filter]} тикеты ({total}):**\n\n"
             
             keyboard = []
-            for ticket in tickets[:15]:
+            for ticket in tickets:
                 status_emoji = STATUS_EMOJI.get(ticket.status, '❓')
                 priority_emoji = "🔴" if ticket.priority == 'high' else "🟡" if ticket.priority == 'medium' else "🟢"
                 
@@ -114,6 +128,17 @@ class AdminTicketHandler:
                     callback_data=AdminCallback.ticket_view(ticket.id)
                 )])
             
+            navigation = []
+            if before:
+                navigation.append(InlineKeyboardButton("⏮ В начало", callback_data=AdminCallback.ticket_list(status_filter)))
+            if has_next:
+                navigation.append(InlineKeyboardButton(
+                    "➡️ Дальше",
+                    callback_data=AdminCallback.ticket_list(status_filter, tickets[-1].page_cursor)
+                ))
+            if navigation:
+                keyboard.append(navigation)
+            
             keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data=AdminCallback.tickets())])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -6,6 +6,7 @@ from telegram.ext import ContextTypes
 
 from domain.services.user_service import UserService
 from core.exceptions import UserNotFoundError
+from core.request_context import RequestContext
 
 
 class ProfileHandler:
@@ -16,20 +17,21 @@ class ProfileHandler:
     
     async def handle_profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработать команду /profile"""
-        user_tg = update.effective_user
+        ctx = RequestContext.of(update, context)
         
         try:
-            # Получаем или создаём пользователя
+            # Получаем или создаём пользователя (один запрос на весь профиль)
             user = await self.user_service.get_or_create_user(
-                str(user_tg.id),
-                user_tg.username or 'Unknown',
-                user_tg.first_name or ''
+                ctx.telegram_id,
+                ctx.username,
+                ctx.first_name,
+                ctx=ctx
             )
             
             # Получаем ранг и прогресс
-            rank = await self.user_service.get_user_rank(str(user_tg.id))
-            next_rank = await self.user_service.get_next_rank(str(user_tg.id))
-            progress = await self.user_service.get_rank_progress(str(user_tg.id))
+            rank = await self.user_service.get_user_rank(ctx.telegram_id, ctx)
+            next_rank = await self.user_service.get_next_rank(ctx.telegram_id, ctx)
+            progress = await self.user_service.get_rank_progress(ctx.telegram_id, ctx)
             
             # Формируем сообщение
             message = f"""
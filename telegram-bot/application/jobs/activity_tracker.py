@@ -0,0 +1,104 @@
+"""
+Activity Tracker - отложенная запись last_active
+
+get_or_create_user вызывается почти на каждый апдейт Telegram. Вместо
+UPDATE на каждое нажатие кнопки время последней активности копится в
+памяти и раз в несколько секунд пишется одним UPDATE на всех
+пользователей.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from infrastructure.database.repositories.user_repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Буфер last_active с периодическим сбросом в БД"""
+    
+    def __init__(self, user_repo: UserRepository, interval_seconds: float = 5):
+        """
+        Args:
+            user_repo: Репозиторий пользователей
+            interval_seconds: Как часто писать накопленное в БД (секунды)
+        """
+        self.user_repo = user_repo
+        self.interval_seconds = interval_seconds
+        self.is_running = False
+        self._pending: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def touch(self, user_id: int, at: Optional[datetime] = None) -> datetime:
+        """Отметить активность пользователя (без обращения к БД)"""
+        at = at or datetime.now()
+        previous = self._pending.get(user_id)
+        if previous is None or at > previous:
+            self._pending[user_id] = at
+        return at
+    
+    async def flush(self) -> int:
+        """
+        Записать накопленные отметки одним запросом
+        
+        Returns:
+            Сколько пользователей обновлено
+        """
+        if not self._pending:
+            return 0
+        
+        batch, self._pending = self._pending, {}
+        try:
+            await self.user_repo.update_last_active_many(batch)
+        except BaseException:
+            # Ошибка или отмена посреди записи: вернуть в буфер (не затирая
+            # более свежие отметки) - запишем в следующий раз или при stop()
+            for user_id, at in batch.items():
+                self.touch(user_id, at)
+            raise
+        
+        return len(batch)
+    
+    async def start(self):
+        """Запустить периодическую запись"""
+        if self.is_running:
+            logger.warning("⚠️  ActivityTracker уже запущен")
+            return
+        
+        self.is_running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"🚀 ActivityTracker запущен: interval={self.interval_seconds}s")
+    
+    async def stop(self):
+        """Остановить и записать остаток"""
+        if not self.is_running:
+            return
+        
+        self.is_running = False
+        
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"❌ ActivityTracker: не удалось записать last_active при остановке: {e}")
+        
+        logger.info("🛑 ActivityTracker остановлен")
+    
+    async def _run(self):
+        """Основной цикл"""
+        while self.is_running:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                count = await self.flush()
+                if count:
+                    logger.debug(f"👣 last_active обновлён: {count} пользователей")
+            except Exception as e:
+                logger.error(f"❌ ActivityTracker: ошибка записи last_active: {e}")
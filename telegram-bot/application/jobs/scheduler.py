@@ -1,31 +1,93 @@
 """
 Job Scheduler - планировщик фоновых задач
+
+Каждая задача:
+- выполняется только на одной реплике (pg_try_advisory_lock по id задачи)
+  и один раз за период расписания (отметка в job_runs)
+- удаляет/обновляет строки порциями по batch_size с паузой batch_sleep
+- пишет метрики: длительность и количество затронутых строк
+- в режиме dry_run только считает строки, ничего не меняя
 """
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
+from apscheduler.triggers.interval import IntervalTrigger
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
 import logging
+import time
+import zlib
 
+from core.config import Config
 from domain.services.user_service import UserService
 from domain.services.game_service import GameService
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class JobMetrics:
+    """Метрики задачи"""
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0  # Задача выполнялась или уже выполнена на другой реплике
+    rows_total: int = 0
+    last_rows: int = 0
+    last_duration: float = 0.0
+    last_run_at: Optional[datetime] = None
+    last_status: Optional[str] = None  # success, failed, skipped
+    last_error: Optional[str] = None
+
+
 class JobScheduler:
     """Планировщик фоновых задач"""
     
     def __init__(
         self,
         user_service: UserService,
-        game_service: GameService
+        game_service: GameService,
+        pool=None,
+        sync_repo=None,
+        discord_repo=None,
+        link_code_manager=None,
+        ledger_service=None,
+        ticket_repo=None,
+        batch_size: int = Config.JOBS_BATCH_SIZE,
+        batch_sleep: float = Config.JOBS_BATCH_SLEEP,
+        dry_run: bool = Config.JOBS_DRY_RUN
     ):
+        """
+        Args:
+            user_service: Сервис пользователей
+            game_service: Сервис игр
+            pool: Пул PostgreSQL (advisory lock и job_runs); None - без блокировки
+            sync_repo: SyncRepository (очистка sync_events)
+            discord_repo: DiscordRepository (истечение кодов подтверждения)
+            link_code_manager: LinkCodeManager (очистка link_codes)
+            ledger_service: LedgerService (проверка контрольных точек журнала)
+            ticket_repo: TicketRepository (пересчёт ticket_stats)
+            batch_size: Максимум строк за один запрос
+            batch_sleep: Пауза между порциями (секунды)
+            dry_run: Только посчитать строки, ничего не менять
+        """
         self.user_service = user_service
         self.game_service = game_service
+        self.pool = pool
+        self.sync_repo = sync_repo
+        self.discord_repo = discord_repo
+        self.link_code_manager = link_code_manager
+        self.ledger_service = ledger_service
+        self.ticket_repo = ticket_repo
+        self.batch_size = batch_size
+        self.batch_sleep = batch_sleep
+        self.dry_run = dry_run
+        self.metrics: Dict[str, JobMetrics] = {}
         self.scheduler = AsyncIOScheduler()
     
     def setup_jobs(self):
-        """Настроить все задачи"""
+        """Настроить задачи, для которых переданы зависимости"""
+        disabled = []
         
         # Ежедневный ресет (00:00)
         self.scheduler.add_job(
@@ -36,6 +98,18 @@ class JobScheduler:
             replace_existing=True
         )
         
+        # Истечение кодов привязки (каждые 5 минут)
+        if self.discord_repo or self.link_code_manager:
+            self.scheduler.add_job(
+                self.expire_link_codes,
+                IntervalTrigger(minutes=5),
+                id='expire_link_codes',
+                name='Истечение кодов привязки',
+                replace_existing=True
+            )
+        else:
+            disabled.append('expire_link_codes')
+        
         # Еженедельная статистика (понедельник 09:00)
         self.scheduler.add_job(
             self.weekly_stats,
@@ -45,16 +119,89 @@ class JobScheduler:
             replace_existing=True
         )
         
+        # Партиции sync_events на неделю вперёд (при запуске и каждые 6 часов):
+        # без них события уходят в DEFAULT-партицию, которую не чистит
+        # удаление по дням и которая мешает потом создать партицию дня
+        if self.sync_repo:
+            self.scheduler.add_job(
+                self.ensure_partitions,
+                IntervalTrigger(hours=6),
+                id='ensure_partitions',
+                name='Партиции sync_events',
+                next_run_time=datetime.now(),
+                replace_existing=True
+            )
+        else:
+            disabled.append('ensure_partitions')
+        
         # Очистка старых данных (каждый день в 03:00)
-        self.scheduler.add_job(
-            self.cleanup_old_data,
-            CronTrigger(hour=3, minute=0),
-            id='cleanup_old_data',
-            name='Очистка старых данных',
-            replace_existing=True
+        if self.sync_repo:
+            self.scheduler.add_job(
+                self.cleanup_old_data,
+                CronTrigger(hour=3, minute=0),
+                id='cleanup_old_data',
+                name='Очистка старых данных',
+                replace_existing=True
+            )
+        else:
+            disabled.append('cleanup_old_data')
+        
+        # Контрольные точки журнала (при запуске и каждый час)
+        if self.ledger_service:
+            self.scheduler.add_job(
+                self.checkpoint_ledger,
+                IntervalTrigger(hours=1),
+                id='checkpoint_ledger',
+                name='Контрольные точки журнала',
+                next_run_time=datetime.now(),
+                replace_existing=True
+            )
+        else:
+            disabled.append('checkpoint_ledger')
+        
+        # Проверка журнала транзакций (каждый день в 04:00)
+        if self.ledger_service:
+            self.scheduler.add_job(
+                self.verify_ledger,
+                CronTrigger(hour=4, minute=0),
+                id='verify_ledger',
+                name='Проверка журнала транзакций',
+                replace_existing=True
+            )
+        else:
+            disabled.append('verify_ledger')
+        
+        # Пересчёт счётчиков тикетов (каждый день в 05:00): тикеты, удалённые
+        # каскадом вместе с пользователем, счётчики не уменьшают
+        if self.ticket_repo:
+            self.scheduler.add_job(
+                self.recount_ticket_stats,
+                CronTrigger(hour=5, minute=0),
+                id='recount_ticket_stats',
+                name='Пересчёт счётчиков тикетов',
+                replace_existing=True
+            )
+        else:
+            disabled.append('recount_ticket_stats')
+        
+        logger.info(
+            f"✅ Фоновые задачи настроены: batch_size={self.batch_size}, "
+            f"batch_sleep={self.batch_sleep}s, dry_run={self.dry_run}"
         )
+        logger.info(f"📋 Включены: {', '.join(job.id for job in self.scheduler.get_jobs())}")
+        if disabled:
+            logger.warning(f"⚠️  Отключены (нет зависимостей): {', '.join(disabled)}")
         
-        logger.info("✅ Фоновые задачи настроены")
+        # Источники задач, которых нет - ничего не чистится
+        sources = {
+            'коды Discord': self.discord_repo,
+            'link_codes': self.link_code_manager,
+            'sync_events': self.sync_repo,
+            'ticket_stats': self.ticket_repo,
+        }
+        missing = [name for name, source in sources.items() if source is None]
+        if missing:
+            logger.warning(f"⚠️  Без обслуживания: {', '.join(missing)}")
     
     def start(self):
         """Запустить планировщик"""
@@ -66,6 +213,165 @@ class JobScheduler:
         self.scheduler.shutdown()
         logger.info("🛑 Планировщик остановлен")
     
+    def get_metrics(self) -> Dict[str, dict]:
+        """Метрики всех задач"""
+        return {job_id: asdict(metrics) for job_id, metrics in self.metrics.items()}
+    
+    # ========================================================================
+    # ИНФРАСТРУКТУРА ЗАДАЧ
+    # ========================================================================
+    
+    @staticmethod
+    def _lock_key(job_id: str) -> int:
+        """Ключ advisory lock для задачи (стабилен между репликами)"""
+        return zlib.crc32(f"ttfd:job:{job_id}".encode())
+    
+    def _claim_gap(self, job_id: str) -> Optional[timedelta]:
+        """
+        Минимальный интервал между запусками задачи: половина периода расписания
+        
+        Половина - чтобы расхождение часов и времени старта реплик не
+        пропускало законные запуски. None - задача не в планировщике.
+        """
+        scheduled = self.scheduler.get_job(job_id)
+        if scheduled is None or getattr(scheduled, 'next_run_time', None) is None:
+            return None
+        
+        next_run = scheduled.next_run_time
+        after = scheduled.trigger.get_next_fire_time(next_run, next_run)
+        if after is None or after <= next_run:
+            return None
+        return (after - next_run) / 2
+    
+    async def _execute(
+        self,
+        job_id: str,
+        job: Callable[[], Awaitable[int]]
+    ) -> Optional[int]:
+        """
+        Выполнить задачу под advisory lock и записать метрики
+        
+        Вместе с блокировкой (в одной транзакции) задача занимает запуск в
+        job_runs: если другая реплика уже выполнила её в этом периоде
+        расписания, запуск пропускается.
+        
+        Returns:
+            Количество затронутых строк или None если задача не выполнялась
+        """
+        metrics = self.metrics.setdefault(job_id, JobMetrics())
+        
+        if self.pool is None:
+            return await self._run_measured(job_id, job, metrics)
+        
+        # Блокировка держится на отдельном соединении всё время выполнения
+        async with self.pool.acquire() as conn:
+            lock_key = self._lock_key(job_id)
+            gap = self._claim_gap(job_id)
+            
+            async with conn.transaction():
+                locked = await conn.fetchval("SELECT pg_try_advisory_lock($1)", lock_key)
+                
+                claimed = locked
+                if locked and gap is not None:
+                    claimed = await conn.fetchval("""
+                        INSERT INTO job_runs (job_id, last_run_at)
+                        VALUES ($1, NOW())
+                        ON CONFLICT (job_id) DO UPDATE SET last_run_at = EXCLUDED.last_run_at
+                        WHERE job_runs.last_run_at <= NOW() - $2::interval
+                        RETURNING TRUE
+                    """, job_id, gap)
+            
+            if not locked:
+                metrics.skipped += 1
+                metrics.last_status = 'skipped'
+                logger.info(f"⏭️  Задача {job_id} выполняется на другой реплике")
+                return None
+            
+            if not claimed:
+                # Сессионная блокировка переживает COMMIT - снимаем явно
+                await conn.execute("SELECT pg_advisory_unlock($1)", lock_key)
+                metrics.skipped += 1
+                metrics.last_status = 'skipped'
+                logger.info(f"⏭️  Задача {job_id} уже выполнена в этом периоде на другой реплике")
+                return None
+            
+            try:
+                return await self._run_measured(job_id, job, metrics)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", lock_key)
+    
+    async def _run_measured(
+        self,
+        job_id: str,
+        job: Callable[[], Awaitable[int]],
+        metrics: JobMetrics
+    ) -> Optional[int]:
+        """Выполнить задачу, замерив длительность и количество строк"""
+        metrics.runs += 1
+        metrics.last_run_at = datetime.now()
+        started = time.perf_counter()
+        
+        try:
+            rows = await job()
+        except Exception as e:
+            metrics.failures += 1
+            metrics.last_status = 'failed'
+            metrics.last_error = str(e)
+            metrics.last_duration = time.perf_counter() - started
+            logger.error(f"❌ Ошибка задачи {job_id}: {e}")
+            return None
+        
+        metrics.last_status = 'success'
+        metrics.last_error = None
+        metrics.last_rows = rows
+        metrics.rows_total += rows
+        metrics.last_duration = time.perf_counter() - started
+        
+        logger.info(
+            f"✅ Задача {job_id}: {rows} строк"
+            f"{' (dry-run)' if self.dry_run else ''}, "
+            f"{metrics.last_duration:.2f}s"
+        )
+        return rows
+    
+    async def _run_batches(
+        self,
+        name: str,
+        batch: Callable[[int], Awaitable[int]],
+        count: Callable[[], Awaitable[int]]
+    ) -> int:
+        """
+        Выполнить операцию порциями
+        
+        Args:
+            name: Название операции (для логов)
+            batch: Обработать до N строк, вернуть количество обработанных
+            count: Посчитать строки без изменений (для dry-run)
+        
+        Returns:
+            Количество затронутых строк
+        """
+        if self.dry_run:
+            rows = await count()
+            logger.info(f"🔎 [dry-run] {name}: будет затронуто {rows} строк")
+            return rows
+        
+        total = 0
+        while True:
+            rows = await batch(self.batch_size)
+            total += rows
+            
+            if rows < self.batch_size:
+                break
+            
+            # Даём БД передохнуть между порциями
+            await asyncio.sleep(self.batch_sleep)
+        
+        if total > 0:
+            logger.info(f"🧹 {name}: {total} строк")
+        
+        return total
+    
     # ========================================================================
     # ЗАДАЧИ
     # ========================================================================
@@ -73,43 +379,117 @@ class JobScheduler:
     async def daily_reset(self):
         """Ежедневный ресет (00:00)"""
         logger.info("🔄 Запуск ежедневного ресета...")
+        await self._execute('daily_reset', self._daily_reset)
+    
+    async def _daily_reset(self) -> int:
+        # Дейлики в этой схеме основаны на кулдауне users.last_daily,
+        # поэтому ресет сводится к закрытию всего, что истекло за сутки
+        rows = await self._expire_link_codes()
         
-        try:
-            # Здесь можно добавить логику ресета дейликов
-            # Например, сброс счётчиков, обновление статистики и т.д.
-            
-            logger.info("✅ Ежедневный ресет завершён")
+        if self.sync_repo:
+            rows += await self._run_batches(
+                'Провалившиеся события sync_events',
+                lambda limit: self.sync_repo.delete_old_events_batch('failed', 7, limit, 3),
+                lambda: self.sync_repo.count_old_events('failed', 7, 3)
+            )
         
-        except Exception as e:
-            logger.error(f"❌ Ошибка ежедневного ресета: {e}")
+        return rows
+    
+    async def expire_link_codes(self):
+        """Истечение кодов привязки (каждые 5 минут)"""
+        await self._execute('expire_link_codes', self._expire_link_codes)
+    
+    async def _expire_link_codes(self) -> int:
+        rows = 0
+        
+        if self.discord_repo:
+            rows += await self._run_batches(
+                'Истёкшие коды подтверждения Discord',
+                self.discord_repo.expire_old_codes,
+                self.discord_repo.count_expired_codes
+            )
+        
+        if self.link_code_manager:
+            rows += await self._run_batches(
+                'Истёкшие коды привязки',
+                self.link_code_manager.cleanup_expired,
+                self.link_code_manager.count_expired
+            )
+        
+        return rows
     
     async def weekly_stats(self):
         """Еженедельная статистика (понедельник 09:00)"""
         logger.info("📊 Генерация еженедельной статистики...")
+        await self._execute('weekly_stats', self._weekly_stats)
+    
+    async def _weekly_stats(self) -> int:
+        # Получаем топ игроков за неделю
+        leaderboard = await self.user_service.get_leaderboard(limit=10)
         
-        try:
-            # Получаем топ игроков за неделю
-            leaderboard = await self.user_service.get_leaderboard(limit=10)
-            
-            # Статистика игр
-            # game_stats = await self.game_service.get_leaderboard(limit=10)
-            
-            logger.info(f"✅ Статистика сгенерирована: {len(leaderboard)} пользователей")
+        if self.sync_repo:
+            sync_stats = await self.sync_repo.get_stats()
+            logger.info(f"📊 События синхронизации: {sync_stats}")
         
-        except Exception as e:
-            logger.error(f"❌ Ошибка генерации статистики: {e}")
+        logger.info(f"📊 Топ недели: {len(leaderboard)} пользователей")
+        return len(leaderboard)
     
     async def cleanup_old_data(self):
         """Очистка старых данных (каждый день в 03:00)"""
         logger.info("🧹 Очистка старых данных...")
+        await self._execute('cleanup_old_data', self._cleanup_old_data)
+    
+    async def _cleanup_old_data(self) -> int:
+        if not self.sync_repo:
+            return 0
         
-        try:
-            # Здесь можно добавить логику очистки:
-            # - Удаление старых логов
-            # - Архивация старых тикетов
-            # - Очистка кэша
-            
-            logger.info("✅ Очистка завершена")
-        
-        except Exception as e:
-            logger.error(f"❌ Ошибка очистки: {e}")
+        # sync_events партиционирована по дням: старые дни удаляются DROP'ом
+        return await self.sync_repo.drop_old_partitions(
+            Config.SYNC_EVENTS_RETENTION_DAYS,
+            dry_run=self.dry_run
+        )
+    
+    async def ensure_partitions(self):
+        """Создание партиций sync_events (при запуске и каждые 6 часов)"""
+        await self._execute('ensure_partitions', self._ensure_partitions)
+    
+    async def _ensure_partitions(self) -> int:
+        # Создание партиций ничего не удаляет - выполняется и в dry-run
+        await self.sync_repo.ensure_partitions()
+        return 0
+    
+    async def checkpoint_ledger(self):
+        """Контрольные точки журнала (при запуске и каждый час)"""
+        await self._execute('checkpoint_ledger', self._checkpoint_ledger)
+    
+    async def _checkpoint_ledger(self) -> int:
+        # Точки только добавляются - в dry-run ничего не пишем
+        if self.dry_run:
+            return 0
+        return await self.ledger_service.create_due_checkpoints(batch_size=self.batch_size)
+    
+    async def verify_ledger(self):
+        """Проверка контрольных точек журнала (каждый день в 04:00)"""
+        logger.info("📒 Проверка журнала транзакций...")
+        await self._execute('verify_ledger', self._verify_ledger)
+    
+    async def _verify_ledger(self) -> int:
+        result = await self.ledger_service.verify_checkpoints(
+            batch_size=self.batch_size,
+            concurrency=Config.LEDGER_VERIFY_CONCURRENCY,
+            repair=not self.dry_run
+        )
+        return result['drifts']
+    
+    async def recount_ticket_stats(self):
+        """Пересчёт счётчиков тикетов (каждый день в 05:00)"""
+        await self._execute('recount_ticket_stats', self._recount_ticket_stats)
+    
+    async def _recount_ticket_stats(self) -> int:
+        # Пересчёт перезаписывает ticket_stats - в dry-run только читаем
+        if self.dry_run:
+            stats = await self.ticket_repo.get_stats()
+        else:
+            stats = await self.ticket_repo.recount_stats()
+        logger.info(f"🎫 Счётчики тикетов: {stats.total} всего, {stats.open} открытых")
+        return stats.total
@@ -8,6 +8,7 @@ from typing import Callable, Dict, Optional
 import logging
 
 from core.callbacks import CallbackBuilder, CallbackDomain
+from core.request_context import RequestContext
 
 logger = logging.getLogger(__name__)
 
@@ -84,6 +85,10 @@ class CallbackRouter:
         
         callback_data = query.data
         
+        # Контекст апдейта: handler, декораторы и сервисы берут из него
+        # одного и того же пользователя и активный сезон
+        RequestContext.of(update, context)
+        
         # Логируем callback
         user = query.from_user
         logger.info(
@@ -29,6 +29,9 @@ DAILY_COOLDOWN_HOURS = 24
 # Настройки магазина
 SHOP_ENABLED = True
 
+# Уведомления админам: окно дайджеста в секундах (0 - каждое событие отдельным сообщением)
+NOTIFY_DIGEST_SECONDS = float(os.getenv('NOTIFY_DIGEST_SECONDS', '0'))
+
 print("✅ Конфигурация загружена")
 if TELEGRAM_ADMIN_IDS:
     print(f"   Админы: {', '.join(TELEGRAM_ADMIN_IDS)}")
@@ -2,9 +2,13 @@
 Centralized callback_data management
 Стандартизация всех callback по доменам
 """
+from datetime import datetime
 from enum import Enum
 from typing import Optional
 
+# Время тикета в ключе страницы (без ":" - это разделитель callback)
+TICKET_CURSOR_FORMAT = "%Y%m%d%H%M%S%f"
+
 
 class CallbackDomain(Enum):
     """Домены callback_data"""
@@ -303,10 +307,20 @@ class AdminCallback:
         return CallbackBuilder.build(CallbackDomain.ADMIN, "db", table_name, str(page))
     
     @staticmethod
-    def ticket_list(status: Optional[str] = None) -> str:
-        if status:
-            return CallbackBuilder.build(CallbackDomain.ADMIN, "ticket", "list", status)
-        return CallbackBuilder.build(CallbackDomain.ADMIN, "ticket", "list", "all")
+    def ticket_list(status: Optional[str] = None, before: Optional[tuple] = None) -> str:
+        """admin:ticket:list:<status>[:<created_at>:<id>] - before = Ticket.page_cursor"""
+        params = [status or "all"]
+        if before:
+            created_at, ticket_id = before
+            params += [created_at.strftime(TICKET_CURSOR_FORMAT), str(ticket_id)]
+        return CallbackBuilder.build(CallbackDomain.ADMIN, "ticket", "list", *params)
+    
+    @staticmethod
+    def parse_ticket_cursor(params: list[str]) -> Optional[tuple]:
+        """Ключ страницы из admin:ticket:list:<status>:<created_at>:<id>"""
+        if len(params) < 4:
+            return None
+        return datetime.strptime(params[2], TICKET_CURSOR_FORMAT), int(params[3])
     
     @staticmethod
     def ticket_view(ticket_id: int) -> str:
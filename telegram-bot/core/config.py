@@ -3,7 +3,10 @@ Application configuration
 """
 import os
 from typing import List
-from dotenv import load_dotenv
+from dotenv import dotenv_values, load_dotenv
+
+# Значение из окружения процесса (до .env) - при перечитывании важнее .env
+_PROCESS_ADMIN_IDS = os.environ.get('TELEGRAM_ADMIN_IDS')
 
 # Загружаем .env
 load_dotenv()
@@ -37,6 +40,8 @@ class Config:
     DAILY_REWARD_XP: int = 100
     DAILY_REWARD_COINS: int = 50
     DAILY_COOLDOWN_HOURS: int = 24
+    # Стрик продолжается, если прошлая награда была не раньше N часов назад
+    DAILY_STREAK_WINDOW_HOURS: int = int(os.getenv('DAILY_STREAK_WINDOW_HOURS', '48'))
     
     # Настройки магазина
     SHOP_ENABLED: bool = True
@@ -46,6 +51,41 @@ class Config:
     CACHE_TTL_LEADERBOARD: int = 60    # 1 минута
     CACHE_TTL_SHOP: int = 600          # 10 минут
     
+    # Сезоны: ранги считаются по индексу, в БД пишутся только в конце сезона
+    SEASON_RANKS_INCREMENTAL: bool = os.getenv('SEASON_RANKS_INCREMENTAL', 'true').lower() == 'true'
+    
+    # Фоновые задачи (JobScheduler)
+    JOBS_BATCH_SIZE: int = int(os.getenv('JOBS_BATCH_SIZE', '1000'))
+    JOBS_BATCH_SLEEP: float = float(os.getenv('JOBS_BATCH_SLEEP', '0.1'))
+    JOBS_DRY_RUN: bool = os.getenv('JOBS_DRY_RUN', 'false').lower() == 'true'
+    SYNC_EVENTS_RETENTION_DAYS: int = int(os.getenv('SYNC_EVENTS_RETENTION_DAYS', '30'))
+    
+    # last_active копится в памяти и пишется пачкой раз в N секунд
+    ACTIVITY_FLUSH_INTERVAL: float = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '5'))
+    
+    # Кэш ключей идемпотентности событий синхронизации
+    IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000'))
+    IDEMPOTENCY_BLOOM_CAPACITY: int = int(os.getenv('IDEMPOTENCY_BLOOM_CAPACITY', '100000'))
+    IDEMPOTENCY_BLOOM_ERROR_RATE: float = float(os.getenv('IDEMPOTENCY_BLOOM_ERROR_RATE', '0.01'))
+    IDEMPOTENCY_REDIS_TTL: int = int(os.getenv('IDEMPOTENCY_REDIS_TTL', '86400'))
+    
+    # Журнал транзакций: контрольная точка баланса каждые N транзакций
+    LEDGER_CHECKPOINT_INTERVAL: int = int(os.getenv('LEDGER_CHECKPOINT_INTERVAL', '100'))
+    LEDGER_VERIFY_CONCURRENCY: int = int(os.getenv('LEDGER_VERIFY_CONCURRENCY', '4'))
+    
+    @classmethod
+    def reload_admin_ids(cls) -> List[str]:
+        """Перечитать TELEGRAM_ADMIN_IDS из окружения и .env (остальное .env не трогаем)"""
+        value = _PROCESS_ADMIN_IDS
+        if value is None:
+            value = dotenv_values().get('TELEGRAM_ADMIN_IDS') or ''
+        cls.TELEGRAM_ADMIN_IDS = [
+            id.strip()
+            for id in value.split(',')
+            if id.strip()
+        ]
+        return cls.TELEGRAM_ADMIN_IDS
+    
     @classmethod
     def validate(cls):
         """Валидация конфигурации"""
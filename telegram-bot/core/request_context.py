@@ -0,0 +1,66 @@
+"""
+Request context - данные одного апдейта Telegram
+
+Создаётся один раз на Update (CallbackRouter.route, декораторы прав или
+сам handler - кто раньше) и хранится в CallbackContext, который
+python-telegram-bot создаёт на апдейт. Сервисы принимают его
+необязательным параметром ctx: пользователь и активный сезон загружаются
+один раз, а не в каждом декораторе и сервисном методе заново.
+"""
+from domain.models.permission import get_permission_matrix
+
+# Атрибут CallbackContext, в котором лежит RequestContext
+CONTEXT_ATTRIBUTE = 'request_context'
+
+
+class RequestContext:
+    """Пользователь, роль и активный сезон в рамках одного апдейта"""
+    
+    __slots__ = ('telegram_id', 'username', 'first_name', 'user', 'season')
+    
+    def __init__(self, telegram_id: str, username: str = 'Unknown', first_name: str = ''):
+        self.telegram_id = telegram_id
+        self.username = username
+        self.first_name = first_name
+        self.user = None  # domain.models.user.User после первой загрузки
+        self.season = None  # domain.models.season.Season после первой загрузки
+    
+    @classmethod
+    def of(cls, update, context=None) -> 'RequestContext':
+        """
+        Контекст апдейта (создаётся при первом обращении)
+        
+        Args:
+            update: Telegram Update
+            context: CallbackContext апдейта; без него контекст не
+                переиспользуется между вызовами
+        """
+        request = getattr(context, CONTEXT_ATTRIBUTE, None) if context is not None else None
+        if request is None:
+            user_tg = update.effective_user
+            request = cls(
+                str(user_tg.id),
+                user_tg.username or 'Unknown',
+                user_tg.first_name or ''
+            )
+            if context is not None:
+                setattr(context, CONTEXT_ATTRIBUTE, request)
+        return request
+    
+    def user_for(self, telegram_id: str):
+        """Загруженный пользователь, если это он (иначе None)"""
+        if self.user is not None and telegram_id == self.telegram_id:
+            return self.user
+        return None
+    
+    def remember_user(self, user):
+        """Запомнить свежую версию пользователя этого апдейта"""
+        if user is not None and user.telegram_id == self.telegram_id:
+            self.user = user
+    
+    @property
+    def role(self):
+        """Роль пользователя (Role) или None, если он ещё не загружен"""
+        if self.user is None:
+            return None
+        return get_permission_matrix().role(self.user.role)
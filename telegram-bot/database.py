@@ -8,6 +8,11 @@ import os
 from datetime import datetime
 from config import DATABASE_FILE
 
+# Кулдаун ежедневной награды; стрик продолжается, если прошлая награда
+# была не раньше DAILY_STREAK_WINDOW_SECONDS назад
+DAILY_COOLDOWN_SECONDS = 86400
+DAILY_STREAK_WINDOW_SECONDS = 2 * 86400
+
 # 7 рангов TTFD (синхронизировано с Discord ботом)
 RANKS = [
     {"id": 1, "name": "F - Ранг", "color": "#95a5a6", "required_xp": 100, "reward_coins": 50},
@@ -153,33 +158,46 @@ class Database:
         now = datetime.now()
         time_diff = (now - last_daily).total_seconds()
         
-        # 24 часа = 86400 секунд
-        return time_diff >= 86400
+        return time_diff >= DAILY_COOLDOWN_SECONDS
     
     def claim_daily(self, telegram_id, xp_reward, coins_reward):
-        """Получить ежедневную награду"""
-        if not self.can_claim_daily(telegram_id):
-            user = self.get_user(telegram_id)
-            last_daily = datetime.fromisoformat(user['last_daily'])
-            time_left = 86400 - (datetime.now() - last_daily).total_seconds()
-            hours = int(time_left // 3600)
-            minutes = int((time_left % 3600) // 60)
-            return {
-                'success': False,
-                'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
-            }
-        
+        """Получить ежедневную награду (проверка и начисление за один проход)"""
         user = self.get_user(telegram_id)
-        self.add_xp(telegram_id, xp_reward)
-        self.add_coins(telegram_id, coins_reward)
+        now = datetime.now()
+        
+        # Кулдаун и стрик - по last_daily
+        streak = 1
+        if user.get('last_daily'):
+            elapsed = (now - datetime.fromisoformat(user['last_daily'])).total_seconds()
+            if elapsed < DAILY_COOLDOWN_SECONDS:
+                time_left = DAILY_COOLDOWN_SECONDS - elapsed
+                hours = int(time_left // 3600)
+                minutes = int((time_left % 3600) // 60)
+                return {
+                    'success': False,
+                    'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
+                }
+            if elapsed <= DAILY_STREAK_WINDOW_SECONDS:
+                streak = user.get('daily_streak', 0) + 1
         
-        user['last_daily'] = datetime.now().isoformat()
+        # Награда, ранг, стрик и last_daily - одно изменение и одна запись
+        old_rank = user['rank_id']
+        user['xp'] += xp_reward
+        user['coins'] += coins_reward
+        self.data['global_stats']['total_xp_earned'] += xp_reward
+        self.data['global_stats']['total_coins_earned'] += coins_reward
+        new_rank = self._check_rank_up(user)
+        user['last_daily'] = now.isoformat()
+        user['daily_streak'] = streak
         self.save_data()
         
         return {
             'success': True,
             'xp': xp_reward,
-            'coins': coins_reward
+            'coins': coins_reward,
+            'streak': streak,
+            'rank_up': new_rank > old_rank,
+            'new_rank': new_rank
         }
     
     def get_leaderboard(self, limit=10):
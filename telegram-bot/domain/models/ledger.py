@@ -0,0 +1,63 @@
+"""
+Ledger models - журнал транзакций и контрольные точки баланса
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from domain.models.sync_event import Transaction
+
+
+@dataclass
+class BalanceCheckpoint:
+    """Накопленные XP и баланс на момент транзакции transaction_id"""
+    user_id: int
+    transaction_id: int
+    xp: int
+    balance: int
+    created_at: datetime
+    
+    @classmethod
+    def from_db_row(cls, row):
+        """Создать BalanceCheckpoint из строки БД"""
+        if not row:
+            return None
+        
+        return cls(
+            user_id=row['user_id'],
+            transaction_id=row['transaction_id'],
+            xp=row['xp'],
+            balance=row['balance'],
+            created_at=row['created_at']
+        )
+
+
+@dataclass
+class LedgerBalance:
+    """Баланс по журналу на момент времени"""
+    user_id: int
+    at: datetime
+    xp: int
+    balance: int
+    
+    # Из какой контрольной точки и сколько строк хвоста прочитано
+    checkpoint_id: Optional[int] = None
+    tail_rows: int = 0
+
+
+@dataclass
+class TransactionPage:
+    """Страница аудита (keyset-пагинация по id)"""
+    items: List[Transaction]
+    next_cursor: Optional[int] = None  # Передать как before_id для следующей страницы
+
+
+@dataclass
+class CheckpointDrift:
+    """Расхождение контрольной точки с журналом"""
+    user_id: int
+    transaction_id: int
+    expected_xp: int
+    expected_balance: int
+    actual_xp: int
+    actual_balance: int
@@ -2,7 +2,7 @@
 Permission and Role models
 """
 from enum import Enum
-from typing import List
+from typing import Dict, FrozenSet, Iterable, List, Optional
 
 
 class Permission(Enum):
@@ -126,6 +126,90 @@ ROLE_PERMISSIONS: dict[Role, List[Permission]] = {
 }
 
 
+# Роли по возрастанию уровня
+ROLE_HIERARCHY = (Role.USER, Role.VIP, Role.MODERATOR, Role.ADMIN, Role.OWNER)
+
+
+class PermissionMatrix:
+    """
+    Скомпилированные таблицы прав
+    
+    Собираются один раз (при старте и при перезагрузке), проверки на
+    горячем пути - битовая маска и поиск в dict/frozenset без обхода
+    списков. Внутренние таблицы ключуются строковым значением Enum:
+    хэш члена Enum считается в Python и заметно медленнее хэша строки.
+    """
+    
+    __slots__ = ('permissions', 'levels', 'admin_ids', 'roles', '_masks', '_bits', '_levels')
+    
+    def __init__(
+        self,
+        role_permissions: Optional[Dict[Role, Iterable[Permission]]] = None,
+        admin_ids: Iterable[str] = ()
+    ):
+        role_permissions = ROLE_PERMISSIONS if role_permissions is None else role_permissions
+        
+        self.permissions: Dict[Role, FrozenSet[Permission]] = {
+            role: frozenset(role_permissions.get(role, ())) for role in Role
+        }
+        self.levels: Dict[Role, int] = {role: level for level, role in enumerate(ROLE_HIERARCHY)}
+        self.admin_ids: FrozenSet[str] = frozenset(str(admin_id) for admin_id in admin_ids)
+        self.roles: Dict[str, Role] = {role.value: role for role in Role}
+        
+        # Горячий путь: право - бит, роль - маска своих прав
+        self._bits: Dict[str, int] = {
+            permission.value: 1 << index for index, permission in enumerate(Permission)
+        }
+        self._masks: Dict[str, int] = {
+            role.value: sum(self._bits[permission.value] for permission in permissions)
+            for role, permissions in self.permissions.items()
+        }
+        self._levels: Dict[str, int] = {role.value: level for role, level in self.levels.items()}
+    
+    def role(self, role_str: Optional[str]) -> Role:
+        """Role по строке из БД (неизвестная - USER)"""
+        role = self.roles.get(role_str)
+        if role is None:
+            role = self.roles.get((role_str or '').lower(), Role.USER)
+        return role
+    
+    def has_permission(self, role: Role, permission: Permission) -> bool:
+        """Есть ли право у роли"""
+        return self._masks[role._value_] & self._bits[permission._value_] != 0
+    
+    def has_role(self, role: Role, required_role: Role) -> bool:
+        """Не ниже ли роль требуемой"""
+        levels = self._levels
+        return levels[role._value_] >= levels[required_role._value_]
+    
+    def is_admin(self, telegram_id: str) -> bool:
+        """Входит ли Telegram ID в список админов"""
+        return telegram_id in self.admin_ids
+
+
+_matrix = PermissionMatrix()
+
+
+def get_permission_matrix() -> PermissionMatrix:
+    """Текущие таблицы прав"""
+    return _matrix
+
+
+def compile_permissions(
+    admin_ids: Iterable[str] = (),
+    role_permissions: Optional[Dict[Role, Iterable[Permission]]] = None
+) -> PermissionMatrix:
+    """
+    Собрать таблицы прав и заменить текущие
+    
+    Замена - присваивание одной ссылки: проверки, которые уже идут,
+    дорабатывают со старыми таблицами, новые видят новые.
+    """
+    global _matrix
+    _matrix = PermissionMatrix(role_permissions, admin_ids)
+    return _matrix
+
+
 def get_role_permissions(role: Role) -> List[Permission]:
     """Получить права роли"""
     return ROLE_PERMISSIONS.get(role, [])
@@ -133,12 +217,9 @@ def get_role_permissions(role: Role) -> List[Permission]:
 
 def has_permission(role: Role, permission: Permission) -> bool:
     """Проверить есть ли право у роли"""
-    return permission in get_role_permissions(role)
+    return _matrix.has_permission(role, permission)
 
 
 def get_role_from_string(role_str: str) -> Role:
     """Получить Role из строки"""
-    try:
-        return Role(role_str.lower())
-    except ValueError:
-        return Role.USER
+    return _matrix.role(role_str)
@@ -5,9 +5,17 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Dict, Any
 from enum import Enum
+import json
 import uuid
 
 
+def _json_value(value):
+    """jsonb из БД (без кодека asyncpg отдаёт строку)"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
 class EventSource(Enum):
     """Источник события"""
     TELEGRAM = "telegram"
@@ -71,7 +79,7 @@ class SyncEvent:
             source=row['source'],
             event_type=row['event_type'],
             user_id=row['user_id'],
-            payload=row['payload'],
+            payload=_json_value(row['payload']),
             status=row['status'],
             processed_by=row.get('processed_by'),
             retries=row['retries'],
@@ -140,7 +148,7 @@ class Transaction:
             delta_xp=row['delta_xp'],
             delta_balance=row['delta_balance'],
             reason=row['reason'],
-            metadata=row.get('metadata'),
+            metadata=_json_value(row.get('metadata')),
             created_at=row['created_at']
         )
 
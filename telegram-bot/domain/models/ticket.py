@@ -3,7 +3,7 @@ Ticket models - модели тикетов
 """
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from enum import Enum
 
 
@@ -53,6 +53,11 @@ class Ticket:
         if self.messages is None:
             self.messages = []
     
+    @property
+    def page_cursor(self) -> Tuple[datetime, int]:
+        """Ключ для следующей страницы списка (параметр before)"""
+        return (self.created_at, self.id)
+    
     @staticmethod
     def from_db_row(row) -> Optional['Ticket']:
         """Создать из строки БД"""
@@ -21,6 +21,7 @@ class User:
     last_active: datetime
     last_daily: Optional[datetime] = None
     last_spin: Optional[datetime] = None
+    daily_streak: int = 0
     discord_id: Optional[str] = None
     is_banned: bool = False
     ban_reason: Optional[str] = None
@@ -44,6 +45,7 @@ class User:
             last_active=row['last_active'],
             last_daily=row.get('last_daily'),
             last_spin=row.get('last_spin'),
+            daily_streak=row.get('daily_streak') or 0,
             discord_id=row.get('discord_id'),
             is_banned=row.get('is_banned', False),
             ban_reason=row.get('ban_reason')
@@ -64,6 +66,7 @@ class User:
             'last_active': self.last_active.isoformat() if self.last_active else None,
             'last_daily': self.last_daily.isoformat() if self.last_daily else None,
             'last_spin': self.last_spin.isoformat() if self.last_spin else None,
+            'daily_streak': self.daily_streak,
             'discord_id': self.discord_id,
             'is_banned': self.is_banned,
             'ban_reason': self.ban_reason
@@ -270,6 +270,6 @@ class DiscordService:
         
         return await self.discord_client.test_connection()
     
-    async def expire_old_codes(self):
+    async def expire_old_codes(self, batch_size: Optional[int] = None) -> int:
         """Истечь старые коды подтверждения"""
-        await self.discord_repo.expire_old_codes()
+        return await self.discord_repo.expire_old_codes(batch_size)
@@ -0,0 +1,177 @@
+"""
+Ledger Service - журнал транзакций с контрольными точками баланса
+
+transactions - append-only журнал изменений XP/баланса. Каждые
+checkpoint_interval транзакций пользователя записывается контрольная точка
+с накопленными значениями, поэтому:
+- баланс на момент T = контрольная точка + хвост не длиннее интервала
+  (точки дописывает фоновая задача, record - сразу после транзакции)
+- аудит читается страницами по курсору id
+- проверка сверяет соседние точки с журналом порциями пользователей параллельно
+"""
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+import asyncio
+import logging
+
+from core.config import Config
+from domain.models.ledger import LedgerBalance, TransactionPage, CheckpointDrift
+from infrastructure.database.repositories.ledger_repository import LedgerRepository
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerService:
+    """Сервис журнала транзакций"""
+    
+    def __init__(
+        self,
+        ledger_repo: LedgerRepository,
+        checkpoint_interval: int = Config.LEDGER_CHECKPOINT_INTERVAL
+    ):
+        self.ledger_repo = ledger_repo
+        self.checkpoint_interval = checkpoint_interval
+    
+    async def record(self, user_id: int):
+        """Вызывать после записи транзакции: добавляет контрольную точку по интервалу"""
+        transaction_id = await self.ledger_repo.create_checkpoint_if_due(
+            user_id, self.checkpoint_interval
+        )
+        
+        if transaction_id:
+            logger.info(f"📌 Контрольная точка журнала: user={user_id}, tx={transaction_id}")
+    
+    async def create_due_checkpoints(self, batch_size: int = 500) -> int:
+        """
+        Дописать контрольные точки всем пользователям журнала
+        
+        Не зависит от того, кто пишет transactions: фоновая задача
+        догоняет и историю после миграции, и новые транзакции.
+        
+        Returns:
+            Сколько точек записано
+        """
+        created = 0
+        after_user_id = 0
+        
+        while True:
+            user_ids = await self.ledger_repo.get_ledger_users(after_user_id, batch_size)
+            if not user_ids:
+                break
+            
+            created += await self.ledger_repo.create_due_checkpoints(user_ids, self.checkpoint_interval)
+            after_user_id = user_ids[-1]
+        
+        if created:
+            logger.info(f"📌 Контрольных точек журнала записано: {created}")
+        
+        return created
+    
+    async def get_balance_at(
+        self,
+        user_id: int,
+        at: Optional[datetime] = None
+    ) -> LedgerBalance:
+        """
+        XP и баланс по журналу на момент at (по умолчанию - сейчас)
+        
+        Читает ближайшую контрольную точку и хвост после неё.
+        """
+        at = at or datetime.now()
+        checkpoint = await self.ledger_repo.get_checkpoint_before(user_id, at)
+        
+        after_id = checkpoint.transaction_id if checkpoint else 0
+        delta_xp, delta_balance, rows = await self.ledger_repo.sum_tail(user_id, after_id, at)
+        
+        return LedgerBalance(
+            user_id=user_id,
+            at=at,
+            xp=(checkpoint.xp if checkpoint else 0) + delta_xp,
+            balance=(checkpoint.balance if checkpoint else 0) + delta_balance,
+            checkpoint_id=checkpoint.transaction_id if checkpoint else None,
+            tail_rows=rows
+        )
+    
+    async def get_audit_page(
+        self,
+        user_id: int,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> TransactionPage:
+        """
+        Страница аудита транзакций пользователя (от новых к старым)
+        
+        Args:
+            cursor: next_cursor предыдущей страницы (None - первая страница)
+        """
+        items = await self.ledger_repo.get_transactions_page(
+            user_id, before_id=cursor, limit=limit, since=since, until=until
+        )
+        
+        next_cursor = items[-1].id if len(items) == limit else None
+        return TransactionPage(items=items, next_cursor=next_cursor)
+    
+    async def verify_checkpoints(
+        self,
+        batch_size: int = 500,
+        concurrency: int = 4,
+        repair: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Сверить все контрольные точки с журналом
+        
+        Args:
+            batch_size: Пользователей в одном запросе
+            concurrency: Сколько порций проверяется одновременно
+            repair: Перестроить точки пользователей с расхождениями
+        
+        Returns:
+            Статистика проверки
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        drifts: List[CheckpointDrift] = []
+        users_checked = 0
+        
+        async def check(user_ids: List[int]):
+            async with semaphore:
+                drifts.extend(await self.ledger_repo.find_drift(user_ids))
+        
+        tasks = []
+        after_user_id = 0
+        while True:
+            user_ids = await self.ledger_repo.get_checkpoint_users(after_user_id, batch_size)
+            if not user_ids:
+                break
+            
+            users_checked += len(user_ids)
+            after_user_id = user_ids[-1]
+            tasks.append(asyncio.create_task(check(user_ids)))
+        
+        await asyncio.gather(*tasks)
+        
+        drifted_users = sorted({drift.user_id for drift in drifts})
+        
+        for drift in drifts:
+            logger.warning(
+                f"⚠️  Журнал: расхождение user={drift.user_id}, tx={drift.transaction_id}: "
+                f"xp {drift.actual_xp} != {drift.expected_xp}, "
+                f"balance {drift.actual_balance} != {drift.expected_balance}"
+            )
+        
+        if repair:
+            for user_id in drifted_users:
+                await self.ledger_repo.rebuild_checkpoints(user_id, self.checkpoint_interval)
+        
+        logger.info(
+            f"✅ Проверка журнала: {users_checked} пользователей, "
+            f"расхождений {len(drifts)} у {len(drifted_users)}"
+        )
+        
+        return {
+            'users_checked': users_checked,
+            'drifts': len(drifts),
+            'drifted_users': drifted_users,
+            'repaired': repair
+        }
@@ -1,29 +1,47 @@
 """
 Permission service - проверка прав доступа
 """
+import logging
 from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from domain.models.user import User
-from domain.models.permission import Permission, Role, has_permission, get_role_from_string
+from domain.models.permission import (
+    Permission, Role, PermissionMatrix, compile_permissions, get_permission_matrix
+)
 from core.exceptions import PermissionDeniedError
 from core.config import Config
+from core.request_context import RequestContext
+
+logger = logging.getLogger(__name__)
 
 
 class PermissionService:
     """Сервис для работы с правами доступа"""
     
+    @staticmethod
+    def reload() -> PermissionMatrix:
+        """
+        Пересобрать таблицы прав без перезапуска
+        
+        Список админов перечитывается из окружения (.env), матрица ролей -
+        из ROLE_PERMISSIONS.
+        """
+        matrix = compile_permissions(Config.reload_admin_ids())
+        logger.info(f"🔐 Таблицы прав пересобраны: админов {len(matrix.admin_ids)}")
+        return matrix
+    
     @staticmethod
     def check_permission(user: User, permission: Permission) -> bool:
         """Проверить есть ли право у пользователя"""
-        role = get_role_from_string(user.role)
-        return has_permission(role, permission)
+        matrix = get_permission_matrix()
+        return matrix.has_permission(matrix.role(user.role), permission)
     
     @staticmethod
     def is_admin_by_id(telegram_id: str) -> bool:
         """Проверить является ли пользователь админом по Telegram ID"""
-        return telegram_id in Config.TELEGRAM_ADMIN_IDS
+        return get_permission_matrix().is_admin(telegram_id)
     
     @staticmethod
     def require_admin_id():
@@ -74,16 +92,19 @@ class PermissionService:
                 if not hasattr(self, 'user_service'):
                     raise RuntimeError("Handler должен иметь user_service для проверки прав")
                 
-                user_tg = update.effective_user
+                # Пользователь загружается один раз на апдейт - handler
+                # получит его из того же контекста
+                ctx = RequestContext.of(update, context)
                 user = await self.user_service.get_or_create_user(
-                    str(user_tg.id),
-                    user_tg.username or 'Unknown',
-                    user_tg.first_name or ''
+                    ctx.telegram_id,
+                    ctx.username,
+                    ctx.first_name,
+                    ctx=ctx
                 )
                 
                 # Проверяем права
                 if not PermissionService.check_permission(user, permission):
-                    role = get_role_from_string(user.role)
+                    role = ctx.role
                     await update.message.reply_text(
                         f"❌ У тебя нет прав для этого действия\n"
                         f"Требуется: {permission.value}\n"
@@ -113,23 +134,20 @@ class PermissionService:
                 if not hasattr(self, 'user_service'):
                     raise RuntimeError("Handler должен иметь user_service для проверки прав")
                 
-                user_tg = update.effective_user
-                user = await self.user_service.get_or_create_user(
-                    str(user_tg.id),
-                    user_tg.username or 'Unknown',
-                    user_tg.first_name or ''
+                # Пользователь загружается один раз на апдейт - handler
+                # получит его из того же контекста
+                ctx = RequestContext.of(update, context)
+                await self.user_service.get_or_create_user(
+                    ctx.telegram_id,
+                    ctx.username,
+                    ctx.first_name,
+                    ctx=ctx
                 )
                 
-                # Проверяем роль
-                user_role = get_role_from_string(user.role)
-                
-                # Список ролей по приоритету
-                role_hierarchy = [Role.USER, Role.VIP, Role.MODERATOR, Role.ADMIN, Role.OWNER]
+                # Проверяем роль (уровни - из скомпилированной таблицы)
+                user_role = ctx.role
                 
-                user_level = role_hierarchy.index(user_role)
-                required_level = role_hierarchy.index(required_role)
-                
-                if user_level < required_level:
+                if not get_permission_matrix().has_role(user_role, required_role):
                     await update.message.reply_text(
                         f"❌ Недостаточно прав\n"
                         f"Требуется: {required_role.value}\n"
@@ -146,5 +164,9 @@ class PermissionService:
     async def get_user_permissions(user: User) -> list[Permission]:
         """Получить все права пользователя"""
         from domain.models.permission import get_role_permissions
-        role = get_role_from_string(user.role)
+        role = get_permission_matrix().role(user.role)
         return get_role_permissions(role)
+
+
+# Таблицы прав собираются один раз при загрузке сервиса
+compile_permissions(Config.TELEGRAM_ADMIN_IDS)
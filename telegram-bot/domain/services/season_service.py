@@ -8,6 +8,7 @@ import logging
 from domain.models.season import Season, SeasonProgress, SeasonReward, DEFAULT_SEASON_REWARDS
 from infrastructure.database.repositories.season_repository import SeasonRepository
 from domain.services.user_service import UserService
+from core.request_context import RequestContext
 
 logger = logging.getLogger(__name__)
 
@@ -20,12 +21,28 @@ class SeasonService:
         season_repo: SeasonRepository,
         user_service: UserService,
         achievement_service=None,  # Optional для обратной совместимости
-        discord_service=None  # Optional для обратной совместимости
+        discord_service=None,  # Optional для обратной совместимости
+        rank_index=None  # Optional: инкрементальный индекс рейтинга
     ):
         self.season_repo = season_repo
         self.user_service = user_service
         self.achievement_service = achievement_service
         self.discord_service = discord_service
+        self.rank_index = rank_index
+    
+    @property
+    def incremental_ranks(self) -> bool:
+        """Считаются ли ранги инкрементально (через индекс)"""
+        return self.rank_index is not None and self.rank_index.enabled
+    
+    async def _ensure_rank_index(self, season_id: int):
+        """Прогреть индекс рейтинга из БД при первом обращении к сезону"""
+        if await self.rank_index.is_loaded(season_id):
+            return
+        
+        scores = await self.season_repo.get_season_scores(season_id)
+        await self.rank_index.load(season_id, scores)
+        logger.info(f"Индекс рейтинга сезона {season_id} загружен: {len(scores)} участников")
     
     # ========================================================================
     # ПОЛУЧЕНИЕ СЕЗОНОВ
@@ -35,21 +52,28 @@ class SeasonService:
         """Получить активный сезон"""
         return await self.season_repo.get_active_season()
     
-    async def get_or_create_active_season(self) -> Season:
+    async def get_or_create_active_season(self, ctx: Optional[RequestContext] = None) -> Season:
         """
         Получить активный сезон или создать новый если нет
         
         Автоматически создаёт новый сезон если:
         - Нет активного сезона
         - Текущий сезон закончился
+        
+        С ctx сезон загружается один раз на апдейт.
         """
+        if ctx and ctx.season is not None:
+            return ctx.season
+        
         season = await self.get_active_season()
         
-        if season and season.is_active:
-            return season
+        if not (season and season.is_active):
+            # Создаём новый сезон
+            season = await self._create_next_season()
         
-        # Создаём новый сезон
-        return await self._create_next_season()
+        if ctx:
+            ctx.season = season
+        return season
     
     async def _create_next_season(self) -> Season:
         """Создать следующий сезон"""
@@ -81,7 +105,8 @@ class SeasonService:
     async def get_user_progress(
         self,
         user_id: int,
-        season_id: Optional[int] = None
+        season_id: Optional[int] = None,
+        ctx: Optional[RequestContext] = None
     ) -> SeasonProgress:
         """
         Получить прогресс пользователя в сезоне
@@ -89,12 +114,42 @@ class SeasonService:
         Args:
             user_id: ID пользователя
             season_id: ID сезона (если None - активный сезон)
+            ctx: Контекст апдейта (активный сезон без повторной загрузки)
+        """
+        if season_id is None:
+            season = await self.get_or_create_active_season(ctx)
+            season_id = season.id
+        
+        progress = await self.season_repo.get_or_create_progress(user_id, season_id)
+        
+        # Позиция считается на чтении, колонка rank обновляется только в конце сезона
+        if self.incremental_ranks:
+            progress.rank = await self.get_user_rank(user_id, season_id)
+        
+        return progress
+    
+    async def get_user_rank(
+        self,
+        user_id: int,
+        season_id: Optional[int] = None,
+        ctx: Optional[RequestContext] = None
+    ) -> Optional[int]:
+        """
+        Получить позицию пользователя в рейтинге сезона
+        
+        В инкрементальном режиме считается по индексу, иначе берётся
+        последнее сохранённое значение rank.
         """
         if season_id is None:
-            season = await self.get_or_create_active_season()
+            season = await self.get_or_create_active_season(ctx)
             season_id = season.id
         
-        return await self.season_repo.get_or_create_progress(user_id, season_id)
+        if not self.incremental_ranks:
+            progress = await self.season_repo.get_or_create_progress(user_id, season_id)
+            return progress.rank
+        
+        await self._ensure_rank_index(season_id)
+        return await self.rank_index.get_rank(season_id, user_id)
     
     async def add_season_xp(
         self,
@@ -102,20 +157,21 @@ class SeasonService:
         xp: int,
         coins: int = 0,
         game_played: bool = False,
-        game_won: bool = False
+        game_won: bool = False,
+        ctx: Optional[RequestContext] = None
     ):
         """
         Добавить XP/монеты в сезонный прогресс
         
         Вызывается после каждой игры/активности
         """
-        season = await self.get_or_create_active_season()
+        season = await self.get_or_create_active_season(ctx)
         
         # Обновляем стрик
         await self._update_streak(user_id, season.id)
         
         # Обновляем прогресс
-        await self.season_repo.update_progress(
+        season_xp = await self.season_repo.update_progress(
             user_id=user_id,
             season_id=season.id,
             season_xp=xp,
@@ -125,9 +181,14 @@ class SeasonService:
             last_activity_date=datetime.now()
         )
         
+        # Обновляем индекс рейтинга
+        if self.incremental_ranks and season_xp is not None:
+            await self._ensure_rank_index(season.id)
+            await self.rank_index.set_score(season.id, user_id, season_xp)
+        
         # Проверяем достижения за сезоны
         if self.achievement_service:
-            progress = await self.season_repo.get_or_create_progress(user_id, season.id)
+            progress = await self.get_user_progress(user_id, season.id, ctx)
             await self.achievement_service.check_season_achievements(
                 user_id=user_id,
                 season_games=progress.games_played,
@@ -193,7 +254,8 @@ class SeasonService:
     async def get_season_leaderboard(
         self,
         season_id: Optional[int] = None,
-        limit: int = 50
+        limit: int = 50,
+        ctx: Optional[RequestContext] = None
     ) -> List[Tuple[SeasonProgress, str, str]]:
         """
         Получить рейтинг сезона
@@ -202,21 +264,35 @@ class SeasonService:
             List of (SeasonProgress, username, first_name)
         """
         if season_id is None:
-            season = await self.get_or_create_active_season()
+            season = await self.get_or_create_active_season(ctx)
             season_id = season.id
         
-        return await self.season_repo.get_season_leaderboard(season_id, limit)
+        leaderboard = await self.season_repo.get_season_leaderboard(season_id, limit)
+        
+        # Порядок выборки совпадает с порядком индекса - позиция и есть ранг
+        if self.incremental_ranks:
+            for position, (progress, _, _) in enumerate(leaderboard, 1):
+                progress.rank = position
+        
+        return leaderboard
     
     async def update_all_ranks(self):
         """
         Обновить ранги всех пользователей в активном сезоне
         
-        Вызывается периодически (например, каждый час)
+        Вызывается периодически (например, каждый час).
+        В инкрементальном режиме ничего не пишет: ранги считаются на чтении
+        и сохраняются в БД только при завершении сезона.
         """
         season = await self.get_active_season()
         if not season:
             return
         
+        if self.incremental_ranks:
+            await self._ensure_rank_index(season.id)
+            logger.debug(f"Ранги сезона #{season.number} считаются инкрементально")
+            return
+        
         await self.season_repo.update_ranks(season.id)
         logger.info(f"Обновлены ранги для сезона #{season.number}")
     
@@ -272,6 +348,10 @@ class SeasonService:
         # Меняем статус сезона
         await self.season_repo.update_season_status(season.id, 'ended')
         
+        # Финальные ранги сохранены в БД - индекс сезона больше не нужен
+        if self.incremental_ranks:
+            await self.rank_index.drop(season.id)
+        
         logger.info(
             f"✅ Сезон #{season.number} завершён. "
             f"Награды выданы: {rewards_given} игрокам"
@@ -327,10 +407,14 @@ class SeasonService:
     # СТАТИСТИКА
     # ========================================================================
     
-    async def get_season_stats(self, season_id: Optional[int] = None) -> dict:
+    async def get_season_stats(
+        self,
+        season_id: Optional[int] = None,
+        ctx: Optional[RequestContext] = None
+    ) -> dict:
         """Получить статистику сезона"""
         if season_id is None:
-            season = await self.get_or_create_active_season()
+            season = await self.get_or_create_active_season(ctx)
             season_id = season.id
         else:
             season = await self.season_repo.get_season_by_id(season_id)
@@ -1,7 +1,7 @@
 """
 Sync Service - бизнес-логика двусторонней синхронизации
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import logging
 from datetime import datetime
 
@@ -24,11 +24,60 @@ class SyncService:
         self,
         sync_repo: SyncRepository,
         user_repo: UserRepository,
-        discord_repo: DiscordRepository
+        discord_repo: DiscordRepository,
+        idempotency_cache=None,
+        ledger_service=None
     ):
+        """
+        Args:
+            idempotency_cache: IdempotencyCache перед create_event (опционально)
+            ledger_service: LedgerService для контрольных точек баланса (опционально)
+        """
         self.sync_repo = sync_repo
         self.user_repo = user_repo
         self.discord_repo = discord_repo
+        self.idempotency_cache = idempotency_cache
+        self.ledger_service = ledger_service
+    
+    async def _create_event(
+        self,
+        idempotency_key: str,
+        source: str,
+        event_type: str,
+        user_id: int,
+        payload: Dict[str, Any]
+    ) -> Tuple[SyncEvent, bool]:
+        """
+        Создать событие через кэш идемпотентности
+        
+        Returns:
+            (событие, cached) - cached=True если событие взято из кэша
+            и его транзакция уже записана этим процессом
+        """
+        cache = self.idempotency_cache
+        
+        if cache is None:
+            event = await self.sync_repo.create_event(
+                idempotency_key, source, event_type, user_id, payload
+            )
+            return event, False
+        
+        event = cache.get(idempotency_key)
+        if event is not None:
+            logger.info(f"🔄 Событие уже существует (кэш): {idempotency_key}")
+            return event, True
+        
+        # Bloom-фильтр: ключ мог быть - сначала читаем, иначе сразу вставляем
+        if await cache.maybe_seen(idempotency_key):
+            event = await self.sync_repo.get_event_by_idempotency_key(idempotency_key)
+        
+        if event is None:
+            event = await self.sync_repo.create_event(
+                idempotency_key, source, event_type, user_id, payload
+            )
+        
+        await cache.remember(event)
+        return event, False
     
     # ========================================================================
     # СОЗДАНИЕ СОБЫТИЙ
@@ -65,7 +114,7 @@ class SyncService:
         )
         
         # Создаём событие
-        event = await self.sync_repo.create_event(
+        event, cached = await self._create_event(
             idempotency_key=idempotency_key,
             source=source,
             event_type=EventType.XP_CHANGE.value,
@@ -77,17 +126,20 @@ class SyncService:
             }
         )
         
-        # Создаём транзакцию для аудита
-        await self.sync_repo.create_transaction(
-            idempotency_key=idempotency_key,
-            user_id=user_id,
-            source=source,
-            type='xp',
-            delta_xp=delta_xp,
-            delta_balance=0,
-            reason=reason,
-            metadata={'entity_id': entity_id}
-        )
+        # Создаём транзакцию для аудита (событие из кэша уже записано с ней)
+        if not cached:
+            await self.sync_repo.create_transaction(
+                idempotency_key=idempotency_key,
+                user_id=user_id,
+                source=source,
+                type='xp',
+                delta_xp=delta_xp,
+                delta_balance=0,
+                reason=reason,
+                metadata={'entity_id': entity_id}
+            )
+            if self.ledger_service:
+                await self.ledger_service.record(user_id)
         
         logger.info(
             f"📝 Событие XP создано: user={user_id}, delta={delta_xp}, "
@@ -125,7 +177,7 @@ class SyncService:
             user_id=user_id
         )
         
-        event = await self.sync_repo.create_event(
+        event, cached = await self._create_event(
             idempotency_key=idempotency_key,
             source=source,
             event_type=EventType.BALANCE_CHANGE.value,
@@ -137,16 +189,19 @@ class SyncService:
             }
         )
         
-        await self.sync_repo.create_transaction(
-            idempotency_key=idempotency_key,
-            user_id=user_id,
-            source=source,
-            type='balance',
-            delta_xp=0,
-            delta_balance=delta_balance,
-            reason=reason,
-            metadata={'entity_id': entity_id}
-        )
+        if not cached:
+            await self.sync_repo.create_transaction(
+                idempotency_key=idempotency_key,
+                user_id=user_id,
+                source=source,
+                type='balance',
+                delta_xp=0,
+                delta_balance=delta_balance,
+                reason=reason,
+                metadata={'entity_id': entity_id}
+            )
+            if self.ledger_service:
+                await self.ledger_service.record(user_id)
         
         logger.info(
             f"📝 Событие баланса создано: user={user_id}, "
@@ -183,7 +238,7 @@ class SyncService:
             timestamp=int(datetime.now().timestamp())
         )
         
-        event = await self.sync_repo.create_event(
+        event, _ = await self._create_event(
             idempotency_key=idempotency_key,
             source=source,
             event_type=EventType.RANK_CHANGE.value,
@@ -225,7 +280,7 @@ class SyncService:
             user_id=user_id
         )
         
-        event = await self.sync_repo.create_event(
+        event, _ = await self._create_event(
             idempotency_key=idempotency_key,
             source=source,
             event_type=EventType.ACHIEVEMENT_UNLOCK.value,
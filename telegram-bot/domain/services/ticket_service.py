@@ -1,7 +1,8 @@
 """
 Ticket service - бизнес-логика тикетов
 """
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Tuple
 
 from domain.models.ticket import (
     Ticket, TicketMessage, TicketStats,
@@ -66,19 +67,21 @@ class TicketService:
         self,
         user_id: int,
         status: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        before: Optional[Tuple[datetime, int]] = None
     ) -> List[Ticket]:
-        """Получить тикеты пользователя"""
-        return await self.ticket_repo.get_user_tickets(user_id, status, limit)
+        """Получить тикеты пользователя (before - page_cursor последнего тикета страницы)"""
+        return await self.ticket_repo.get_user_tickets(user_id, status, limit, before)
     
     async def get_all_tickets(
         self,
         status: Optional[str] = None,
         priority: Optional[str] = None,
-        limit: int = 50
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None
     ) -> List[Ticket]:
-        """Получить все тикеты (для админов)"""
-        return await self.ticket_repo.get_all_tickets(status, priority, limit)
+        """Получить все тикеты (для админов, before - page_cursor последнего тикета страницы)"""
+        return await self.ticket_repo.get_all_tickets(status, priority, limit, before)
     
     async def close_ticket(self, ticket_id: int) -> Ticket:
         """Закрыть тикет"""
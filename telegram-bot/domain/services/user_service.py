@@ -8,14 +8,21 @@ from domain.models.user import User, Rank, get_rank_by_id, calculate_rank_by_xp,
 from infrastructure.database.repositories.user_repository import UserRepository
 from core.exceptions import UserNotFoundError, CooldownError
 from core.config import Config
+from core.request_context import RequestContext
+
+# Поколение кэша таблиц лидеров: ключи вида leaderboard:v{поколение}:...
+# Инвалидация - один INCR; старые ключи истекают по TTL
+LEADERBOARD_VERSION_KEY = "leaderboard:version"
 
 
 class UserService:
     """Сервис для работы с пользователями"""
     
-    def __init__(self, user_repo: UserRepository, cache=None):
+    def __init__(self, user_repo: UserRepository, cache=None, activity_tracker=None):
         self.user_repo = user_repo
         self.cache = cache
+        # ActivityTracker: last_active пишется пачками, а не на каждый апдейт
+        self.activity_tracker = activity_tracker
     
     async def _get_from_cache(self, key: str):
         """Получить из кэша"""
@@ -28,47 +35,90 @@ class UserService:
         if self.cache:
             await self.cache.set(key, value, ttl)
     
-    async def _invalidate_cache(self, telegram_id: str):
-        """Инвалидировать кэш пользователя"""
-        if self.cache:
-            await self.cache.delete(f"user:profile:{telegram_id}")
-            await self.cache.invalidate_pattern("leaderboard:*")
+    async def _leaderboard_version(self) -> int:
+        """Текущее поколение кэша таблиц лидеров"""
+        return await self._get_from_cache(LEADERBOARD_VERSION_KEY) or 0
+    
+    async def _invalidate_cache(self, telegram_id: str, old_xp: Optional[int] = None,
+                                new_xp: Optional[int] = None):
+        """
+        Инвалидировать кэш пользователя
+        
+        Таблицы лидеров сбрасываются (INCR поколения), только если изменение
+        XP может их затронуть: пользователь был или стал не ниже порога -
+        наименьшего XP среди закэшированных топов текущего поколения.
+        """
+        if not self.cache:
+            return
+        
+        await self.cache.delete(f"user:profile:{telegram_id}")
+        
+        version = await self._leaderboard_version()
+        floor = await self._get_from_cache(f"leaderboard:v{version}:floor")
+        if floor is None:
+            return  # В этом поколении топы ещё не кэшировались
+        
+        if old_xp is not None and new_xp is not None and max(old_xp, new_xp) < floor:
+            return  # Пользователь далеко от топа
+        
+        await self.cache.incr(LEADERBOARD_VERSION_KEY)
     
     async def get_or_create_user(
         self,
         telegram_id: str,
         username: str,
-        first_name: str
+        first_name: str,
+        ctx: Optional[RequestContext] = None
     ) -> User:
-        """Получить или создать пользователя"""
+        """
+        Получить или создать пользователя
+        
+        С ctx пользователь загружается один раз на апдейт: повторные вызовы
+        (декораторы прав, handler, сервисы) берут его из контекста.
+        """
+        if ctx and ctx.user_for(telegram_id):
+            return ctx.user
+        
         user = await self.user_repo.get_by_telegram_id(telegram_id)
         
         if not user:
             user = await self.user_repo.create(telegram_id, username, first_name)
             print(f"✨ Новый пользователь: {username} ({telegram_id})")
+        elif self.activity_tracker:
+            # last_active запишется вместе с остальными через несколько секунд
+            user.last_active = self.activity_tracker.touch(user.id)
         else:
             # Обновляем last_active
             await self.user_repo.update_last_active(user.id)
         
+        if ctx:
+            ctx.remember_user(user)
         return user
     
-    async def get_user(self, telegram_id: str) -> User:
-        """Получить пользователя"""
+    async def get_user(self, telegram_id: str, ctx: Optional[RequestContext] = None) -> User:
+        """Получить пользователя (с ctx - один раз на апдейт)"""
+        if ctx and ctx.user_for(telegram_id):
+            return ctx.user
+        
         user = await self.user_repo.get_by_telegram_id(telegram_id)
         if not user:
             raise UserNotFoundError(f"Пользователь {telegram_id} не найден")
+        
+        if ctx:
+            ctx.remember_user(user)
         return user
     
-    async def add_xp(self, telegram_id: str, amount: int) -> dict:
+    async def add_xp(self, telegram_id: str, amount: int, ctx: Optional[RequestContext] = None) -> dict:
         """Добавить XP пользователю"""
-        user = await self.get_user(telegram_id)
+        user = await self.get_user(telegram_id, ctx)
         old_rank_id = user.rank_id
+        old_xp = user.xp
         
         # Обновляем XP
         user = await self.user_repo.update_xp(user.id, amount)
         
         # Инвалидируем кэш
-        await self._invalidate_cache(telegram_id)
+        await self._invalidate_cache(telegram_id, old_xp, user.xp)
         
         # Проверяем повышение ранга
         new_rank = calculate_rank_by_xp(user.xp)
@@ -78,6 +128,8 @@ class UserService:
             user.rank_id = new_rank.id
             user.coins += new_rank.reward_coins
             user = await self.user_repo.update(user)
+            if ctx:
+                ctx.remember_user(user)
             
             return {
                 'xp': user.xp,
@@ -87,6 +139,9 @@ class UserService:
                 'reward_coins': new_rank.reward_coins
             }
         
+        if ctx:
+            ctx.remember_user(user)
+        
         return {
             'xp': user.xp,
             'rank_up': False,
@@ -94,20 +149,24 @@ class UserService:
             'new_rank': get_rank_by_id(user.rank_id)
         }
     
-    async def add_coins(self, telegram_id: str, amount: int) -> int:
+    async def add_coins(self, telegram_id: str, amount: int, ctx: Optional[RequestContext] = None) -> int:
         """Добавить монеты пользователю"""
-        user = await self.get_user(telegram_id)
+        user = await self.get_user(telegram_id, ctx)
         user = await self.user_repo.update_coins(user.id, amount)
+        if ctx:
+            ctx.remember_user(user)
         return user.coins
     
-    async def remove_coins(self, telegram_id: str, amount: int) -> bool:
+    async def remove_coins(self, telegram_id: str, amount: int, ctx: Optional[RequestContext] = None) -> bool:
         """Убрать монеты у пользователя"""
-        user = await self.get_user(telegram_id)
+        user = await self.get_user(telegram_id, ctx)
         
         if user.coins < amount:
             return False
         
-        await self.user_repo.update_coins(user.id, -amount)
+        user = await self.user_repo.update_coins(user.id, -amount)
+        if ctx:
+            ctx.remember_user(user)
         return True
     
     async def can_claim_daily(self, telegram_id: str) -> bool:
@@ -120,43 +179,60 @@ class UserService:
         time_diff = (datetime.now() - user.last_daily).total_seconds()
         return time_diff >= (Config.DAILY_COOLDOWN_HOURS * 3600)
     
-    async def claim_daily(self, telegram_id: str) -> dict:
-        """Получить ежедневную награду"""
-        user = await self.get_user(telegram_id)
+    async def claim_daily(self, telegram_id: str, ctx: Optional[RequestContext] = None) -> dict:
+        """
+        Получить ежедневную награду
+        
+        Проверка кулдауна, XP, монеты, ранг, стрик и last_daily - один
+        условный UPDATE: два быстрых нажатия не дадут награду дважды.
+        """
+        claimed = await self.user_repo.claim_daily(
+            telegram_id,
+            xp=Config.DAILY_REWARD_XP,
+            coins=Config.DAILY_REWARD_COINS,
+            cooldown=timedelta(hours=Config.DAILY_COOLDOWN_HOURS),
+            streak_window=timedelta(hours=Config.DAILY_STREAK_WINDOW_HOURS),
+            rank_thresholds=[rank.required_xp for rank in RANKS],
+            rank_rewards=[rank.reward_coins for rank in RANKS]
+        )
         
-        # Проверяем кулдаун
-        if user.last_daily:
-            time_diff = (datetime.now() - user.last_daily).total_seconds()
-            cooldown_seconds = Config.DAILY_COOLDOWN_HOURS * 3600
+        if claimed is None:
+            # Награду не выдали: пользователя нет или кулдаун ещё идёт
+            user = await self.user_repo.get_by_telegram_id(telegram_id)
+            if not user:
+                raise UserNotFoundError(f"Пользователь {telegram_id} не найден")
             
-            if time_diff < cooldown_seconds:
-                time_left = int(cooldown_seconds - time_diff)
-                hours = time_left // 3600
-                minutes = (time_left % 3600) // 60
-                raise CooldownError(
-                    f'Ты уже получил награду! Следующая через {hours}ч {minutes}м',
-                    time_left
-                )
-        
-        # Начисляем награды
-        xp_result = await self.add_xp(telegram_id, Config.DAILY_REWARD_XP)
-        coins = await self.add_coins(telegram_id, Config.DAILY_REWARD_COINS)
-        
-        # Обновляем last_daily
-        user.last_daily = datetime.now()
-        await self.user_repo.update(user)
+            time_left = 0
+            if user.last_daily:
+                cooldown_seconds = Config.DAILY_COOLDOWN_HOURS * 3600
+                time_left = max(int(cooldown_seconds - (datetime.now() - user.last_daily).total_seconds()), 0)
+            hours = time_left // 3600
+            minutes = (time_left % 3600) // 60
+            raise CooldownError(
+                f'Ты уже получил награду! Следующая через {hours}ч {minutes}м',
+                time_left
+            )
         
+        user, old_rank_id = claimed
+        if ctx:
+            ctx.remember_user(user)
+        
+        await self._invalidate_cache(telegram_id, user.xp - Config.DAILY_REWARD_XP, user.xp)
+        
+        rank_up = user.rank_id > old_rank_id
         return {
             'success': True,
             'xp': Config.DAILY_REWARD_XP,
             'coins': Config.DAILY_REWARD_COINS,
-            'rank_up': xp_result['rank_up'],
-            'new_rank': xp_result['new_rank'] if xp_result['rank_up'] else None
+            'streak': user.daily_streak,
+            'rank_up': rank_up,
+            'new_rank': get_rank_by_id(user.rank_id) if rank_up else None
         }
     
     async def get_leaderboard(self, limit: int = 10) -> List[User]:
         """Получить таблицу лидеров (с кэшированием)"""
-        cache_key = f"leaderboard:{limit}"
+        version = await self._leaderboard_version()
+        cache_key = f"leaderboard:v{version}:{limit}"
         
         # Проверяем кэш
         cached = await self._get_from_cache(cache_key)
@@ -173,27 +249,38 @@ class UserService:
             Config.CACHE_TTL_LEADERBOARD
         )
         
+        # Порог попадания в топ: XP последнего места (если топ неполный -
+        # попасть в него может любой). Храним минимум по всем закэшированным
+        # топам поколения и продлеваем TTL, чтобы порог жил не меньше них
+        floor = users[-1].xp if users and len(users) >= limit else -1
+        floor_key = f"leaderboard:v{version}:floor"
+        current_floor = await self._get_from_cache(floor_key)
+        if current_floor is not None:
+            floor = min(floor, current_floor)
+        await self._set_to_cache(floor_key, floor, Config.CACHE_TTL_LEADERBOARD)
+        
         return users
     
-    async def get_user_rank(self, telegram_id: str) -> Rank:
+    async def get_user_rank(self, telegram_id: str, ctx: Optional[RequestContext] = None) -> Rank:
         """Получить ранг пользователя"""
-        user = await self.get_user(telegram_id)
+        user = await self.get_user(telegram_id, ctx)
         return get_rank_by_id(user.rank_id)
     
-    async def get_next_rank(self, telegram_id: str) -> Optional[Rank]:
+    async def get_next_rank(self, telegram_id: str, ctx: Optional[RequestContext] = None) -> Optional[Rank]:
         """Получить следующий ранг"""
-        user = await self.get_user(telegram_id)
+        user = await self.get_user(telegram_id, ctx)
         
         if user.rank_id >= len(RANKS):
             return None  # Максимальный ранг
         
         return RANKS[user.rank_id]  # Следующий ранг
     
-    async def get_rank_progress(self, telegram_id: str) -> dict:
+    async def get_rank_progress(self, telegram_id: str, ctx: Optional[RequestContext] = None) -> dict:
         """Получить прогресс до следующего ранга"""
-        user = await self.get_user(telegram_id)
+        user = await self.get_user(telegram_id, ctx)
         current_rank = get_rank_by_id(user.rank_id)
-        next_rank = await self.get_next_rank(telegram_id)
+        # Следующий ранг - по уже загруженному пользователю, без второго запроса
+        next_rank = RANKS[user.rank_id] if user.rank_id < len(RANKS) else None
         
         if not next_rank:
             return {
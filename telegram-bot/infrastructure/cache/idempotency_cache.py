@@ -0,0 +1,151 @@
+"""
+Idempotency cache - кэш ключей идемпотентности событий синхронизации
+
+Два уровня перед SyncRepository.create_event:
+- LRU последних событий: повтор ключа отдаётся без обращения к БД
+- Bloom-фильтр всех ключей процесса: ключ, вытесненный из LRU, идёт сразу
+  на чтение из БД вместо попытки вставки
+
+Опционально Redis - общий признак "ключ уже видели" для нескольких реплик.
+"""
+import hashlib
+import math
+from collections import OrderedDict
+from typing import Optional
+
+
+class BloomFilter:
+    """
+    Bloom-фильтр фиксированного размера
+    
+    Ложноположительные срабатывания возможны (с вероятностью error_rate),
+    ложноотрицательные - нет.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, key: str):
+        """Позиции битов ключа (double hashing по blake2b)"""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+    
+    def add(self, key: str):
+        """Добавить ключ"""
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+    
+    @property
+    def is_full(self) -> bool:
+        """Превышена ли расчётная ёмкость (растёт доля ложных срабатываний)"""
+        return self.count >= self.capacity
+
+
+class IdempotencyCache:
+    """Bloom-фильтр + LRU (+ опционально Redis) для ключей идемпотентности"""
+    
+    def __init__(
+        self,
+        lru_size: int = 10000,
+        bloom_capacity: int = 100000,
+        bloom_error_rate: float = 0.01,
+        redis_cache=None,
+        redis_ttl: int = 86400
+    ):
+        """
+        Args:
+            lru_size: Сколько последних событий держать целиком
+            bloom_capacity: Ёмкость одного поколения Bloom-фильтра
+            bloom_error_rate: Допустимая доля ложных срабатываний
+            redis_cache: RedisCache для общего признака между репликами
+            redis_ttl: Сколько хранить ключ в Redis (секунды)
+        """
+        self.lru_size = lru_size
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.redis_cache = redis_cache
+        self.redis_ttl = redis_ttl
+        
+        self._events = OrderedDict()
+        
+        # Два поколения фильтра: заполненный уходит в previous, затем отбрасывается
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._previous_bloom: Optional[BloomFilter] = None
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def _redis(self):
+        if self.redis_cache and self.redis_cache.enabled:
+            return self.redis_cache.redis
+        return None
+    
+    def _redis_key(self, idempotency_key: str) -> str:
+        return f"sync:idem:{idempotency_key}"
+    
+    def get(self, idempotency_key: str):
+        """Событие из LRU или None"""
+        event = self._events.get(idempotency_key)
+        
+        if event is None:
+            self.misses += 1
+            return None
+        
+        self._events.move_to_end(idempotency_key)
+        self.hits += 1
+        return event
+    
+    async def maybe_seen(self, idempotency_key: str) -> bool:
+        """
+        Мог ли ключ уже использоваться
+        
+        False - ключ точно новый для этого процесса (и для Redis, если подключён).
+        """
+        if idempotency_key in self._bloom:
+            return True
+        
+        if self._previous_bloom is not None and idempotency_key in self._previous_bloom:
+            return True
+        
+        redis = self._redis
+        if redis is not None:
+            try:
+                return bool(await redis.exists(self._redis_key(idempotency_key)))
+            except Exception:
+                # Redis недоступен - считаем что ключ мог быть (безопасный путь через БД)
+                return True
+        
+        return False
+    
+    async def remember(self, event):
+        """Запомнить событие после вставки или чтения из БД"""
+        key = event.idempotency_key
+        
+        self._events[key] = event
+        self._events.move_to_end(key)
+        while len(self._events) > self.lru_size:
+            self._events.popitem(last=False)
+        
+        if key not in self._bloom:
+            if self._bloom.is_full:
+                self._previous_bloom = self._bloom
+                self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            self._bloom.add(key)
+        
+        redis = self._redis
+        if redis is not None:
+            try:
+                await redis.set(self._redis_key(key), event.id, ex=self.redis_ttl)
+            except Exception:
+                pass
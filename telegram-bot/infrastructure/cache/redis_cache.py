@@ -2,6 +2,7 @@
 Redis cache implementation
 """
 import json
+import time
 from typing import Optional, Any
 try:
     import redis.asyncio as redis
@@ -74,8 +75,24 @@ class RedisCache:
         except Exception as e:
             print(f"⚠️  Ошибка удаления из Redis: {e}")
     
+    async def incr(self, key: str) -> Optional[int]:
+        """Атомарно увеличить счётчик (ключ без TTL), вернуть новое значение"""
+        if not self.enabled or not self.redis:
+            return None
+        
+        try:
+            return await self.redis.incr(key)
+        except Exception as e:
+            print(f"⚠️  Ошибка INCR в Redis: {e}")
+            return None
+    
     async def invalidate_pattern(self, pattern: str):
-        """Инвалидировать по паттерну"""
+        """
+        Инвалидировать по паттерну
+        
+        SCAN по всему keyspace - только для редких административных
+        операций; на горячих путях используйте версионированные ключи (incr).
+        """
         if not self.enabled or not self.redis:
             return
         
@@ -93,9 +110,14 @@ class RedisCache:
 class MemoryCache:
     """Простой in-memory кэш (fallback если Redis недоступен)"""
     
+    # Как часто (сек) set() вычищает истёкшие ключи
+    SWEEP_INTERVAL = 60
+    
     def __init__(self):
         self.cache = {}
+        self.expires = {}  # ключ -> time.monotonic() истечения (у счётчиков нет)
         self.enabled = True
+        self._next_sweep = time.monotonic() + self.SWEEP_INTERVAL
         print("✅ Используется MemoryCache (fallback)")
     
     async def connect(self):
@@ -106,17 +128,45 @@ class MemoryCache:
         """Заглушка для совместимости"""
         pass
     
+    def _expired(self, key: str, now: float) -> bool:
+        """Ключ истёк - удалить его"""
+        deadline = self.expires.get(key)
+        if deadline is None or deadline > now:
+            return False
+        self.cache.pop(key, None)
+        del self.expires[key]
+        return True
+    
+    def _sweep(self, now: float):
+        """Удалить все истёкшие ключи (старые поколения leaderboard:v{N}:* и т.п.)"""
+        for key in [k for k, deadline in self.expires.items() if deadline <= now]:
+            self._expired(key, now)
+        self._next_sweep = now + self.SWEEP_INTERVAL
+    
     async def get(self, key: str) -> Optional[Any]:
         """Получить из памяти"""
+        if self._expired(key, time.monotonic()):
+            return None
         return self.cache.get(key)
     
     async def set(self, key: str, value: Any, ttl: int = 300):
-        """Сохранить в память (TTL игнорируется)"""
+        """Сохранить в память на ttl секунд"""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
         self.cache[key] = value
+        self.expires[key] = now + ttl
     
     async def delete(self, key: str):
         """Удалить из памяти"""
         self.cache.pop(key, None)
+        self.expires.pop(key, None)
+    
+    async def incr(self, key: str) -> int:
+        """Увеличить счётчик (ключ без TTL), вернуть новое значение"""
+        self._expired(key, time.monotonic())
+        self.cache[key] = self.cache.get(key, 0) + 1
+        return self.cache[key]
     
     async def invalidate_pattern(self, pattern: str):
         """Инвалидировать по паттерну"""
@@ -125,3 +175,4 @@ class MemoryCache:
         keys_to_delete = [k for k in self.cache.keys() if pattern in k]
         for key in keys_to_delete:
             del self.cache[key]
+            self.expires.pop(key, None)
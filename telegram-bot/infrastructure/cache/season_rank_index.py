@@ -0,0 +1,190 @@
+"""
+Season rank index - инкрементальный индекс сезонного рейтинга
+
+Вместо периодического пересчёта `rank` для всех строк season_progress
+(ROW_NUMBER + UPDATE каждой строки) держим упорядоченный индекс season_xp,
+который обновляется при каждом изменении прогресса. Позиция вычисляется
+при чтении, а в БД ранги записываются только при завершении сезона.
+"""
+import bisect
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class MemorySeasonRankIndex:
+    """
+    In-memory индекс рейтинга (один процесс)
+    
+    Для каждого сезона хранит отсортированный список ключей
+    (-season_xp, user_id) - тот же порядок, что и в
+    SeasonRepository.get_season_leaderboard (XP по убыванию, затем user_id).
+    """
+    
+    def __init__(self):
+        self._entries: Dict[int, List[Tuple[int, int]]] = {}
+        self._scores: Dict[int, Dict[int, int]] = {}
+        self.enabled = True
+    
+    async def is_loaded(self, season_id: int) -> bool:
+        """Загружен ли сезон в индекс"""
+        return season_id in self._scores
+    
+    async def load(self, season_id: int, scores: Iterable[Tuple[int, int]]):
+        """Полностью загрузить сезон: scores - пары (user_id, season_xp)"""
+        season_scores = {user_id: xp for user_id, xp in scores}
+        self._scores[season_id] = season_scores
+        self._entries[season_id] = sorted(
+            (-xp, user_id) for user_id, xp in season_scores.items()
+        )
+    
+    async def set_score(self, season_id: int, user_id: int, season_xp: int):
+        """Установить текущий season_xp пользователя"""
+        scores = self._scores.setdefault(season_id, {})
+        entries = self._entries.setdefault(season_id, [])
+        
+        old_xp = scores.get(user_id)
+        if old_xp == season_xp:
+            return
+        
+        if old_xp is not None:
+            pos = bisect.bisect_left(entries, (-old_xp, user_id))
+            del entries[pos]
+        
+        bisect.insort(entries, (-season_xp, user_id))
+        scores[user_id] = season_xp
+    
+    async def get_rank(self, season_id: int, user_id: int) -> Optional[int]:
+        """Позиция пользователя (с 1) или None если его нет в сезоне"""
+        xp = self._scores.get(season_id, {}).get(user_id)
+        if xp is None:
+            return None
+        return bisect.bisect_left(self._entries[season_id], (-xp, user_id)) + 1
+    
+    async def get_top(self, season_id: int, limit: int) -> List[Tuple[int, int]]:
+        """Топ сезона: список (user_id, season_xp)"""
+        return [
+            (user_id, -neg_xp)
+            for neg_xp, user_id in self._entries.get(season_id, [])[:limit]
+        ]
+    
+    async def count(self, season_id: int) -> int:
+        """Количество участников сезона"""
+        return len(self._scores.get(season_id, {}))
+    
+    async def drop(self, season_id: int):
+        """Удалить сезон из индекса"""
+        self._scores.pop(season_id, None)
+        self._entries.pop(season_id, None)
+
+
+class RedisSeasonRankIndex:
+    """
+    Индекс рейтинга на Redis sorted set (общий для нескольких реплик)
+    
+    Ключ season:{id}:xp, score = season_xp. При равном score Redis
+    упорядочивает по member, а ZREVRANK/ZREVRANGE - по убыванию member,
+    поэтому member - дополнение user_id до MEMBER_BASE фиксированной
+    ширины: по убыванию member = по возрастанию user_id, как в
+    SeasonRepository.get_season_leaderboard.
+    
+    Отдельный ключ season:{id}:xp:loaded отмечает загруженный сезон
+    (пустой sorted set в Redis не хранится).
+    """
+    
+    LOAD_CHUNK_SIZE = 5000
+    
+    # Временный ключ загрузки живёт не дольше (если загрузка оборвалась)
+    LOAD_TTL = 600
+    
+    MEMBER_BASE = 10 ** 19 - 1
+    MEMBER_WIDTH = 19
+    
+    def __init__(self, cache):
+        """
+        Args:
+            cache: подключённый RedisCache
+        """
+        self.cache = cache
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache.enabled and self.cache.redis)
+    
+    def _key(self, season_id: int) -> str:
+        return f"season:{season_id}:xp"
+    
+    def _loaded_key(self, season_id: int) -> str:
+        return f"season:{season_id}:xp:loaded"
+    
+    def _member(self, user_id: int) -> str:
+        return f"{self.MEMBER_BASE - user_id:0{self.MEMBER_WIDTH}d}"
+    
+    def _user_id(self, member: str) -> int:
+        return self.MEMBER_BASE - int(member)
+    
+    async def is_loaded(self, season_id: int) -> bool:
+        """Загружен ли сезон в индекс"""
+        return bool(await self.cache.redis.exists(self._loaded_key(season_id)))
+    
+    async def load(self, season_id: int, scores: Iterable[Tuple[int, int]]):
+        """
+        Полностью загрузить сезон: scores - пары (user_id, season_xp)
+        
+        Загрузка идёт во временный ключ, который затем одной транзакцией
+        подменяет рабочий: читатели не видят частично загруженный сезон.
+        set_score, пришедшие во время загрузки, не теряются - при подмене
+        из двух значений берётся большее (season_xp только растёт).
+        """
+        key = self._key(season_id)
+        temp_key = f"{key}:load:{uuid.uuid4().hex}"
+        loaded = False
+        
+        chunk = {}
+        for user_id, xp in scores:
+            chunk[self._member(user_id)] = xp
+            if len(chunk) >= self.LOAD_CHUNK_SIZE:
+                await self._load_chunk(temp_key, chunk)
+                loaded = True
+                chunk = {}
+        
+        if chunk:
+            await self._load_chunk(temp_key, chunk)
+            loaded = True
+        
+        async with self.cache.redis.pipeline(transaction=True) as pipe:
+            if loaded:
+                # ZUNIONSTORE создаёт ключ заново - TTL временного ключа снимается
+                pipe.zunionstore(temp_key, [temp_key, key], aggregate='MAX')
+                pipe.rename(temp_key, key)
+            pipe.set(self._loaded_key(season_id), 1)
+            await pipe.execute()
+    
+    async def _load_chunk(self, temp_key: str, chunk: Dict[str, int]):
+        async with self.cache.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(temp_key, chunk)
+            pipe.expire(temp_key, self.LOAD_TTL)
+            await pipe.execute()
+    
+    async def set_score(self, season_id: int, user_id: int, season_xp: int):
+        """Установить текущий season_xp пользователя"""
+        await self.cache.redis.zadd(self._key(season_id), {self._member(user_id): season_xp})
+    
+    async def get_rank(self, season_id: int, user_id: int) -> Optional[int]:
+        """Позиция пользователя (с 1) или None если его нет в сезоне"""
+        rank = await self.cache.redis.zrevrank(self._key(season_id), self._member(user_id))
+        return rank + 1 if rank is not None else None
+    
+    async def get_top(self, season_id: int, limit: int) -> List[Tuple[int, int]]:
+        """Топ сезона: список (user_id, season_xp)"""
+        rows = await self.cache.redis.zrevrange(
+            self._key(season_id), 0, limit - 1, withscores=True
+        )
+        return [(self._user_id(member), int(score)) for member, score in rows]
+    
+    async def count(self, season_id: int) -> int:
+        """Количество участников сезона"""
+        return await self.cache.redis.zcard(self._key(season_id))
+    
+    async def drop(self, season_id: int):
+        """Удалить сезон из индекса"""
+        await self.cache.redis.delete(self._key(season_id), self._loaded_key(season_id))
@@ -0,0 +1,292 @@
+-- ============================================================================
+-- Миграция 007: Партиционирование sync_events по дням
+-- ============================================================================
+--
+-- sync_events становится RANGE-партиционированной по created_at (одна
+-- партиция на день). Старые данные удаляются через DROP партиции вместо
+-- DELETE, pending-события ищутся по частичному индексу, а статистика
+-- читается из счётчиков вместо COUNT(*) по всей таблице.
+--
+-- Уникальность idempotency_key больше не может держаться на самой таблице
+-- (уникальный ключ партиционированной таблицы обязан включать created_at),
+-- поэтому ключи хранятся в отдельной таблице sync_event_keys.
+--
+-- Существующие данные переносятся в новую таблицу, старая таблица
+-- остаётся как sync_events_legacy - удалите её вручную после проверки.
+
+-- ============================================================================
+-- Функции управления партициями
+-- ============================================================================
+
+-- Создать партицию за день (если её нет)
+CREATE OR REPLACE FUNCTION create_sync_events_partition(day DATE)
+RETURNS void AS $$
+DECLARE
+    partition_name TEXT := 'sync_events_p' || to_char(day, 'YYYYMMDD');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF sync_events
+         FOR VALUES FROM (%L) TO (%L)',
+        partition_name, day, day + 1
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Создать партиции на N дней вперёд
+CREATE OR REPLACE FUNCTION ensure_sync_events_partitions(days_ahead INTEGER DEFAULT 7)
+RETURNS void AS $$
+DECLARE
+    day DATE;
+BEGIN
+    FOR day IN
+        SELECT generate_series(CURRENT_DATE, CURRENT_DATE + days_ahead, INTERVAL '1 day')::date
+    LOOP
+        PERFORM create_sync_events_partition(day);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- Новая таблица
+-- ============================================================================
+
+DO $$
+BEGIN
+    -- Повторный запуск: таблица уже партиционирована
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table
+        WHERE partrelid = 'sync_events'::regclass
+    ) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE sync_events RENAME TO sync_events_legacy;
+
+    CREATE TABLE sync_events (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        idempotency_key VARCHAR(255) NOT NULL,
+
+        -- Источник и тип
+        source VARCHAR(20) NOT NULL CHECK (source IN ('telegram', 'discord')),
+        event_type VARCHAR(50) NOT NULL CHECK (event_type IN (
+            'xp_change', 'balance_change', 'rank_change',
+            'achievement_unlock', 'reward_grant'
+        )),
+
+        -- Пользователь
+        user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+
+        -- Данные события
+        payload JSONB NOT NULL,
+
+        -- Статус обработки
+        status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN (
+            'pending', 'processing', 'completed', 'failed'
+        )),
+        processed_by VARCHAR(50),
+
+        -- Ошибки и повторы
+        retries INTEGER NOT NULL DEFAULT 0,
+        error_message TEXT,
+
+        -- Метаданные
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        processed_at TIMESTAMP,
+
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    -- Страховка на случай, если партиция на день не была создана заранее
+    CREATE TABLE sync_events_default PARTITION OF sync_events DEFAULT;
+END;
+$$;
+
+-- Индексы (создаются в каждой партиции)
+CREATE INDEX IF NOT EXISTS idx_sync_events_user_created ON sync_events(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_sync_events_pending ON sync_events(created_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_sync_events_failed ON sync_events(created_at) WHERE status = 'failed';
+
+-- Ключи идемпотентности (глобально уникальные)
+CREATE TABLE IF NOT EXISTS sync_event_keys (
+    idempotency_key VARCHAR(255) PRIMARY KEY,
+    event_id UUID NOT NULL,
+    created_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_event_keys_created ON sync_event_keys(created_at);
+
+-- ============================================================================
+-- Счётчики по статусам
+-- ============================================================================
+
+-- Счётчик разбит на шарды, чтобы параллельные вставки не упирались в одну строку
+CREATE TABLE IF NOT EXISTS sync_event_counters (
+    status VARCHAR(20) NOT NULL,
+    shard SMALLINT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (status, shard)
+);
+
+CREATE OR REPLACE FUNCTION sync_event_counters_add(event_status VARCHAR, delta BIGINT)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO sync_event_counters (status, shard, count)
+    VALUES (event_status, floor(random() * 16)::smallint, delta)
+    ON CONFLICT (status, shard)
+    DO UPDATE SET count = sync_event_counters.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_events_count_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM sync_event_counters_add(NEW.status, 1);
+    END IF;
+
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM sync_event_counters_add(OLD.status, -1);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- Перенос данных
+-- ============================================================================
+
+DO $$
+DECLARE
+    first_day DATE;
+BEGIN
+    IF to_regclass('sync_events_legacy') IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Партиции на весь период старых данных
+    SELECT MIN(created_at)::date INTO first_day FROM sync_events_legacy;
+
+    IF first_day IS NOT NULL THEN
+        PERFORM create_sync_events_partition(day::date)
+        FROM generate_series(first_day, CURRENT_DATE, INTERVAL '1 day') AS day;
+    END IF;
+
+    PERFORM ensure_sync_events_partitions(7);
+
+    INSERT INTO sync_events (
+        id, idempotency_key, source, event_type, user_id, payload,
+        status, processed_by, retries, error_message, created_at, processed_at
+    )
+    SELECT
+        id, idempotency_key, source, event_type, user_id, payload,
+        status, processed_by, retries, error_message, created_at, processed_at
+    FROM sync_events_legacy
+    WHERE NOT EXISTS (SELECT 1 FROM sync_event_keys k WHERE k.idempotency_key = sync_events_legacy.idempotency_key);
+
+    INSERT INTO sync_event_keys (idempotency_key, event_id, created_at)
+    SELECT idempotency_key, id, created_at FROM sync_events_legacy
+    ON CONFLICT (idempotency_key) DO NOTHING;
+
+    -- Начальные значения счётчиков
+    DELETE FROM sync_event_counters;
+    INSERT INTO sync_event_counters (status, shard, count)
+    SELECT status, 0, COUNT(*) FROM sync_events GROUP BY status;
+END;
+$$;
+
+-- Счётчики поддерживаются триггером после переноса данных
+DROP TRIGGER IF EXISTS trigger_sync_events_count ON sync_events;
+CREATE TRIGGER trigger_sync_events_count
+    AFTER INSERT OR DELETE ON sync_events
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_events_count_trigger();
+
+DROP TRIGGER IF EXISTS trigger_sync_events_count_status ON sync_events;
+CREATE TRIGGER trigger_sync_events_count_status
+    AFTER UPDATE OF status ON sync_events
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION sync_events_count_trigger();
+
+-- ============================================================================
+-- Ретеншн: DROP партиций вместо DELETE
+-- ============================================================================
+
+-- Удалить дневные партиции старше retention_days.
+-- Партиции с pending/processing событиями пропускаются.
+-- Возвращает количество удалённых (при dry_run - подлежащих удалению) строк.
+CREATE OR REPLACE FUNCTION drop_old_sync_events_partitions(
+    retention_days INTEGER DEFAULT 30,
+    dry_run BOOLEAN DEFAULT FALSE
+)
+RETURNS BIGINT AS $$
+DECLARE
+    part RECORD;
+    part_day DATE;
+    has_active BOOLEAN;
+    part_rows BIGINT;
+    total_rows BIGINT := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'sync_events'::regclass
+            AND c.relname ~ '^sync_events_p[0-9]{8}$'
+        ORDER BY c.relname
+    LOOP
+        part_day := to_date(right(part.relname, 8), 'YYYYMMDD');
+
+        IF part_day >= CURRENT_DATE - retention_days THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM %I WHERE status IN (''pending'', ''processing''))',
+            part.relname
+        ) INTO has_active;
+
+        IF has_active THEN
+            RAISE NOTICE 'Партиция % содержит необработанные события - пропуск', part.relname;
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('SELECT COUNT(*) FROM %I', part.relname) INTO part_rows;
+        total_rows := total_rows + part_rows;
+
+        IF dry_run THEN
+            CONTINUE;
+        END IF;
+
+        -- DROP не вызывает DELETE-триггеры - корректируем счётчики вручную
+        EXECUTE format(
+            'SELECT sync_event_counters_add(status, -COUNT(*)) FROM %I GROUP BY status',
+            part.relname
+        );
+
+        DELETE FROM sync_event_keys
+        WHERE created_at >= part_day AND created_at < part_day + 1;
+
+        EXECUTE format('DROP TABLE %I', part.relname);
+    END LOOP;
+
+    RETURN total_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Старая функция очистки теперь работает через партиции
+CREATE OR REPLACE FUNCTION cleanup_old_sync_events()
+RETURNS void AS $$
+BEGIN
+    PERFORM drop_old_sync_events_partitions(30);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- Готово!
+-- ============================================================================
+
+SELECT 'Миграция 007: sync_events партиционирована' AS status;
+SELECT status, SUM(count) AS events FROM sync_event_counters GROUP BY status;
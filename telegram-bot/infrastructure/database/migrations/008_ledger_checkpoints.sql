@@ -0,0 +1,66 @@
+-- ============================================================================
+-- Миграция 008: Контрольные точки баланса для журнала транзакций
+-- ============================================================================
+--
+-- transactions остаётся append-only журналом. Каждые N транзакций
+-- пользователя в ledger_checkpoints записывается накопленная сумма
+-- delta_xp / delta_balance на момент транзакции transaction_id.
+--
+-- Баланс на момент T = ближайшая контрольная точка до T + хвост журнала
+-- после неё (не больше N строк), без прохода по всей истории.
+
+CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+
+    -- Последняя транзакция, вошедшая в сумму
+    transaction_id INTEGER NOT NULL,
+
+    -- Накопленные значения
+    xp BIGINT NOT NULL,
+    balance BIGINT NOT NULL,
+
+    -- created_at транзакции transaction_id (для запросов "на момент T")
+    created_at TIMESTAMP NOT NULL,
+
+    PRIMARY KEY (user_id, transaction_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ledger_checkpoints_user_created
+    ON ledger_checkpoints(user_id, created_at DESC);
+
+-- Хвост журнала и keyset-пагинация аудита идут по (user_id, id)
+CREATE INDEX IF NOT EXISTS idx_transactions_user_id_id
+    ON transactions(user_id, id DESC);
+
+-- Построить контрольные точки пользователя заново по журналу
+CREATE OR REPLACE FUNCTION rebuild_ledger_checkpoints(target_user BIGINT, checkpoint_interval INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    inserted INTEGER;
+BEGIN
+    DELETE FROM ledger_checkpoints WHERE user_id = target_user;
+
+    INSERT INTO ledger_checkpoints (user_id, transaction_id, xp, balance, created_at)
+    SELECT user_id, id, xp, balance, created_at
+    FROM (
+        SELECT
+            user_id, id, created_at,
+            SUM(delta_xp) OVER w AS xp,
+            SUM(delta_balance) OVER w AS balance,
+            ROW_NUMBER() OVER w AS n
+        FROM transactions
+        WHERE user_id = target_user
+        WINDOW w AS (ORDER BY id)
+    ) running
+    WHERE n % checkpoint_interval = 0;
+
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+    RETURN inserted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Контрольные точки для существующей истории и новых транзакций пишет
+-- фоновая задача checkpoint_ledger (при запуске бота и каждый час) с
+-- интервалом LEDGER_CHECKPOINT_INTERVAL - миграция их не создаёт.
+
+SELECT 'Миграция 008: таблица контрольных точек журнала создана' AS status;
@@ -0,0 +1,10 @@
+-- ============================================================================
+-- Миграция 009: Стрик ежедневной награды
+-- ============================================================================
+--
+-- Ежедневная награда выдаётся одним условным UPDATE
+-- (UserRepository.claim_daily), который заодно ведёт стрик: награда не
+-- позже DAILY_STREAK_WINDOW_HOURS после прошлой продолжает его, иначе
+-- стрик начинается заново.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_streak INTEGER NOT NULL DEFAULT 0;
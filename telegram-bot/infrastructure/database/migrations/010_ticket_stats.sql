@@ -0,0 +1,53 @@
+-- ============================================================================
+-- Миграция 010: Счётчики тикетов и индексы под админ-списки
+-- ============================================================================
+--
+-- Статистика админ-панели читается из ticket_stats (несколько строк)
+-- вместо агрегации всей таблицы tickets. Счётчики меняет
+-- TicketRepository в той же транзакции, что create/update_status/assign_to;
+-- TicketRepository.recount_stats пересчитывает их с нуля (например, после
+-- удаления пользователей, когда тикеты уходят через ON DELETE CASCADE).
+--
+-- Списки тикетов листаются по ключу (created_at, id), поэтому индексы
+-- повторяют фильтры и порядок ORDER BY created_at DESC, id DESC.
+
+-- ============================================================================
+-- Счётчики
+-- ============================================================================
+
+-- dimension: 'status' или 'priority', value: значение поля тикета
+CREATE TABLE IF NOT EXISTS ticket_stats (
+    dimension VARCHAR(20) NOT NULL,
+    value VARCHAR(20) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (dimension, value)
+);
+
+-- Начальные значения
+DELETE FROM ticket_stats;
+INSERT INTO ticket_stats (dimension, value, count)
+SELECT 'status', status, COUNT(*) FROM tickets WHERE status IS NOT NULL GROUP BY status
+UNION ALL
+SELECT 'priority', priority, COUNT(*) FROM tickets WHERE priority IS NOT NULL GROUP BY priority;
+
+-- ============================================================================
+-- Индексы
+-- ============================================================================
+
+-- Все тикеты / по статусу / по приоритету / по статусу и приоритету
+CREATE INDEX IF NOT EXISTS idx_tickets_created_id ON tickets(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON tickets(status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_priority_created ON tickets(priority, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_priority_created ON tickets(status, priority, created_at DESC, id DESC);
+
+-- Тикеты пользователя / пользователя по статусу
+CREATE INDEX IF NOT EXISTS idx_tickets_user_created ON tickets(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_user_status_created ON tickets(user_id, status, created_at DESC, id DESC);
+
+-- Одиночные индексы из 001 покрыты составными
+DROP INDEX IF EXISTS idx_tickets_user_id;
+DROP INDEX IF EXISTS idx_tickets_status;
+DROP INDEX IF EXISTS idx_tickets_created_at;
+
+COMMENT ON TABLE ticket_stats IS 'Счётчики тикетов по статусу и приоритету';
@@ -0,0 +1,17 @@
+-- ============================================================================
+-- Миграция 011: Последний запуск фоновых задач
+-- ============================================================================
+--
+-- pg_try_advisory_lock в JobScheduler не даёт задаче выполняться на двух
+-- репликах одновременно, но не мешает второй реплике запустить её сразу
+-- после первой (часы и старт планировщиков на репликах не совпадают).
+-- Перед запуском реплика в той же транзакции, что и блокировка, занимает
+-- запуск: обновляет last_run_at, только если прошлый запуск был раньше
+-- половины периода задачи. Не заняла - задача уже выполнена в этом окне.
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    job_id VARCHAR(100) PRIMARY KEY,
+    last_run_at TIMESTAMPTZ NOT NULL
+);
+
+COMMENT ON TABLE job_runs IS 'Время последнего запуска фоновых задач (одна реплика на запуск)';
@@ -327,20 +327,57 @@ class DiscordRepository:
     # УТИЛИТЫ
     # ========================================================================
     
-    async def expire_old_codes(self):
-        """Истечь старые коды подтверждения"""
+    async def expire_old_codes(self, batch_size: Optional[int] = None) -> int:
+        """
+        Истечь старые коды подтверждения
+        
+        Args:
+            batch_size: Максимум строк за один UPDATE (None - все сразу)
+        
+        Returns:
+            Количество истёкших кодов
+        """
         async with self.pool.acquire() as conn:
-            result = await conn.execute(
-                """
-                UPDATE discord_links
-                SET status = 'expired'
-                WHERE status = 'pending'
-                    AND expires_at < CURRENT_TIMESTAMP
-                """
-            )
+            if batch_size is None:
+                result = await conn.execute(
+                    """
+                    UPDATE discord_links
+                    SET status = 'expired'
+                    WHERE status = 'pending'
+                        AND expires_at < CURRENT_TIMESTAMP
+                    """
+                )
+            else:
+                result = await conn.execute(
+                    """
+                    UPDATE discord_links
+                    SET status = 'expired'
+                    WHERE id IN (
+                        SELECT id FROM discord_links
+                        WHERE status = 'pending'
+                            AND expires_at < CURRENT_TIMESTAMP
+                        LIMIT $1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    """,
+                    batch_size
+                )
             
             # Извлекаем количество обновлённых строк
             count = int(result.split()[-1]) if result else 0
             
             if count > 0:
                 logger.info(f"Истекло кодов подтверждения: {count}")
+            
+            return count
+    
+    async def count_expired_codes(self) -> int:
+        """Посчитать просроченные коды подтверждения (для dry-run)"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                """
+                SELECT COUNT(*) FROM discord_links
+                WHERE status = 'pending'
+                    AND expires_at < CURRENT_TIMESTAMP
+                """
+            )
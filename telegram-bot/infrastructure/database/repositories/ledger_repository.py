@@ -0,0 +1,290 @@
+"""
+Ledger Repository - контрольные точки баланса и аудит журнала транзакций
+"""
+from typing import Optional, List
+from datetime import datetime
+import logging
+
+from domain.models.sync_event import Transaction
+from domain.models.ledger import BalanceCheckpoint, CheckpointDrift
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerRepository:
+    """Репозиторий журнала транзакций"""
+    
+    def __init__(self, pool):
+        self.pool = pool
+    
+    # ========================================================================
+    # КОНТРОЛЬНЫЕ ТОЧКИ
+    # ========================================================================
+    
+    async def create_checkpoint_if_due(self, user_id: int, interval: int) -> Optional[int]:
+        """
+        Записать контрольную точку, если после последней накопилось interval транзакций
+        
+        Returns:
+            transaction_id новой контрольной точки или None
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                """
+                WITH last AS (
+                    SELECT transaction_id, xp, balance
+                    FROM ledger_checkpoints
+                    WHERE user_id = $1
+                    ORDER BY transaction_id DESC
+                    LIMIT 1
+                ),
+                tail AS (
+                    SELECT
+                        COUNT(*) AS rows,
+                        MAX(t.id) AS last_id,
+                        COALESCE(SUM(t.delta_xp), 0) AS delta_xp,
+                        COALESCE(SUM(t.delta_balance), 0) AS delta_balance
+                    FROM transactions t
+                    WHERE t.user_id = $1
+                        AND t.id > COALESCE((SELECT transaction_id FROM last), 0)
+                )
+                INSERT INTO ledger_checkpoints (user_id, transaction_id, xp, balance, created_at)
+                SELECT
+                    $1, tail.last_id,
+                    COALESCE((SELECT xp FROM last), 0) + tail.delta_xp,
+                    COALESCE((SELECT balance FROM last), 0) + tail.delta_balance,
+                    (SELECT created_at FROM transactions WHERE id = tail.last_id)
+                FROM tail
+                WHERE tail.rows >= $2
+                ON CONFLICT (user_id, transaction_id) DO NOTHING
+                RETURNING transaction_id
+                """,
+                user_id, interval
+            )
+    
+    async def create_due_checkpoints(self, user_ids: List[int], interval: int) -> int:
+        """
+        Дописать недостающие контрольные точки порции пользователей
+        
+        После последней точки пользователя (или с начала журнала) точка
+        ставится на каждую interval-ю транзакцию - независимо от того, кто
+        писал транзакции.
+        
+        Returns:
+            Сколько точек записано
+        """
+        async with self.pool.acquire() as conn:
+            result = await conn.execute(
+                """
+                WITH last AS (
+                    SELECT DISTINCT ON (user_id) user_id, transaction_id, xp, balance
+                    FROM ledger_checkpoints
+                    WHERE user_id = ANY($1::bigint[])
+                    ORDER BY user_id, transaction_id DESC
+                ),
+                tail AS (
+                    SELECT
+                        t.user_id, t.id, t.created_at,
+                        COALESCE(l.xp, 0) + SUM(t.delta_xp) OVER w AS xp,
+                        COALESCE(l.balance, 0) + SUM(t.delta_balance) OVER w AS balance,
+                        ROW_NUMBER() OVER w AS n
+                    FROM transactions t
+                    LEFT JOIN last l ON l.user_id = t.user_id
+                    WHERE t.user_id = ANY($1::bigint[])
+                        AND t.id > COALESCE(l.transaction_id, 0)
+                    WINDOW w AS (PARTITION BY t.user_id ORDER BY t.id)
+                )
+                INSERT INTO ledger_checkpoints (user_id, transaction_id, xp, balance, created_at)
+                SELECT user_id, id, xp, balance, created_at
+                FROM tail
+                WHERE n % $2 = 0
+                ON CONFLICT (user_id, transaction_id) DO NOTHING
+                """,
+                user_ids, interval
+            )
+            
+            return int(result.split()[-1])
+    
+    async def get_checkpoint_before(
+        self,
+        user_id: int,
+        at: datetime
+    ) -> Optional[BalanceCheckpoint]:
+        """Ближайшая контрольная точка не позже момента at"""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT * FROM ledger_checkpoints
+                WHERE user_id = $1 AND created_at <= $2
+                ORDER BY created_at DESC, transaction_id DESC
+                LIMIT 1
+                """,
+                user_id, at
+            )
+            
+            return BalanceCheckpoint.from_db_row(row)
+    
+    async def sum_tail(
+        self,
+        user_id: int,
+        after_id: int,
+        at: datetime
+    ) -> tuple:
+        """
+        Сумма транзакций после контрольной точки до момента at
+        
+        Returns:
+            (delta_xp, delta_balance, rows)
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT
+                    COALESCE(SUM(delta_xp), 0) AS delta_xp,
+                    COALESCE(SUM(delta_balance), 0) AS delta_balance,
+                    COUNT(*) AS rows
+                FROM transactions
+                WHERE user_id = $1 AND id > $2 AND created_at <= $3
+                """,
+                user_id, after_id, at
+            )
+            
+            return row['delta_xp'], row['delta_balance'], row['rows']
+    
+    async def rebuild_checkpoints(self, user_id: int, interval: int) -> int:
+        """Построить контрольные точки пользователя заново по журналу"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                "SELECT rebuild_ledger_checkpoints($1, $2)",
+                user_id, interval
+            )
+    
+    # ========================================================================
+    # АУДИТ
+    # ========================================================================
+    
+    async def get_transactions_page(
+        self,
+        user_id: int,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Transaction]:
+        """
+        Транзакции пользователя от новых к старым (keyset по id)
+        
+        Args:
+            before_id: Курсор - id последней транзакции предыдущей страницы
+            since / until: Ограничение по created_at
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT * FROM transactions
+                WHERE user_id = $1
+                    AND ($2::integer IS NULL OR id < $2)
+                    AND ($3::timestamp IS NULL OR created_at >= $3)
+                    AND ($4::timestamp IS NULL OR created_at <= $4)
+                ORDER BY id DESC
+                LIMIT $5
+                """,
+                user_id, before_id, since, until, limit
+            )
+            
+            return [Transaction.from_db_row(row) for row in rows]
+    
+    # ========================================================================
+    # ПРОВЕРКА
+    # ========================================================================
+    
+    async def get_ledger_users(
+        self,
+        after_user_id: int = 0,
+        limit: int = 500
+    ) -> List[int]:
+        """Пользователи с транзакциями в журнале (keyset по user_id)"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT DISTINCT user_id FROM transactions
+                WHERE user_id > $1
+                ORDER BY user_id
+                LIMIT $2
+                """,
+                after_user_id, limit
+            )
+            
+            return [row['user_id'] for row in rows]
+    
+    async def get_checkpoint_users(
+        self,
+        after_user_id: int = 0,
+        limit: int = 500
+    ) -> List[int]:
+        """Пользователи с контрольными точками (keyset по user_id)"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT DISTINCT user_id FROM ledger_checkpoints
+                WHERE user_id > $1
+                ORDER BY user_id
+                LIMIT $2
+                """,
+                after_user_id, limit
+            )
+            
+            return [row['user_id'] for row in rows]
+    
+    async def find_drift(self, user_ids: List[int]) -> List[CheckpointDrift]:
+        """
+        Сверить контрольные точки пользователей с журналом
+        
+        Каждая точка проверяется относительно предыдущей: разница между ними
+        должна совпадать с суммой транзакций между ними.
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                WITH cp AS (
+                    SELECT
+                        user_id, transaction_id, xp, balance,
+                        LAG(transaction_id, 1, 0) OVER w AS prev_id,
+                        LAG(xp, 1, 0::bigint) OVER w AS prev_xp,
+                        LAG(balance, 1, 0::bigint) OVER w AS prev_balance
+                    FROM ledger_checkpoints
+                    WHERE user_id = ANY($1::bigint[])
+                    WINDOW w AS (PARTITION BY user_id ORDER BY transaction_id)
+                )
+                SELECT
+                    cp.user_id, cp.transaction_id,
+                    cp.prev_xp + s.delta_xp AS expected_xp,
+                    cp.prev_balance + s.delta_balance AS expected_balance,
+                    cp.xp AS actual_xp,
+                    cp.balance AS actual_balance
+                FROM cp
+                CROSS JOIN LATERAL (
+                    SELECT
+                        COALESCE(SUM(t.delta_xp), 0) AS delta_xp,
+                        COALESCE(SUM(t.delta_balance), 0) AS delta_balance
+                    FROM transactions t
+                    WHERE t.user_id = cp.user_id
+                        AND t.id > cp.prev_id AND t.id <= cp.transaction_id
+                ) s
+                WHERE cp.xp <> cp.prev_xp + s.delta_xp
+                    OR cp.balance <> cp.prev_balance + s.delta_balance
+                """,
+                user_ids
+            )
+            
+            return [
+                CheckpointDrift(
+                    user_id=row['user_id'],
+                    transaction_id=row['transaction_id'],
+                    expected_xp=row['expected_xp'],
+                    expected_balance=row['expected_balance'],
+                    actual_xp=row['actual_xp'],
+                    actual_balance=row['actual_balance']
+                )
+                for row in rows
+            ]
@@ -161,8 +161,13 @@ class SeasonRepository:
         current_streak: Optional[int] = None,
         best_streak: Optional[int] = None,
         last_activity_date: Optional[datetime] = None
-    ):
-        """Обновить прогресс пользователя"""
+    ) -> Optional[int]:
+        """
+        Обновить прогресс пользователя
+        
+        Returns:
+            Новое значение season_xp (None если обновлять нечего)
+        """
         updates = []
         params = []
         param_count = 1
@@ -203,15 +208,16 @@ class SeasonRepository:
             param_count += 1
         
         if not updates:
-            return
+            return None
         
         params.extend([user_id, season_id])
         
         async with self.pool.acquire() as conn:
-            await conn.execute(f"""
+            return await conn.fetchval(f"""
                 UPDATE season_progress
                 SET {', '.join(updates)}
                 WHERE user_id = ${param_count} AND season_id = ${param_count + 1}
+                RETURNING season_xp
             """, *params)
     
     async def get_season_leaderboard(
@@ -231,7 +237,7 @@ class SeasonRepository:
                 FROM season_progress sp
                 JOIN users u ON sp.user_id = u.id
                 WHERE sp.season_id = $1
-                ORDER BY sp.season_xp DESC
+                ORDER BY sp.season_xp DESC, sp.user_id
                 LIMIT $2
             """, season_id, limit)
             
@@ -244,6 +250,24 @@ class SeasonRepository:
                 for row in rows
             ]
     
+    async def get_season_scores(self, season_id: int) -> List[tuple[int, int]]:
+        """
+        Получить season_xp всех участников сезона
+        
+        Используется для прогрева индекса рейтинга.
+        
+        Returns:
+            List of (user_id, season_xp)
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT user_id, season_xp
+                FROM season_progress
+                WHERE season_id = $1
+            """, season_id)
+            
+            return [(row['user_id'], row['season_xp']) for row in rows]
+    
     async def update_ranks(self, season_id: int):
         """Обновить ранги всех пользователей в сезоне"""
         async with self.pool.acquire() as conn:
@@ -251,7 +275,7 @@ class SeasonRepository:
                 WITH ranked AS (
                     SELECT 
                         id,
-                        ROW_NUMBER() OVER (ORDER BY season_xp DESC) as new_rank
+                        ROW_NUMBER() OVER (ORDER BY season_xp DESC, user_id) as new_rank
                     FROM season_progress
                     WHERE season_id = $1
                 )
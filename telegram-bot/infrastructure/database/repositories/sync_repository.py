@@ -3,6 +3,7 @@ Sync Repository - работа с событиями синхронизации
 """
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+import json
 import uuid
 import logging
 
@@ -17,6 +18,31 @@ logger = logging.getLogger(__name__)
 class SyncRepository:
     """Репозиторий для работы с синхронизацией"""
     
+    # Поиск события по ключу идемпотентности (с отсечением партиций по created_at)
+    _SELECT_BY_KEY = """
+        SELECT e.* FROM sync_event_keys k
+        JOIN sync_events e ON e.id = k.event_id AND e.created_at = k.created_at
+        WHERE k.idempotency_key = $1
+    """
+    
+    # Вставка события, если ключ идемпотентности ещё не занят
+    _INSERT_EVENT = """
+        WITH new_key AS (
+            INSERT INTO sync_event_keys (idempotency_key, event_id, created_at)
+            VALUES ($1::varchar, gen_random_uuid(), CURRENT_TIMESTAMP)
+            ON CONFLICT (idempotency_key) DO NOTHING
+            RETURNING event_id, created_at
+        )
+        INSERT INTO sync_events (
+            id, idempotency_key, source, event_type,
+            user_id, payload, status, retries, created_at
+        )
+        SELECT event_id, $1::varchar, $2::varchar, $3::varchar, $4::bigint, $5::jsonb,
+               'pending', 0, created_at
+        FROM new_key
+        RETURNING *
+    """
+    
     def __init__(self, pool):
         self.pool = pool
     
@@ -46,34 +72,21 @@ class SyncRepository:
             SyncEvent
         """
         async with self.pool.acquire() as conn:
-            # Проверяем существование
-            existing = await conn.fetchrow(
-                """
-                SELECT * FROM sync_events
-                WHERE idempotency_key = $1
-                """,
-                idempotency_key
+            # Один запрос: ключ резервируется в sync_event_keys (уникальность держит
+            # она, т.к. партиционированная sync_events не может иметь UNIQUE без
+            # created_at), событие вставляется только если ключ новый
+            row = await conn.fetchrow(
+                self._INSERT_EVENT,
+                idempotency_key, source, event_type, user_id, json.dumps(payload)
             )
             
-            if existing:
+            if row is None:
+                # Ключ уже занят (повтор или параллельный запрос)
                 logger.info(
                     f"🔄 Событие уже существует: {idempotency_key}"
                 )
-                return SyncEvent.from_db_row(existing)
-            
-            # Создаём новое
-            row = await conn.fetchrow(
-                """
-                INSERT INTO sync_events (
-                    id, idempotency_key, source, event_type,
-                    user_id, payload, status, retries
-                )
-                VALUES ($1, $2, $3, $4, $5, $6, 'pending', 0)
-                RETURNING *
-                """,
-                uuid.uuid4(), idempotency_key, source, event_type,
-                user_id, payload
-            )
+                row = await conn.fetchrow(self._SELECT_BY_KEY, idempotency_key)
+                return SyncEvent.from_db_row(row)
             
             logger.info(
                 f"✅ Событие создано: {event_type} для user={user_id}, "
@@ -82,6 +95,50 @@ class SyncRepository:
             
             return SyncEvent.from_db_row(row)
     
+    async def create_events(self, events: List[Dict[str, Any]]) -> List[SyncEvent]:
+        """
+        Создать несколько событий за один executemany
+        
+        Ключи резервируются тем же INSERT ... ON CONFLICT (idempotency_key)
+        DO NOTHING, что и в create_event; затем все события (новые и уже
+        существовавшие) читаются одним запросом.
+        
+        Args:
+            events: Словари с полями idempotency_key, source, event_type,
+                user_id, payload (как у create_event)
+        
+        Returns:
+            События в порядке входного списка
+        """
+        if not events:
+            return []
+        
+        keys = [e['idempotency_key'] for e in events]
+        
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(
+                    self._INSERT_EVENT,
+                    [
+                        (e['idempotency_key'], e['source'], e['event_type'],
+                         e['user_id'], json.dumps(e['payload']))
+                        for e in events
+                    ]
+                )
+                rows = await conn.fetch(
+                    """
+                    SELECT e.* FROM sync_event_keys k
+                    JOIN sync_events e ON e.id = k.event_id AND e.created_at = k.created_at
+                    WHERE k.idempotency_key = ANY($1::varchar[])
+                    """,
+                    list(set(keys))
+                )
+        
+        by_key = {row['idempotency_key']: SyncEvent.from_db_row(row) for row in rows}
+        logger.info(f"✅ Пакет событий: {len(events)}, в БД: {len(by_key)}")
+        
+        return [by_key[key] for key in keys if key in by_key]
+    
     async def get_event_by_id(self, event_id: str) -> Optional[SyncEvent]:
         """Получить событие по ID"""
         async with self.pool.acquire() as conn:
@@ -101,13 +158,7 @@ class SyncRepository:
     ) -> Optional[SyncEvent]:
         """Получить событие по ключу идемпотентности"""
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                """
-                SELECT * FROM sync_events
-                WHERE idempotency_key = $1
-                """,
-                idempotency_key
-            )
+            row = await conn.fetchrow(self._SELECT_BY_KEY, idempotency_key)
             
             return SyncEvent.from_db_row(row) if row else None
     
@@ -118,6 +169,9 @@ class SyncRepository:
         """
         Получить события ожидающие обработки
         
+        Читает частичный индекс idx_sync_events_pending в каждой партиции,
+        а не весь набор событий.
+        
         Args:
             limit: Максимальное количество
         
@@ -278,7 +332,8 @@ class SyncRepository:
                 RETURNING *
                 """,
                 idempotency_key, user_id, source, type,
-                delta_xp, delta_balance, reason, metadata
+                delta_xp, delta_balance, reason,
+                json.dumps(metadata) if metadata is not None else None
             )
             
             return Transaction.from_db_row(row)
@@ -471,56 +526,140 @@ class SyncRepository:
     # УТИЛИТЫ
     # ========================================================================
     
-    async def cleanup_old_events(self, days: int = 30):
+    async def delete_old_events_batch(
+        self,
+        status: str,
+        days: int,
+        batch_size: int,
+        min_retries: int = 0
+    ) -> int:
         """
-        Очистить старые события
+        Удалить одну порцию старых событий
         
         Args:
-            days: Удалить события старше N дней
+            status: Статус удаляемых событий (completed, failed)
+            days: Удалять события старше N дней
+            batch_size: Максимум строк за один DELETE
+            min_retries: Минимальное число повторов (для failed)
+        
+        Returns:
+            Количество удалённых строк
         """
         async with self.pool.acquire() as conn:
-            # Удаляем завершённые события старше 30 дней
-            result1 = await conn.execute(
+            return await conn.fetchval(
                 """
-                DELETE FROM sync_events
-                WHERE status = 'completed'
-                    AND created_at < CURRENT_TIMESTAMP - INTERVAL '1 day' * $1
+                WITH deleted AS (
+                    DELETE FROM sync_events
+                    WHERE (id, created_at) IN (
+                        SELECT id, created_at FROM sync_events
+                        WHERE status = $1
+                            AND retries >= $2
+                            AND created_at < CURRENT_TIMESTAMP - INTERVAL '1 day' * $3
+                        LIMIT $4
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING idempotency_key
+                ),
+                deleted_keys AS (
+                    DELETE FROM sync_event_keys
+                    WHERE idempotency_key IN (SELECT idempotency_key FROM deleted)
+                )
+                SELECT COUNT(*) FROM deleted
                 """,
-                days
+                status, min_retries, days, batch_size
             )
-            
-            # Удаляем провалившиеся события старше 7 дней
-            result2 = await conn.execute(
-                """
-                DELETE FROM sync_events
-                WHERE status = 'failed'
-                    AND retries >= 3
-                    AND created_at < CURRENT_TIMESTAMP - INTERVAL '7 days'
+    
+    async def count_old_events(
+        self,
+        status: str,
+        days: int,
+        min_retries: int = 0
+    ) -> int:
+        """Посчитать старые события (для dry-run очистки)"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
                 """
+                SELECT COUNT(*) FROM sync_events
+                WHERE status = $1
+                    AND retries >= $2
+                    AND created_at < CURRENT_TIMESTAMP - INTERVAL '1 day' * $3
+                """,
+                status, min_retries, days
+            )
+    
+    async def ensure_partitions(self, days_ahead: int = 7):
+        """Создать дневные партиции sync_events на N дней вперёд"""
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                "SELECT ensure_sync_events_partitions($1)",
+                days_ahead
             )
-            
-            count1 = int(result1.split()[-1]) if result1 else 0
-            count2 = int(result2.split()[-1]) if result2 else 0
-            
-            if count1 + count2 > 0:
-                logger.info(
-                    f"🧹 Очищено событий: {count1} завершённых, "
-                    f"{count2} провалившихся"
-                )
+    
+    async def drop_old_partitions(self, days: int = 30, dry_run: bool = False) -> int:
+        """
+        Удалить дневные партиции старше N дней
+        
+        Партиции с pending/processing событиями не удаляются.
+        
+        Args:
+            days: Хранить партиции N дней
+            dry_run: Только посчитать строки
+        
+        Returns:
+            Количество удалённых (при dry_run - подлежащих удалению) событий
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                "SELECT drop_old_sync_events_partitions($1, $2)",
+                days, dry_run
+            )
+    
+    async def cleanup_old_events(self, days: int = 30, batch_size: int = 1000) -> int:
+        """
+        Очистить старые события
+        
+        Старые дни удаляются целыми партициями, провалившиеся события
+        (старше 7 дней, 3+ попытки) - порциями по batch_size строк.
+        
+        Args:
+            days: Хранить события N дней
+            batch_size: Максимум строк за один DELETE
+        
+        Returns:
+            Количество удалённых событий
+        """
+        dropped = await self.drop_old_partitions(days)
+        
+        failed = 0
+        while True:
+            deleted = await self.delete_old_events_batch('failed', 7, batch_size, 3)
+            failed += deleted
+            if deleted < batch_size:
+                break
+        
+        if dropped + failed > 0:
+            logger.info(
+                f"🧹 Очищено событий: {dropped} в старых партициях, "
+                f"{failed} провалившихся"
+            )
+        
+        return dropped + failed
     
     async def get_stats(self) -> Dict[str, int]:
         """Получить статистику синхронизации"""
         async with self.pool.acquire() as conn:
-            stats = await conn.fetchrow(
+            # Счётчики поддерживаются триггером - без сканирования sync_events
+            rows = await conn.fetch(
                 """
-                SELECT
-                    COUNT(*) FILTER (WHERE status = 'pending') as pending,
-                    COUNT(*) FILTER (WHERE status = 'processing') as processing,
-                    COUNT(*) FILTER (WHERE status = 'completed') as completed,
-                    COUNT(*) FILTER (WHERE status = 'failed') as failed,
-                    COUNT(*) as total
-                FROM sync_events
+                SELECT status, SUM(count) AS count
+                FROM sync_event_counters
+                GROUP BY status
                 """
             )
-            
-            return dict(stats)
+        
+        stats = {status.value: 0 for status in EventStatus}
+        for row in rows:
+            stats[row['status']] = int(row['count'])
+        
+        stats['total'] = sum(stats.values())
+        return stats
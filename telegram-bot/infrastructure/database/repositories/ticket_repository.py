@@ -2,11 +2,14 @@
 Ticket repository - работа с тикетами в БД
 """
 import asyncpg
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
 from domain.models.ticket import Ticket, TicketMessage, TicketStats
 
+# Ключ страницы списка: (created_at, id) последнего показанного тикета
+TicketCursor = Tuple[datetime, int]
+
 
 class TicketRepository:
     """Repository для работы с тикетами"""
@@ -25,16 +28,21 @@ class TicketRepository:
         priority: str,
         subject: str
     ) -> Ticket:
-        """Создать тикет"""
+        """Создать тикет (счётчики обновляются в той же транзакции)"""
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                """
-                INSERT INTO tickets (user_id, category, priority, subject)
-                VALUES ($1, $2, $3, $4)
-                RETURNING *
-                """,
-                user_id, category, priority, subject
-            )
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    """
+                    INSERT INTO tickets (user_id, category, priority, subject)
+                    VALUES ($1, $2, $3, $4)
+                    RETURNING *
+                    """,
+                    user_id, category, priority, subject
+                )
+                await self._add_stats(conn, {
+                    ('status', row['status']): 1,
+                    ('priority', row['priority']): 1
+                })
             return Ticket.from_db_row(row)
     
     async def get_by_id(self, ticket_id: int) -> Optional[Ticket]:
@@ -50,59 +58,72 @@ class TicketRepository:
         self,
         user_id: int,
         status: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        before: Optional[TicketCursor] = None
     ) -> List[Ticket]:
-        """Получить тикеты пользователя"""
-        async with self.pool.acquire() as conn:
-            if status:
-                rows = await conn.fetch(
-                    """
-                    SELECT * FROM tickets
-                    WHERE user_id = $1 AND status = $2
-                    ORDER BY created_at DESC
-                    LIMIT $3
-                    """,
-                    user_id, status, limit
-                )
-            else:
-                rows = await conn.fetch(
-                    """
-                    SELECT * FROM tickets
-                    WHERE user_id = $1
-                    ORDER BY created_at DESC
-                    LIMIT $2
-                    """,
-                    user_id, limit
-                )
-            
-            return [Ticket.from_db_row(row) for row in rows]
+        """
+        Получить тикеты пользователя (новые сначала)
+        
+        Args:
+            before: Ticket.page_cursor последнего тикета предыдущей страницы
+        """
+        filters = {'user_id': user_id}
+        if status:
+            filters['status'] = status
+        return await self._fetch_page(filters, limit, before)
     
     async def get_all_tickets(
         self,
         status: Optional[str] = None,
         priority: Optional[str] = None,
-        limit: int = 50
+        limit: int = 50,
+        before: Optional[TicketCursor] = None
+    ) -> List[Ticket]:
+        """
+        Получить все тикеты (для админов, новые сначала)
+        
+        Args:
+            before: Ticket.page_cursor последнего тикета предыдущей страницы
+        """
+        filters = {}
+        if status:
+            filters['status'] = status
+        if priority:
+            filters['priority'] = priority
+        return await self._fetch_page(filters, limit, before)
+    
+    async def _fetch_page(
+        self,
+        filters: Dict[str, object],
+        limit: int,
+        before: Optional[TicketCursor]
     ) -> List[Ticket]:
-        """Получить все тикеты (для админов)"""
+        """
+        Страница тикетов по ключу (created_at, id)
+        
+        Фильтры и порядок совпадают с составными индексами миграции 010,
+        поэтому страница читается из индекса без OFFSET и сортировки:
+        стоимость не зависит от того, сколько тикетов накопилось.
+        """
+        conditions = []
+        params = []
+        
+        for column, value in filters.items():
+            params.append(value)
+            conditions.append(f"{column} = ${len(params)}")
+        
+        if before:
+            params.extend(before)
+            conditions.append(f"(created_at, id) < (${len(params) - 1}, ${len(params)})")
+        
+        query = "SELECT * FROM tickets"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        params.append(limit)
+        query += f" ORDER BY created_at DESC, id DESC LIMIT ${len(params)}"
+        
         async with self.pool.acquire() as conn:
-            query = "SELECT * FROM tickets WHERE 1=1"
-            params = []
-            param_count = 0
-            
-            if status:
-                param_count += 1
-                query += f" AND status = ${param_count}"
-                params.append(status)
-            
-            if priority:
-                param_count += 1
-                query += f" AND priority = ${param_count}"
-                params.append(priority)
-            
-            param_count += 1
-            query += f" ORDER BY created_at DESC LIMIT ${param_count}"
-            params.append(limit)
-            
             rows = await conn.fetch(query, *params)
             return [Ticket.from_db_row(row) for row in rows]
     
@@ -111,30 +132,29 @@ class TicketRepository:
         ticket_id: int,
         status: str
     ) -> Ticket:
-        """Обновить статус тикета"""
+        """Обновить статус тикета (при закрытии ставится closed_at)"""
         async with self.pool.acquire() as conn:
-            # Если закрываем - ставим closed_at
-            if status == 'closed':
+            async with conn.transaction():
+                # Прежний статус читается под блокировкой строки тикета,
+                # чтобы параллельные смены статуса не сбили счётчики
                 row = await conn.fetchrow(
                     """
-                    UPDATE tickets
-                    SET status = $1, closed_at = NOW()
-                    WHERE id = $2
-                    RETURNING *
+                    UPDATE tickets AS t
+                    SET status = $1::varchar,
+                        closed_at = CASE WHEN $1::varchar = 'closed' THEN NOW() ELSE t.closed_at END
+                    FROM (
+                        SELECT id, status AS old_status
+                        FROM tickets
+                        WHERE id = $2
+                        FOR UPDATE
+                    ) prev
+                    WHERE t.id = prev.id
+                    RETURNING t.*, prev.old_status
                     """,
                     status, ticket_id
                 )
-            else:
-                row = await conn.fetchrow(
-                    """
-                    UPDATE tickets
-                    SET status = $1
-                    WHERE id = $2
-                    RETURNING *
-                    """,
-                    status, ticket_id
-                )
-            
+                if row:
+                    await self._add_stats(conn, self._status_change(row['old_status'], row['status']))
             return Ticket.from_db_row(row)
     
     async def assign_to(
@@ -142,62 +162,125 @@ class TicketRepository:
         ticket_id: int,
         admin_id: int
     ) -> Ticket:
-        """Назначить тикет админу"""
+        """Назначить тикет админу (статус становится in_progress)"""
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                """
-                UPDATE tickets
-                SET assigned_to = $1, status = 'in_progress'
-                WHERE id = $2
-                RETURNING *
-                """,
-                admin_id, ticket_id
-            )
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    """
+                    UPDATE tickets AS t
+                    SET assigned_to = $1, status = 'in_progress'
+                    FROM (
+                        SELECT id, status AS old_status
+                        FROM tickets
+                        WHERE id = $2
+                        FOR UPDATE
+                    ) prev
+                    WHERE t.id = prev.id
+                    RETURNING t.*, prev.old_status
+                    """,
+                    admin_id, ticket_id
+                )
+                if row:
+                    await self._add_stats(conn, self._status_change(row['old_status'], row['status']))
             return Ticket.from_db_row(row)
     
-    async def count_by_status(self, status: str) -> int:
-        """Подсчитать тикеты по статусу"""
+    # ========================================================================
+    # СТАТИСТИКА
+    # ========================================================================
+    
+    @staticmethod
+    def _status_change(old_status: Optional[str], new_status: Optional[str]) -> Dict[Tuple[str, str], int]:
+        """Изменения счётчиков при смене статуса"""
+        if old_status == new_status:
+            return {}
+        return {('status', old_status): -1, ('status', new_status): 1}
+    
+    @staticmethod
+    async def _add_stats(conn: asyncpg.Connection, changes: Dict[Tuple[str, str], int]):
+        """
+        Изменить счётчики ticket_stats одним запросом
+        
+        Вызывается внутри транзакции изменения тикета. Ключи идут в
+        одном порядке, поэтому параллельные транзакции блокируют строки
+        счётчиков в одной последовательности и не ловят deadlock.
+        """
+        changes = sorted(
+            (key, delta) for key, delta in changes.items()
+            if delta and key[1] is not None
+        )
+        if not changes:
+            return
+        
+        await conn.execute(
+            """
+            INSERT INTO ticket_stats (dimension, value, count)
+            SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::bigint[])
+            ON CONFLICT (dimension, value)
+            DO UPDATE SET count = ticket_stats.count + EXCLUDED.count
+            """,
+            [dimension for (dimension, _), _ in changes],
+            [value for (_, value), _ in changes],
+            [delta for _, delta in changes]
+        )
+    
+    async def _get_stat(self, dimension: str, value: str) -> int:
         async with self.pool.acquire() as conn:
-            return await conn.fetchval(
-                "SELECT COUNT(*) FROM tickets WHERE status = $1",
-                status
+            count = await conn.fetchval(
+                "SELECT count FROM ticket_stats WHERE dimension = $1 AND value = $2",
+                dimension, value
             )
+            return count or 0
+    
+    async def count_by_status(self, status: str) -> int:
+        """Подсчитать тикеты по статусу (из счётчиков)"""
+        return await self._get_stat('status', status)
     
     async def count_by_priority(self, priority: str) -> int:
-        """Подсчитать тикеты по приоритету"""
-        async with self.pool.acquire() as conn:
-            return await conn.fetchval(
-                "SELECT COUNT(*) FROM tickets WHERE priority = $1",
-                priority
-            )
+        """Подсчитать тикеты по приоритету (из счётчиков)"""
+        return await self._get_stat('priority', priority)
     
     async def get_stats(self) -> TicketStats:
-        """Получить статистику тикетов"""
+        """Получить статистику тикетов (из счётчиков, без обхода tickets)"""
         async with self.pool.acquire() as conn:
-            # Общая статистика
-            total_row = await conn.fetchrow(
-                """
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END) as open,
-                    SUM(CASE WHEN status = 'in_progress' THEN 1 ELSE 0 END) as in_progress,
-                    SUM(CASE WHEN status = 'closed' THEN 1 ELSE 0 END) as closed,
-                    SUM(CASE WHEN priority = 'high' THEN 1 ELSE 0 END) as high_priority,
-                    SUM(CASE WHEN priority = 'medium' THEN 1 ELSE 0 END) as medium_priority,
-                    SUM(CASE WHEN priority = 'low' THEN 1 ELSE 0 END) as low_priority
-                FROM tickets
-                """
-            )
-            
-            return TicketStats(
-                total=total_row['total'] or 0,
-                open=total_row['open'] or 0,
-                in_progress=total_row['in_progress'] or 0,
-                closed=total_row['closed'] or 0,
-                high_priority=total_row['high_priority'] or 0,
-                medium_priority=total_row['medium_priority'] or 0,
-                low_priority=total_row['low_priority'] or 0
-            )
+            rows = await conn.fetch("SELECT dimension, value, count FROM ticket_stats")
+        
+        counts = {(row['dimension'], row['value']): row['count'] for row in rows}
+        
+        return TicketStats(
+            total=sum(count for (dimension, _), count in counts.items() if dimension == 'status'),
+            open=counts.get(('status', 'open'), 0),
+            in_progress=counts.get(('status', 'in_progress'), 0),
+            closed=counts.get(('status', 'closed'), 0),
+            high_priority=counts.get(('priority', 'high'), 0),
+            medium_priority=counts.get(('priority', 'medium'), 0),
+            low_priority=counts.get(('priority', 'low'), 0)
+        )
+    
+    async def recount_stats(self) -> TicketStats:
+        """
+        Пересчитать счётчики по таблице tickets
+        
+        Нужен, если тикеты менялись в обход репозитория (например, ушли
+        вместе с пользователем через ON DELETE CASCADE).
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Ждём транзакции, которые уже меняют счётчики, и не даём
+                # начать новые до конца пересчёта
+                await conn.execute("LOCK TABLE ticket_stats IN EXCLUSIVE MODE")
+                await conn.execute("DELETE FROM ticket_stats")
+                await conn.execute(
+                    """
+                    INSERT INTO ticket_stats (dimension, value, count)
+                    SELECT 'status', status, COUNT(*) FROM tickets
+                    WHERE status IS NOT NULL GROUP BY status
+                    UNION ALL
+                    SELECT 'priority', priority, COUNT(*) FROM tickets
+                    WHERE priority IS NOT NULL GROUP BY priority
+                    """
+                )
+        
+        return await self.get_stats()
     
     # ========================================================================
     # СООБЩЕНИЯ
@@ -2,8 +2,8 @@
 User repository - работа с пользователями в БД
 """
 import asyncpg
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Optional, List, Sequence, Tuple
+from datetime import datetime, timedelta
 
 from domain.models.user import User
 
@@ -98,6 +98,69 @@ class UserRepository:
             )
             return User.from_db_row(row)
     
+    async def claim_daily(
+        self,
+        telegram_id: str,
+        xp: int,
+        coins: int,
+        cooldown: timedelta,
+        streak_window: timedelta,
+        rank_thresholds: Sequence[int],
+        rank_rewards: Sequence[int]
+    ) -> Optional[Tuple[User, int]]:
+        """
+        Выдать ежедневную награду одним условным UPDATE
+        
+        Кулдаун, XP, монеты, пересчёт ранга (с наградой за новый ранг),
+        стрик и last_daily применяются атомарно: из параллельных запросов
+        условие last_daily проходит только один, остальные получают 0 строк.
+        
+        Args:
+            cooldown: Минимальный интервал между наградами
+            streak_window: Если прошлая награда была не раньше этого
+                интервала - стрик продолжается, иначе начинается заново
+            rank_thresholds: required_xp рангов по порядку (id = позиция + 1)
+            rank_rewards: reward_coins рангов в том же порядке
+        
+        Returns:
+            (пользователь после награды, ранг до неё) или None, если кулдаун
+            не прошёл или пользователя нет
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                UPDATE users AS u
+                SET xp = u.xp + $2,
+                    coins = u.coins + $3 + CASE
+                        WHEN prev.new_rank_id > u.rank_id THEN ($7::int[])[prev.new_rank_id]
+                        ELSE 0
+                    END,
+                    rank_id = GREATEST(u.rank_id, prev.new_rank_id),
+                    daily_streak = CASE
+                        WHEN u.last_daily >= NOW() - $5::interval THEN u.daily_streak + 1
+                        ELSE 1
+                    END,
+                    last_daily = NOW(),
+                    last_active = NOW()
+                FROM (
+                    SELECT id, rank_id AS old_rank_id,
+                           (SELECT COUNT(*) FROM unnest($6::int[]) AS r(required_xp)
+                            WHERE r.required_xp <= users.xp + $2)::int AS new_rank_id
+                    FROM users
+                    WHERE telegram_id = $1
+                    FOR UPDATE
+                ) AS prev
+                WHERE u.id = prev.id
+                  AND (u.last_daily IS NULL OR u.last_daily <= NOW() - $4::interval)
+                RETURNING u.*, prev.old_rank_id
+                """,
+                telegram_id, xp, coins, cooldown, streak_window,
+                list(rank_thresholds), list(rank_rewards)
+            )
+            if not row:
+                return None
+            return User.from_db_row(row), row['old_rank_id']
+    
     async def get_leaderboard(self, limit: int = 10) -> List[User]:
         """Получить топ пользователей по XP"""
         async with self.pool.acquire() as conn:
@@ -125,3 +188,26 @@ class UserRepository:
                 "UPDATE users SET last_active = NOW() WHERE id = $1",
                 user_id
             )
+    
+    async def update_last_active_many(self, last_active: Dict[int, datetime]):
+        """
+        Обновить last_active многим пользователям одним запросом
+        
+        Args:
+            last_active: {user_id: время активности}; более позднее время
+                в БД (например, от update_xp) не перезаписывается
+        """
+        if not last_active:
+            return
+        
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                """
+                UPDATE users AS u
+                SET last_active = GREATEST(u.last_active, v.ts)
+                FROM unnest($1::int[], $2::timestamp[]) AS v(id, ts)
+                WHERE u.id = v.id
+                """,
+                list(last_active.keys()),
+                list(last_active.values())
+            )
@@ -4,6 +4,7 @@ TTFD Telegram Bot v3.0 - Clean Architecture
 Шаг 2: Игровая мета (Сезоны)
 """
 import asyncio
+import os
 import sys
 import logging
 from telegram import Update
@@ -24,7 +25,11 @@ from infrastructure.database.repositories.ticket_repository import TicketReposit
 from infrastructure.database.repositories.season_repository import SeasonRepository
 from infrastructure.database.repositories.achievement_repository import AchievementRepository
 from infrastructure.database.repositories.discord_repository import DiscordRepository
+from infrastructure.database.repositories.ledger_repository import LedgerRepository
+from infrastructure.database.repositories.sync_repository import SyncRepository
 from infrastructure.cache.redis_cache import RedisCache, MemoryCache
+from infrastructure.cache.season_rank_index import MemorySeasonRankIndex, RedisSeasonRankIndex
+from infrastructure.cache.idempotency_cache import IdempotencyCache
 from infrastructure.external.discord_client import DiscordClient
 
 # Domain
@@ -35,9 +40,13 @@ from domain.services.ticket_service import TicketService
 from domain.services.season_service import SeasonService
 from domain.services.achievement_service import AchievementService
 from domain.services.discord_service import DiscordService
+from domain.services.ledger_service import LedgerService
+from domain.services.sync_service import SyncService
 
 # Application
 from application.router import callback_router
+from application.jobs.scheduler import JobScheduler
+from application.jobs.activity_tracker import ActivityTracker
 from application.handlers.user.profile_handler import ProfileHandler
 from application.handlers.user.leaderboard_handler import LeaderboardHandler
 from application.handlers.economy.daily_handler import DailyHandler
@@ -96,7 +105,8 @@ async def help_command(update: Update, context):
         "/admin - Админ-панель\n"
         "/admin_stats - Статистика платформы\n"
         "/setrole <id> <role> - Изменить роль\n"
-        "/broadcast <текст> - Рассылка\n\n"
+        "/broadcast <текст> - Рассылка\n"
+        "/reload_permissions - Перечитать список админов\n\n"
         "ℹ️ Прочее:\n"
         "/start - Начать работу с ботом\n"
         "/help - Эта справка"
@@ -143,6 +153,8 @@ async def main():
     season_repo = SeasonRepository(db_connection.get_pool())
     achievement_repo = AchievementRepository(db_connection.get_pool())
     discord_repo = DiscordRepository(db_connection.get_pool())
+    ledger_repo = LedgerRepository(db_connection.get_pool())
+    sync_repo = SyncRepository(db_connection.get_pool())
     
     # Создаём Discord клиент (опционально)
     discord_client = None
@@ -155,14 +167,47 @@ async def main():
     else:
         print("⚠️  Discord интеграция отключена (нет токена/guild_id)")
     
+    # Индекс сезонного рейтинга (Redis - общий для реплик, иначе in-memory)
+    rank_index = None
+    if Config.SEASON_RANKS_INCREMENTAL:
+        if isinstance(cache, RedisCache) and cache.enabled:
+            rank_index = RedisSeasonRankIndex(cache)
+        else:
+            rank_index = MemorySeasonRankIndex()
+    
     # Создаём services (с кэшем)
     print("🔧 Инициализация services...")
-    user_service = UserService(user_repo, cache)
+    activity_tracker = ActivityTracker(user_repo, Config.ACTIVITY_FLUSH_INTERVAL)
+    user_service = UserService(user_repo, cache, activity_tracker)
     discord_service = DiscordService(discord_repo, discord_client)
     achievement_service = AchievementService(achievement_repo, user_service, discord_service)
-    season_service = SeasonService(season_repo, user_service, achievement_service, discord_service)
+    season_service = SeasonService(
+        season_repo,
+        user_service,
+        achievement_service,
+        discord_service,
+        rank_index=rank_index
+    )
     game_service = GameService(game_repo, user_service, season_service, achievement_service)
     ticket_service = TicketService(ticket_repo, user_service)
+    ledger_service = LedgerService(ledger_repo)
+    
+    # Кэш ключей идемпотентности: известные ключи не идут на INSERT
+    # (Redis - общий признак "ключ уже видели" для реплик)
+    idempotency_cache = IdempotencyCache(
+        lru_size=Config.IDEMPOTENCY_CACHE_SIZE,
+        bloom_capacity=Config.IDEMPOTENCY_BLOOM_CAPACITY,
+        bloom_error_rate=Config.IDEMPOTENCY_BLOOM_ERROR_RATE,
+        redis_cache=cache if isinstance(cache, RedisCache) else None,
+        redis_ttl=Config.IDEMPOTENCY_REDIS_TTL
+    )
+    sync_service = SyncService(
+        sync_repo,
+        user_repo,
+        discord_repo,
+        idempotency_cache=idempotency_cache,
+        ledger_service=ledger_service
+    )
     
     # Создаём handlers
     print("🔧 Инициализация handlers...")
@@ -208,6 +253,9 @@ async def main():
     print("\n🤖 Создание Telegram приложения...")
     app = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
     
+    # События синхронизации создаются через общий SyncService (с кэшем идемпотентности)
+    app.bot_data['sync_service'] = sync_service
+    
     # Регистрируем handlers
     print("📝 Регистрация handlers...")
     app.add_handler(CommandHandler("start", start_command))
@@ -221,6 +269,7 @@ async def main():
     app.add_handler(CommandHandler("admin_stats", admin_handler.handle_stats_command))
     app.add_handler(CommandHandler("setrole", admin_handler.handle_set_role_command))
     app.add_handler(CommandHandler("broadcast", admin_handler.handle_broadcast_command))
+    app.add_handler(CommandHandler("reload_permissions", admin_handler.handle_reload_permissions_command))
     
     # Игровые команды
     app.add_handler(CommandHandler("games", games_menu_handler.handle_menu))
@@ -297,7 +346,6 @@ async def main():
             await asyncio.sleep(300)  # Каждые 5 минут
             try:
                 await discord_service.process_pending_role_grants()
-                await discord_service.expire_old_codes()
             except Exception as e:
                 logger.error(f"Ошибка в process_discord_roles: {e}")
     
@@ -305,6 +353,32 @@ async def main():
     asyncio.create_task(check_season())
     asyncio.create_task(process_discord_roles())
     
+    # Коды привязки Discord (shared/link_codes.py) - для очистки link_codes
+    link_code_manager = None
+    try:
+        sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+        from link_codes import get_link_code_manager
+        link_code_manager = await get_link_code_manager()
+    except Exception as e:
+        print(f"⚠️  Очистка link_codes отключена: {e}")
+    
+    # Обслуживание БД: одна реплика на задачу, порционные DELETE/UPDATE
+    job_scheduler = JobScheduler(
+        user_service,
+        game_service,
+        pool=db_connection.get_pool(),
+        sync_repo=sync_repo,
+        discord_repo=discord_repo,
+        link_code_manager=link_code_manager,
+        ledger_service=ledger_service,
+        ticket_repo=ticket_repo
+    )
+    job_scheduler.setup_jobs()
+    job_scheduler.start()
+    
+    # Отложенная запись last_active
+    await activity_tracker.start()
+    
     print("\n" + "=" * 60)
     print("✅ TTFD Bot v3.0 запущен и готов к работе!")
     print("   • Clean Architecture")
@@ -325,6 +399,10 @@ async def main():
         await app.run_polling(drop_pending_updates=True)
     finally:
         # Закрываем подключения
+        job_scheduler.shutdown()
+        await activity_tracker.stop()
+        if link_code_manager:
+            await link_code_manager.disconnect()
         await db_connection.disconnect()
         await cache.disconnect()
 
@@ -0,0 +1,135 @@
+"""
+Бенчмарк проверок прав на горячем пути callback
+
+Сравнивает прежние проверки (список ролей + два .index(), поиск в
+списке прав и списке админов) со скомпилированной PermissionMatrix и
+меряет накладные расходы декораторов require_role/require_permission
+поверх пустого handler (пользователь уже в RequestContext апдейта).
+
+Запуск: python scripts/benchmark_permissions.py [iterations]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+# Добавляем корневую папку в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.request_context import RequestContext
+from domain.models.permission import (
+    Permission, Role, ROLE_PERMISSIONS, PermissionMatrix, compile_permissions
+)
+from domain.models.user import User
+from domain.services.permission_service import PermissionService
+
+ADMIN_IDS = [str(100000 + i) for i in range(50)]
+
+
+def legacy_has_role(user_role: Role, required_role: Role) -> bool:
+    """Как было: иерархия собирается на каждый вызов"""
+    role_hierarchy = [Role.USER, Role.VIP, Role.MODERATOR, Role.ADMIN, Role.OWNER]
+    return role_hierarchy.index(user_role) >= role_hierarchy.index(required_role)
+
+
+def legacy_has_permission(role: Role, permission: Permission) -> bool:
+    return permission in ROLE_PERMISSIONS.get(role, [])
+
+
+def measure(label: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    per_call = (time.perf_counter() - start) / iterations * 1_000_000_000
+    print(f"   {label:<34} {per_call:8.1f} нс/вызов")
+    return per_call
+
+
+async def measure_async(label: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    per_call = (time.perf_counter() - start) / iterations * 1_000_000_000
+    print(f"   {label:<34} {per_call:8.1f} нс/вызов")
+    return per_call
+
+
+class Handler:
+    """Handler с user_service, как у настоящих handlers"""
+    
+    def __init__(self, user):
+        async def get_or_create_user(telegram_id, username, first_name, ctx=None):
+            if ctx and ctx.user_for(telegram_id):
+                return ctx.user
+            ctx.remember_user(user)
+            return user
+        
+        self.user_service = SimpleNamespace(get_or_create_user=get_or_create_user)
+    
+    async def bare(self, update, context):
+        return True
+    
+    @PermissionService.require_role(Role.MODERATOR)
+    async def by_role(self, update, context):
+        return True
+    
+    @PermissionService.require_permission(Permission.VIEW_TICKETS)
+    async def by_permission(self, update, context):
+        return True
+
+
+async def run(iterations: int):
+    matrix = compile_permissions(ADMIN_IDS)
+    
+    print("=" * 60)
+    print(f"🔐 Проверки прав: {iterations} итераций")
+    print("=" * 60)
+    
+    print("\n📋 Уровень роли (ADMIN >= MODERATOR):")
+    legacy = measure("список + .index()", lambda: legacy_has_role(Role.ADMIN, Role.MODERATOR), iterations)
+    compiled = measure("PermissionMatrix.has_role", lambda: matrix.has_role(Role.ADMIN, Role.MODERATOR), iterations)
+    print(f"   Ускорение: x{legacy / compiled:.1f}")
+    
+    print("\n📋 Право роли (ADMIN, BAN_USERS - в конце списка):")
+    legacy = measure("поиск в списке", lambda: legacy_has_permission(Role.ADMIN, Permission.BAN_USERS), iterations)
+    compiled = measure("битовая маска", lambda: matrix.has_permission(Role.ADMIN, Permission.BAN_USERS), iterations)
+    print(f"   Ускорение: x{legacy / compiled:.1f}")
+    
+    print(f"\n📋 Админ по ID ({len(ADMIN_IDS)} админов, ID не из списка):")
+    legacy = measure("список", lambda: '999' in ADMIN_IDS, iterations)
+    compiled = measure("frozenset", lambda: matrix.is_admin('999'), iterations)
+    print(f"   Ускорение: x{legacy / compiled:.1f}")
+    
+    # Декораторы: один апдейт = один CallbackContext с готовым RequestContext
+    user = User(
+        id=1, telegram_id='42', username='bench', first_name='Bench', xp=0, coins=0,
+        rank_id=1, role='admin', created_at=datetime.now(), last_active=datetime.now()
+    )
+    handler = Handler(user)
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=42, username='bench', first_name='Bench'))
+    context = SimpleNamespace()
+    RequestContext.of(update, context)
+    
+    print("\n📋 Декораторы поверх пустого handler:")
+    bare = await measure_async("без декоратора", lambda: handler.bare(update, context), iterations)
+    by_role = await measure_async("require_role(MODERATOR)", lambda: handler.by_role(update, context), iterations)
+    by_permission = await measure_async("require_permission(VIEW_TICKETS)", lambda: handler.by_permission(update, context), iterations)
+    print(f"   Накладные расходы: роль +{by_role - bare:.0f} нс, право +{by_permission - bare:.0f} нс")
+    
+    # Проверка корректности: матрица совпадает с прежними проверками
+    for role in Role:
+        for required in Role:
+            assert matrix.has_role(role, required) == legacy_has_role(role, required)
+        for permission in Permission:
+            assert matrix.has_permission(role, permission) == legacy_has_permission(role, permission)
+    assert all(matrix.is_admin(admin_id) for admin_id in ADMIN_IDS)
+    assert matrix.role('ADMIN') is Role.ADMIN and matrix.role(None) is Role.USER
+    assert isinstance(PermissionMatrix().permissions[Role.OWNER], frozenset)
+    print("\n✅ Скомпилированные таблицы совпадают с прежними проверками")
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    asyncio.run(run(iterations))
@@ -0,0 +1,84 @@
+"""
+Бенчмарк сезонного рейтинга: полный пересчёт vs инкрементальный индекс
+
+Моделирует сезон со 100k участниками и сравнивает:
+- полный пересчёт (аналог ROW_NUMBER + UPDATE всех строк в update_ranks)
+- MemorySeasonRankIndex: обновление XP и позиция на чтении
+
+Запуск: python scripts/benchmark_season_ranks.py [participants] [updates]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Добавляем корневую папку в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infrastructure.cache.season_rank_index import MemorySeasonRankIndex
+
+SEASON_ID = 1
+
+
+def full_rerank(scores: dict) -> dict:
+    """Полный пересчёт: сортировка и ранг для каждой строки"""
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return {user_id: rank for rank, (user_id, _) in enumerate(ordered, 1)}
+
+
+async def run(participants: int, updates: int):
+    rng = random.Random(42)
+    scores = {user_id: rng.randint(0, 50_000) for user_id in range(1, participants + 1)}
+    
+    print("=" * 60)
+    print(f"📊 Сезонный рейтинг: {participants} участников, {updates} обновлений XP")
+    print("=" * 60)
+    
+    # Полный пересчёт
+    start = time.perf_counter()
+    ranks = full_rerank(scores)
+    full_time = time.perf_counter() - start
+    print(f"\n🐢 Полный пересчёт: {full_time * 1000:.1f} мс, {len(ranks)} записей rank")
+    
+    # Прогрев индекса
+    index = MemorySeasonRankIndex()
+    start = time.perf_counter()
+    await index.load(SEASON_ID, scores.items())
+    load_time = time.perf_counter() - start
+    print(f"\n⚡ Загрузка индекса: {load_time * 1000:.1f} мс (один раз на сезон)")
+    
+    # Обновления XP
+    user_ids = [rng.randint(1, participants) for _ in range(updates)]
+    start = time.perf_counter()
+    for user_id in user_ids:
+        scores[user_id] += rng.randint(1, 500)
+        await index.set_score(SEASON_ID, user_id, scores[user_id])
+    update_time = time.perf_counter() - start
+    print(f"   Обновление XP: {update_time / updates * 1_000_000:.1f} мкс/операция")
+    
+    # Позиция на чтении
+    start = time.perf_counter()
+    for user_id in user_ids:
+        await index.get_rank(SEASON_ID, user_id)
+    read_time = time.perf_counter() - start
+    print(f"   Позиция пользователя: {read_time / updates * 1_000_000:.1f} мкс/операция")
+    
+    start = time.perf_counter()
+    top = await index.get_top(SEASON_ID, 50)
+    top_time = time.perf_counter() - start
+    print(f"   Топ-50: {top_time * 1_000_000:.1f} мкс")
+    
+    # Проверка корректности
+    expected = full_rerank(scores)
+    sample = rng.sample(range(1, participants + 1), 1000)
+    for user_id in sample:
+        assert await index.get_rank(SEASON_ID, user_id) == expected[user_id]
+    assert [user_id for user_id, _ in top] == sorted(expected, key=expected.get)[:50]
+    print("\n✅ Позиции индекса совпадают с полным пересчётом")
+
+
+if __name__ == '__main__':
+    participants = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    asyncio.run(run(participants, updates))
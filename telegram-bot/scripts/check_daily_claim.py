@@ -0,0 +1,80 @@
+"""
+Проверка атомарности ежедневной награды на реальной БД
+
+Создаёт тестового пользователя, сбрасывает ему last_daily и отправляет
+N параллельных claim_daily (как быстрые повторные нажатия /daily через
+разные соединения пула). Награду должен получить ровно один запрос,
+остальные - CooldownError; XP и монеты начислены один раз.
+
+Нужен DATABASE_URL с применённой миграцией 009_daily_streak.sql.
+
+Запуск: python scripts/check_daily_claim.py [concurrency]
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Добавляем корневую папку в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import Config
+from core.exceptions import CooldownError
+from domain.services.user_service import UserService
+from infrastructure.database.connection import db_connection
+from infrastructure.database.repositories.user_repository import UserRepository
+
+TEST_TELEGRAM_ID = 'daily-claim-check'
+
+
+async def run(concurrency: int):
+    await db_connection.connect()
+    pool = db_connection.get_pool()
+    user_repo = UserRepository(pool)
+    user_service = UserService(user_repo)
+    
+    try:
+        user = await user_repo.get_by_telegram_id(TEST_TELEGRAM_ID)
+        if not user:
+            user = await user_repo.create(TEST_TELEGRAM_ID, 'daily_check', 'Daily Check')
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE users SET last_daily = NULL, daily_streak = 0 WHERE id = $1",
+                user.id
+            )
+        before = await user_repo.get_by_id(user.id)
+        
+        print("=" * 60)
+        print(f"🎁 {concurrency} параллельных claim_daily для одного пользователя")
+        print("=" * 60)
+        
+        async def claim():
+            try:
+                return await user_service.claim_daily(TEST_TELEGRAM_ID)
+            except CooldownError:
+                return None
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(claim() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        
+        wins = [result for result in results if result]
+        after = await user_repo.get_by_id(user.id)
+        rank_bonus = wins[0]['new_rank'].reward_coins if wins and wins[0]['rank_up'] else 0
+        
+        print(f"\n⏱️  {elapsed * 1000:.1f} мс на все запросы")
+        print(f"   Выдано наград: {len(wins)}, отказов по кулдауну: {len(results) - len(wins)}")
+        print(f"   XP: {before.xp} → {after.xp}, монеты: {before.coins} → {after.coins}, стрик: {after.daily_streak}")
+        
+        assert len(wins) == 1, f"ожидалась ровно одна награда, выдано {len(wins)}"
+        assert after.xp - before.xp == Config.DAILY_REWARD_XP
+        assert after.coins - before.coins == Config.DAILY_REWARD_COINS + rank_bonus
+        assert after.daily_streak == 1
+        print("\n✅ Награду получил ровно один запрос")
+    finally:
+        await db_connection.disconnect()
+
+
+if __name__ == '__main__':
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    asyncio.run(run(concurrency))
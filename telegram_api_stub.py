@@ -0,0 +1,204 @@
+# Локальная замена Telegram Bot API для проверки бэкапов
+#
+#   python telegram_api_stub.py --port 8081 --dir stub_files
+#   TELEGRAM_API_URL=http://localhost:8081 python main.py
+#
+#   python telegram_api_stub.py --check   # полный цикл: снимок, дельты, восстановление
+#
+# Поддерживает sendMessage, sendDocument, getFile и скачивание файлов.
+# Как и настоящий API, отклоняет файлы больше 50 МБ.
+import argparse
+import asyncio
+import copy
+import os
+import tempfile
+
+from aiohttp import web
+
+from backup_engine import BackupEngine, restore, to_json_files
+
+# Лимит sendDocument в Telegram Bot API
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+
+
+def create_app(files_dir):
+    """Приложение aiohttp, сохраняющее присланные документы в files_dir"""
+    os.makedirs(files_dir, exist_ok=True)
+    app = web.Application(client_max_size=MAX_UPLOAD_SIZE + 1024 * 1024)
+    app['messages'] = []
+    app['documents'] = []
+    app['reject_document'] = None  # Номер документа, который отклонить (обрыв загрузки)
+    
+    def ok(result):
+        return web.json_response({'ok': True, 'result': result})
+    
+    async def send_message(request):
+        data = await request.json()
+        request.app['messages'].append(data)
+        return ok({'message_id': len(request.app['messages']), 'text': data.get('text')})
+    
+    async def send_document(request):
+        if request.app['reject_document'] == len(request.app['documents']) + 1:
+            request.app['reject_document'] = None
+            return web.json_response({'ok': False, 'description': 'Internal Server Error'}, status=500)
+        
+        reader = await request.multipart()
+        fields = {}
+        document = None
+        
+        while True:
+            part = await reader.next()
+            if part is None:
+                break
+            if part.name == 'document':
+                path = os.path.join(files_dir, os.path.basename(part.filename))
+                size = 0
+                with open(path, 'wb') as f:
+                    while True:
+                        chunk = await part.read_chunk()
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        f.write(chunk)
+                if size > MAX_UPLOAD_SIZE:
+                    os.remove(path)
+                    return web.json_response(
+                        {'ok': False, 'error_code': 413, 'description': 'Request Entity Too Large'},
+                        status=413
+                    )
+                document = {'file_id': part.filename, 'file_name': part.filename, 'file_size': size}
+            else:
+                fields[part.name] = await part.text()
+        
+        if document is None:
+            return web.json_response({'ok': False, 'description': 'document is required'}, status=400)
+        
+        request.app['documents'].append(document)
+        return ok({'message_id': len(request.app['documents']), 'caption': fields.get('caption'), 'document': document})
+    
+    async def get_file(request):
+        file_id = request.query.get('file_id', '')
+        return ok({'file_id': file_id, 'file_path': file_id})
+    
+    async def download(request):
+        path = os.path.join(files_dir, os.path.basename(request.match_info['path']))
+        if not os.path.exists(path):
+            raise web.HTTPNotFound()
+        return web.FileResponse(path)
+    
+    app.router.add_post('/bot{token}/sendMessage', send_message)
+    app.router.add_post('/bot{token}/sendDocument', send_document)
+    app.router.add_get('/bot{token}/getFile', get_file)
+    app.router.add_get('/file/bot{token}/{path}', download)
+    return app
+
+
+class FakeJsonDatabase:
+    """Минимальная JSON-база: то же устройство data/accounts, что и в database.py"""
+    
+    def __init__(self, users):
+        self.data = {
+            'users': {
+                str(i): {'user_id': str(i), 'username': f"user{i}", 'xp': i * 10, 'coins': i}
+                for i in range(1, users + 1)
+            },
+            'global_stats': {'total_clicks': 0, 'total_tasks_completed': 0},
+        }
+        self.accounts = {'accounts': {}, 'sessions': {}}
+
+
+async def check(users, chunk_size):
+    """
+    Снимок + дельты через заглушку, затем восстановление и сравнение
+    
+    Третья дельта обрывается на второй части: следующая получает новый
+    номер, а восстановление пропускает незафиксированную.
+    """
+    from telegram_bot import TelegramBackup
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        files_dir = os.path.join(tmp, 'telegram')
+        runner = web.AppRunner(create_app(files_dir))
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        
+        try:
+            app = runner.app
+            client = TelegramBackup(token='TEST', chat_id='1', api_url=f"http://127.0.0.1:{port}")
+            db = FakeJsonDatabase(users)
+            engine = BackupEngine(
+                db,
+                backup_dir=os.path.join(tmp, 'out'),
+                state_file=os.path.join(tmp, 'state.json'),
+                chunk_size=chunk_size,
+            )
+            snapshots = {}
+            
+            for step in range(5):
+                if step == 1:
+                    db.data['users']['1']['xp'] += 500
+                    db.data['users']['new'] = {'user_id': 'new', 'username': 'new', 'xp': 0, 'coins': 0}
+                    db.accounts['sessions']['token'] = {'account_id': '1'}
+                elif step == 2:
+                    del db.data['users']['2']
+                    db.data['global_stats']['total_clicks'] = 42
+                elif step == 3:
+                    for user in db.data['users'].values():
+                        user['coins'] += 1
+                    # Несколько частей, вторая не дойдёт
+                    engine.chunk_size = 4096
+                    app['reject_document'] = len(app['documents']) + 2
+                elif step == 4:
+                    engine.chunk_size = chunk_size
+                
+                backup = engine.create_backup()
+                uploaded = await client.upload_backup(engine, backup)
+                engine.cleanup(backup)
+                print(
+                    f"📤 #{backup['seq']} {backup['kind']}: {backup['records']} записей, "
+                    f"удалено {backup['deleted']}, {backup['size'] / 1024:.1f} КБ, частей {len(backup['paths'])}"
+                    f"{'' if uploaded else ' - загрузка оборвалась'}"
+                )
+                
+                if step == 3:
+                    assert not uploaded, "загрузка должна была оборваться"
+                    continue
+                assert uploaded, "загрузка не удалась"
+                
+                # Сессии в бэкап не попадают
+                expected = copy.deepcopy({'user_data': db.data, 'accounts': db.accounts})
+                expected['accounts']['sessions'] = {}
+                snapshots[backup['seq']] = expected
+            
+            assert engine.create_backup() is None, "пустая дельта должна пропускаться"
+            assert list(snapshots) == [1, 2, 3, 5], f"номер оборванного бэкапа использован снова: {list(snapshots)}"
+            
+            for seq, expected in snapshots.items():
+                collections, applied = restore(files_dir, until_seq=seq)
+                assert to_json_files(collections) == expected, f"восстановление на #{seq} не совпало"
+                print(f"✅ Восстановление на #{seq}: бэкапы {applied}")
+        finally:
+            await runner.cleanup()
+    
+    print("✅ Проверка бэкапов пройдена")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальная замена Telegram Bot API')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--dir', default='stub_files', help='Куда сохранять присланные файлы')
+    parser.add_argument('--check', action='store_true', help='Проверить цикл бэкап/восстановление')
+    parser.add_argument('--users', type=int, default=20000, help='Пользователей в проверке')
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024, help='Размер части в проверке')
+    args = parser.parse_args()
+    
+    if args.check:
+        asyncio.run(check(args.users, args.chunk_size))
+    else:
+        web.run_app(create_app(args.dir), port=args.port)
+
+
+if __name__ == '__main__':
+    main()
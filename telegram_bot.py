@@ -5,16 +5,22 @@ import asyncio
 from datetime import datetime
 import aiohttp
 
+from backup_engine import BackupEngine
+
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_BACKUP_CHAT_ID')  # ID чата для бэкапов
+# Адрес Bot API (можно указать локальный сервер, например telegram_api_stub.py)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', '6'))
 
 class TelegramBackup:
     """Telegram бот для резервного копирования данных"""
     
-    def __init__(self):
-        self.token = TELEGRAM_TOKEN
-        self.chat_id = TELEGRAM_CHAT_ID
-        self.base_url = f"https://api.telegram.org/bot{self.token}"
+    def __init__(self, token=TELEGRAM_TOKEN, chat_id=TELEGRAM_CHAT_ID, api_url=TELEGRAM_API_URL):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_url = api_url
+        self.base_url = f"{api_url}/bot{self.token}"
         
         if not self.token:
             print("⚠️ TELEGRAM_BOT_TOKEN не установлен")
@@ -57,11 +63,31 @@ class TelegramBackup:
                         form.add_field('caption', caption)
                     
                     async with session.post(url, data=form) as response:
+                        if response.status != 200:
+                            print(f"❌ Telegram отклонил файл {os.path.basename(file_path)}: {response.status}")
                         return response.status == 200
         except Exception as e:
             print(f"❌ Ошибка отправки файла в Telegram: {e}")
             return False
     
+    async def upload_backup(self, engine, backup):
+        """Отправить все части бэкапа и зафиксировать его при успехе"""
+        parts = backup['paths']
+        for number, path in enumerate(parts, 1):
+            caption = (
+                f"🔄 Бэкап #{backup['seq']} ({'полный' if backup['kind'] == 'base' else 'дельта'}"
+                f", снимок #{backup['base_seq']})\n"
+                f"📦 Часть {number}/{len(parts)}, записей: {backup['records']}, удалено: {backup['deleted']}"
+            )
+            if not await self.send_document(path, caption):
+                return False
+            if number == 1:
+                # Части уже в чате: при обрыве номер не используется повторно
+                engine.mark_sent(backup)
+        
+        engine.commit(backup)
+        return True
+    
     async def backup_data(self, data, backup_name="backup"):
         """Создать бэкап данных"""
         if not self.token or not self.chat_id:
@@ -121,7 +147,7 @@ class TelegramBackup:
                                 file_path = file_data['result']['file_path']
                                 
                                 # Скачиваем файл
-                                download_url = f"https://api.telegram.org/file/bot{self.token}/{file_path}"
+                                download_url = f"{self.api_url}/file/bot{self.token}/{file_path}"
                                 async with session.get(download_url) as download_response:
                                     content = await download_response.text()
                                     return json.loads(content)
@@ -143,23 +169,35 @@ class TelegramBackup:
 telegram_backup = TelegramBackup()
 
 # Функция для автоматического бэкапа
-async def auto_backup_to_telegram(db):
-    """Автоматический бэкап в Telegram каждые 6 часов"""
+async def auto_backup_to_telegram(db, engine=None):
+    """
+    Автоматический бэкап в Telegram каждые BACKUP_INTERVAL_HOURS часов
+    
+    Отправляется полный снимок, затем только изменения (см. backup_engine).
+    """
+    engine = engine or BackupEngine(db)
+    loop = asyncio.get_running_loop()
+    
     while True:
+        backup = None
         try:
-            # Получаем данные из БД
-            if hasattr(db, 'data'):
-                # JSON база
-                await telegram_backup.backup_data(db.data, "user_data")
-                await telegram_backup.backup_data(db.accounts, "accounts")
-            else:
-                # PostgreSQL база - делаем дамп
-                users = db.get_leaderboard(1000)  # Все пользователи
-                await telegram_backup.backup_data({'users': users}, "postgres_backup")
+            # Чтение базы и сжатие - в отдельном потоке, чтобы не стопорить бота
+            backup = await loop.run_in_executor(None, engine.create_backup)
             
-            print("✅ Автоматический бэкап в Telegram выполнен")
+            if backup is None:
+                print("ℹ️ С прошлого бэкапа данных не менялись")
+            elif await telegram_backup.upload_backup(engine, backup):
+                print(
+                    f"✅ Бэкап #{backup['seq']} ({backup['kind']}) отправлен в Telegram: "
+                    f"{backup['records']} записей, {backup['size'] / 1024:.1f} КБ, "
+                    f"частей: {len(backup['paths'])}"
+                )
+            else:
+                print(f"⚠️ Бэкап #{backup['seq']} не отправлен, изменения уйдут в следующий")
         except Exception as e:
             print(f"❌ Ошибка автобэкапа: {e}")
+        finally:
+            if backup:
+                engine.cleanup(backup)
         
-        # Ждём 6 часов
-        await asyncio.sleep(6 * 60 * 60)
+        await asyncio.sleep(BACKUP_INTERVAL_HOURS * 60 * 60)
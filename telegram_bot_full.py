@@ -696,12 +696,34 @@ async def handle_text_commands(update: Update, context: ContextTypes.DEFAULT_TYP
 
 # ==================== ЗАПУСК БОТА ====================
 
-def run_telegram_bot():
-    """Запустить Telegram бота"""
-    print("=" * 50)
-    print("🤖 Запуск Telegram бота...")
-    print("=" * 50)
-    
+def build_application():
+    """Собрать приложение Telegram бота с обработчиками"""
+    app = Application.builder().token(TELEGRAM_TOKEN).build()
+    
+    # Команды
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("help", help_command))
+    print("✅ Команды зарегистрированы")
+    
+    # Кнопки
+    app.add_handler(CallbackQueryHandler(button_handler))
+    print("✅ Обработчик кнопок зарегистрирован")
+    
+    # Сообщения (для тикетов и команд)
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, lambda u, c: 
+        handle_ticket_message(u, c) if c.user_data.get('waiting_for_ticket') else handle_text_commands(u, c)
+    ))
+    print("✅ Обработчик сообщений зарегистрирован")
+    
+    return app
+
+async def run_telegram_bot_async(stop_event=None):
+    """
+    Запустить Telegram бота в текущем event loop
+    
+    Работает до установки stop_event (или до отмены задачи), затем
+    останавливает polling и сохраняет тикеты.
+    """
     if not TELEGRAM_TOKEN:
         print("❌ TELEGRAM_BOT_TOKEN не установлен!")
         print("   Установи переменную окружения TELEGRAM_BOT_TOKEN")
@@ -713,43 +735,35 @@ def run_telegram_bot():
     load_tickets()
     print(f"✅ Загружено тикетов: {len(tickets)}")
     
+    app = build_application()
+    await app.initialize()
+    await app.start()
+    await app.updater.start_polling(drop_pending_updates=True)
+    
+    print("=" * 50)
+    print("✅ Telegram бот запущен и готов к работе!")
+    print("   Отправь /start боту в Telegram")
+    print("=" * 50)
+    
+    try:
+        await (stop_event or asyncio.Event()).wait()
+    finally:
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        save_tickets()
+        print("🛑 Telegram бот остановлен")
+
+def run_telegram_bot():
+    """Запустить Telegram бота (в своём event loop - для работы в потоке)"""
+    print("=" * 50)
+    print("🤖 Запуск Telegram бота...")
+    print("=" * 50)
+    
     try:
-        app = Application.builder().token(TELEGRAM_TOKEN).build()
-        
-        # Команды
-        app.add_handler(CommandHandler("start", start))
-        app.add_handler(CommandHandler("help", help_command))
-        print("✅ Команды зарегистрированы")
-        
-        # Кнопки
-        app.add_handler(CallbackQueryHandler(button_handler))
-        print("✅ Обработчик кнопок зарегистрирован")
-        
-        # Сообщения (для тикетов и команд)
-        app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, lambda u, c: 
-            handle_ticket_message(u, c) if c.user_data.get('waiting_for_ticket') else handle_text_commands(u, c)
-        ))
-        print("✅ Обработчик сообщений зарегистрирован")
-        
-        print("=" * 50)
-        print("✅ Telegram бот запущен и готов к работе!")
-        print("   Отправь /start боту в Telegram")
-        print("=" * 50)
-        
-        # Используем webhook вместо polling для работы в потоке
-        # Но для простоты просто запускаем в новом event loop
-        import asyncio
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        
-        async def start_bot():
-            await app.initialize()
-            await app.start()
-            await app.updater.start_polling(drop_pending_updates=True)
-            # Держим бота запущенным
-            await asyncio.Event().wait()
-        
-        loop.run_until_complete(start_bot())
+        loop.run_until_complete(run_telegram_bot_async())
     except Exception as e:
         print(f"❌ Ошибка запуска Telegram бота: {e}")
         import traceback
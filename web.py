@@ -1,23 +1,34 @@
 # Веб-сайт для бота
-from flask import Flask, render_template, jsonify, request, session, redirect, url_for, flash, send_from_directory
+from flask import Flask, render_template, jsonify, request, session, redirect, url_for, flash, send_from_directory, g
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import config
 import os
-import uuid
+import threading
+import time
 
 # Пытаемся использовать PostgreSQL, если нет - JSON
 try:
     from database_postgres import db, RANKS
+    USING_POSTGRES = True
     print("✅ Используется PostgreSQL")
 except Exception as e:
     from database import db, RANKS
+    USING_POSTGRES = False
     print(f"⚠️ Используется JSON файл: {e}")
 
 from functools import wraps
+from response_cache import ResponseCache, init_static_hashing
+from uploads import store_upload, collect_orphans, variant_url, UploadError
+from bot_state import BotState
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = config.SECRET_KEY
+app.add_template_global(variant_url)
+
+# Кэш страниц и API, которые в основном читают данные (сбрасывается по версии данных)
+response_cache = ResponseCache(db)
+init_static_hashing(app)
 
 # Настройки загрузки файлов
 UPLOAD_FOLDER = 'static/uploads'
@@ -26,6 +37,9 @@ ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'webm', 'mov', 'avi'}
 ALLOWED_AUDIO_EXTENSIONS = {'mp3', 'mpeg', 'wav', 'ogg', 'flac'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
+# Слишком большой запрос отклоняется до разбора multipart (запас на поля формы)
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 1024 * 1024
+
 # Создаём папки для загрузок
 os.makedirs(os.path.join(UPLOAD_FOLDER, 'avatars'), exist_ok=True)
 os.makedirs(os.path.join(UPLOAD_FOLDER, 'music'), exist_ok=True)
@@ -34,17 +48,45 @@ os.makedirs(os.path.join(UPLOAD_FOLDER, 'backgrounds'), exist_ok=True)
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-# Данные бота (будут обновляться из main.py)
-bot_data = {
-    'status': 'offline',
-    'uptime': 0,
-    'guilds': 0,
-    'users': 0,
-    'commands_used': 0,
-    'messages_seen': 0,
-    'latency': 0,
-    'online_members': [],
-}
+# Очистка старых сессий (раз в час)
+SESSION_SWEEP_INTERVAL = 3600
+
+@app.before_request
+def load_current_user():
+    """Один раз за запрос определяем текущего пользователя по токену сессии"""
+    g.current_user = None
+    if request.endpoint == 'static':
+        return
+    if 'token' in session:
+        g.current_user = db.get_account_by_token(session['token'])
+
+def sweep_sessions():
+    """Один проход очистки: старые сессии порциями и неиспользуемые загрузки"""
+    try:
+        db.cleanup_expired_sessions()
+    except Exception as e:
+        print(f"❌ Ошибка очистки сессий: {e}")
+    try:
+        collect_orphans(db, app.static_folder)
+    except Exception as e:
+        print(f"❌ Ошибка очистки загрузок: {e}")
+
+def session_sweeper():
+    """Фоновая очистка старых сессий и неиспользуемых загрузок"""
+    while True:
+        sweep_sessions()
+        time.sleep(SESSION_SWEEP_INTERVAL)
+
+def start_session_sweeper():
+    """Запустить очистку сессий в фоновом потоке"""
+    threading.Thread(target=session_sweeper, daemon=True).start()
+
+# Данные бота (публикуются из main.py, в других процессах читаются из файла)
+bot_state = BotState()
+
+# Страница списка онлайн в /api/online
+ONLINE_PAGE_SIZE = 50
+ONLINE_PAGE_MAX = 200
 
 @app.route('/landing')
 def landing():
@@ -69,81 +111,91 @@ def test_design():
 @app.route('/')
 def index():
     """Главная страница"""
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
-    return render_template('index.html', bot_data=bot_data, current_user=current_user)
+    current_user = g.current_user
+    return render_template('index.html', bot_data=bot_state.get(), current_user=current_user)
 
 @app.route('/games')
 def games():
     """Страница со списком игр"""
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     return render_template('games.html', current_user=current_user)
 
 @app.route('/game')
 def game():
     """Страница кликера (старая игра)"""
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     return render_template('game.html', current_user=current_user)
 
 @app.route('/clicker')
 def clicker():
     """Кликер с фиолетовым градиентом"""
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     return render_template('game.html', current_user=current_user)
 
 @app.route('/snake')
 def snake():
     """Страница игры Змейка"""
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     return render_template('snake.html', current_user=current_user)
 
 @app.route('/leaderboard')
+@response_cache.cached()
 def leaderboard():
     """Таблица лидеров"""
     leaders = db.get_leaderboard(50)
     # Фильтруем Unknown пользователей
     leaders = [user for user in leaders if user.get('username') != 'Unknown']
     
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     return render_template('leaderboard.html', leaders=leaders, ranks=RANKS, current_user=current_user)
 
 @app.route('/ranks')
+@response_cache.cached()
 def ranks():
     """Список всех рангов"""
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     return render_template('ranks.html', ranks=RANKS, current_user=current_user)
 
 @app.route('/users')
+@response_cache.cached()
 def users():
-    """Список всех пользователей"""
+    """Каталог пользователей (первая страница, остальные - через /api/users)"""
     try:
-        # Получаем всех пользователей через универсальный метод
-        all_users = db.get_all_accounts()
+        query = request.args.get('q', '').strip()
+        page = db.get_accounts_page(prefix=query or None)
         
-        current_user = None
-        if 'token' in session:
-            current_user = db.get_account_by_token(session['token'])
+        current_user = g.current_user
         
-        return render_template('users.html', users=all_users, current_user=current_user)
+        return render_template(
+            'users.html',
+            users=page['accounts'],
+            next_cursor=page['next_cursor'],
+            total_users=db.count_accounts(),
+            query=query,
+            current_user=current_user
+        )
     except Exception as e:
         print(f"❌ Ошибка на странице /users: {e}")
         import traceback
         traceback.print_exc()
         return f"Ошибка: {str(e)}", 500
 
+@app.route('/api/users')
+@response_cache.cached(per_user=False)
+def api_users():
+    """API: страница каталога пользователей (?cursor=&limit=&q=)"""
+    try:
+        limit = min(max(request.args.get('limit', 24, type=int), 1), 100)
+        query = request.args.get('q', '').strip()
+        page = db.get_accounts_page(
+            cursor=request.args.get('cursor') or None,
+            limit=limit,
+            prefix=query or None
+        )
+        return jsonify({'success': True, **page})
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Некорректный курсор'}), 400
+
 # ==================== АУТЕНТИФИКАЦИЯ ====================
 
 # Регистрация через почту УДАЛЕНА - используется только Discord OAuth
@@ -165,6 +217,7 @@ def logout():
 # ==================== ПРОФИЛИ ====================
 
 @app.route('/profile/<username>')
+@response_cache.cached()
 def profile(username):
     """Публичный профиль пользователя"""
     account = db.get_account_by_username(username)
@@ -176,19 +229,14 @@ def profile(username):
     if account.get('discord_id'):
         game_data = db.get_user(account['discord_id'])
     
-    current_user = None
-    if 'token' in session:
-        current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     
     return render_template('profile.html', account=account, game_data=game_data, current_user=current_user, ranks=RANKS)
 
 @app.route('/settings')
 def settings():
     """Настройки профиля"""
-    if 'token' not in session:
-        return redirect(url_for('login'))
-    
-    current_user = db.get_account_by_token(session['token'])
+    current_user = g.current_user
     if not current_user:
         return redirect(url_for('login'))
     
@@ -197,10 +245,7 @@ def settings():
 @app.route('/api/update_profile', methods=['POST'])
 def api_update_profile():
     """API: обновить профиль"""
-    if 'token' not in session:
-        return jsonify({'success': False, 'error': 'Не авторизован'}), 401
-    
-    account = db.get_account_by_token(session['token'])
+    account = g.current_user
     if not account:
         return jsonify({'success': False, 'error': 'Не авторизован'}), 401
     
@@ -216,10 +261,7 @@ def api_change_password():
 @app.route('/api/link_discord', methods=['POST'])
 def api_link_discord():
     """API: привязать Discord ID"""
-    if 'token' not in session:
-        return jsonify({'success': False, 'error': 'Не авторизован'}), 401
-    
-    account = db.get_account_by_token(session['token'])
+    account = g.current_user
     if not account:
         return jsonify({'success': False, 'error': 'Не авторизован'}), 401
     
@@ -230,10 +272,7 @@ def api_link_discord():
 @app.route('/api/upload_avatar', methods=['POST'])
 def api_upload_avatar():
     """API: загрузить аватарку"""
-    if 'token' not in session:
-        return jsonify({'success': False, 'error': 'Не авторизован'}), 401
-    
-    account = db.get_account_by_token(session['token'])
+    account = g.current_user
     if not account:
         return jsonify({'success': False, 'error': 'Не авторизован'}), 401
     
@@ -248,14 +287,10 @@ def api_upload_avatar():
     if not allowed_file(file.filename, ALLOWED_IMAGE_EXTENSIONS):
         return jsonify({'success': False, 'error': 'Недопустимый формат файла. Используй PNG, JPG, GIF'}), 400
     
-    # Генерируем уникальное имя файла
     ext = file.filename.rsplit('.', 1)[1].lower()
-    filename = f"{account['id']}_{uuid.uuid4().hex[:8]}.{ext}"
-    filepath = os.path.join(UPLOAD_FOLDER, 'avatars', filename)
     
     try:
-        file.save(filepath)
-        avatar_url = f"/static/uploads/avatars/{filename}"
+        avatar_url = store_upload(file, app.static_folder, 'avatars', ext)
         
         # Обновляем профиль
         result = db.update_profile(account['id'], avatar_url=avatar_url)
@@ -264,16 +299,15 @@ def api_upload_avatar():
             return jsonify({'success': True, 'avatar_url': avatar_url})
         else:
             return jsonify(result)
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': f'Ошибка загрузки: {str(e)}'}), 500
 
 @app.route('/api/upload_music', methods=['POST'])
 def api_upload_music():
     """API: загрузить музыку"""
-    if 'token' not in session:
-        return jsonify({'success': False, 'error': 'Не авторизован'}), 401
-    
-    account = db.get_account_by_token(session['token'])
+    account = g.current_user
     if not account:
         return jsonify({'success': False, 'error': 'Не авторизован'}), 401
     
@@ -288,14 +322,10 @@ def api_upload_music():
     if not allowed_file(file.filename, ALLOWED_AUDIO_EXTENSIONS):
         return jsonify({'success': False, 'error': 'Недопустимый формат файла. Используй MP3'}), 400
     
-    # Генерируем уникальное имя файла
     ext = file.filename.rsplit('.', 1)[1].lower()
-    filename = f"{account['id']}_{uuid.uuid4().hex[:8]}.{ext}"
-    filepath = os.path.join(UPLOAD_FOLDER, 'music', filename)
     
     try:
-        file.save(filepath)
-        music_url = f"/static/uploads/music/{filename}"
+        music_url = store_upload(file, app.static_folder, 'music', ext)
         
         # Обновляем профиль
         result = db.update_profile(account['id'], music_url=music_url)
@@ -304,16 +334,15 @@ def api_upload_music():
             return jsonify({'success': True, 'music_url': music_url})
         else:
             return jsonify(result)
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': f'Ошибка загрузки: {str(e)}'}), 500
 
 @app.route('/api/upload_background', methods=['POST'])
 def api_upload_background():
     """API: загрузить background (изображение, видео или GIF)"""
-    if 'token' not in session:
-        return jsonify({'success': False, 'error': 'Не авторизован'}), 401
-    
-    account = db.get_account_by_token(session['token'])
+    account = g.current_user
     if not account:
         return jsonify({'success': False, 'error': 'Не авторизован'}), 401
     
@@ -336,13 +365,8 @@ def api_upload_background():
         allowed = ', '.join(sorted(ALLOWED_IMAGE_EXTENSIONS | ALLOWED_VIDEO_EXTENSIONS))
         return jsonify({'success': False, 'error': f'Недопустимый формат. Используй: {allowed}'}), 400
     
-    # Генерируем уникальное имя файла
-    filename = f"{account['id']}_{uuid.uuid4().hex[:8]}.{ext}"
-    filepath = os.path.join(UPLOAD_FOLDER, 'backgrounds', filename)
-    
     try:
-        file.save(filepath)
-        background_url = f"/static/uploads/backgrounds/{filename}"
+        background_url = store_upload(file, app.static_folder, 'backgrounds', ext)
         
         # Обновляем профиль
         result = db.update_profile(account['id'], background_url=background_url, background_type=file_type)
@@ -351,16 +375,15 @@ def api_upload_background():
             return jsonify({'success': True, 'background_url': background_url, 'background_type': file_type})
         else:
             return jsonify(result)
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': f'Ошибка загрузки: {str(e)}'}), 500
 
 @app.route('/api/upload_profile_bg', methods=['POST'])
 def api_upload_profile_bg():
     """API: загрузить фон профиля"""
-    if 'token' not in session:
-        return jsonify({'success': False, 'error': 'Не авторизован'}), 401
-    
-    account = db.get_account_by_token(session['token'])
+    account = g.current_user
     if not account:
         return jsonify({'success': False, 'error': 'Не авторизован'}), 401
     
@@ -375,14 +398,10 @@ def api_upload_profile_bg():
     if not allowed_file(file.filename, ALLOWED_IMAGE_EXTENSIONS):
         return jsonify({'success': False, 'error': 'Недопустимый формат файла. Используй JPG, PNG, GIF'}), 400
     
-    # Генерируем уникальное имя файла
     ext = file.filename.rsplit('.', 1)[1].lower()
-    filename = f"{account['id']}_profile_bg_{uuid.uuid4().hex[:8]}.{ext}"
-    filepath = os.path.join(UPLOAD_FOLDER, 'backgrounds', filename)
     
     try:
-        file.save(filepath)
-        profile_bg_url = f"/static/uploads/backgrounds/{filename}"
+        profile_bg_url = store_upload(file, app.static_folder, 'backgrounds', ext)
         
         # Обновляем профиль
         result = db.update_profile(account['id'], profile_bg_url=profile_bg_url)
@@ -391,6 +410,8 @@ def api_upload_profile_bg():
             return jsonify({'success': True, 'profile_bg_url': profile_bg_url})
         else:
             return jsonify(result)
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': f'Ошибка загрузки: {str(e)}'}), 500
 
@@ -398,26 +419,65 @@ def api_upload_profile_bg():
 
 @app.route('/api/stats')
 def api_stats():
-    """API: статистика бота"""
+    """API: статистика бота (список онлайн - в /api/online)"""
+    bot_data = dict(bot_state.get())
+    members = bot_data.pop('online_members', [])
+    bot_data.setdefault('online_count', len(members))
     return jsonify(bot_data)
 
 @app.route('/api/status')
 def api_status():
     """API: статус бота"""
     return jsonify({
-        'status': bot_data['status'],
+        'status': bot_state.get()['status'],
         'timestamp': datetime.now().isoformat()
     })
 
+# Готовый ответ /api/online для текущей версии онлайна: (версия, тело)
+online_json = (None, b'')
+
 @app.route('/api/online')
 def api_online():
-    """API: онлайн пользователи"""
-    return jsonify({
-        'count': len(bot_data['online_members']),
-        'members': bot_data['online_members']
-    })
+    """API: онлайн пользователи (?offset=&limit= - страница списка)"""
+    global online_json
+    bot_data = bot_state.get()
+    members = bot_data['online_members']
+    count = bot_data.get('online_count', len(members))
+    version = bot_data.get('online_version', 0)
+    paged = 'offset' in request.args or 'limit' in request.args
+    
+    if paged:
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', ONLINE_PAGE_SIZE, type=int), 1), ONLINE_PAGE_MAX)
+        etag = f"online-{version}-{offset}-{limit}"
+    else:
+        etag = f"online-{version}"
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    elif paged:
+        end = offset + limit
+        response = jsonify({
+            'count': count,
+            'version': version,
+            'offset': offset,
+            'members': members[offset:end],
+            'next_offset': end if end < len(members) else None
+        })
+    else:
+        # Полный список сериализуется один раз на версию, а не на каждый запрос
+        cached_version, body = online_json
+        if cached_version != version:
+            body = app.json.dumps({'count': count, 'version': version, 'members': members}).encode('utf-8')
+            online_json = (version, body)
+        response = app.response_class(body, mimetype='application/json')
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
 
 @app.route('/api/user/<user_id>')
+@response_cache.cached(per_user=False)
 def api_user(user_id):
     """API: данные пользователя"""
     user = db.get_user(user_id)
@@ -543,6 +603,7 @@ def api_complete_task():
     return jsonify(result)
 
 @app.route('/api/leaderboard')
+@response_cache.cached(per_user=False)
 def api_leaderboard():
     """API: таблица лидеров"""
     leaders = db.get_leaderboard(50)
@@ -552,6 +613,7 @@ def api_leaderboard():
     })
 
 @app.route('/api/ranks')
+@response_cache.cached(per_user=False)
 def api_ranks():
     """API: все ранги"""
     return jsonify({
@@ -559,13 +621,13 @@ def api_ranks():
     })
 
 def update_bot_data(data):
-    """Обновить данные бота"""
-    global bot_data
-    bot_data.update(data)
+    """Обновить данные бота (новый снимок вместо изменения на месте)"""
+    bot_state.publish(data)
 
 def run_web():
     """Запуск веб-сервера"""
     print(f"🌐 Веб-сервер запущен на http://localhost:{config.WEB_PORT}")
+    start_session_sweeper()
     app.run(host='0.0.0.0', port=config.WEB_PORT, debug=False)
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
-from flask import Flask, render_template, jsonify, send_from_directory, request, session, redirect, url_for, flash
+from flask import Flask, render_template, jsonify, send_from_directory, request, session, redirect, url_for, flash, g
 import os
+import threading
+import time
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -10,6 +12,9 @@ from database import db, RANKS
 # Импорт Discord OAuth
 from discord_oauth import get_oauth_url, handle_oauth_callback
 
+from response_cache import ResponseCache, init_static_hashing
+from uploads import store_upload, collect_orphans, variant_url, UploadError
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 
@@ -17,6 +22,14 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-pro
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 
+# Хэшированная статика (static_url в шаблонах) и кэш публичных API
+init_static_hashing(app)
+response_cache = ResponseCache(db)
+app.add_template_global(variant_url)
+
+# Слишком большой запрос отклоняется до разбора multipart
+app.config['MAX_CONTENT_LENGTH'] = 11 * 1024 * 1024
+
 # Email конфигурация (нужно будет настроить)
 EMAIL_CONFIG = {
     'smtp_server': 'smtp.gmail.com',  # Или другой SMTP сервер
@@ -28,16 +41,46 @@ EMAIL_CONFIG = {
 
 @app.after_request
 def add_header(response):
+    # Статика кэшируется отдельно (см. init_static_hashing)
+    if request.endpoint in ('static', 'serve_photos'):
+        return response
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '-1'
     return response
 
+@app.before_request
+def load_current_user():
+    """Один раз за запрос определяем текущего пользователя по токену сессии"""
+    g.current_user = None
+    if request.endpoint in ('static', 'serve_photos'):
+        return
+    if 'token' in session:
+        g.current_user = db.get_account_by_token(session['token'])
+
 def get_current_user():
     """Получить текущего пользователя из сессии"""
-    if 'token' in session:
-        return db.get_account_by_token(session['token'])
-    return None
+    return g.get('current_user')
+
+# Очистка старых сессий (раз в час)
+SESSION_SWEEP_INTERVAL = 3600
+
+def session_sweeper():
+    """Фоновая очистка старых сессий порциями и неиспользуемых загрузок"""
+    while True:
+        try:
+            db.cleanup_expired_sessions()
+        except Exception as e:
+            print(f"❌ Ошибка очистки сессий: {e}")
+        try:
+            collect_orphans(db, app.static_folder)
+        except Exception as e:
+            print(f"❌ Ошибка очистки загрузок: {e}")
+        time.sleep(SESSION_SWEEP_INTERVAL)
+
+def start_session_sweeper():
+    """Запустить очистку сессий в фоновом потоке"""
+    threading.Thread(target=session_sweeper, daemon=True).start()
 
 @app.route('/')
 def index():
@@ -151,6 +194,7 @@ def api_update_profile():
     return jsonify(result)
 
 @app.route('/api/user/<user_id>')
+@response_cache.cached(per_user=False)
 def api_user(user_id):
     """API: данные пользователя по Discord ID"""
     try:
@@ -197,24 +241,19 @@ def api_upload_avatar():
         if file_ext not in allowed_extensions:
             return jsonify({'success': False, 'error': 'Неподдерживаемый формат файла'})
         
-        # Сохранение файла
-        import uuid
-        filename = f"{uuid.uuid4()}.{file_ext}"
-        upload_folder = os.path.join(app.root_path, 'static', 'uploads', 'avatars')
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
+        # Потоковая запись с дедупликацией по содержимому
+        avatar_url = store_upload(file, app.static_folder, 'avatars', file_ext)
         
         # Обновление аватара в БД
-        avatar_url = f"/static/uploads/avatars/{filename}"
-        result = db.update_profile(current_user['id'], avatar=avatar_url)
+        result = db.update_profile(current_user['id'], avatar_url=avatar_url)
         
         if result['success']:
             return jsonify({'success': True, 'avatar_url': avatar_url})
         else:
             return jsonify({'success': False, 'error': 'Ошибка обновления профиля'})
             
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)})
     except Exception as e:
         print(f"Ошибка загрузки аватарки: {e}")
         return jsonify({'success': False, 'error': str(e)})
@@ -4,10 +4,67 @@ from datetime import datetime
 import hashlib
 import secrets
 import json
+import threading
+
+from session_cache import SessionCache
+
+# Сессии старше этого срока удаляются фоновой очисткой
+SESSION_MAX_AGE_DAYS = int(os.getenv('SESSION_MAX_AGE_DAYS', '30'))
+
+# Размер страницы каталога пользователей
+ACCOUNTS_PAGE_SIZE = 24
+
+# Кулдаун ежедневной награды; стрик продолжается, если прошлая награда
+# была не раньше DAILY_STREAK_WINDOW_SECONDS назад
+DAILY_COOLDOWN_SECONDS = 86400
+DAILY_STREAK_WINDOW_SECONDS = 2 * 86400
+
+# Пул соединений (на процесс): веб-потоки не открывают новое соединение на каждый запрос
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+
+
+class PooledConnection:
+    """
+    Соединение из пула
+    
+    Ведёт себя как обычное соединение psycopg2, но close() возвращает его
+    в пул (с откатом незавершённой транзакции) вместо закрытия.
+    """
+    
+    def __init__(self, pool, conn, slots):
+        self._pool = pool
+        self._conn = conn
+        self._slots = slots
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def close(self):
+        if self._conn is None:
+            return
+        
+        conn, self._conn = self._conn, None
+        broken = conn.closed
+        if not broken:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        self._pool.putconn(conn, close=broken)
+        self._slots.release()
+    
+    def __del__(self):
+        # Метод упал до close() - соединение всё равно должно вернуться в пул
+        try:
+            self.close()
+        except Exception:
+            pass
 
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
+    from psycopg2.pool import ThreadedConnectionPool
     PSYCOPG2_AVAILABLE = True
 except ImportError:
     PSYCOPG2_AVAILABLE = False
@@ -50,11 +107,52 @@ class PostgresDatabase:
         if self.database_url.startswith('postgres://'):
             self.database_url = self.database_url.replace('postgres://', 'postgresql://', 1)
         
+        # Аккаунт по токену запрашивается почти на каждой странице
+        self.session_cache = SessionCache()
+        
+        # Версия данных для кэша ответов (лидерборд, профили, список пользователей)
+        self.data_version = 0
+        self.data_modified_at = datetime.now()
+        
+        self._pool = None
+        self._pool_pid = None
+        self._pool_slots = None
+        self._pool_lock = threading.Lock()
+        
+        # Соединения, унаследованные от родителя при fork: не закрываем их
+        # (закрытие в дочернем процессе оборвёт их и у родителя)
+        self._inherited_pools = []
+        
         self.init_tables()
     
+    def _get_pool(self):
+        """Пул текущего процесса (после fork воркера создаётся заново)"""
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != pid:
+                    if self._pool is not None:
+                        self._inherited_pools.append(self._pool)
+                    self._pool = ThreadedConnectionPool(
+                        DB_POOL_MIN, DB_POOL_MAX,
+                        self.database_url, cursor_factory=RealDictCursor
+                    )
+                    self._pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+                    self._pool_pid = pid
+        return self._pool
+    
     def get_connection(self):
-        """Получить подключение к БД"""
-        return psycopg2.connect(self.database_url, cursor_factory=RealDictCursor)
+        """Получить подключение к БД (из пула, close() возвращает его обратно)"""
+        pool = self._get_pool()
+        slots = self._pool_slots
+        
+        # Пул не ждёт свободного соединения сам - ждём на семафоре
+        slots.acquire()
+        try:
+            return PooledConnection(pool, pool.getconn(), slots)
+        except Exception:
+            slots.release()
+            raise
     
     def init_tables(self):
         """Создать таблицы если их нет"""
@@ -100,6 +198,12 @@ class PostgresDatabase:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at)")
+        
+        # Каталог пользователей: keyset по (created_at, id) и поиск по началу имени
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_accounts_created_id ON accounts(created_at DESC, id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_accounts_username_prefix ON accounts(lower(username) text_pattern_ops)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_accounts_display_name_prefix ON accounts(lower(display_name) text_pattern_ops)")
         
         # Глобальная статистика
         cur.execute("""
@@ -110,6 +214,9 @@ class PostgresDatabase:
             )
         """)
         
+        # Стрик ежедневной награды (колонка добавлена позже)
+        cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS daily_streak INTEGER DEFAULT 0")
+        
         # Вставляем начальную статистику если её нет
         cur.execute("INSERT INTO global_stats (id) VALUES (1) ON CONFLICT DO NOTHING")
         
@@ -118,6 +225,22 @@ class PostgresDatabase:
         conn.close()
         print("✅ Таблицы PostgreSQL инициализированы")
     
+    def bump_data_version(self):
+        """Отметить изменение данных (XP, монеты, аккаунты)"""
+        self.data_version += 1
+        self.data_modified_at = datetime.now()
+    
+    def flush(self):
+        """Изменения в PostgreSQL фиксируются сразу - дописывать нечего"""
+    
+    def close(self):
+        """Завершение работы: закрыть соединения пула этого процесса"""
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._pool_pid = None
+    
     def hash_password(self, password):
         """Хешировать пароль"""
         return hashlib.sha256(password.encode()).hexdigest()
@@ -140,6 +263,7 @@ class PostgresDatabase:
             """, (str(user_id), username or 'Unknown', json.dumps(daily_tasks)))
             user = cur.fetchone()
             conn.commit()
+            self.bump_data_version()
         elif username and user['username'] != username:
             # Обновляем username если он изменился
             cur.execute("""
@@ -148,6 +272,7 @@ class PostgresDatabase:
             """, (username, str(user_id)))
             user = cur.fetchone()
             conn.commit()
+            self.bump_data_version()
         
         cur.close()
         conn.close()
@@ -181,6 +306,7 @@ class PostgresDatabase:
         user = cur.fetchone()
         
         conn.commit()
+        self.bump_data_version()
         cur.close()
         conn.close()
         
@@ -251,6 +377,7 @@ class PostgresDatabase:
                 cur = conn.cursor()
                 cur.execute("UPDATE global_stats SET total_tasks_completed = total_tasks_completed + 1 WHERE id = 1")
                 conn.commit()
+                self.bump_data_version()
                 cur.close()
                 conn.close()
                 
@@ -270,41 +397,99 @@ class PostgresDatabase:
         now = datetime.now()
         time_diff = (now - last_daily).total_seconds()
         
-        # 24 часа = 86400 секунд
-        return time_diff >= 86400
+        return time_diff >= DAILY_COOLDOWN_SECONDS
     
-    def claim_daily(self, user_id):
-        """Получить ежедневную награду"""
-        if not self.can_claim_daily(user_id):
-            user = self.get_user(user_id)
-            from datetime import datetime
-            last_daily = user['last_daily']
-            time_left = 86400 - (datetime.now() - last_daily).total_seconds()
-            hours = int(time_left // 3600)
-            minutes = int((time_left % 3600) // 60)
-            return {
-                'success': False,
-                'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
-            }
-        
-        user = self.get_user(user_id)
-        reward_xp = 100
-        reward_coins = 50
+    def _claim_daily_update(self, user_id, reward_xp, reward_coins):
+        """
+        Условный UPDATE ежедневной награды
         
-        self.add_xp(user_id, reward_xp)
+        Кулдаун, XP, монеты, ранг (с наградой за новый), стрик и last_daily
+        применяются одним запросом; параллельный запрос получит 0 строк.
         
-        # Обновляем last_daily
+        Returns:
+            (пользователь, ранг до награды) или None
+        """
         conn = self.get_connection()
         cur = conn.cursor()
-        cur.execute("UPDATE users SET last_daily = CURRENT_TIMESTAMP, coins = coins + %s WHERE id = %s", (reward_coins, str(user_id)))
+        
+        cur.execute("""
+            UPDATE users AS u
+            SET xp = u.xp + %(xp)s,
+                coins = u.coins + %(coins)s + CASE
+                    WHEN prev.new_rank_id > u.rank_id THEN (%(rewards)s::int[])[prev.new_rank_id]
+                    ELSE 0
+                END,
+                rank_id = GREATEST(u.rank_id, prev.new_rank_id),
+                daily_streak = CASE
+                    WHEN u.last_daily >= CURRENT_TIMESTAMP - %(streak_window)s * INTERVAL '1 second'
+                        THEN COALESCE(u.daily_streak, 0) + 1
+                    ELSE 1
+                END,
+                last_daily = CURRENT_TIMESTAMP,
+                last_active = CURRENT_TIMESTAMP
+            FROM (
+                SELECT id, rank_id AS old_rank_id,
+                       (SELECT COUNT(*) FROM unnest(%(thresholds)s::int[]) AS r(required_xp)
+                        WHERE r.required_xp <= users.xp + %(xp)s)::int AS new_rank_id
+                FROM users
+                WHERE id = %(id)s
+                FOR UPDATE
+            ) AS prev
+            WHERE u.id = prev.id
+              AND (u.last_daily IS NULL
+                   OR u.last_daily <= CURRENT_TIMESTAMP - %(cooldown)s * INTERVAL '1 second')
+            RETURNING u.*, prev.old_rank_id
+        """, {
+            'id': str(user_id),
+            'xp': reward_xp,
+            'coins': reward_coins,
+            'cooldown': DAILY_COOLDOWN_SECONDS,
+            'streak_window': DAILY_STREAK_WINDOW_SECONDS,
+            'thresholds': [rank['required_xp'] for rank in RANKS],
+            'rewards': [rank['reward_coins'] for rank in RANKS]
+        })
+        row = cur.fetchone()
+        
         conn.commit()
         cur.close()
         conn.close()
         
+        if not row:
+            return None
+        self.bump_data_version()
+        row = dict(row)
+        return row, row.pop('old_rank_id')
+    
+    def claim_daily(self, user_id):
+        """Получить ежедневную награду (один условный UPDATE)"""
+        reward_xp = 100
+        reward_coins = 50
+        
+        claimed = self._claim_daily_update(user_id, reward_xp, reward_coins)
+        if claimed is None:
+            # Кулдаун не прошёл или пользователя ещё нет (get_user создаст)
+            user = self.get_user(user_id)
+            if user.get('last_daily') is None:
+                claimed = self._claim_daily_update(user_id, reward_xp, reward_coins)
+            if claimed is None:
+                from datetime import datetime
+                user = self.get_user(user_id)
+                time_left = max(DAILY_COOLDOWN_SECONDS - (datetime.now() - user['last_daily']).total_seconds(), 0)
+                hours = int(time_left // 3600)
+                minutes = int((time_left % 3600) // 60)
+                return {
+                    'success': False,
+                    'error': f'Ты уже получил награду! Следующая через {hours}ч {minutes}м'
+                }
+        
+        user, old_rank = claimed
         return {
             'success': True,
             'xp': reward_xp,
-            'coins': reward_coins
+            'coins': reward_coins,
+            'streak': user['daily_streak'],
+            'rank_up': user['rank_id'] > old_rank,
+            'new_rank': user['rank_id']
         }
     
     def get_leaderboard(self, limit=10):
@@ -343,6 +528,73 @@ class PostgresDatabase:
         
         return [dict(acc) for acc in accounts]
     
+    def count_accounts(self):
+        """Количество аккаунтов"""
+        conn = self.get_connection()
+        cur = conn.cursor()
+        
+        cur.execute("SELECT COUNT(*) AS total FROM accounts")
+        total = cur.fetchone()['total']
+        
+        cur.close()
+        conn.close()
+        
+        return total
+    
+    def get_accounts_page(self, cursor=None, limit=ACCOUNTS_PAGE_SIZE, prefix=None):
+        """
+        Страница каталога пользователей (новые первые) без полного профиля
+        
+        Args:
+            cursor: next_cursor предыдущей страницы
+            prefix: Начало username или display_name
+        
+        Returns:
+            {'accounts': [...], 'next_cursor': str или None}
+        """
+        conditions = []
+        values = []
+        
+        if cursor:
+            created_at, _, account_id = cursor.rpartition('|')
+            conditions.append("(created_at, id) < (%s, %s)")
+            values += [datetime.fromisoformat(created_at), int(account_id)]
+        
+        if prefix:
+            # Экранируем спецсимволы LIKE, чтобы искать именно по началу
+            pattern = prefix.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(lower(username) LIKE %s OR lower(display_name) LIKE %s)")
+            values += [pattern, pattern]
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self.get_connection()
+        cur = conn.cursor()
+        
+        cur.execute(f"""
+            SELECT id, username, display_name, discord_id, created_at,
+                   COALESCE(profile->>'avatar_url', '') AS avatar_url,
+                   COALESCE(left(profile->>'bio', 101), '') AS bio
+            FROM accounts
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        """, values + [limit + 1])
+        rows = [dict(row) for row in cur.fetchall()]
+        
+        cur.close()
+        conn.close()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created_at'].isoformat()}|{rows[-1]['id']}"
+        
+        for row in rows:
+            row['created_at'] = row['created_at'].isoformat() if row['created_at'] else None
+        
+        return {'accounts': rows, 'next_cursor': next_cursor}
+    
     # Методы для аккаунтов (аналогично JSON версии)
     def create_account(self, email, username, password, display_name):
         """Создать аккаунт"""
@@ -362,6 +614,7 @@ class PostgresDatabase:
             
             account_id = cur.fetchone()['id']
             conn.commit()
+            self.bump_data_version()
             cur.close()
             conn.close()
             
@@ -403,6 +656,10 @@ class PostgresDatabase:
     
     def get_account_by_token(self, token):
         """Получить аккаунт по токену"""
+        cached = self.session_cache.get(token)
+        if cached is not None:
+            return dict(cached)
+        
         conn = self.get_connection()
         cur = conn.cursor()
         
@@ -416,7 +673,12 @@ class PostgresDatabase:
         cur.close()
         conn.close()
         
-        return dict(account) if account else None
+        if not account:
+            return None
+        
+        account = dict(account)
+        self.session_cache.put(token, account)
+        return dict(account)
     
     def get_account_by_username(self, username):
         """Получить аккаунт по username"""
@@ -466,7 +728,7 @@ class PostgresDatabase:
             
             # Обновляем профиль
             profile = dict(account['profile']) if account['profile'] else {}
-            for key in ['bio', 'music_url', 'theme', 'background_color', 'text_color', 'avatar_url']:
+            for key in ['bio', 'music_url', 'theme', 'background_color', 'bg_color', 'text_color', 'avatar_url', 'background_url', 'background_type', 'profile_bg_color', 'profile_bg_url']:
                 if key in kwargs:
                     profile[key] = kwargs[key]
             
@@ -479,6 +741,8 @@ class PostgresDatabase:
                 cur.execute(query, values)
                 updated_account = cur.fetchone()
                 conn.commit()
+                self.bump_data_version()
+                self.session_cache.invalidate_account(account_id)
                 
                 cur.close()
                 conn.close()
@@ -511,6 +775,7 @@ class PostgresDatabase:
         if account['password'] == self.hash_password(old_password):
             cur.execute("UPDATE accounts SET password = %s WHERE id = %s", (self.hash_password(new_password), account_id))
             conn.commit()
+            self.session_cache.invalidate_account(account_id)
             cur.close()
             conn.close()
             return {'success': True}
@@ -526,6 +791,8 @@ class PostgresDatabase:
         
         cur.execute("UPDATE accounts SET discord_id = %s WHERE id = %s", (discord_id, account_id))
         conn.commit()
+        self.bump_data_version()
+        self.session_cache.invalidate_account(account_id)
         
         cur.close()
         conn.close()
@@ -539,11 +806,45 @@ class PostgresDatabase:
         
         cur.execute("DELETE FROM sessions WHERE token = %s", (token,))
         conn.commit()
+        self.session_cache.invalidate_token(token)
         
         cur.close()
         conn.close()
         
         return {'success': True}
+    
+    def cleanup_expired_sessions(self, max_age_days=SESSION_MAX_AGE_DAYS, batch_size=1000):
+        """Удалить сессии старше max_age_days порциями по batch_size"""
+        conn = self.get_connection()
+        cur = conn.cursor()
+        total = 0
+        
+        try:
+            while True:
+                cur.execute("""
+                    DELETE FROM sessions
+                    WHERE token IN (
+                        SELECT token FROM sessions
+                        WHERE created_at < NOW() - make_interval(days => %s)
+                        LIMIT %s
+                    )
+                """, (max_age_days, batch_size))
+                deleted = cur.rowcount
+                conn.commit()
+                total += deleted
+                
+                if deleted < batch_size:
+                    break
+        finally:
+            cur.close()
+            conn.close()
+        
+        if total:
+            # Удалённые токены не должны жить в кэше до истечения TTL
+            self.session_cache.clear()
+            print(f"🧹 Удалено старых сессий: {total}")
+        
+        return total
 
 # Создаём экземпляр
 try:
@@ -183,15 +183,16 @@ def handle_oauth_callback(db):
                 conn.close()
             else:
                 # Убедимся что sessions существует
-                if 'sessions' not in db.accounts:
-                    db.accounts['sessions'] = {}
-                    
-                db.accounts['sessions'][token] = {
-                    'account_id': str(existing_account['id']),
-                    'created_at': datetime.now().isoformat()
-                }
-                db.save_accounts()
-                print(f"✅ Сессия сохранена в JSON: account_id={existing_account['id']}, token={token[:10]}...")
+                with db.lock:
+                    if 'sessions' not in db.accounts:
+                        db.accounts['sessions'] = {}
+                        
+                    db.accounts['sessions'][token] = {
+                        'account_id': str(existing_account['id']),
+                        'created_at': datetime.now().isoformat()
+                    }
+                    db.save_accounts()
+                    print(f"✅ Сессия сохранена в JSON: account_id={existing_account['id']}, token={token[:10]}...")
             
             print(f"✅ Сессия создана: {token[:10]}...")
         except Exception as e:
@@ -271,15 +272,16 @@ def handle_oauth_callback(db):
                     conn.close()
                 else:
                     # Убедимся что sessions существует
-                    if 'sessions' not in db.accounts:
-                        db.accounts['sessions'] = {}
-                    
-                    db.accounts['sessions'][token] = {
-                        'account_id': str(account_id),
-                        'created_at': datetime.now().isoformat()
-                    }
-                    db.save_accounts()
-                    print(f"✅ Сессия сохранена в JSON: account_id={account_id}, token={token[:10]}...")
+                    with db.lock:
+                        if 'sessions' not in db.accounts:
+                            db.accounts['sessions'] = {}
+                        
+                        db.accounts['sessions'][token] = {
+                            'account_id': str(account_id),
+                            'created_at': datetime.now().isoformat()
+                        }
+                        db.save_accounts()
+                        print(f"✅ Сессия сохранена в JSON: account_id={account_id}, token={token[:10]}...")
                 
                 print(f"✅ Сессия создана: {token[:10]}...")
             except Exception as e:
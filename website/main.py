@@ -5,10 +5,11 @@ import sys
 def main():
     """Главная функция"""
     # Запускаем веб-сервер
-    from app import app
+    from app import app, start_session_sweeper
     port = int(os.environ.get('PORT', 10000))
     
     print("🌐 TTFD Website запущен на порту", port)
+    start_session_sweeper()
     
     app.run(host='0.0.0.0', port=port, debug=False)
 
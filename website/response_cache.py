@@ -0,0 +1,172 @@
+# Кэш ответов для страниц и API, которые в основном читают данные
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import wraps
+
+from flask import g, request, make_response, url_for
+
+# Сколько держать ответ, даже если версия данных не менялась
+# (данные могут меняться из другого процесса - бота)
+RESPONSE_CACHE_TTL = 30
+RESPONSE_CACHE_SIZE = 2000
+
+# Статика с хэшем содержимого в ?v= кэшируется браузером навсегда
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class ResponseCache:
+    """
+    Кэш готовых ответов по ключу (путь, аргументы, пользователь) и версии данных
+    
+    Версия берётся из db.data_version: любая запись XP/монет/аккаунтов
+    её увеличивает, и старые ответы перестают совпадать. Ответы получают
+    ETag и Last-Modified, повторный запрос с If-None-Match /
+    If-Modified-Since получает 304 без тела.
+    """
+    
+    def __init__(self, db, ttl=RESPONSE_CACHE_TTL, maxsize=RESPONSE_CACHE_SIZE):
+        self.db = db
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items = OrderedDict()  # key -> (version, expires_at, body, mimetype, etag, last_modified)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _key(self, per_user):
+        user = g.get('current_user') if per_user else None
+        user_id = user.get('id') if user else None
+        return (request.path, request.query_string, user_id)
+    
+    def cached(self, per_user=True):
+        """
+        Декоратор view-функции
+        
+        Args:
+            per_user: Ответ зависит от текущего пользователя (шапка страницы)
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self._key(per_user)
+                version = self.db.data_version
+                
+                with self._lock:
+                    item = self._items.get(key)
+                    if item and (item[0] != version or item[1] < time.monotonic()):
+                        del self._items[key]
+                        item = None
+                    if item:
+                        self._items.move_to_end(key)
+                        self.hits += 1
+                
+                if item is None:
+                    self.misses += 1
+                    response = make_response(view(*args, **kwargs))
+                    
+                    # Кэшируем только успешные ответы
+                    if response.status_code != 200:
+                        return response
+                    
+                    body = response.get_data()
+                    etag = hashlib.sha1(body).hexdigest()[:16]
+                    last_modified = self.db.data_modified_at.replace(microsecond=0)
+                    item = (version, time.monotonic() + self.ttl, body, response.mimetype, etag, last_modified)
+                    
+                    with self._lock:
+                        self._items[key] = item
+                        while len(self._items) > self.maxsize:
+                            self._items.popitem(last=False)
+                
+                return self._respond(item, per_user)
+            
+            return wrapper
+        return decorator
+    
+    def _respond(self, item, per_user):
+        """Ответ из кэша: 200 с телом или 304"""
+        _, _, body, mimetype, etag, last_modified = item
+        
+        if self._not_modified(etag, last_modified):
+            response = make_response('', 304)
+        else:
+            response = make_response(body)
+            response.mimetype = mimetype
+        
+        response.set_etag(etag)
+        response.headers['Last-Modified'] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+        response.headers['Cache-Control'] = ('private' if per_user else 'public') + ', no-cache'
+        return response
+    
+    @staticmethod
+    def _not_modified(etag, last_modified):
+        if request.if_none_match:
+            return request.if_none_match.contains(etag)
+        
+        since = request.headers.get('If-Modified-Since')
+        if since:
+            try:
+                return last_modified.astimezone() <= parsedate_to_datetime(since)
+            except (TypeError, ValueError):
+                return False
+        
+        return False
+    
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._items.clear()
+
+
+# ==================== ХЭШИРОВАННАЯ СТАТИКА ====================
+
+_static_hashes = {}
+
+
+def static_hash(static_folder, filename):
+    """Короткий хэш содержимого файла статики (пересчитывается при изменении mtime)"""
+    path = os.path.join(static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    
+    cached = _static_hashes.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    with open(path, 'rb') as f:
+        digest = hashlib.md5(f.read()).hexdigest()[:12]
+    
+    _static_hashes[path] = (mtime, digest)
+    return digest
+
+
+def init_static_hashing(app):
+    """
+    Подключить static_url() в шаблонах и долгий кэш для хэшированной статики
+    
+    static_url('css/main.css') -> /static/css/main.css?v=<хэш содержимого>.
+    Изменённый файл получает новый URL, поэтому старый можно кэшировать навсегда.
+    """
+    @app.context_processor
+    def inject_static_url():
+        def static_url(filename):
+            digest = static_hash(app.static_folder, filename)
+            if digest:
+                return url_for('static', filename=filename, v=digest)
+            return url_for('static', filename=filename)
+        return {'static_url': static_url}
+    
+    @app.after_request
+    def cache_static(response):
+        if request.endpoint == 'static' and request.args.get('v') and response.status_code == 200:
+            response.headers['Cache-Control'] = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+            response.headers.pop('Pragma', None)
+            response.headers.pop('Expires', None)
+        return response
@@ -0,0 +1,76 @@
+# Кэш сессий: токен -> снимок аккаунта
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Сколько держать снимок аккаунта (0 - не кэшировать) и сколько токенов помнить.
+# Кэш у каждого процесса свой: при нескольких воркерах gunicorn logout в одном
+# из них не сбрасывает токен в остальных до истечения TTL
+SESSION_CACHE_TTL = int(os.getenv('SESSION_CACHE_TTL', '60'))
+SESSION_CACHE_SIZE = 10000
+
+
+class SessionCache:
+    """
+    Ограниченный TTL-кэш аккаунтов по токену сессии
+    
+    Снимок сбрасывается при logout (по токену) и при изменении аккаунта -
+    update_profile, change_password, link_discord (по id аккаунта).
+    Потокобезопасен: Flask обслуживает запросы в нескольких потоках.
+    """
+    
+    def __init__(self, ttl=SESSION_CACHE_TTL, maxsize=SESSION_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items = OrderedDict()  # token -> (expires_at, account)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, token):
+        """Аккаунт из кэша или None"""
+        with self._lock:
+            item = self._items.get(token)
+            
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[token]
+                self.misses += 1
+                return None
+            
+            self._items.move_to_end(token)
+            self.hits += 1
+            return item[1]
+    
+    def put(self, token, account):
+        """Запомнить аккаунт для токена"""
+        if self.ttl <= 0:
+            return
+        
+        with self._lock:
+            self._items[token] = (time.monotonic() + self.ttl, account)
+            self._items.move_to_end(token)
+            
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+    
+    def invalidate_token(self, token):
+        """Сбросить одну сессию (logout)"""
+        with self._lock:
+            self._items.pop(token, None)
+    
+    def invalidate_account(self, account_id):
+        """Сбросить все сессии аккаунта (изменение профиля, пароля, Discord)"""
+        with self._lock:
+            stale = [
+                token for token, (_, account) in self._items.items()
+                if account.get('id') == account_id
+            ]
+            for token in stale:
+                del self._items[token]
+    
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,197 @@
+# Загрузка файлов: потоковая запись, дедупликация по хэшу, варианты, сборка мусора
+#
+# Файл пишется на диск порциями с подсчётом sha256 и ограничением размера,
+# затем переносится в адрес по содержимому: uploads/<вид>/<ab>/<sha256>.<ext>.
+# Одинаковые файлы хранятся один раз. Уменьшенные копии картинок делаются
+# в фоновом потоке, файлы без ссылок из профилей удаляет collect_orphans().
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("⚠️ Pillow не установлен, уменьшенные копии картинок не создаются")
+
+CHUNK_SIZE = 64 * 1024
+
+# Ограничения размера по виду загрузки
+MAX_SIZES = {
+    'avatars': 10 * 1024 * 1024,
+    'music': 50 * 1024 * 1024,
+    'backgrounds': 50 * 1024 * 1024,
+}
+
+# Размеры уменьшенных копий (по большей стороне)
+VARIANT_SIZES = {
+    'avatars': [128, 256],
+    'backgrounds': [1280],
+}
+
+# Поля профиля, которые ссылаются на загруженные файлы
+PROFILE_FILE_FIELDS = ('avatar_url', 'music_url', 'background_url', 'profile_bg_url')
+
+# Файлы моложе этого возраста сборщик не трогает (профиль мог ещё не сохраниться)
+ORPHAN_MIN_AGE = 3600
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp'}
+
+_variant_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-variants')
+_store_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Ошибка загрузки, текст можно показать пользователю"""
+
+
+def _public_url(static_root, path):
+    """Путь в static -> URL /static/..."""
+    return '/static/' + os.path.relpath(path, static_root).replace(os.sep, '/')
+
+
+def store_upload(file, static_root, kind, ext, max_size=None):
+    """
+    Сохранить загруженный файл
+    
+    Args:
+        file: werkzeug FileStorage
+        static_root: Папка static приложения
+        kind: avatars, music или backgrounds
+        ext: Расширение файла (уже проверенное)
+        max_size: Предел размера (по умолчанию MAX_SIZES[kind])
+    
+    Returns:
+        URL файла (/static/uploads/<kind>/..)
+    """
+    max_size = max_size or MAX_SIZES.get(kind, MAX_SIZES['backgrounds'])
+    kind_dir = os.path.join(static_root, 'uploads', kind)
+    tmp_dir = os.path.join(static_root, 'uploads', '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadError(f'Файл больше {max_size // (1024 * 1024)} МБ')
+                digest.update(chunk)
+                out.write(chunk)
+        
+        if size == 0:
+            raise UploadError('Пустой файл')
+        
+        content_hash = digest.hexdigest()
+        final_dir = os.path.join(kind_dir, content_hash[:2])
+        final_path = os.path.join(final_dir, f"{content_hash}.{ext}")
+        os.makedirs(final_dir, exist_ok=True)
+        
+        with _store_lock:
+            if os.path.exists(final_path):
+                # Такой файл уже есть - обновляем mtime, чтобы сборщик его не тронул
+                os.utime(final_path)
+            else:
+                os.replace(tmp_path, final_path)
+                tmp_path = None
+                
+                if kind in VARIANT_SIZES and ext in IMAGE_EXTENSIONS and PIL_AVAILABLE:
+                    _variant_executor.submit(make_variants, final_path, VARIANT_SIZES[kind])
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return _public_url(static_root, final_path)
+
+
+def variant_path(path, size):
+    """Путь уменьшенной копии: <имя>_<size>.webp"""
+    base, _ = os.path.splitext(path)
+    return f"{base}_{size}.webp"
+
+
+def make_variants(path, sizes):
+    """Сделать уменьшенные копии картинки (вызывается в фоновом потоке)"""
+    try:
+        with Image.open(path) as image:
+            if getattr(image, 'is_animated', False):
+                return  # GIF-анимацию не пережимаем
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            for size in sizes:
+                if max(image.size) <= size:
+                    continue
+                variant = image.copy()
+                variant.thumbnail((size, size))
+                variant.save(variant_path(path, size), 'WEBP', quality=85)
+    except Exception as e:
+        print(f"❌ Ошибка создания копий {path}: {e}")
+
+
+def variant_url(url, size):
+    """URL уменьшенной копии, если она есть, иначе исходный URL"""
+    if not url or not url.startswith('/static/uploads/'):
+        return url
+    
+    from flask import current_app
+    static_root = current_app.static_folder
+    path = os.path.join(static_root, url[len('/static/'):])
+    
+    if os.path.exists(variant_path(path, size)):
+        return _public_url(static_root, variant_path(path, size))
+    return url
+
+
+def collect_orphans(db, static_root, min_age=ORPHAN_MIN_AGE, dry_run=False):
+    """
+    Удалить загруженные файлы, на которые не ссылается ни один профиль
+    
+    Returns:
+        Количество удалённых (при dry_run - найденных) файлов
+    """
+    referenced = set()
+    for account in db.get_all_accounts():
+        profile = account.get('profile') or {}
+        for field in PROFILE_FILE_FIELDS:
+            url = profile.get(field)
+            if url and url.startswith('/static/uploads/'):
+                referenced.add(os.path.normpath(os.path.join(static_root, url[len('/static/'):])))
+    
+    referenced_bases = {os.path.splitext(ref)[0] for ref in referenced}
+    uploads_root = os.path.join(static_root, 'uploads')
+    now = time.time()
+    removed = 0
+    
+    for dirpath, _, filenames in os.walk(uploads_root):
+        for filename in filenames:
+            path = os.path.normpath(os.path.join(dirpath, filename))
+            if path in referenced:
+                continue
+            
+            # Уменьшенная копия живёт, пока жив исходный файл
+            base, ext = os.path.splitext(path)
+            if ext == '.webp' and base.rsplit('_', 1)[0] in referenced_bases:
+                continue
+            
+            try:
+                if now - os.path.getmtime(path) < min_age:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+    
+    if removed:
+        print(f"🧹 Неиспользуемых загрузок {'найдено' if dry_run else 'удалено'}: {removed}")
+    
+    return removed
@@ -0,0 +1,18 @@
+# WSGI точка входа для продакшена: несколько воркеров вместо dev-сервера Flask
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Discord бот при этом запускается отдельно: WEB_MODE=external python main.py
+import os
+
+from web import app, start_session_sweeper, USING_POSTGRES
+
+# JSON-база: у каждого процесса своя копия данных, файлы перезаписываются
+# целиком - с несколькими воркерами (и ботом) изменения теряются
+if not USING_POSTGRES and int(os.getenv('WEB_WORKERS', '1')) > 1:
+    raise RuntimeError(
+        "JSON-база не поддерживает несколько воркеров: "
+        "настройте PostgreSQL (DATABASE_URL) или WEB_WORKERS=1"
+    )
+
+start_session_sweeper()